@@ -0,0 +1,71 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Measure how many L{callFromThread} calls per second the reactor can accept
+from other threads and run, and how many times its waker is written to in
+the process.
+
+Several threads each queue the same number of calls as fast as they can,
+which is roughly what a busy L{twisted.enterprise.adbapi.ConnectionPool} or
+a lot of L{twisted.internet.threads.deferToThread} traffic looks like.  With
+coalesced wakeups the number of waker writes should be a small fraction of
+the number of calls.
+"""
+
+import sys
+import threading
+from time import time
+
+from twisted.internet import reactor
+
+THREADS = 4
+CALLS = 100000
+
+
+def benchmark(threads, calls):
+    received = [0]
+    wakeUps = [0]
+    total = threads * calls
+
+    waker = reactor.waker
+    originalWakeUp = waker.wakeUp
+    def countingWakeUp():
+        wakeUps[0] += 1
+        originalWakeUp()
+    waker.wakeUp = countingWakeUp
+
+    def receive():
+        received[0] += 1
+        if received[0] == total:
+            reactor.stop()
+
+    def produce():
+        for i in range(calls):
+            reactor.callFromThread(receive)
+
+    def start():
+        for i in range(threads):
+            thread = threading.Thread(target=produce)
+            thread.daemon = True
+            thread.start()
+
+    reactor.callWhenRunning(start)
+    before = time()
+    reactor.run()
+    elapsed = time() - before
+    print("%d threads, %d calls: %10d calls/sec, %d waker writes (%s)" % (
+            threads, total, total / elapsed, wakeUps[0],
+            waker.__class__.__name__))
+
+
+
+def main(args):
+    threads = int(args[0]) if args else THREADS
+    calls = int(args[1]) if len(args) > 1 else CALLS
+    benchmark(threads, calls)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -133,6 +133,50 @@ def pauseUnpause(n):
     d.unpause()
 pauseUnpause = benchmarkNFunc(20, ns)(pauseUnpause)
 
+def succeedAddCallback():
+    """
+    Create an already fired deferred with succeed and add one callback to it,
+    the most common use of deferreds by code which has its result at hand.
+    """
+    defer.succeed(1).addCallback(lambda result: result)
+succeedAddCallback = benchmarkFunc(100000)(succeedAddCallback)
+
+def failAddErrback():
+    """
+    Create an already failed deferred with fail and add one errback to it
+    which handles the failure.
+    """
+    defer.fail(ZeroDivisionError()).addErrback(lambda reason: None)
+failAddErrback = benchmarkFunc(20000)(failAddErrback)
+
+def chainDeferreds(n):
+    """
+    Create the given number of deferreds, each waiting on the next by
+    returning it from a callback, then fire the last one so the result is
+    passed back up the chain.
+    """
+    first = d = defer.Deferred()
+    for i in xrange(n):
+        next = defer.Deferred()
+        d.addCallback(lambda ignored, next=next: next)
+        d.callback(None)
+        d = next
+    d.callback(1)
+    first.addCallback(lambda result: result)
+chainDeferreds = benchmarkNFunc(20, ns)(chainDeferreds)
+
+def gatherResults(n):
+    """
+    Gather the results of the given number of deferreds, which are fired
+    after they are passed to gatherResults.
+    """
+    ds = [defer.Deferred() for i in xrange(n)]
+    gathered = defer.gatherResults(ds)
+    for d in ds:
+        d.callback(1)
+    gathered.addCallback(lambda result: result)
+gatherResults = benchmarkNFunc(20, ns)(gatherResults)
+
 def benchmark():
     """
     Run all of the benchmarks registered in the benchmarkFuncs list
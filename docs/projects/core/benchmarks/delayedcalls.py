@@ -0,0 +1,88 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+See how the reactor's timed call bookkeeping scales with the number of
+pending L{DelayedCall}s.
+
+Each benchmark schedules C{n} calls and then cancels, resets or delays a
+sample of them, which is what a server full of idle connections using
+L{twisted.protocols.policies.TimeoutMixin} does all the time.  With an indexed
+heap the cost per operation should grow logarithmically (or not at all) with
+C{n}.
+"""
+
+import random
+import sys
+from time import time
+
+from twisted.internet.base import ReactorBase
+
+OPERATIONS = 10000
+
+
+class BenchmarkReactor(ReactorBase):
+    """
+    A reactor with the timed call implementation of L{ReactorBase} and no
+    I/O.
+    """
+    def installWaker(self):
+        pass
+
+
+
+def populate(n):
+    """
+    Create a reactor with C{n} pending timed calls, all inserted into its
+    heap.
+    """
+    reactor = BenchmarkReactor()
+    calls = [reactor.callLater(random.uniform(10, 1000), lambda: None)
+             for i in range(n)]
+    reactor._insertNewDelayedCalls()
+    return reactor, calls
+
+
+def sample(calls):
+    return random.sample(calls, OPERATIONS)
+
+
+def cancel(calls):
+    for call in sample(calls):
+        call.cancel()
+
+
+def resetSooner(calls):
+    for call in sample(calls):
+        call.reset(random.uniform(1, 10))
+
+
+def resetLater(calls):
+    for call in sample(calls):
+        call.reset(random.uniform(1000, 2000))
+
+
+def delaySooner(calls):
+    for call in sample(calls):
+        call.delay(-5)
+
+
+def benchmark(n):
+    for operation in (cancel, resetSooner, resetLater, delaySooner):
+        reactor, calls = populate(n)
+        before = time()
+        operation(calls)
+        elapsed = time() - before
+        print("%-12s n=%-8d %10d ops/sec" % (
+                operation.__name__, n, OPERATIONS / elapsed))
+
+
+def main(args):
+    random.seed(12345)
+    sizes = [int(arg) for arg in args] or [10 ** 5, 10 ** 6]
+    for n in sizes:
+        benchmark(n)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,84 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Measure the overhead of L{inlineCallbacks} for deep chains of generators
+yielding each other's L{Deferred}s, which is what business logic written with
+L{inlineCallbacks} calling more of the same looks like.
+
+Three cases are measured:
+
+  - C{ready}: each generator yields the next one down, and the innermost
+    yields a L{Deferred} which already has a result, so everything finishes
+    without waiting.
+
+  - C{waiting}: the same, but the innermost yields a L{Deferred} which is
+    fired afterwards, so every generator in the chain has to be resumed by a
+    callback.
+
+  - C{loop}: a single generator yielding many L{Deferred}s which already
+    have results.
+"""
+
+import sys
+from time import time
+
+from twisted.internet.defer import (
+    Deferred, succeed, inlineCallbacks, returnValue)
+
+DEPTH = 50
+ITERATIONS = 2000
+
+
+@inlineCallbacks
+def chain(depth, innermost):
+    if depth:
+        result = yield chain(depth - 1, innermost)
+    else:
+        result = yield innermost
+    returnValue(result + 1)
+
+
+
+def ready(depth):
+    chain(depth, succeed(0))
+
+
+
+def waiting(depth):
+    innermost = Deferred()
+    chain(depth, innermost)
+    innermost.callback(0)
+
+
+
+@inlineCallbacks
+def loop(count):
+    total = 0
+    for i in range(count):
+        total += yield succeed(i)
+    returnValue(total)
+
+
+
+def benchmark(name, f, argument, iterations):
+    before = time()
+    for i in range(iterations):
+        f(argument)
+    elapsed = time() - before
+    print("%-8s %5d: %10.1f usec/iteration" % (
+            name, argument, elapsed / iterations * 1000000))
+
+
+
+def main(args):
+    depth = int(args[0]) if args else DEPTH
+    iterations = int(args[1]) if len(args) > 1 else ITERATIONS
+    benchmark("ready", ready, depth, iterations)
+    benchmark("waiting", waiting, depth, iterations)
+    benchmark("loop", loop, depth, iterations)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
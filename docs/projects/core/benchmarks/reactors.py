@@ -0,0 +1,141 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Compare reactors on an echo workload and an HTTP workload.
+
+Both run a server and C{CONNECTIONS} clients in one process, over loopback
+TCP.  Each client keeps exactly one small message or request outstanding, so
+the work per round trip is dominated by the reactor and the transports rather
+than by copying data around.
+
+Usage::
+
+    python reactors.py [reactor ...]
+
+Reactors are named as for C{twistd --reactor}, or by the name of a module
+with an C{install} function, such as C{twisted.internet.uringreactor}, which
+twistd does not offer yet.  epoll and the io_uring reactor are compared by
+default.  Each reactor and workload is run in a new interpreter, since a
+process can only install one reactor.
+"""
+
+import subprocess
+import sys
+
+DURATION = 5
+CONNECTIONS = 50
+MESSAGE = b"x" * 64
+REQUEST = b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n"
+
+
+
+def echo(reactor, counter):
+    """
+    Start an echo server and clients which bounce L{MESSAGE} off it.
+    """
+    from twisted.internet.protocol import Protocol, Factory, ClientFactory
+    from twisted.protocols.wire import Echo
+
+    class EchoClient(Protocol):
+        received = 0
+
+        def connectionMade(self):
+            self.transport.write(MESSAGE)
+
+        def dataReceived(self, data):
+            self.received += len(data)
+            if self.received >= len(MESSAGE):
+                self.received -= len(MESSAGE)
+                counter[0] += 1
+                self.transport.write(MESSAGE)
+
+    port = reactor.listenTCP(0, Factory.forProtocol(Echo),
+                             interface="127.0.0.1")
+    return port, ClientFactory.forProtocol(EchoClient)
+
+
+
+def http(reactor, counter):
+    """
+    Start a web server and clients which repeatedly request a small resource
+    over persistent connections.
+    """
+    from twisted.internet.protocol import Protocol, Factory, ClientFactory
+    from twisted.web.resource import Resource
+    from twisted.web.server import Site
+    from twisted.web.static import Data
+
+    class HTTPClient(Protocol):
+        buffer = b""
+
+        def connectionMade(self):
+            self.transport.write(REQUEST)
+
+        def dataReceived(self, data):
+            self.buffer += data
+            while True:
+                end = self.buffer.find(b"\r\n\r\n")
+                if end == -1:
+                    return
+                length = 0
+                for header in self.buffer[:end].split(b"\r\n"):
+                    name, _, value = header.partition(b":")
+                    if name.lower() == b"content-length":
+                        length = int(value)
+                if len(self.buffer) < end + 4 + length:
+                    return
+                self.buffer = self.buffer[end + 4 + length:]
+                counter[0] += 1
+                self.transport.write(REQUEST)
+
+    root = Resource()
+    root.putChild(b"", Data(b"Hello, world!", "text/plain"))
+    site = Site(root)
+    site.log = lambda request: None
+    port = reactor.listenTCP(0, site, interface="127.0.0.1")
+    return port, ClientFactory.forProtocol(HTTPClient)
+
+
+
+def child(reactorName, workloadName):
+    """
+    Install a reactor, run one workload on it for L{DURATION} seconds and
+    report the rate of round trips.
+    """
+    if "." in reactorName:
+        from twisted.python.reflect import namedAny
+        namedAny(reactorName).install()
+        from twisted.internet import reactor
+    else:
+        from twisted.application.reactors import installReactor
+        reactor = installReactor(reactorName)
+    counter = [0]
+    port, clientFactory = globals()[workloadName](reactor, counter)
+    address = port.getHost()
+    for i in range(CONNECTIONS):
+        reactor.connectTCP(address.host, address.port, clientFactory)
+
+    def start():
+        counter[0] = 0
+        reactor.callLater(DURATION, reactor.stop)
+    # Let the connections get set up before measuring.
+    reactor.callLater(0.5, start)
+    reactor.run()
+    print("%-12s %-6s %10d round trips/sec" % (
+            reactorName.split(".")[-1], workloadName, counter[0] / DURATION))
+
+
+
+def main(args):
+    if args[:1] == ["--child"]:
+        child(*args[1:])
+        return
+    for reactorName in args or ["epoll", "twisted.internet.uringreactor"]:
+        for workloadName in ["echo", "http"]:
+            subprocess.call([sys.executable, __file__, "--child",
+                             reactorName, workloadName])
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,110 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Compare the rate at which C{reactor.spawnProcess} starts processes with
+posix_spawn() and with fork() and exec().
+
+C{CONCURRENCY} short-lived C{/bin/true} processes are kept running for
+C{DURATION} seconds with each method, first from a small process and then
+after growing the heap by C{HEAP} megabytes, since the cost of fork() grows
+with the size of the parent while that of posix_spawn() does not.
+
+Usage::
+
+    python spawn.py [heap megabytes]
+"""
+
+import sys
+import time
+
+from twisted.internet import reactor, process
+from twisted.internet.protocol import ProcessProtocol
+
+DURATION = 3
+CONCURRENCY = 8
+HEAP = 1024
+EXECUTABLE = "/bin/true"
+
+
+
+class Exit(ProcessProtocol):
+    """
+    Start another process when this one ends.
+    """
+
+    def __init__(self, run):
+        self.run = run
+
+
+    def processEnded(self, reason):
+        self.run.spawned()
+
+
+
+class Run(object):
+    """
+    Keep C{CONCURRENCY} processes running until C{deadline}, counting them.
+    """
+
+    def __init__(self, deadline, done):
+        self.deadline = deadline
+        self.done = done
+        self.count = 0
+        self.running = 0
+
+
+    def spawn(self):
+        self.running += 1
+        reactor.spawnProcess(Exit(self), EXECUTABLE, [EXECUTABLE], {})
+
+
+    def spawned(self):
+        self.count += 1
+        self.running -= 1
+        if time.time() < self.deadline:
+            self.spawn()
+        elif not self.running:
+            self.done(self.count)
+
+
+
+def benchmark(phases, ballast=[]):
+    """
+    Run each phase in turn: a method name, the L{process._posixspawn} to use
+    (C{None} to fork) and the size of the heap to do it with.
+    """
+    if not phases:
+        reactor.stop()
+        return
+    name, posixspawn, heap = phases.pop(0)
+    if heap and not ballast:
+        # Touch every page, so that they all have to be mapped in the child.
+        ballast.append(b"x" * (heap * 2 ** 20))
+    process._posixspawn = posixspawn
+    start = time.time()
+    def done(count):
+        print("%-11s %6d MB heap %8.1f spawns/sec" % (
+                name, heap, count / (time.time() - start)))
+        benchmark(phases)
+    run = Run(start + DURATION, done)
+    for i in range(CONCURRENCY):
+        run.spawn()
+
+
+
+def main(args):
+    posixspawn = process._posixspawn
+    if posixspawn is None:
+        raise SystemExit("posix_spawn is unavailable")
+    phases = []
+    for heap in [0, int(args[0]) if args else HEAP]:
+        phases.append(("posix_spawn", posixspawn, heap))
+        phases.append(("fork", None, heap))
+    reactor.callWhenRunning(benchmark, phases)
+    reactor.run()
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,160 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Measure the throughput of L{twisted.protocols.tls} over an in-memory
+loopback connection.
+
+Like L{twisted.protocols.loopback}, the bytes each side writes are queued
+and delivered to the other side's C{dataReceived}, but without a reactor, so
+only the TLS layer and the protocols are being measured.  Two workloads are
+run:
+
+  - bulk: the server answers each request with L{BULK_SIZE} bytes, written
+    in 64kB chunks.
+
+  - small: the server answers each request with L{SMALL_COUNT} writes of
+    L{SMALL_SIZE} bytes each, as a protocol writing a header at a time
+    might.
+
+Usage::
+
+    python tls.py
+"""
+
+import time
+
+from twisted.internet.protocol import Protocol, Factory
+from twisted.internet.ssl import ClientContextFactory
+from twisted.protocols.tls import TLSMemoryBIOFactory
+from twisted.test.proto_helpers import StringTransport
+from twisted.test.test_ssl import ServerTLSContext, certPath
+
+DURATION = 3
+BULK_SIZE = 2 ** 20
+SMALL_SIZE = 64
+SMALL_COUNT = 256
+
+
+
+class Queue(StringTransport):
+    """
+    A transport which queues written bytes for L{pump} to deliver.
+    """
+
+    def __init__(self):
+        StringTransport.__init__(self)
+        self.queue = []
+
+
+    def write(self, data):
+        self.queue.append(data)
+
+
+    def writeSequence(self, data):
+        self.queue.extend(data)
+
+
+
+def pump(source, target):
+    """
+    Deliver the bytes queued by C{source} to C{target}, one write at a time.
+
+    @return: Whether any bytes were delivered.
+    """
+    queue = source.transport.queue
+    if not queue:
+        return False
+    while queue:
+        target.dataReceived(queue.pop(0))
+    return True
+
+
+
+class Responder(Protocol):
+    """
+    Answer each request byte with a response made by C{respond}.
+    """
+
+    def dataReceived(self, data):
+        for byte in data:
+            self.respond()
+
+
+
+def bulk(transport):
+    chunk = b"x" * 2 ** 16
+    for i in range(BULK_SIZE // len(chunk)):
+        transport.write(chunk)
+    return BULK_SIZE
+
+
+
+def small(transport):
+    piece = b"x" * SMALL_SIZE
+    for i in range(SMALL_COUNT):
+        transport.write(piece)
+    return SMALL_SIZE * SMALL_COUNT
+
+
+
+class Counter(Protocol):
+    """
+    Count the bytes received, and send another request each time a whole
+    response has arrived.
+    """
+    received = 0
+
+    def __init__(self, responseSize):
+        self.responseSize = responseSize
+
+
+    def dataReceived(self, data):
+        self.received += len(data)
+        if self.received % self.responseSize == 0:
+            self.transport.write(b"?")
+
+
+
+def benchmark(name, respond):
+    """
+    Run one workload for L{DURATION} seconds and report the rate at which
+    response bytes are received.
+    """
+    responseSize = respond(StringTransport())
+
+    server = Responder()
+    server.respond = lambda: respond(server.transport)
+    serverFactory = TLSMemoryBIOFactory(
+        ServerTLSContext(certPath, certPath), False,
+        Factory.forProtocol(lambda: server))
+    client = Counter(responseSize)
+    clientFactory = TLSMemoryBIOFactory(
+        ClientContextFactory(), True, Factory.forProtocol(lambda: client))
+
+    serverTLS = serverFactory.buildProtocol(None)
+    clientTLS = clientFactory.buildProtocol(None)
+    serverTLS.makeConnection(Queue())
+    clientTLS.makeConnection(Queue())
+    client.transport.write(b"?")
+
+    start = time.time()
+    deadline = start + DURATION
+    while time.time() < deadline:
+        sent = pump(clientTLS, serverTLS)
+        sent = pump(serverTLS, clientTLS) or sent
+        if not sent:
+            break
+    elapsed = time.time() - start
+    print("%-6s %10.1f MB/sec" % (name, client.received / elapsed / 2 ** 20))
+
+
+
+def main():
+    benchmark("bulk", bulk)
+    benchmark("small", small)
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Measure how many datagrams per second L{twisted.internet.udp.Port} can read
+and deliver to a protocol, with one C{datagramReceived} call per datagram
+and with one C{datagramsReceived} call per read event.
+
+A plain socket fills the port's receive buffer with a burst of small
+datagrams, like DNS queries, and then C{doRead} is called directly, so only
+the cost of reading and dispatching is measured.
+"""
+
+import socket
+import sys
+from time import time
+
+from zope.interface import implementer
+
+from twisted.internet import udp
+from twisted.internet.interfaces import IBatchedDatagramProtocol
+from twisted.internet.protocol import DatagramProtocol
+
+BURST = 256
+PAYLOAD = b"x" * 64
+
+
+class Counter(DatagramProtocol):
+    count = 0
+
+    def datagramReceived(self, data, addr):
+        self.count += 1
+
+
+
+@implementer(IBatchedDatagramProtocol)
+class BatchedCounter(Counter):
+    def datagramsReceived(self, datagrams):
+        self.count += len(datagrams)
+
+
+
+def benchmark(protocol, duration):
+    port = udp.Port(0, protocol, interface="127.0.0.1")
+    port._bindSocket()
+    port.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2 ** 22)
+    address = ("127.0.0.1", port.getHost().port)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    elapsed = 0
+    end = time() + duration
+    while time() < end:
+        for i in range(BURST):
+            sender.sendto(PAYLOAD, address)
+        before = time()
+        port.doRead()
+        elapsed += time() - before
+
+    sender.close()
+    port.socket.close()
+    print("%-16s %10d packets/sec" % (
+            protocol.__class__.__name__, protocol.count / elapsed))
+
+
+
+def main(args):
+    duration = float(args[0]) if args else 3
+    benchmark(Counter(), duration)
+    benchmark(BatchedCounter(), duration)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
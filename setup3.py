@@ -35,6 +35,7 @@ modules = [
     "twisted.internet.gtk3reactor",
     "twisted.internet.main",
     "twisted.internet._newtls",
+    "twisted.internet.pool",
     "twisted.internet.posixbase",
     "twisted.internet.protocol",
     "twisted.internet.pollreactor",
@@ -51,6 +52,8 @@ modules = [
     "twisted.internet.test.reactormixins",
     "twisted.internet.threads",
     "twisted.internet.udp",
+    "twisted.internet._uring",
+    "twisted.internet.uringreactor",
     "twisted.internet.util",
     "twisted.names",
     "twisted.names.cache",
@@ -134,6 +137,7 @@ testModules = [
     "twisted.internet.test.test_glibbase",
     "twisted.internet.test.test_main",
     "twisted.internet.test.test_newtls",
+    "twisted.internet.test.test_pool",
     "twisted.internet.test.test_posixbase",
     "twisted.internet.test.test_protocol",
     "twisted.internet.test.test_sigchld",
@@ -142,6 +146,7 @@ testModules = [
     "twisted.internet.test.test_tls",
     "twisted.internet.test.test_udp",
     "twisted.internet.test.test_udp_internals",
+    "twisted.internet.test.test_uringreactor",
     "twisted.names.test.test_cache",
     "twisted.names.test.test_client",
     "twisted.names.test.test_common",
@@ -0,0 +1,97 @@
+# -*- test-case-name: twisted.internet.test.test_posixbase -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A binding to Linux's C{eventfd(2)}, standing in for C{os.eventfd},
+C{os.eventfd_read} and C{os.eventfd_write} where Python does not have them,
+as before Python 3.10.
+
+C{eventfd} is called through C{ctypes}, so no compiled extension is needed.
+The counter is read and written with ordinary C{read} and C{write} calls.
+"""
+
+from __future__ import division, absolute_import
+
+import ctypes
+import os
+import struct
+
+from twisted.python.runtime import platform
+
+if not platform.isLinux():
+    raise ImportError("eventfd is only supported on Linux")
+
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _eventfd = _libc.eventfd
+except (OSError, TypeError, AttributeError):
+    raise ImportError("eventfd is unavailable")
+
+_eventfd.argtypes = [ctypes.c_uint, ctypes.c_int]
+_eventfd.restype = ctypes.c_int
+
+# These are the same as the corresponding open(2) flags, whose values differ
+# between architectures.  Python 2 does not have O_CLOEXEC; its value here is
+# the one most architectures use.
+EFD_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+EFD_NONBLOCK = os.O_NONBLOCK
+
+_counter = struct.Struct("=Q")
+
+
+
+def eventfd(initval, flags=EFD_CLOEXEC):
+    """
+    Create an C{eventfd} file descriptor, like C{os.eventfd}.
+
+    @param initval: The initial value of the counter.
+    @type initval: C{int}
+
+    @param flags: A combination of L{EFD_CLOEXEC} and L{EFD_NONBLOCK}.
+    @type flags: C{int}
+
+    @raise OSError: If C{eventfd(2)} fails.
+
+    @return: The new file descriptor.
+    @rtype: C{int}
+    """
+    fd = _eventfd(initval, flags)
+    if fd == -1:
+        code = ctypes.get_errno()
+        raise OSError(code, os.strerror(code))
+    return fd
+
+
+
+def eventfd_read(fd):
+    """
+    Read the counter of an C{eventfd} and reset it to zero, like
+    C{os.eventfd_read}.
+
+    @raise OSError: With C{EAGAIN}, if C{fd} is non-blocking and the counter
+        is zero.
+
+    @return: The value the counter had.
+    @rtype: C{int}
+    """
+    return _counter.unpack(os.read(fd, _counter.size))[0]
+
+
+
+def eventfd_write(fd, value):
+    """
+    Add to the counter of an C{eventfd}, like C{os.eventfd_write}.
+
+    @param value: The number to add.
+    @type value: C{int}
+
+    @raise OSError: With C{EAGAIN}, if C{fd} is non-blocking and the counter
+        would overflow.
+    """
+    os.write(fd, _counter.pack(value))
+
+
+
+__all__ = ["eventfd", "eventfd_read", "eventfd_write", "EFD_CLOEXEC",
+           "EFD_NONBLOCK"]
@@ -320,6 +320,9 @@ class ConnectionMixin(object):
 
     def _startTLS(self):
         self.TLS = 1
+        # SSL.Connection proxies sendmsg to the underlying socket, which would
+        # bypass the encryption.
+        self._vectoredWrites = False
         self.__class__ = _getTLSClass(self.__class__)
 
 
@@ -0,0 +1,164 @@
+# -*- test-case-name: twisted.test.test_process -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A minimal binding to C{posix_spawn(3)}, just large enough for
+L{twisted.internet.process}.
+
+C{posix_spawn} starts a process without copying the parent's address space:
+on Linux, glibc uses C{clone(CLONE_VM | CLONE_VFORK)}, so the cost of
+starting a process does not grow with the size of the parent.  It is called
+through C{ctypes}, so no compiled extension is needed.
+
+The C{posix_spawn_file_actions_t}, C{posix_spawnattr_t} and C{sigset_t}
+types are opaque, and are given buffers larger than any C library's.
+"""
+
+from __future__ import division, absolute_import
+
+import ctypes
+import fcntl
+import os
+
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _posix_spawn = _libc.posix_spawn
+except (OSError, TypeError, AttributeError):
+    raise ImportError("posix_spawn is unavailable")
+
+_posix_spawn.argtypes = [
+    ctypes.POINTER(ctypes.c_int), ctypes.c_char_p, ctypes.c_void_p,
+    ctypes.c_void_p, ctypes.POINTER(ctypes.c_char_p),
+    ctypes.POINTER(ctypes.c_char_p)]
+
+_OPAQUE_SIZE = 1024
+
+# The same on every platform glibc supports.
+POSIX_SPAWN_SETSIGDEF = 0x04
+
+# posix_spawn_file_actions_addclosefrom_np is in glibc 2.34 and later, and
+# uses close_range(2) where the kernel has it.  Without it, the descriptors
+# to close have to be listed.
+canCloseFrom = hasattr(_libc, "posix_spawn_file_actions_addclosefrom_np")
+
+# posix_spawn_file_actions_addchdir_np is in glibc 2.29 and later, and in
+# macOS 10.15 and later.
+canChangeDirectory = hasattr(_libc, "posix_spawn_file_actions_addchdir_np")
+
+
+
+def _check(result):
+    """
+    Raise an C{OSError} if a C{posix_spawn} function reported an error.
+    """
+    if result:
+        raise OSError(result, os.strerror(result))
+
+
+
+def _strings(values):
+    """
+    Make a C{NULL}-terminated C array of strings.
+    """
+    values = list(values)
+    return (ctypes.c_char_p * (len(values) + 1))(*(values + [None]))
+
+
+
+def spawn(executable, args, environment, fdmap, path=None,
+          defaultSignals=(), listOpenFDs=None):
+    """
+    Start a process running C{executable}.
+
+    @param executable: The path of the program to run.  It is not looked up
+        in C{PATH}.
+    @type executable: C{str}
+
+    @param args: The arguments of the new process.
+    @type args: C{list} of C{str}
+
+    @param environment: The environment of the new process.
+    @type environment: C{dict}
+
+    @param fdmap: Maps each file descriptor the new process is to have to
+        the file descriptor in this process it is to be a copy of.  All other
+        file descriptors are closed in the new process.
+    @type fdmap: C{dict}
+
+    @param path: The working directory of the new process, or C{None} to
+        keep this process's.  Only supported if L{canChangeDirectory}.
+
+    @param defaultSignals: Signals whose disposition is reset to the default
+        in the new process.
+
+    @param listOpenFDs: If L{canCloseFrom} is false, a callable returning
+        the file descriptors which may be open in this process.
+
+    @raise OSError: If the process could not be started, including if the
+        program could not be executed.
+
+    @return: The new process's ID.
+    """
+    actions = ctypes.create_string_buffer(_OPAQUE_SIZE)
+    attributes = ctypes.create_string_buffer(_OPAQUE_SIZE)
+    _check(_libc.posix_spawn_file_actions_init(actions))
+    try:
+        _check(_libc.posix_spawnattr_init(attributes))
+        try:
+            # Move every source descriptor above the ones the new process
+            # will have, so that no dup2 can overwrite a descriptor which is
+            # still to be copied.  Copies made this way are also inheritable,
+            # whatever the flags of the originals.
+            lowest = max(fdmap) + 1 if fdmap else 0
+            copies = []
+            try:
+                for childFD in sorted(fdmap):
+                    copy = fcntl.fcntl(fdmap[childFD], fcntl.F_DUPFD, lowest)
+                    copies.append(copy)
+                    _check(_libc.posix_spawn_file_actions_adddup2(
+                            actions, copy, childFD))
+                for fd in range(lowest):
+                    if fd not in fdmap:
+                        _check(_libc.posix_spawn_file_actions_addclose(
+                                actions, fd))
+                if canCloseFrom:
+                    _check(_libc.posix_spawn_file_actions_addclosefrom_np(
+                            actions, lowest))
+                else:
+                    for fd in listOpenFDs():
+                        if fd >= lowest:
+                            _check(_libc.posix_spawn_file_actions_addclose(
+                                    actions, fd))
+                if path is not None:
+                    _check(_libc.posix_spawn_file_actions_addchdir_np(
+                            actions, path))
+
+                if defaultSignals:
+                    signals = ctypes.create_string_buffer(_OPAQUE_SIZE)
+                    _libc.sigemptyset(signals)
+                    for signalnum in defaultSignals:
+                        _libc.sigaddset(signals, signalnum)
+                    _check(_libc.posix_spawnattr_setsigdefault(
+                            attributes, signals))
+                    _check(_libc.posix_spawnattr_setflags(
+                            attributes, ctypes.c_short(POSIX_SPAWN_SETSIGDEF)))
+
+                pid = ctypes.c_int()
+                _check(_posix_spawn(
+                        ctypes.byref(pid), executable, actions, attributes,
+                        _strings(args),
+                        _strings(["%s=%s" % item
+                                  for item in environment.items()])))
+                return pid.value
+            finally:
+                for copy in copies:
+                    os.close(copy)
+        finally:
+            _libc.posix_spawnattr_destroy(attributes)
+    finally:
+        _libc.posix_spawn_file_actions_destroy(actions)
+
+
+
+__all__ = ["spawn", "canCloseFrom", "canChangeDirectory"]
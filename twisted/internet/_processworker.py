@@ -0,0 +1,51 @@
+# -*- test-case-name: twisted.internet.test.test_processpool -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+The main program of L{twisted.internet.processpool} worker processes.
+
+A worker answers L{CallFunction<twisted.internet.processpool.CallFunction>}
+commands read from file descriptor 3, one at a time, writing the responses
+to file descriptor 4, until descriptor 3 is closed.
+"""
+
+import os
+import sys
+import errno
+
+from twisted.internet.protocol import FileWrapper
+from twisted.internet.processpool import WorkerProtocol
+from twisted.internet.processpool import _WORKER_AMP_STDIN, _WORKER_AMP_STDOUT
+
+
+
+def main(_fdopen=os.fdopen, _read=os.read):
+    """
+    Serve calls until the pool closes our input.
+
+    @param _fdopen: If specified, the function to use in place of C{os.fdopen}.
+    @param _read: If specified, the function to use in place of C{os.read}.
+    """
+    protocolOut = _fdopen(_WORKER_AMP_STDOUT, 'wb')
+    protocol = WorkerProtocol()
+    protocol.makeConnection(FileWrapper(protocolOut))
+
+    while True:
+        try:
+            data = _read(_WORKER_AMP_STDIN, 65536)
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                continue
+            raise
+        if not data:
+            break
+        protocol.dataReceived(data)
+        protocolOut.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -*- test-case-name: twisted.internet.test.test_tcp -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A binding to Linux's C{sendfile(2)}, standing in for C{os.sendfile} where
+Python does not have it, as on Python 2.
+
+It is called through C{ctypes}, so no compiled extension is needed.  Other
+platforms' C{sendfile} functions take different arguments and are not
+supported.
+"""
+
+from __future__ import division, absolute_import
+
+import ctypes
+import os
+
+from twisted.python.runtime import platform
+
+if not platform.isLinux():
+    raise ImportError("sendfile is only supported on Linux")
+
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+    # sendfile64 takes a 64 bit offset whatever the size of off_t.  Where it
+    # is missing, sendfile does if long is 64 bits wide.
+    if hasattr(_libc, "sendfile64"):
+        _sendfile = _libc.sendfile64
+    elif ctypes.sizeof(ctypes.c_long) == 8:
+        _sendfile = _libc.sendfile
+    else:
+        raise ImportError("sendfile is unavailable")
+except (OSError, TypeError, AttributeError):
+    raise ImportError("sendfile is unavailable")
+
+_sendfile.argtypes = [
+    ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_int64),
+    ctypes.c_size_t]
+_sendfile.restype = ctypes.c_ssize_t
+
+
+
+def sendfile(outFD, inFD, offset, count):
+    """
+    Copy up to C{count} bytes from C{inFD}, starting at C{offset}, to
+    C{outFD}, like C{os.sendfile}.
+
+    @param outFD: The file descriptor to write to.
+    @type outFD: C{int}
+
+    @param inFD: The file descriptor to read from.  Its file position is not
+        changed.
+    @type inFD: C{int}
+
+    @param offset: The position in C{inFD} to start reading at.
+    @type offset: C{int}
+
+    @param count: The most bytes to copy.
+    @type count: C{int}
+
+    @raise OSError: If C{sendfile(2)} fails.
+
+    @return: The number of bytes copied, C{0} at the end of C{inFD}.
+    """
+    position = ctypes.c_int64(offset)
+    sent = _sendfile(outFD, inFD, ctypes.byref(position), count)
+    if sent == -1:
+        code = ctypes.get_errno()
+        raise OSError(code, os.strerror(code))
+    return sent
+
+
+
+__all__ = ["sendfile"]
@@ -6,6 +6,7 @@
 from __future__ import division, absolute_import
 
 import itertools
+from collections import OrderedDict
 from hashlib import md5
 
 from OpenSSL import SSL, crypto
@@ -16,6 +17,7 @@ from twisted.internet.error import VerifyError, CertificateError
 from twisted.internet.interfaces import IAcceptableCiphers, ICipher
 from twisted.python import _reflectpy3 as reflect, util
 from twisted.python.compat import nativeString, networkString, unicode
+from twisted.python.runtime import monotonic
 from twisted.python.util import FancyEqMixin
 
 
@@ -881,6 +883,148 @@ class OpenSSLCertificateOptions(object):
 
 
 
+class ClientSessionCache(object):
+    """
+    A cache of the TLS sessions negotiated by client connections, so that a
+    later connection to the same server can offer one and, if the server
+    still remembers it, resume it with an abbreviated handshake instead of
+    performing a full one.
+
+    Sessions are looked up by a key identifying the server and the context
+    factory the connection was made with, such as the C{(host, port,
+    serverName, contextFactory)} used by L{SSL4ClientEndpoint
+    <twisted.internet.endpoints.SSL4ClientEndpoint>}.  A resumed session is
+    not verified again, so a key must not be shared by connections whose
+    context factories trust different certificates.  The least recently
+    used session is discarded when the cache is full, and sessions are
+    discarded once they are older than C{lifetime}.
+
+    @ivar maxSize: The largest number of sessions kept.
+
+    @ivar lifetime: The number of seconds a session is kept for.  This should
+        not be longer than servers keep them for, which is 300 seconds unless
+        they were configured otherwise.
+
+    @ivar hits: The number of lookups which found a session.
+
+    @ivar misses: The number of lookups which found no session, or only an
+        expired one.
+
+    @ivar stores: The number of sessions stored.
+
+    @ivar evictions: The number of sessions discarded to make room for others.
+
+    @ivar _sessions: An L{OrderedDict} mapping keys to C{(session, expires)}
+        tuples, least recently used first.
+
+    @ivar _seconds: A no-argument callable returning the current time.
+    """
+    hits = 0
+    misses = 0
+    stores = 0
+    evictions = 0
+
+    def __init__(self, maxSize=1000, lifetime=300, clock=None):
+        """
+        @param clock: An L{IReactorTime} provider to measure session lifetimes
+            with, or C{None} to use a monotonic clock.
+        """
+        self.maxSize = maxSize
+        self.lifetime = lifetime
+        if clock is None:
+            self._seconds = monotonic
+        else:
+            self._seconds = clock.seconds
+        self._sessions = OrderedDict()
+
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+    def get(self, key):
+        """
+        Look up the session stored for C{key}.
+
+        @return: An L{OpenSSL.SSL.Session}, or C{None} if there is none which
+            has not expired.
+        """
+        entry = self._sessions.pop(key, None)
+        if entry is None or entry[1] <= self._seconds():
+            self.misses += 1
+            return None
+        self._sessions[key] = entry
+        self.hits += 1
+        return entry[0]
+
+
+    def store(self, key, session):
+        """
+        Store C{session} for C{key}, replacing any session already stored for
+        it.
+
+        @param session: An L{OpenSSL.SSL.Session}.
+        """
+        self._sessions.pop(key, None)
+        self._sessions[key] = (session, self._seconds() + self.lifetime)
+        self.stores += 1
+        while len(self._sessions) > self.maxSize:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+
+    def invalidate(self, key):
+        """
+        Discard the session stored for C{key}, if there is one.
+        """
+        self._sessions.pop(key, None)
+
+
+    def hitRate(self):
+        """
+        @return: The fraction of lookups which found a session, or C{0.0} if
+            there have been none.
+        @rtype: L{float}
+        """
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return self.hits / lookups
+
+
+
+class _SessionCachingContextFactory(object):
+    """
+    A client context factory which makes connections using it offer and
+    record sessions in a L{ClientSessionCache}.
+
+    L{TLSMemoryBIOProtocol <twisted.protocols.tls.TLSMemoryBIOProtocol>} looks
+    for the C{sessionCache} and C{sessionKey} attributes of its context
+    factory; any other context factory can provide them as well.
+
+    @ivar sessionCache: The L{ClientSessionCache}.
+
+    @ivar sessionKey: The key sessions are stored under.
+    """
+    isClient = True
+
+    def __init__(self, contextFactory, sessionCache, sessionKey):
+        """
+        @param contextFactory: The context factory to get contexts from.
+        """
+        self._contextFactory = contextFactory
+        self.sessionCache = sessionCache
+        self.sessionKey = sessionKey
+
+
+    def getContext(self):
+        """
+        @return: The context of the wrapped context factory.
+        """
+        return self._contextFactory.getContext()
+
+
+
 @implementer(ICipher)
 class OpenSSLCipher(FancyEqMixin, object):
     """
@@ -0,0 +1,414 @@
+# -*- test-case-name: twisted.internet.test.test_uringreactor -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A minimal binding to Linux's io_uring(7), just large enough for
+L{twisted.internet.uringreactor}.
+
+The kernel is driven with the raw C{io_uring_setup} and C{io_uring_enter}
+system calls through C{ctypes}, and the shared submission and completion
+rings are accessed through C{mmap}, so neither liburing nor a compiled
+extension is needed.  Only poll, receive, send and cancellation requests
+are supported.
+
+The kernel reads the submission queue tail during C{io_uring_enter} (no
+submission polling thread is used), but it may post completions at any time,
+from its worker threads and task work as well as during that call.  So the
+completion queue tail must be read with acquire ordering, before the entries
+it covers, and the queue heads and tails must be published with release
+ordering, after the entries they cover.  Python cannot issue memory barriers,
+so this module relies on x86's total store ordering, under which every load
+already has acquire ordering and every store release ordering, and refuses
+to load on other architectures.  Each access to the rings is a separate C
+call, which the compiler cannot reorder, and the head and tail words are
+read and written with single aligned 32 bit accesses through C{ctypes}, so
+neither side ever sees one of them half written.
+"""
+
+from __future__ import division, absolute_import
+
+import ctypes
+import errno
+import mmap
+import os
+import struct
+
+from twisted.python.runtime import platform
+
+if not platform.isLinux():
+    raise ImportError("io_uring is only available on Linux")
+
+# Architectures with total store ordering; see the module docstring.
+_TOTAL_STORE_ORDER = ("x86_64", "i386", "i486", "i586", "i686")
+
+if os.uname()[4] not in _TOTAL_STORE_ORDER:
+    raise ImportError("io_uring is only supported on x86")
+
+# These are the same on every architecture Linux supports, except Alpha.
+_SYS_io_uring_setup = 425
+_SYS_io_uring_enter = 426
+
+IORING_SETUP_CQSIZE = 1 << 3
+
+IORING_FEAT_SINGLE_MMAP = 1 << 0
+IORING_FEAT_EXT_ARG = 1 << 8
+
+IORING_ENTER_GETEVENTS = 1 << 0
+IORING_ENTER_EXT_ARG = 1 << 3
+
+IORING_OFF_SQ_RING = 0
+IORING_OFF_CQ_RING = 0x8000000
+IORING_OFF_SQES = 0x10000000
+
+IORING_OP_POLL_ADD = 6
+IORING_OP_POLL_REMOVE = 7
+IORING_OP_ASYNC_CANCEL = 14
+IORING_OP_SEND = 26
+IORING_OP_RECV = 27
+
+MSG_NOSIGNAL = 0x4000
+
+# Python 2's errno module does not have this.
+ECANCELED = getattr(errno, "ECANCELED", 125)
+
+_libc = ctypes.CDLL(None, use_errno=True)
+_syscall = _libc.syscall
+_syscall.restype = ctypes.c_long
+
+
+
+class _SubmissionRingOffsets(ctypes.Structure):
+    _fields_ = [(name, ctypes.c_uint32) for name in (
+            "head", "tail", "ring_mask", "ring_entries", "flags", "dropped",
+            "array", "resv1")] + [("user_addr", ctypes.c_uint64)]
+
+
+
+class _CompletionRingOffsets(ctypes.Structure):
+    _fields_ = [(name, ctypes.c_uint32) for name in (
+            "head", "tail", "ring_mask", "ring_entries", "overflow", "cqes",
+            "flags", "resv1")] + [("user_addr", ctypes.c_uint64)]
+
+
+
+class _Parameters(ctypes.Structure):
+    _fields_ = [(name, ctypes.c_uint32) for name in (
+            "sq_entries", "cq_entries", "flags", "sq_thread_cpu",
+            "sq_thread_idle", "features", "wq_fd")] + [
+        ("resv", ctypes.c_uint32 * 3),
+        ("sq_off", _SubmissionRingOffsets),
+        ("cq_off", _CompletionRingOffsets)]
+
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_int64), ("tv_nsec", ctypes.c_int64)]
+
+
+
+class _GetEventsArgument(ctypes.Structure):
+    _fields_ = [
+        ("sigmask", ctypes.c_uint64),
+        ("sigmask_sz", ctypes.c_uint32),
+        ("pad", ctypes.c_uint32),
+        ("ts", ctypes.c_uint64)]
+
+
+
+def _raiseFromErrno():
+    """
+    Raise an C{IOError} describing the error the last system call made
+    through C{ctypes} failed with.
+    """
+    err = ctypes.get_errno()
+    raise IOError(err, os.strerror(err))
+
+
+
+class Ring(object):
+    """
+    An io_uring instance, with its submission and completion queues mapped
+    into this process.
+
+    Requests are queued with L{pollAdd}, L{pollRemove}, L{recv}, L{send} and
+    L{cancel} and only reach the kernel when L{submit} or L{submitAndWait} is
+    called, so any number of them cost a single system call.
+
+    @ivar enters: The number of C{io_uring_enter} system calls made.
+
+    @ivar submitted: The number of requests the kernel has accepted.
+    """
+    _MASK32 = 0xffffffff
+
+    _u32 = struct.Struct("=I")
+    _sqe = struct.Struct("=BBHiQQIIQ24x")
+    _cqe = struct.Struct("=QiI")
+
+    enters = 0
+    submitted = 0
+
+    def __init__(self, entries=256, completionEntries=16384):
+        """
+        @param entries: The size of the submission queue.  More requests than
+            this may be queued between submissions; a full queue is submitted
+            to make room.
+
+        @param completionEntries: The size of the completion queue.  The
+            kernel buffers completions which do not fit, so this only needs
+            to be large enough to make that rare.
+
+        @raise IOError: If io_uring is unavailable or too old to provide
+            C{IORING_FEAT_EXT_ARG} (added in Linux 5.11).
+        """
+        self._fd = -1
+        self._maps = []
+        params = _Parameters()
+        params.flags = IORING_SETUP_CQSIZE
+        params.cq_entries = completionEntries
+        fd = _syscall(_SYS_io_uring_setup, ctypes.c_uint(entries),
+                      ctypes.byref(params))
+        if fd < 0:
+            _raiseFromErrno()
+        self._fd = fd
+        if not params.features & IORING_FEAT_EXT_ARG:
+            self.close()
+            raise IOError(
+                errno.ENOSYS,
+                "io_uring without IORING_FEAT_EXT_ARG is unsupported")
+
+        sqOffsets, cqOffsets = params.sq_off, params.cq_off
+        sqSize = sqOffsets.array + params.sq_entries * self._u32.size
+        cqSize = cqOffsets.cqes + params.cq_entries * self._cqe.size
+        if params.features & IORING_FEAT_SINGLE_MMAP:
+            sqSize = cqSize = max(sqSize, cqSize)
+        self._sq = self._map(sqSize, IORING_OFF_SQ_RING)
+        if params.features & IORING_FEAT_SINGLE_MMAP:
+            self._cq = self._sq
+        else:
+            self._cq = self._map(cqSize, IORING_OFF_CQ_RING)
+        self._sqes = self._map(
+            params.sq_entries * self._sqe.size, IORING_OFF_SQES)
+
+        self._sqHeadWord = ctypes.c_uint32.from_buffer(
+            self._sq, sqOffsets.head)
+        self._sqTailWord = ctypes.c_uint32.from_buffer(
+            self._sq, sqOffsets.tail)
+        self._sqMask = self._u32.unpack_from(self._sq, sqOffsets.ring_mask)[0]
+        self._sqEntries = params.sq_entries
+        self._sqTail = self._sqTailWord.value
+        self._sqHead = self._sqTail
+        # Entries are always placed in the slot their index names, so the
+        # indirection array can be filled in once.
+        for i in range(params.sq_entries):
+            self._u32.pack_into(
+                self._sq, sqOffsets.array + i * self._u32.size, i)
+
+        self._cqHeadWord = ctypes.c_uint32.from_buffer(
+            self._cq, cqOffsets.head)
+        self._cqTailWord = ctypes.c_uint32.from_buffer(
+            self._cq, cqOffsets.tail)
+        self._cqesOffset = cqOffsets.cqes
+        self._cqMask = self._u32.unpack_from(self._cq, cqOffsets.ring_mask)[0]
+
+        self._timespec = _Timespec()
+        self._argument = _GetEventsArgument()
+
+
+    def _map(self, size, offset):
+        """
+        Map one of the ring's regions into memory.
+        """
+        region = mmap.mmap(self._fd, size, mmap.MAP_SHARED,
+                           mmap.PROT_READ | mmap.PROT_WRITE, offset=offset)
+        self._maps.append(region)
+        return region
+
+
+    def close(self):
+        """
+        Release the rings and the io_uring file descriptor.  Outstanding
+        requests are cancelled by the kernel.
+        """
+        # The views of the head and tail words must go before the regions
+        # they are in can be unmapped.
+        self._sqHeadWord = self._sqTailWord = None
+        self._cqHeadWord = self._cqTailWord = None
+        for region in self._maps:
+            region.close()
+        self._maps = []
+        if self._fd != -1:
+            os.close(self._fd)
+            self._fd = -1
+
+
+    def __del__(self):
+        self.close()
+
+
+    def fileno(self):
+        """
+        @return: The io_uring file descriptor.
+        """
+        return self._fd
+
+
+    def pending(self):
+        """
+        @return: The number of queued requests the kernel has not consumed
+            yet.
+        """
+        self._sqHead = self._sqHeadWord.value
+        return (self._sqTail - self._sqHead) & self._MASK32
+
+
+    def _queue(self, opcode, fd, address, length, opFlags, userData):
+        """
+        Fill in the next submission queue entry.  It is published to the
+        kernel by L{_enter}.
+        """
+        if (self._sqTail - self._sqHead) & self._MASK32 == self._sqEntries:
+            # The queue looks full; see how far the kernel really got, and
+            # make room if it is.
+            while self.pending() == self._sqEntries:
+                self.submit()
+        self._sqe.pack_into(
+            self._sqes, (self._sqTail & self._sqMask) * self._sqe.size,
+            opcode, 0, 0, fd, 0, address, length, opFlags, userData)
+        self._sqTail = (self._sqTail + 1) & self._MASK32
+
+
+    def pollAdd(self, fd, events, userData):
+        """
+        Queue a one-shot poll of C{fd}.
+
+        @param events: The C{poll(2)} event mask to wait for.
+
+        @param userData: A non-zero integer identifying the request.  Its
+            completion is reported with this value and the C{poll(2)} events
+            which occurred, or a negative C{errno} value.
+        """
+        self._queue(IORING_OP_POLL_ADD, fd, 0, 0, events, userData)
+
+
+    def pollRemove(self, userData):
+        """
+        Queue the cancellation of the poll identified by C{userData}.  The
+        cancellation itself completes with a C{userData} of zero.
+        """
+        self._queue(IORING_OP_POLL_REMOVE, -1, userData, 0, 0, 0)
+
+
+    def recv(self, fd, address, length, userData):
+        """
+        Queue a receive of up to C{length} bytes from the socket C{fd} into
+        the memory at C{address}, which must stay allocated until the request
+        completes.  It completes once there is data to receive, with the
+        number of bytes received, C{0} at the end of the stream, or a
+        negative C{errno} value.
+        """
+        self._queue(IORING_OP_RECV, fd, address, length, 0, userData)
+
+
+    def send(self, fd, address, length, userData):
+        """
+        Queue a send of up to C{length} bytes from the memory at C{address},
+        which must stay allocated until the request completes, to the socket
+        C{fd}.  It completes once some data could be sent, with the number
+        of bytes sent or a negative C{errno} value.
+        """
+        self._queue(
+            IORING_OP_SEND, fd, address, length, MSG_NOSIGNAL, userData)
+
+
+    def cancel(self, userData):
+        """
+        Queue the cancellation of the receive or send identified by
+        C{userData}.  If it is cancelled, it completes with C{-ECANCELED}; it
+        may also have completed already.  The cancellation itself completes
+        with a C{userData} of zero.
+        """
+        self._queue(IORING_OP_ASYNC_CANCEL, -1, userData, 0, 0, 0)
+
+
+    def _enter(self, toSubmit, minComplete, flags, argument):
+        """
+        Make an C{io_uring_enter} system call, after publishing the queued
+        submission queue entries.
+        """
+        self._sqTailWord.value = self._sqTail
+        self.enters += 1
+        if argument is None:
+            argumentPointer, argumentSize = None, 0
+        else:
+            argumentPointer = ctypes.byref(argument)
+            argumentSize = ctypes.sizeof(argument)
+        result = _syscall(
+            _SYS_io_uring_enter, ctypes.c_int(self._fd),
+            ctypes.c_uint(toSubmit), ctypes.c_uint(minComplete),
+            ctypes.c_uint(flags), argumentPointer,
+            ctypes.c_size_t(argumentSize))
+        if result < 0:
+            _raiseFromErrno()
+        self.submitted += result
+        return result
+
+
+    def submit(self):
+        """
+        Hand all queued requests to the kernel without waiting for any to
+        complete.
+        """
+        pending = self.pending()
+        if pending:
+            self._enter(pending, 0, 0, None)
+
+
+    def submitAndWait(self, timeout):
+        """
+        Hand all queued requests to the kernel and wait for at least one
+        completion, in a single system call.
+
+        @param timeout: The longest time to wait, in seconds, or C{None} to
+            wait indefinitely.  Waiting ends early, without error, if a signal
+            is received.
+        """
+        argument = self._argument
+        if timeout is None:
+            argument.ts = 0
+        else:
+            timeout = max(timeout, 0)
+            seconds = int(timeout)
+            self._timespec.tv_sec = seconds
+            self._timespec.tv_nsec = int((timeout - seconds) * 1e9)
+            argument.ts = ctypes.addressof(self._timespec)
+        try:
+            self._enter(self.pending(), 1,
+                        IORING_ENTER_GETEVENTS | IORING_ENTER_EXT_ARG,
+                        argument)
+        except IOError as e:
+            if e.errno not in (errno.ETIME, errno.EINTR):
+                raise
+
+
+    def reap(self):
+        """
+        Consume every completion currently in the completion queue.
+
+        @return: A C{list} of C{(userData, result)} tuples.
+        """
+        cq = self._cq
+        head = self._cqHeadWord.value
+        tail = self._cqTailWord.value
+        completions = []
+        while head != tail:
+            userData, result, flags = self._cqe.unpack_from(
+                cq, self._cqesOffset + (head & self._cqMask) * self._cqe.size)
+            completions.append((userData, result))
+            head = (head + 1) & self._MASK32
+        self._cqHeadWord.value = head
+        return completions
+
+
+
+__all__ = ["Ring"]
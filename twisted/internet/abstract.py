@@ -20,9 +20,8 @@ from twisted.internet import interfaces, main
 if _PY3:
     def _concatenate(bObj, offset, bArray):
         # Python 3 lacks the buffer() builtin and the other primitives don't
-        # help in this case.  Just do the copy.  Perhaps later these buffers can
-        # be joined and FileDescriptor can use writev().  Or perhaps bytearrays
-        # would help.
+        # help in this case.  Just do the copy.  Transports which can use
+        # sendmsg() avoid this entirely; see FileDescriptor._doWriteVectors.
         return bObj[offset:] + b"".join(bArray)
 else:
     def _concatenate(bObj, offset, bArray):
@@ -172,9 +171,19 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
     _writeDisconnected = False
     dataBuffer = b""
     offset = 0
+    _tempDataOffset = 0
 
     SEND_LIMIT = 128*1024
 
+    # Subclasses which implement _writeSomeVectors set this to True to have
+    # doWrite hand them the buffered chunks directly instead of joining them
+    # into dataBuffer first.
+    _vectoredWrites = False
+
+    # The most chunks to pass to _writeSomeVectors at once; the usual value
+    # of IOV_MAX.
+    _VECTOR_LIMIT = 1024
+
     def __init__(self, reactor=None):
         """
         @param reactor: An L{IReactorFDSet} provider which this descriptor will
@@ -221,6 +230,111 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
                                   reflect.qual(self.__class__))
 
 
+    def _writeSomeVectors(self, vectors):
+        """
+        Write as much as possible of the given chunks of data, immediately and
+        in order, without joining them together.
+
+        This is used instead of L{writeSomeData} by subclasses which set
+        C{_vectoredWrites}, for example with C{sendmsg(2)}.  The return value
+        is interpreted in the same way as that of L{writeSomeData}.
+
+        @param vectors: The chunks of data to write.
+        @type vectors: C{list} of C{bytes} or C{memoryview}
+        """
+        raise NotImplementedError("%s does not implement _writeSomeVectors" %
+                                  reflect.qual(self.__class__))
+
+
+    def _doWriteVectors(self):
+        """
+        Write as much buffered data as possible with L{_writeSomeVectors} and
+        discard whatever was written from C{_tempDataBuffer}.
+
+        The chunks are passed on as they were given to L{write} and
+        L{writeSequence}; the first one is sliced with a C{memoryview} if it
+        has been partially written already.  At most C{SEND_LIMIT} bytes in at
+        most C{_VECTOR_LIMIT} chunks are passed on at once.
+
+        @return: The number of bytes written, or an exception if the
+            connection was lost.
+        """
+        buffers = self._tempDataBuffer
+        offset = self._tempDataOffset
+        vectors = []
+        size = 0
+        for chunk in buffers:
+            if offset:
+                chunk = memoryview(chunk)[offset:]
+                offset = 0
+            vectors.append(chunk)
+            size += len(chunk)
+            if size >= self.SEND_LIMIT or len(vectors) >= self._VECTOR_LIMIT:
+                break
+
+        l = self._writeSomeVectors(vectors)
+        if isinstance(l, Exception) or l < 0:
+            return l
+        self._discardWritten(l)
+        return l
+
+
+    def _pendingData(self):
+        """
+        Get the data which is to be written next, for writing it by other
+        means than L{doWrite}, such as a request to an io_uring reactor.
+
+        @return: Up to C{SEND_LIMIT} bytes from the start of the buffered
+            data.
+        @rtype: C{bytes}
+        """
+        limit = self.SEND_LIMIT
+        buffers = self._tempDataBuffer
+        if (self.offset == len(self.dataBuffer) and len(buffers) == 1 and
+                not self._tempDataOffset and self._tempDataLen <= limit):
+            # The usual case: a single write since the last one was sent.
+            return buffers[0]
+        chunks = [self.dataBuffer[self.offset:self.offset + limit]]
+        size = len(chunks[0])
+        offset = self._tempDataOffset
+        for chunk in buffers:
+            if size >= limit:
+                break
+            chunk = chunk[offset:offset + limit - size]
+            offset = 0
+            chunks.append(chunk)
+            size += len(chunk)
+        return b"".join(chunks)
+
+
+    def _discardWritten(self, count):
+        """
+        Discard C{count} bytes which have been written from the start of the
+        buffered data.
+
+        @type count: C{int}
+        """
+        inBuffer = min(count, len(self.dataBuffer) - self.offset)
+        self.offset += inBuffer
+        count -= inBuffer
+        if not count:
+            return
+        buffers = self._tempDataBuffer
+        self._tempDataLen -= count
+        if not self._tempDataLen:
+            del buffers[:]
+            self._tempDataOffset = 0
+            return
+        # Find the chunk where writing stopped, and how far into it.
+        written = count + self._tempDataOffset
+        index = 0
+        while index < len(buffers) and written >= len(buffers[index]):
+            written -= len(buffers[index])
+            index += 1
+        del buffers[:index]
+        self._tempDataOffset = written
+
+
     def doRead(self):
         """
         Called when data is available for reading.
@@ -240,28 +354,53 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
 
         @see: L{twisted.internet.interfaces.IWriteDescriptor.doWrite}.
         """
-        if len(self.dataBuffer) - self.offset < self.SEND_LIMIT:
-            # If there is currently less than SEND_LIMIT bytes left to send
-            # in the string, extend it with the array data.
-            self.dataBuffer = _concatenate(
-                self.dataBuffer, self.offset, self._tempDataBuffer)
-            self.offset = 0
-            self._tempDataBuffer = []
-            self._tempDataLen = 0
-
-        # Send as much data as you can.
-        if self.offset:
-            l = self.writeSomeData(lazyByteSlice(self.dataBuffer, self.offset))
+        if self._vectoredWrites and not self.dataBuffer:
+            # Send straight from the list of chunks, without copying them.
+            l = self._doWriteVectors()
+            if isinstance(l, Exception) or l < 0:
+                return l
         else:
-            l = self.writeSomeData(self.dataBuffer)
+            if self._tempDataOffset:
+                # Vectored writing stopped part way through the first chunk.
+                self._tempDataBuffer[0] = (
+                    self._tempDataBuffer[0][self._tempDataOffset:])
+                self._tempDataOffset = 0
+
+            if len(self.dataBuffer) - self.offset < self.SEND_LIMIT:
+                # If there is currently less than SEND_LIMIT bytes left to
+                # send in the string, extend it with the array data.
+                self.dataBuffer = _concatenate(
+                    self.dataBuffer, self.offset, self._tempDataBuffer)
+                self.offset = 0
+                self._tempDataBuffer = []
+                self._tempDataLen = 0
+
+            # Send as much data as you can.
+            if self.offset:
+                l = self.writeSomeData(
+                    lazyByteSlice(self.dataBuffer, self.offset))
+            else:
+                l = self.writeSomeData(self.dataBuffer)
 
-        # There is no writeSomeData implementation in Twisted which returns
-        # < 0, but the documentation for writeSomeData used to claim negative
-        # integers meant connection lost.  Keep supporting this here,
-        # although it may be worth deprecating and removing at some point.
-        if isinstance(l, Exception) or l < 0:
-            return l
-        self.offset += l
+            # There is no writeSomeData implementation in Twisted which
+            # returns < 0, but the documentation for writeSomeData used to
+            # claim negative integers meant connection lost.  Keep supporting
+            # this here, although it may be worth deprecating and removing at
+            # some point.
+            if isinstance(l, Exception) or l < 0:
+                return l
+            self.offset += l
+        return self._afterWrite()
+
+
+    def _afterWrite(self):
+        """
+        Do what L{doWrite} does once it has written some data: stop writing,
+        and ask the producer for more data or finish disconnecting, if
+        everything buffered has been written.
+
+        @return: See L{doWrite}.
+        """
         # If there is nothing left to send,
         if self.offset == len(self.dataBuffer) and not self._tempDataLen:
             self.dataBuffer = b""
@@ -9,20 +9,24 @@ Very basic functionality for a Reactor implementation.
 from __future__ import division, absolute_import
 
 import socket # needed only for sync-dns
+from collections import deque
 from zope.interface import implementer, classImplements
 
 import sys
+import types
 import warnings
-from heapq import heappush, heappop, heapify
 
 import traceback
 
 from twisted.internet.interfaces import IReactorCore, IReactorTime, IReactorThreads
 from twisted.internet.interfaces import IResolverSimple, IReactorPluggableResolver
 from twisted.internet.interfaces import IConnector, IDelayedCall
+from twisted.internet.interfaces import IReactorInstrumented
 from twisted.internet import fdesc, main, error, abstract, defer, threads
 from twisted.python import log, failure, _reflectpy3 as reflect
-from twisted.python.runtime import seconds as runtimeSeconds, platform
+from twisted.python.context import _currentContext
+from twisted.python.runtime import seconds as runtimeSeconds
+from twisted.python.runtime import monotonicSeconds, platform
 from twisted.internet.defer import Deferred, DeferredList
 
 # This import is for side-effects!  Even if you don't see any code using it
@@ -38,6 +42,11 @@ class DelayedCall:
     debug = False
     _str = None
 
+    # The position of this call in its reactor's heap of pending timed calls,
+    # or -1 if it is not in that heap.  This lets the reactor cancel and
+    # reschedule the call without searching the heap for it.
+    _heapIndex = -1
+
     def __init__(self, time, func, args, kw, cancel, reset,
                  seconds=runtimeSeconds):
         """
@@ -62,6 +71,8 @@ class DelayedCall:
         self.seconds = seconds
         self.cancelled = self.called = 0
         self.delayed_time = 0
+        # The call runs with the values of ContextVariables current now.
+        self._context = _currentContext.values
         if self.debug:
             self.creator = traceback.format_stack()[:-2]
 
@@ -220,7 +231,12 @@ class ThreadedResolver(object):
     @ivar reactor: The reactor the threadpool of which will be used to call
         L{socket.gethostbyname} and the I/O thread of which the result will be
         delivered.
+
+    @ivar lookupPriority: The priority of lookups in the reactor's threadpool,
+        ahead of ordinary work, so that a backlog of slow work such as
+        database queries does not hold up name resolution.
     """
+    lookupPriority = -10
 
     def __init__(self, reactor):
         self.reactor = reactor
@@ -266,9 +282,14 @@ class ThreadedResolver(object):
         else:
             timeoutDelay = 60
         userDeferred = defer.Deferred()
-        lookupDeferred = threads.deferToThreadPool(
-            self.reactor, self.reactor.getThreadPool(),
-            socket.gethostbyname, name)
+        threadpool = self.reactor.getThreadPool()
+        if getattr(threadpool, 'callInThreadWithPriority', None) is not None:
+            lookupDeferred = threads.deferToThreadPoolWithPriority(
+                self.reactor, threadpool, self.lookupPriority,
+                socket.gethostbyname, name)
+        else:
+            lookupDeferred = threads.deferToThreadPool(
+                self.reactor, threadpool, socket.gethostbyname, name)
         cancelCall = self.reactor.callLater(
             timeoutDelay, self._cleanup, name, lookupDeferred)
         self._runningQueries[lookupDeferred] = (userDeferred, cancelCall)
@@ -432,7 +453,31 @@ class _ThreePhaseEvent(object):
 
 
 
-@implementer(IReactorCore, IReactorTime, IReactorPluggableResolver)
+def _qualifiedName(f):
+    """
+    Name a callable for L{IReactorInstrumentation.slowCall}.
+
+    @return: The module and name of a function, the class and name of a
+        bound method, or the C{repr} of anything else (such as a
+        C{functools.partial}).
+    @rtype: C{str}
+    """
+    instance = getattr(f, '__self__', None)
+    name = getattr(f, '__name__', None)
+    if isinstance(instance, types.ModuleType):
+        # A builtin function on Python 3.
+        instance = None
+    if instance is not None and name is not None:
+        return reflect.qual(instance.__class__) + '.' + name
+    module = getattr(f, '__module__', None)
+    if module is not None and name is not None:
+        return module + '.' + getattr(f, '__qualname__', name)
+    return reflect.safe_repr(f)
+
+
+
+@implementer(IReactorCore, IReactorTime, IReactorPluggableResolver,
+             IReactorInstrumented)
 class ReactorBase(object):
     """
     Default base class for Reactors.
@@ -460,9 +505,32 @@ class ReactorBase(object):
     @ivar _registerAsIOThread: A flag controlling whether the reactor will
         register the thread it is running in as the I/O thread when it starts.
         If C{True}, registration will be done, otherwise it will not be.
+
+    @ivar _instrumentation: The L{IReactorInstrumentation} provider installed
+        by L{setInstrumentation}, or C{None}.  Every timing hook checks this
+        first, so an uninstrumented reactor pays only for that check.
+
+    @ivar threadCallQueue: A C{deque} of C{(f, args, kw, context)} tuples
+        queued by L{callFromThread}, where C{context} holds the values of
+        L{ContextVariable<twisted.python.context.ContextVariable>}s which
+        C{f} runs with.  Other threads only append to it and the reactor
+        thread only pops from its left, both of which are atomic, so no lock
+        is needed.
+
+    @ivar _wakeUpPending: A flag which is true from the time
+        L{callFromThread} wakes the reactor up until the reactor next runs
+        the thread call queue.  While it is set, further calls are queued
+        without waking the reactor again.
+
+    @ivar _threadCallBatchSize: The largest number of calls from
+        C{threadCallQueue} which L{runUntilCurrent} runs before letting the
+        reactor go back to I/O.
     """
 
     _registerAsIOThread = True
+    _instrumentation = None
+    _wakeUpPending = False
+    _threadCallBatchSize = 1000
 
     _stopped = True
     installed = False
@@ -472,11 +540,10 @@ class ReactorBase(object):
     __name__ = "twisted.internet.reactor"
 
     def __init__(self):
-        self.threadCallQueue = []
+        self.threadCallQueue = deque()
         self._eventTriggers = {}
         self._pendingTimedCalls = []
         self._newTimedCalls = []
-        self._cancellations = 0
         self.running = False
         self._started = False
         self._justStopped = False
@@ -511,6 +578,33 @@ class ReactorBase(object):
         self.resolver = resolver
         return oldResolver
 
+    def setInstrumentation(self, instrumentation):
+        """
+        See
+        L{twisted.internet.interfaces.IReactorInstrumented.setInstrumentation}.
+        """
+        previous = self._instrumentation
+        self._instrumentation = instrumentation
+        return previous
+
+
+    def _timeCall(self, instrumentation, f, args=(), kw={}):
+        """
+        Call C{f} with C{args} and C{kw} and report it to C{instrumentation}
+        if it took at least C{instrumentation.slowThreshold} seconds, whether
+        or not it raised.
+
+        @return: Whatever C{f} returned.
+        """
+        start = self.seconds()
+        try:
+            return f(*args, **kw)
+        finally:
+            elapsed = self.seconds() - start
+            if elapsed >= instrumentation.slowThreshold:
+                instrumentation.slowCall(_qualifiedName(f), elapsed)
+
+
     def wakeUp(self):
         """
         Wake up the event loop.
@@ -699,41 +793,165 @@ class ReactorBase(object):
 
     seconds = staticmethod(runtimeSeconds)
 
+    def _timedCallClock(self):
+        """
+        Get the clock which timed calls are scheduled and run by.
+
+        L{seconds} gives the system time, which may be stepped forwards or
+        backwards.  Timed calls are scheduled by
+        L{twisted.python.runtime.monotonicSeconds} instead, so that they
+        neither run early nor are held up when that happens.  If L{seconds}
+        has been replaced, though, timed calls follow the replacement, so
+        that whatever controls the time this reactor sees also controls when
+        they run.
+
+        @return: A no-argument callable returning the current time in
+            seconds.
+        """
+        seconds = self.seconds
+        if seconds is runtimeSeconds:
+            return monotonicSeconds
+        return seconds
+
     def callLater(self, _seconds, _f, *args, **kw):
         """See twisted.internet.interfaces.IReactorTime.callLater.
         """
         assert callable(_f), "%s is not callable" % _f
         assert _seconds >= 0, \
                "%s is not greater than or equal to 0 seconds" % (_seconds,)
-        tple = DelayedCall(self.seconds() + _seconds, _f, args, kw,
+        seconds = self._timedCallClock()
+        tple = DelayedCall(seconds() + _seconds, _f, args, kw,
                            self._cancelCallLater,
                            self._moveCallLaterSooner,
-                           seconds=self.seconds)
+                           seconds=seconds)
         self._newTimedCalls.append(tple)
         return tple
 
     def _moveCallLaterSooner(self, tple):
-        # Linear time find: slow.
-        heap = self._pendingTimedCalls
-        try:
-            pos = heap.index(tple)
-
-            # Move elt up the heap until it rests at the right place.
-            elt = heap[pos]
-            while pos != 0:
-                parent = (pos-1) // 2
-                if heap[parent] <= elt:
-                    break
-                # move parent down
-                heap[pos] = heap[parent]
-                pos = parent
-            heap[pos] = elt
-        except ValueError:
-            # element was not found in heap - oh well...
-            pass
+        """
+        Restore the heap invariant after C{tple} was rescheduled to an earlier
+        time.
+
+        A call which has not yet been moved from C{_newTimedCalls} into the
+        heap needs no attention; it will be placed correctly when it is
+        inserted.
+        """
+        pos = tple._heapIndex
+        if pos >= 0:
+            self._siftTimedCallUp(pos)
 
     def _cancelCallLater(self, tple):
-        self._cancellations+=1
+        """
+        Remove the cancelled call C{tple} from the heap of pending timed
+        calls, if it has been inserted there.
+        """
+        if tple._heapIndex >= 0:
+            self._removeTimedCall(tple)
+
+
+    def _siftTimedCallUp(self, pos):
+        """
+        Move the call at index C{pos} of C{_pendingTimedCalls} towards the
+        root of the heap until its parent is scheduled no later than it is.
+
+        This and L{_siftTimedCallDown} are equivalent to the private helpers
+        of L{heapq}, but also keep each call's C{_heapIndex} up to date so
+        that a call can be found in the heap without searching for it.
+
+        @param pos: The index of the call to move.
+        @type pos: L{int}
+        """
+        heap = self._pendingTimedCalls
+        call = heap[pos]
+        time = call.time
+        while pos > 0:
+            parentPos = (pos - 1) >> 1
+            parent = heap[parentPos]
+            if parent.time <= time:
+                break
+            heap[pos] = parent
+            parent._heapIndex = pos
+            pos = parentPos
+        heap[pos] = call
+        call._heapIndex = pos
+
+
+    def _siftTimedCallDown(self, pos):
+        """
+        Move the call at index C{pos} of C{_pendingTimedCalls} away from the
+        root of the heap until neither of its children is scheduled before it.
+
+        @param pos: The index of the call to move.
+        @type pos: L{int}
+        """
+        heap = self._pendingTimedCalls
+        end = len(heap)
+        call = heap[pos]
+        time = call.time
+        childPos = 2 * pos + 1
+        while childPos < end:
+            rightPos = childPos + 1
+            if rightPos < end and heap[rightPos].time < heap[childPos].time:
+                childPos = rightPos
+            child = heap[childPos]
+            if time <= child.time:
+                break
+            heap[pos] = child
+            child._heapIndex = pos
+            pos = childPos
+            childPos = 2 * pos + 1
+        heap[pos] = call
+        call._heapIndex = pos
+
+
+    def _pushTimedCall(self, call):
+        """
+        Add C{call} to the heap of pending timed calls.
+
+        @type call: L{DelayedCall}
+        """
+        heap = self._pendingTimedCalls
+        heap.append(call)
+        self._siftTimedCallUp(len(heap) - 1)
+
+
+    def _popTimedCall(self):
+        """
+        Remove and return the earliest call from the heap of pending timed
+        calls.
+
+        @rtype: L{DelayedCall}
+        """
+        heap = self._pendingTimedCalls
+        last = heap.pop()
+        if heap:
+            call = heap[0]
+            heap[0] = last
+            self._siftTimedCallDown(0)
+        else:
+            call = last
+        call._heapIndex = -1
+        return call
+
+
+    def _removeTimedCall(self, call):
+        """
+        Remove C{call} from any position in the heap of pending timed calls in
+        logarithmic time.
+
+        @type call: L{DelayedCall}
+        """
+        heap = self._pendingTimedCalls
+        pos = call._heapIndex
+        last = heap.pop()
+        call._heapIndex = -1
+        if last is not call:
+            heap[pos] = last
+            last._heapIndex = pos
+            if pos > 0 and last.time < heap[(pos - 1) >> 1].time:
+                self._siftTimedCallUp(pos)
+            else:
+                self._siftTimedCallDown(pos)
 
 
     def getDelayedCalls(self):
@@ -745,11 +963,9 @@ class ReactorBase(object):
 
     def _insertNewDelayedCalls(self):
         for call in self._newTimedCalls:
-            if call.cancelled:
-                self._cancellations-=1
-            else:
+            if not call.cancelled:
                 call.activate_delay()
-                heappush(self._pendingTimedCalls, call)
+                self._pushTimedCall(call)
         self._newTimedCalls = []
 
 
@@ -768,7 +984,7 @@ class ReactorBase(object):
         if not self._pendingTimedCalls:
             return None
 
-        delay = self._pendingTimedCalls[0].time - self.seconds()
+        delay = self._pendingTimedCalls[0].time - self._timedCallClock()()
 
         # Pick a somewhat arbitrary maximum possible value for the timeout.
         # This value is 2 ** 31 / 1000, which is the number of seconds which can
@@ -786,42 +1002,62 @@ class ReactorBase(object):
     def runUntilCurrent(self):
         """Run all pending timed calls.
         """
-        if self.threadCallQueue:
-            # Keep track of how many calls we actually make, as we're
-            # making them, in case another call is added to the queue
-            # while we're in this loop.
-            count = 0
-            total = len(self.threadCallQueue)
-            for (f, a, kw) in self.threadCallQueue:
+        instrumentation = self._instrumentation
+        # Clear the flag before looking at the queue, so that a call queued
+        # from now on wakes the reactor up again.
+        self._wakeUpPending = False
+        queue = self.threadCallQueue
+        if queue:
+            if instrumentation is not None:
+                start = self.seconds()
+            # Only run the calls which were queued before we started, and no
+            # more than a batch of them, so that calls queued as fast as we
+            # can run them can't keep the reactor from getting back to I/O.
+            count = min(len(queue), self._threadCallBatchSize)
+            previousContext = _currentContext.values
+            for i in range(count):
+                # Each call runs with the values of ContextVariables which
+                # were current when callFromThread queued it.
+                f, a, kw, _currentContext.values = queue.popleft()
                 try:
-                    f(*a, **kw)
+                    if instrumentation is None:
+                        f(*a, **kw)
+                    else:
+                        self._timeCall(instrumentation, f, a, kw)
                 except:
                     log.err()
-                count += 1
-                if count == total:
-                    break
-            del self.threadCallQueue[:count]
-            if self.threadCallQueue:
+            _currentContext.values = previousContext
+            if queue and not self._wakeUpPending:
+                self._wakeUpPending = True
                 self.wakeUp()
+            if instrumentation is not None:
+                instrumentation.threadCallsRun(count, self.seconds() - start)
 
         # insert new delayed calls now
         self._insertNewDelayedCalls()
 
-        now = self.seconds()
+        seconds = self._timedCallClock()
+        now = seconds()
+        count = 0
+        previousContext = _currentContext.values
         while self._pendingTimedCalls and (self._pendingTimedCalls[0].time <= now):
-            call = heappop(self._pendingTimedCalls)
-            if call.cancelled:
-                self._cancellations-=1
-                continue
-
+            call = self._pendingTimedCalls[0]
             if call.delayed_time > 0:
                 call.activate_delay()
-                heappush(self._pendingTimedCalls, call)
+                self._siftTimedCallDown(0)
                 continue
 
+            self._popTimedCall()
+            count += 1
+
             try:
                 call.called = 1
-                call.func(*call.args, **call.kw)
+                _currentContext.values = call._context
+                if instrumentation is None:
+                    call.func(*call.args, **call.kw)
+                else:
+                    self._timeCall(
+                        instrumentation, call.func, call.args, call.kw)
             except:
                 log.deferr()
                 if hasattr(call, "creator"):
@@ -832,14 +1068,10 @@ class ReactorBase(object):
                     e += "".join(call.creator).rstrip().replace("\n","\n C:")
                     e += "\n"
                     log.msg(e)
+        _currentContext.values = previousContext
 
-
-        if (self._cancellations > 50 and
-             self._cancellations > len(self._pendingTimedCalls) >> 1):
-            self._cancellations = 0
-            self._pendingTimedCalls = [x for x in self._pendingTimedCalls
-                                       if not x.cancelled]
-            heapify(self._pendingTimedCalls)
+        if instrumentation is not None and count:
+            instrumentation.timedCallsRun(count, seconds() - now)
 
         if self._justStopped:
             self._justStopped = False
@@ -941,11 +1173,18 @@ class ReactorBase(object):
             See L{twisted.internet.interfaces.IReactorThreads.callFromThread}.
             """
             assert callable(f), "%s is not callable" % (f,)
-            # lists are thread-safe in CPython, but not in Jython
+            # deques are thread-safe in CPython, but not in Jython
             # this is probably a bug in Jython, but until fixed this code
             # won't work in Jython.
-            self.threadCallQueue.append((f, args, kw))
-            self.wakeUp()
+            self.threadCallQueue.append(
+                (f, args, kw, _currentContext.values))
+            # The flag is checked after appending: if runUntilCurrent has
+            # already cleared it, it may not have seen this call, so wake it
+            # up.  Two threads racing here may both wake it, which is
+            # harmless.
+            if not self._wakeUpPending:
+                self._wakeUpPending = True
+                self.wakeUp()
 
         def _initThreadPool(self):
             """
@@ -1006,7 +1245,8 @@ class ReactorBase(object):
         def callFromThread(self, f, *args, **kw):
             assert callable(f), "%s is not callable" % (f,)
             # See comment in the other callFromThread implementation.
-            self.threadCallQueue.append((f, args, kw))
+            self.threadCallQueue.append(
+                (f, args, kw, _currentContext.values))
 
 if platform.supportsThreads():
     classImplements(ReactorBase, IReactorThreads)
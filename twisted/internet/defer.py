@@ -21,12 +21,14 @@ from __future__ import division, absolute_import
 import traceback
 import types
 import warnings
+from collections import deque
 from sys import exc_info
 from functools import wraps
 
 # Twisted imports
 from twisted.python.compat import cmp, comparable
 from twisted.python import lockfile, log, failure
+from twisted.python.context import _currentContext
 from twisted.python.deprecate import warnAboutFunction
 
 
@@ -44,8 +46,8 @@ class CancelledError(Exception):
 
 class TimeoutError(Exception):
     """
-    This exception is deprecated.  It is used only by the deprecated
-    L{Deferred.setTimeout} method.
+    A L{Deferred} did not get a result in time.  See L{Deferred.addTimeout}
+    and L{Deadline}.
     """
 
 
@@ -74,7 +76,14 @@ def succeed(result):
     @rtype: L{Deferred}
     """
     d = Deferred()
-    d.callback(result)
+    if d.debug:
+        d.callback(result)
+    else:
+        # No callbacks can have been added to a new Deferred, so there is
+        # nothing to run.
+        assert not isinstance(result, Deferred)
+        d.called = True
+        d.result = result
     return d
 
 
@@ -183,7 +192,7 @@ _CONTINUE = object()
 
 
 
-class Deferred:
+class Deferred(object):
     """
     This is a callback which will be put off until later.
 
@@ -225,24 +234,24 @@ class Deferred:
 
     @ivar _chainedTo: If this Deferred is waiting for the result of another
         Deferred, this is a reference to the other Deferred.  Otherwise, C{None}.
-    """
 
-    called = False
-    paused = 0
-    _debugInfo = None
-    _suppressAlreadyCalled = False
+    @ivar result: The current result, once C{callback} or C{errback} has been
+        called.  Until then, this attribute is not set.
+
+    @note: Twisted creates a great many L{Deferred}s, so the attributes above
+        are kept in C{__slots__}.  A C{__dict__} slot is kept as well, so
+        that other attributes may still be set on instances; it is only
+        allocated when one is.
+    """
 
-    # Are we currently running a user-installed callback?  Meant to prevent
-    # recursive running of callbacks when a reentrant call to add a callback is
-    # used.
-    _runningCallbacks = False
+    __slots__ = ('callbacks', 'result', 'called', 'paused', '_canceller',
+                 '_debugInfo', '_suppressAlreadyCalled', '_runningCallbacks',
+                 '_chainedTo', '__dict__', '__weakref__')
 
     # Keep this class attribute for now, for compatibility with code that
     # sets it directly.
     debug = False
 
-    _chainedTo = None
-
     def __init__(self, canceller=None):
         """
         Initialize a L{Deferred}.
@@ -268,7 +277,16 @@ class Deferred:
             return result is ignored.
         """
         self.callbacks = []
+        self.called = False
+        self.paused = 0
         self._canceller = canceller
+        self._debugInfo = None
+        self._suppressAlreadyCalled = False
+        # Are we currently running a user-installed callback?  Meant to
+        # prevent recursive running of callbacks when a reentrant call to add
+        # a callback is used.
+        self._runningCallbacks = False
+        self._chainedTo = None
         if self.debug:
             self._debugInfo = DebugInfo()
             self._debugInfo.creator = traceback.format_stack()[:-1]
@@ -287,8 +305,24 @@ class Deferred:
         """
         assert callable(callback)
         assert errback == None or callable(errback)
+        if errback is None:
+            errback = passthru
+
+        if (self.called and not self.callbacks and not self.paused and
+                not self._runningCallbacks):
+            # The result is already here and nothing else is waiting for it,
+            # which is the common case of adding callbacks to a Deferred
+            # returned by succeed() or fail().  Run the new callback right
+            # away instead of queueing it and going through _runCallbacks.
+            self._runOneCallback(callback, errback, callbackArgs,
+                                 callbackKeywords, errbackArgs,
+                                 errbackKeywords)
+            return self
+
+        # The third element is the context the callbacks will run in.
         cbs = ((callback, callbackArgs, callbackKeywords),
-               (errback or (passthru), errbackArgs, errbackKeywords))
+               (errback, errbackArgs, errbackKeywords),
+               _currentContext.values)
         self.callbacks.append(cbs)
 
         if self.called:
@@ -329,6 +363,46 @@ class Deferred:
                                  callbackKeywords=kw, errbackKeywords=kw)
 
 
+    def addTimeout(self, timeout, clock, onTimeoutCancel=None):
+        """
+        Cancel this L{Deferred} if it does not get a result within C{timeout}
+        seconds, and make the resulting L{CancelledError} a L{TimeoutError}.
+
+        The timer is cancelled as soon as this L{Deferred} gets a result.
+        Many operations with similar timeouts can share a single reactor
+        timer by passing a L{TimerWheel<twisted.internet.task.TimerWheel>}
+        as C{clock}.  To give several operations one timeout between them,
+        use a L{Deadline}.
+
+        @param timeout: The number of seconds to wait.
+
+        @param clock: The object used to schedule the timeout, which need
+            only have a C{callLater} method like that of
+            L{IReactorTime<twisted.internet.interfaces.IReactorTime>}.
+
+        @param onTimeoutCancel: A callable to call instead of converting the
+            result to a L{TimeoutError} if this L{Deferred} times out.  It is
+            called with the result, usually a L{failure.Failure} wrapping a
+            L{CancelledError}, and C{timeout}, and what it returns or raises
+            becomes the result.
+
+        @return: C{self}.
+        """
+        timedOut = []
+        def timeItOut():
+            timedOut.append(True)
+            self.cancel()
+        delayedCall = clock.callLater(timeout, timeItOut)
+
+        def convertCancelled(result):
+            if not timedOut:
+                delayedCall.cancel()
+                return result
+            return (onTimeoutCancel or _cancelledToTimedOutError)(
+                result, timeout)
+        return self.addBoth(convertCancelled)
+
+
     def chainDeferred(self, d):
         """
         Chain another L{Deferred} to this L{Deferred}.
@@ -496,7 +570,72 @@ class Deferred:
         L{_addContinue} and L{_removeContinue} on another Deferred.
         """
         return ((_CONTINUE, (self,), None),
-                (_CONTINUE, (self,), None))
+                (_CONTINUE, (self,), None),
+                None)
+
+
+    def _runOneCallback(self, callback, errback, callbackArgs,
+                        callbackKeywords, errbackArgs, errbackKeywords):
+        """
+        Run a single pair of callbacks on the current result, for
+        L{addCallbacks} when no other callbacks are waiting to run.
+
+        This does what L{_runCallbacks} would do with a callback list holding
+        just this pair, without building that list.
+        """
+        result = self.result
+        if isinstance(result, failure.Failure):
+            callback, args, kw = errback, errbackArgs, errbackKeywords
+        else:
+            args, kw = callbackArgs, callbackKeywords
+
+        previousContext = _currentContext.values
+        try:
+            self._runningCallbacks = True
+            try:
+                result = callback(result, *(args or ()), **(kw or {}))
+                if result is self:
+                    warnAboutFunction(
+                        callback,
+                        "Callback returned the Deferred "
+                        "it was attached to; this breaks the "
+                        "callback chain and will raise an "
+                        "exception in the future.")
+            finally:
+                self._runningCallbacks = False
+                _currentContext.values = previousContext
+        except:
+            result = failure.Failure(captureVars=self.debug)
+
+        if isinstance(result, Deferred):
+            resultResult = getattr(result, 'result', _NO_RESULT)
+            if (resultResult is _NO_RESULT or
+                    isinstance(resultResult, Deferred) or result.paused):
+                # Wait for the other Deferred; see _runCallbacks.
+                self.result = result
+                self.pause()
+                self._chainedTo = result
+                result.callbacks.append(self._continuation())
+                if self._debugInfo is not None:
+                    self._debugInfo.failResult = None
+                return
+            # It already has a result.  Steal it.
+            result.result = None
+            if result._debugInfo is not None:
+                result._debugInfo.failResult = None
+            result = resultResult
+
+        self.result = result
+        if self.callbacks:
+            # The callback added more callbacks to this Deferred.
+            self._runCallbacks()
+        elif isinstance(result, failure.Failure):
+            result.cleanFailure()
+            if self._debugInfo is None:
+                self._debugInfo = DebugInfo()
+            self._debugInfo.failResult = result
+        elif self._debugInfo is not None:
+            self._debugInfo.failResult = None
 
 
     def _runCallbacks(self):
@@ -571,6 +710,8 @@ class Deferred:
                     finished = False
                     break
 
+                previousContext = _currentContext.values
+                _currentContext.values = item[2]
                 try:
                     current._runningCallbacks = True
                     try:
@@ -584,6 +725,7 @@ class Deferred:
                                 "exception in the future.")
                     finally:
                         current._runningCallbacks = False
+                        _currentContext.values = previousContext
                 except:
                     # Including full frame information in the Failure is quite
                     # expensive, so we avoid it unless self.debug is set.
@@ -652,6 +794,231 @@ class Deferred:
 
 
 
+def _cancelledToTimedOutError(result, timeout):
+    """
+    Turn the L{CancelledError} of a L{Deferred} which timed out into a
+    L{TimeoutError}.
+
+    @param result: The result of the L{Deferred}.
+
+    @param timeout: The timeout, in seconds.
+
+    @raise TimeoutError: If C{result} is a L{failure.Failure} wrapping a
+        L{CancelledError}.
+
+    @return: C{result}, if the L{Deferred} got a result or a different
+        failure in spite of being cancelled.
+    """
+    if isinstance(result, failure.Failure) and result.check(CancelledError):
+        raise TimeoutError("Timed out after %r seconds" % (timeout,))
+    return result
+
+
+
+def _timedCallSeconds(clock):
+    """
+    Get the current time by the clock which C{clock} schedules its timed
+    calls with.
+
+    A reactor's L{IReactorTime.seconds} gives the system time, but it
+    schedules timed calls by a clock which changes to the system time do not
+    affect.  Code which works out when a call made with C{clock.callLater}
+    should run must measure time by that clock too.
+
+    @param clock: An L{IReactorTime} provider.
+
+    @return: The current time in seconds, by the clock which
+        C{clock.callLater} uses.
+    """
+    timedCallClock = getattr(clock, "_timedCallClock", None)
+    if timedCallClock is None:
+        return clock.seconds()
+    return timedCallClock()()
+
+
+
+class Deadline(object):
+    """
+    A time by which a tree of operations must finish, shared by all of
+    them.
+
+    Rather than giving each operation its own timeout, create one
+    L{Deadline} for a whole request and pass it down the call tree.  Each
+    L{Deferred} given to L{track} is cancelled when the deadline passes, and
+    fails with a L{TimeoutError}.  A nested part of the request can make a
+    L{child} deadline, which passes no later than its parent and is also
+    expired, along with everything it tracks, when its parent is.
+
+    A deadline only schedules a timer of its own if it passes earlier than
+    its parent's.  Passing a L{TimerWheel<twisted.internet.task.TimerWheel>}
+    as the clock lets many deadlines share a single reactor timer.
+
+    @ivar clock: The object used to schedule the timer, which has C{seconds}
+        and C{callLater} methods like those of
+        L{IReactorTime<twisted.internet.interfaces.IReactorTime>}.
+
+    @ivar time: The time, according to C{clock}, at which the deadline
+        passes.
+
+    @ivar timeout: The number of seconds the deadline allowed when it was
+        made.
+
+    @ivar expired: C{True} once the deadline has passed.
+
+    @ivar _parent: The L{Deadline} this is a child of, or C{None}.
+
+    @ivar _call: The L{IDelayedCall} which will expire this deadline, or
+        C{None} if it is expired by its parent's instead.
+
+    @ivar _tracked: A C{set} of the L{Deferred}s being tracked which do not
+        have a result yet.
+
+    @ivar _children: A C{set} of the child deadlines which have not expired
+        or been stopped.
+    """
+
+    def __init__(self, timeout, clock, _parent=None):
+        """
+        @param timeout: The number of seconds from now at which the deadline
+            passes.
+
+        @param clock: See L{clock}.
+        """
+        self.clock = clock
+        now = _timedCallSeconds(clock)
+        self.time = now + timeout
+        self.expired = False
+        self._parent = _parent
+        self._tracked = set()
+        self._children = set()
+        if _parent is not None and _parent.time <= self.time:
+            self.time = _parent.time
+            self._call = None
+        else:
+            self._call = clock.callLater(timeout, self._timerFired)
+        self.timeout = self.time - now
+        if _parent is not None:
+            if _parent.expired:
+                self._expire()
+            else:
+                _parent._children.add(self)
+
+
+    def __repr__(self):
+        return "<Deadline at 0x%x %s>" % (
+            id(self), "expired" if self.expired else
+            "in %r seconds" % (self.remaining(),))
+
+
+    def remaining(self):
+        """
+        @return: The number of seconds until the deadline passes, or C{0} if
+            it has passed.
+        """
+        if self.expired:
+            return 0
+        return max(0, self.time - _timedCallSeconds(self.clock))
+
+
+    def child(self, timeout=None):
+        """
+        Make a deadline for part of the work which must finish by this one.
+
+        @param timeout: The number of seconds that part may take, or C{None}
+            to give it as long as this deadline allows.
+
+        @return: A new L{Deadline}, passing at the earlier of C{timeout}
+            seconds from now and this deadline.  It is already expired if
+            this one is.
+        """
+        if timeout is None:
+            timeout = self.remaining()
+        return Deadline(timeout, self.clock, self)
+
+
+    def track(self, deferred):
+        """
+        Cancel C{deferred} if it has no result when this deadline passes,
+        and make the resulting L{CancelledError} a L{TimeoutError}.
+
+        @param deferred: A L{Deferred}.  If the deadline has already passed
+            it is cancelled right away.
+
+        @return: C{deferred}.
+        """
+        self._tracked.add(deferred)
+        deferred.addBoth(self._finished, deferred)
+        if self.expired:
+            deferred.cancel()
+        return deferred
+
+
+    def stop(self):
+        """
+        Stop timing, because the work has finished or been given up on.
+        Nothing tracked by this deadline or its children is cancelled from
+        now on, and their timers are cancelled.
+        """
+        if self._parent is not None:
+            self._parent._children.discard(self)
+        self._release()
+
+
+    def _release(self):
+        """
+        Cancel the timers of this deadline and its children and forget what
+        they track.
+        """
+        if self._call is not None:
+            self._call.cancel()
+            self._call = None
+        self._tracked.clear()
+        children, self._children = self._children, set()
+        for child in children:
+            child._release()
+
+
+    def _finished(self, result, deferred):
+        """
+        Stop tracking C{deferred}, which has a result.
+
+        @return: C{result}, or a L{TimeoutError} failure if this deadline
+            cancelled C{deferred}.
+        """
+        if deferred in self._tracked:
+            self._tracked.discard(deferred)
+            if self.expired:
+                return _cancelledToTimedOutError(result, self.timeout)
+        return result
+
+
+    def _timerFired(self):
+        """
+        Expire this deadline, now that its own timer has fired.
+        """
+        self._call = None
+        if self._parent is not None:
+            self._parent._children.discard(self)
+        self._expire()
+
+
+    def _expire(self):
+        """
+        Expire this deadline and its children, cancelling everything they
+        track.
+        """
+        self.expired = True
+        if self._call is not None:
+            self._call.cancel()
+            self._call = None
+        children, self._children = self._children, set()
+        for child in children:
+            child._expire()
+        for deferred in list(self._tracked):
+            deferred.cancel()
+
+
+
 class DebugInfo:
     """
     Deferred debug helper.
@@ -912,6 +1279,349 @@ FAILURE = False
 
 
 
+class _BoundedCalls(object):
+    """
+    Call a function with each item of an iterable, keeping a limited number
+    of calls in flight and reading the iterable only as it needs more.
+
+    This is the machinery shared by L{mapConcurrently} and L{asCompleted}.
+
+    @ivar started: The number of calls made so far.  A failure to read the
+        iterable counts as one, since it is reported in the same way.
+
+    @ivar exhausted: C{True} once the iterable has run out, raised an
+        exception, or been abandoned by L{stop}.
+
+    @ivar _running: A C{dict} mapping the index of each call which has no
+        result yet to its L{Deferred}.
+
+    @ivar _readAhead: A C{deque} of items read from the iterable by L{peek}
+        but not yet passed to the function.
+
+    @ivar _filling: C{True} while L{fill} is running, so that calls which
+        finish synchronously leave it to L{fill} to start the next call
+        rather than recursing.
+    """
+
+    def __init__(self, f, iterable, limit, report, allDone=None):
+        """
+        @param f: The function to call with each item.  It may return a
+            L{Deferred}.
+
+        @param iterable: The items.
+
+        @param limit: The largest number of calls to have in flight at once.
+
+        @param report: A function called with the index of a call, whether
+            it succeeded, and its result or L{failure.Failure}, as each call
+            finishes.  If the iterable raises an exception, C{report} is
+            called with an index of C{None} and the L{failure.Failure}.
+
+        @param allDone: A function called with no arguments once the
+            iterable is exhausted and no calls are in flight, or C{None}.
+            It may be called more than once.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1, not %r" % (limit,))
+        self._f = f
+        self._iterator = iter(iterable)
+        self._limit = limit
+        self._report = report
+        self._allDone = allDone
+        self._running = {}
+        self._readAhead = deque()
+        self._filling = False
+        self.started = 0
+        self.exhausted = False
+
+
+    def _read(self, items):
+        """
+        Read the next item from the iterable onto C{items}.
+
+        @return: C{True} if there was one, C{False} if not.
+        """
+        if self.exhausted:
+            return False
+        try:
+            items.append(next(self._iterator))
+        except StopIteration:
+            self.exhausted = True
+            return False
+        except:
+            self.exhausted = True
+            self.started += 1
+            self._report(None, False, failure.Failure())
+            return False
+        return True
+
+
+    def peek(self):
+        """
+        Read one more item from the iterable without calling the function
+        with it yet.
+        """
+        self._read(self._readAhead)
+
+
+    def pending(self):
+        """
+        @return: The number of items read so far, including those whose
+            calls have finished.
+        """
+        return self.started + len(self._readAhead)
+
+
+    def fill(self):
+        """
+        Make calls until C{limit} are in flight or there are no more items.
+        """
+        if self._filling:
+            return
+        self._filling = True
+        try:
+            readAhead = self._readAhead
+            while len(self._running) < self._limit:
+                if not readAhead and not self._read(readAhead):
+                    break
+                index = self.started
+                self.started += 1
+                d = maybeDeferred(self._f, readAhead.popleft())
+                self._running[index] = d
+                d.addBoth(self._finished, index)
+        finally:
+            self._filling = False
+        self._checkDone()
+
+
+    def _finished(self, result, index):
+        """
+        Report the result of the call numbered C{index}, and start another.
+
+        @return: C{None}; the result has been handed on to C{report}.
+        """
+        if self._running.pop(index, None) is not None:
+            self._report(index, not isinstance(result, failure.Failure),
+                         result)
+            self.fill()
+
+
+    def _checkDone(self):
+        """
+        Call C{allDone} if there is nothing left to do.
+        """
+        if (self.exhausted and not self._running and
+                self._allDone is not None):
+            self._allDone()
+
+
+    def stop(self):
+        """
+        Read nothing more from the iterable, and cancel the calls in flight.
+        Their results are not reported.
+        """
+        self.exhausted = True
+        self._readAhead.clear()
+        running, self._running = self._running, {}
+        for d in running.values():
+            d.addErrback(lambda reason: None)
+            d.cancel()
+        self._checkDone()
+
+
+
+def mapConcurrently(f, iterable, limit, failFast=True):
+    """
+    Call C{f} with each item of C{iterable}, with at most C{limit} calls in
+    flight at once, and gather the results.
+
+    The iterable is read as calls finish, not all at once, so it may be a
+    generator yielding a very large number of items::
+
+        def crawl(agent, urls):
+            return mapConcurrently(lambda url: agent.request("GET", url),
+                                   urls, 20)
+
+    Cancelling the returned L{Deferred} stops reading C{iterable} and
+    cancels the calls in flight.
+
+    @param f: A function of one argument, which may return a L{Deferred}.
+
+    @param iterable: The items to call C{f} with.
+
+    @param limit: The largest number of calls to have in flight at once.
+    @type limit: C{int}
+
+    @param failFast: If C{True}, the first call to fail stops reading
+        C{iterable} and cancels the calls in flight.  Otherwise every item
+        is still processed.  Either way only the first failure is reported.
+    @type failFast: C{bool}
+
+    @return: A L{Deferred} which fires with a C{list} of the results of the
+        calls, in the order of the items, or fails with a L{FirstError}
+        giving the first failure and the index of its item.  An exception
+        raised while reading C{iterable} stops it, and unless a call has
+        already failed, the L{Deferred} fails with that exception.
+    """
+    results = []
+    firstFailure = []
+
+    def start(item):
+        results.append(None)
+        return f(item)
+
+    def report(index, succeeded, result):
+        if succeeded:
+            results[index] = result
+        elif not firstFailure:
+            if index is None:
+                firstFailure.append(result)
+            else:
+                firstFailure.append(FirstError(result, index))
+            if failFast:
+                calls.stop()
+
+    def allDone():
+        if not done.called:
+            if firstFailure:
+                done.errback(firstFailure[0])
+            else:
+                done.callback(results)
+
+    def cancel(d):
+        firstFailure[:] = [failure.Failure(CancelledError())]
+        calls.stop()
+
+    done = Deferred(cancel)
+    calls = _BoundedCalls(start, iterable, limit, report, allDone)
+    calls.fill()
+    return done
+
+
+
+class _AsCompleted(object):
+    """
+    An iterator of L{Deferred}s which fire with the results of bounded
+    concurrent calls, in the order the calls finish.  See L{asCompleted}.
+
+    @ivar _calls: The L{_BoundedCalls} making the calls.
+
+    @ivar _handedOut: The number of L{Deferred}s returned so far.
+
+    @ivar _finished: A C{deque} of C{(succeeded, result)} tuples for calls
+        which have finished before a L{Deferred} was asked for.
+
+    @ivar _waiting: A C{deque} of L{Deferred}s which have been returned and
+        are waiting for calls to finish.
+
+    @ivar _cancelled: C{True} once L{cancel} has been called.
+    """
+
+    def __init__(self, f, iterable, limit):
+        self._calls = _BoundedCalls(f, iterable, limit, self._report)
+        self._handedOut = 0
+        self._finished = deque()
+        self._waiting = deque()
+        self._cancelled = False
+        self._calls.fill()
+
+
+    def __iter__(self):
+        return self
+
+
+    def _report(self, index, succeeded, result):
+        if self._waiting:
+            d = self._waiting.popleft()
+            if succeeded:
+                d.callback(result)
+            else:
+                d.errback(result)
+        else:
+            self._finished.append((succeeded, result))
+
+
+    def __next__(self):
+        """
+        @return: A L{Deferred} which fires with the result of the next call
+            to finish.
+
+        @raise StopIteration: If a L{Deferred} has already been returned for
+            every item, or L{cancel} has been called.
+        """
+        calls = self._calls
+        if self._cancelled:
+            raise StopIteration()
+        if self._handedOut >= calls.pending():
+            calls.peek()
+            if self._handedOut >= calls.pending():
+                raise StopIteration()
+            # The new item may fit in a free slot.
+            calls.fill()
+        self._handedOut += 1
+        if self._finished:
+            succeeded, result = self._finished.popleft()
+            if succeeded:
+                return succeed(result)
+            return fail(result)
+        d = Deferred()
+        self._waiting.append(d)
+        return d
+
+    next = __next__
+
+
+    def cancel(self):
+        """
+        Stop reading the iterable and cancel the calls in flight.  Every
+        L{Deferred} already returned which is still waiting fails with
+        L{CancelledError}, and iteration stops.
+        """
+        self._cancelled = True
+        self._calls.stop()
+        self._finished.clear()
+        waiting, self._waiting = self._waiting, deque()
+        for d in waiting:
+            d.errback(failure.Failure(CancelledError()))
+
+
+
+def asCompleted(f, iterable, limit):
+    """
+    Call C{f} with each item of C{iterable}, with at most C{limit} calls in
+    flight at once, and iterate over their results in the order the calls
+    finish.
+
+    Each step of the returned iterator gives a L{Deferred} for the next
+    result to arrive.  The iterable is only read as calls finish and as
+    L{Deferred}s are asked for, so it may be very large::
+
+        @inlineCallbacks
+        def resolveAll(names):
+            for d in asCompleted(client.getHostByName, names, 50):
+                try:
+                    address = yield d
+                except DNSLookupError:
+                    continue
+                ...
+
+    @param f: A function of one argument, which may return a L{Deferred}.
+
+    @param iterable: The items to call C{f} with.
+
+    @param limit: The largest number of calls to have in flight at once.
+    @type limit: C{int}
+
+    @return: An iterator of L{Deferred}s, one for each item, which fire with
+        or fail with the results of the calls in the order they finish.  It
+        has a C{cancel} method which stops reading C{iterable} and cancels
+        the calls in flight.  If reading C{iterable} raises an exception,
+        one of the L{Deferred}s fails with it and there are no more.
+    """
+    return _AsCompleted(f, iterable, limit)
+
+
+
 ## deferredGenerator
 
 class waitForDeferred:
@@ -1077,19 +1787,20 @@ def returnValue(val):
 
 
 
-def _inlineCallbacks(result, g, deferred):
+def _inlineCallbacks(result, g, deferred, context):
     """
     See L{inlineCallbacks}.
-    """
-    # This function is complicated by the need to prevent unbounded recursion
-    # arising from repeatedly yielding immediately ready deferreds.  This while
-    # loop and the waiting variable solve that by manually unfolding the
-    # recursion.
-
-    waiting = [True, # waiting for result?
-               None] # result
 
+    @param context: The values of
+        L{ContextVariable<twisted.python.context.ContextVariable>}s which the
+        generator runs with.  Values it sets are kept for its next resumption.
+    """
+    # Yielding a Deferred which already has a result goes round this loop
+    # again rather than through a callback, which avoids unbounded recursion
+    # when a generator yields many of them.
     while 1:
+        previousContext = _currentContext.values
+        _currentContext.values = context
         try:
             # Send the last result back as the result of the yield expression.
             isFailure = isinstance(result, failure.Failure)
@@ -1144,35 +1855,41 @@ def _inlineCallbacks(result, g, deferred):
         except:
             deferred.errback()
             return deferred
+        finally:
+            context = _currentContext.values
+            _currentContext.values = previousContext
 
         if isinstance(result, Deferred):
-            # a deferred was yielded, get the result.
-            def gotResult(r):
-                if waiting[0]:
-                    waiting[0] = False
-                    waiting[1] = r
-                else:
-                    _inlineCallbacks(r, g, deferred)
-
-            result.addBoth(gotResult)
-            if waiting[0]:
-                # Haven't called back yet, set flag so that we get reinvoked
-                # and return from the loop
-                waiting[0] = False
-                return deferred
+            # A Deferred was yielded.  If it already has a result which
+            # nothing else is waiting for, take it, as _runCallbacks does
+            # when a callback returns such a Deferred, and carry on.  This
+            # also keeps yielding many ready Deferreds from recursing.
+            if (result.called and not result.callbacks and
+                    not result.paused and not result._runningCallbacks):
+                ready = result
+                result = ready.result
+                ready.result = None
+                if ready._debugInfo is not None:
+                    ready._debugInfo.failResult = None
+                continue
+
+            # Otherwise resume the generator when it gets one.  It can't get
+            # one before addBoth returns, so we are done here.
+            result.addBoth(_gotResultInlineCallbacks, g, deferred, context)
+            return deferred
 
-            result = waiting[1]
-            # Reset waiting to initial values for next loop.  gotResult uses
-            # waiting, but this isn't a problem because gotResult is only
-            # executed once, and if it hasn't been executed yet, the return
-            # branch above would have been taken.
+    return deferred
 
 
-            waiting[0] = True
-            waiting[1] = None
 
+def _gotResultInlineCallbacks(result, g, deferred, context):
+    """
+    Resume an L{inlineCallbacks} generator with the result of the
+    L{Deferred} it yielded.
 
-    return deferred
+    @return: C{None}, which becomes the result of the yielded L{Deferred}.
+    """
+    _inlineCallbacks(result, g, deferred, context)
 
 
 
@@ -1234,7 +1951,7 @@ def inlineCallbacks(f):
             raise TypeError(
                 "inlineCallbacks requires %r to produce a generator; "
                 "instead got %r" % (f, gen))
-        return _inlineCallbacks(None, gen, Deferred())
+        return _inlineCallbacks(None, gen, Deferred(), _currentContext.values)
     return unwindGenerator
 
 
@@ -1614,7 +2331,8 @@ class DeferredFilesystemLock(lockfile.FilesystemLock):
 
 
 __all__ = ["Deferred", "DeferredList", "succeed", "fail", "FAILURE", "SUCCESS",
-           "AlreadyCalledError", "TimeoutError", "gatherResults",
+           "AlreadyCalledError", "TimeoutError", "Deadline", "gatherResults",
+           "mapConcurrently", "asCompleted",
            "maybeDeferred",
            "waitForDeferred", "deferredGenerator", "inlineCallbacks",
            "returnValue",
@@ -19,11 +19,12 @@ import re
 import socket
 import warnings
 
+from collections import OrderedDict
 from socket import AF_INET6, AF_INET
 
 from zope.interface import implementer, directlyProvides
 
-from twisted.python.compat import _PY3
+from twisted.python.compat import _PY3, nativeString
 from twisted.internet import interfaces, defer, error, fdesc, threads
 from twisted.internet.protocol import ClientFactory, Factory
 from twisted.internet.protocol import ProcessProtocol, Protocol
@@ -31,12 +32,12 @@ from twisted.internet.interfaces import IStreamServerEndpointStringParser
 from twisted.internet.interfaces import IStreamClientEndpointStringParser
 from twisted.python.filepath import FilePath
 from twisted.python.systemd import ListenFDs
-from twisted.internet.abstract import isIPv6Address
+from twisted.internet.abstract import isIPAddress, isIPv6Address
 from twisted.python.failure import Failure
 from twisted.python import log
 from twisted.internet.address import _ProcessAddress, HostnameAddress
 from twisted.python.components import proxyForInterface
-from twisted.internet.task import LoopingCall
+from twisted.python.runtime import monotonic
 
 if not _PY3:
     from twisted.plugin import IPlugin, getPlugins
@@ -434,7 +435,7 @@ class _TCPServerEndpoint(object):
     A TCP server endpoint interface
     """
 
-    def __init__(self, reactor, port, backlog, interface):
+    def __init__(self, reactor, port, backlog, interface, reusePort=False):
         """
         @param reactor: An L{IReactorTCP} provider.
 
@@ -446,11 +447,18 @@ class _TCPServerEndpoint(object):
 
         @param interface: The hostname to bind to
         @type interface: str
+
+        @param reusePort: Whether to set C{SO_REUSEPORT} on the listening
+            socket, so that other processes can listen on the same port.  The
+            reactor's C{listenTCP} must accept a C{reusePort} argument if this
+            is C{True}.
+        @type reusePort: bool
         """
         self._reactor = reactor
         self._port = port
         self._backlog = backlog
         self._interface = interface
+        self._reusePort = reusePort
 
 
     def listen(self, protocolFactory):
@@ -458,11 +466,15 @@ class _TCPServerEndpoint(object):
         Implement L{IStreamServerEndpoint.listen} to listen on a TCP
         socket
         """
+        kwargs = {}
+        if self._reusePort:
+            kwargs['reusePort'] = True
         return defer.execute(self._reactor.listenTCP,
                              self._port,
                              protocolFactory,
                              backlog=self._backlog,
-                             interface=self._interface)
+                             interface=self._interface,
+                             **kwargs)
 
 
 
@@ -470,7 +482,8 @@ class TCP4ServerEndpoint(_TCPServerEndpoint):
     """
     Implements TCP server endpoint with an IPv4 configuration
     """
-    def __init__(self, reactor, port, backlog=50, interface=''):
+    def __init__(self, reactor, port, backlog=50, interface='',
+                 reusePort=False):
         """
         @param reactor: An L{IReactorTCP} provider.
 
@@ -482,8 +495,13 @@ class TCP4ServerEndpoint(_TCPServerEndpoint):
 
         @param interface: The hostname to bind to, defaults to '' (all)
         @type interface: str
+
+        @param reusePort: Whether to set C{SO_REUSEPORT} on the listening
+            socket, defaults to C{False}
+        @type reusePort: bool
         """
-        _TCPServerEndpoint.__init__(self, reactor, port, backlog, interface)
+        _TCPServerEndpoint.__init__(
+            self, reactor, port, backlog, interface, reusePort)
 
 
 
@@ -491,7 +509,8 @@ class TCP6ServerEndpoint(_TCPServerEndpoint):
     """
     Implements TCP server endpoint with an IPv6 configuration
     """
-    def __init__(self, reactor, port, backlog=50, interface='::'):
+    def __init__(self, reactor, port, backlog=50, interface='::',
+                 reusePort=False):
         """
         @param reactor: An L{IReactorTCP} provider.
 
@@ -503,8 +522,13 @@ class TCP6ServerEndpoint(_TCPServerEndpoint):
 
         @param interface: The hostname to bind to, defaults to '' (all)
         @type interface: str
+
+        @param reusePort: Whether to set C{SO_REUSEPORT} on the listening
+            socket, defaults to C{False}
+        @type reusePort: bool
         """
-        _TCPServerEndpoint.__init__(self, reactor, port, backlog, interface)
+        _TCPServerEndpoint.__init__(
+            self, reactor, port, backlog, interface, reusePort)
 
 
 
@@ -570,7 +594,7 @@ class TCP6ClientEndpoint(object):
         5-tuple L{_GAI_ADDRESS}.
     """
 
-    _getaddrinfo = socket.getaddrinfo
+    _getaddrinfo = staticmethod(socket.getaddrinfo)
     _deferToThread = staticmethod(threads.deferToThread)
     _GAI_ADDRESS = 4
     _GAI_ADDRESS_HOST = 0
@@ -627,20 +651,102 @@ class TCP6ClientEndpoint(object):
 
 
 
+class _AddressFamilyCache(object):
+    """
+    The address family of the last connection L{HostnameEndpoint}
+    established to each host name, whose addresses are tried first the next
+    time any L{HostnameEndpoint} connects to it.
+
+    At most C{maxSize} host names are remembered, the least recently used
+    being forgotten first, and each for at most C{lifetime} seconds, so that
+    a change in a host's or the network's connectivity is noticed.
+
+    @ivar maxSize: The largest number of host names remembered.
+
+    @ivar lifetime: The number of seconds a family is remembered for.  RFC
+        6555 recommends no more than 10 minutes.
+
+    @ivar _families: An L{OrderedDict} mapping host names to C{(family,
+        expires)} tuples, least recently used first.
+
+    @ivar _seconds: A no-argument callable returning the current time.
+    """
+
+    def __init__(self, maxSize=1000, lifetime=600, clock=None):
+        """
+        @param clock: An L{IReactorTime} provider to measure lifetimes with,
+            or C{None} to use a monotonic clock.
+        """
+        self.maxSize = maxSize
+        self.lifetime = lifetime
+        if clock is None:
+            self._seconds = monotonic
+        else:
+            self._seconds = clock.seconds
+        self._families = OrderedDict()
+
+
+    def __len__(self):
+        return len(self._families)
+
+
+    def get(self, host):
+        """
+        Look up the address family remembered for C{host}.
+
+        @return: C{AF_INET6} or C{AF_INET}, or C{None} if none is remembered
+            or it has expired.
+        """
+        entry = self._families.pop(host, None)
+        if entry is None or entry[1] <= self._seconds():
+            return None
+        self._families[host] = entry
+        return entry[0]
+
+
+    def store(self, host, family):
+        """
+        Remember that the last connection to C{host} was made with an address
+        of C{family}.
+        """
+        self._families.pop(host, None)
+        self._families[host] = (family, self._seconds() + self.lifetime)
+        while len(self._families) > self.maxSize:
+            self._families.popitem(last=False)
+
+
+
 @implementer(interfaces.IStreamClientEndpoint)
 class HostnameEndpoint(object):
     """
     A name-based endpoint that connects to the fastest amongst the
     resolved host addresses.
 
+    Connection attempts are raced as described by RFC 6555 ("Happy
+    Eyeballs"): they are started one at a time, C{attemptDelay} seconds
+    apart or as soon as the previous one fails, alternating between IPv6
+    and IPv4 addresses, and once one succeeds the others are cancelled.
+
     @ivar _getaddrinfo: A hook used for testing name resolution.
 
     @ivar _deferToThread: A hook used for testing deferToThread.
+
+    @ivar _resolver: The L{IResolver <interfaces.IResolver>} host names are
+        looked up with, or C{None} to call C{getaddrinfo} in a thread.
+
+    @ivar _attemptDelay: The number of seconds to wait for a connection
+        attempt before starting the next one.
+
+    @ivar _preferredFamilies: The L{_AddressFamilyCache} which every
+        L{HostnameEndpoint} records the family of the connections it
+        establishes in, and whose addresses it tries first.
     """
-    _getaddrinfo = socket.getaddrinfo
+    _getaddrinfo = staticmethod(socket.getaddrinfo)
     _deferToThread = staticmethod(threads.deferToThread)
+    _preferredFamilies = _AddressFamilyCache()
 
-    def __init__(self, reactor, host, port, timeout=30, bindAddress=None):
+    def __init__(self, reactor, host, port, timeout=30, bindAddress=None,
+                 resolver=None, attemptDelay=0.25):
         """
         @param host: A hostname to connect to.
         @type host: L{bytes}
@@ -649,6 +755,15 @@ class HostnameEndpoint(object):
             seconds to wait before assuming the connection has failed.
         @type timeout: L{int}
 
+        @param resolver: An L{IResolver <interfaces.IResolver>} to look up
+            C{host}'s IPv6 and IPv4 addresses with, for example
+            L{twisted.names.client.createResolver}.  If C{None}, they are
+            looked up by calling C{getaddrinfo} in a thread.
+
+        @param attemptDelay: The number of seconds to give a connection
+            attempt before starting the next one in parallel with it.
+        @type attemptDelay: L{float}
+
         @see: L{twisted.internet.interfaces.IReactorTCP.connectTCP}
         """
         self._reactor = reactor
@@ -656,15 +771,29 @@ class HostnameEndpoint(object):
         self._port = port
         self._timeout = timeout
         self._bindAddress = bindAddress
+        self._resolver = resolver
+        self._attemptDelay = attemptDelay
 
 
     def connect(self, protocolFactory):
         """
-        Attempts a connection to each address returned by gai, and returns a
-        connection which is established first.
+        Attempts a connection to each address the host name resolves to, and
+        returns the connection which is established first.
         """
-        wf = protocolFactory
         pending = []
+        remaining = []
+        delayedCalls = []
+
+        def stopAttempts():
+            """
+            Start no more connection attempts, and cancel those in progress.
+            """
+            del remaining[:]
+            for call in delayedCalls:
+                call.cancel()
+            del delayedCalls[:]
+            for p in pending[:]:
+                p.cancel()
 
         def _canceller(d):
             """
@@ -678,8 +807,7 @@ class HostnameEndpoint(object):
             """
             d.errback(error.ConnectingCancelledError(
                 HostnameAddress(self._host, self._port)))
-            for p in pending[:]:
-                p.cancel()
+            stopAttempts()
 
         def errbackForGai(failure):
             """
@@ -689,96 +817,194 @@ class HostnameEndpoint(object):
             return defer.fail(error.DNSLookupError(
                 "Couldn't find the hostname '%s'" % (self._host,)))
 
-        def _endpoints(gaiResult):
+        def attemptConnection(endpoints):
             """
-            This method matches the host address family with an endpoint for
-            every address returned by GAI.
+            Attempt to connect each of C{endpoints}, in order, until one of
+            the attempts succeeds.
 
-            @param gaiResult: A list of 5-tuples as returned by GAI.
-            @type gaiResult: list
-            """
-            for family, socktype, proto, canonname, sockaddr in gaiResult:
-                if family in [AF_INET6]:
-                    yield TCP6ClientEndpoint(self._reactor, sockaddr[0],
-                            sockaddr[1], self._timeout, self._bindAddress)
-                elif family in [AF_INET]:
-                    yield TCP4ClientEndpoint(self._reactor, sockaddr[0],
-                            sockaddr[1], self._timeout, self._bindAddress)
-                        # Yields an endpoint for every address returned by GAI
+            @param endpoints: A C{list} of C{(family, endpoint)} tuples, as
+                returned by L{_endpoints}.
 
-        def attemptConnection(endpoints):
-            """
-            When L{endpoints} yields an endpoint, this method attempts to connect it.
+            @return: A L{Deferred} which fires with the protocol connected by
+                the attempt which succeeded, or with the failure of the last
+                attempt if none do.
             """
-            # The trial attempts for each endpoints, the recording of
-            # successful and failed attempts, and the algorithm to pick the
-            # winner endpoint goes here.
-            # Return a Deferred that fires with the endpoint that wins,
-            # or `failures` if none succeed.
-
-            endpointsListExhausted = []
-            successful = []
-            failures = []
             winner = defer.Deferred(canceller=_canceller)
+            failures = []
+            remaining.extend(endpoints)
+
+            if not remaining:
+                winner.errback(error.DNSLookupError(
+                    "Couldn't find the hostname '%s'" % (self._host,)))
+                return winner
 
             def usedEndpointRemoval(connResult, connAttempt):
                 pending.remove(connAttempt)
                 return connResult
 
-            def afterConnectionAttempt(connResult):
-                if lc.running:
-                    lc.stop()
-
-                successful.append(True)
-                for p in pending[:]:
-                    p.cancel()
+            def connectSucceeded(connResult, family):
+                self._preferredFamilies.store(self._host, family)
                 winner.callback(connResult)
-                return None
-
-            def checkDone():
-                if endpointsListExhausted and not pending and not successful:
-                    winner.errback(failures.pop())
+                stopAttempts()
 
             def connectFailed(reason):
+                if winner.called:
+                    # Cancelled, either along with the connection attempt as
+                    # a whole or because another attempt succeeded.
+                    return
                 failures.append(reason)
-                checkDone()
-                return None
-
-            def iterateEndpoint():
-                try:
-                    endpoint = next(endpoints)
-                except StopIteration:
-                    # The list of endpoints ends.
-                    endpointsListExhausted.append(True)
-                    lc.stop()
-                    checkDone()
-                else:
-                    dconn = endpoint.connect(wf)
-                    pending.append(dconn)
-                    dconn.addBoth(usedEndpointRemoval, dconn)
-                    dconn.addCallback(afterConnectionAttempt)
-                    dconn.addErrback(connectFailed)
-
-            lc = LoopingCall(iterateEndpoint)
-            lc.clock = self._reactor
-            lc.start(0.3)
+                if remaining:
+                    # Don't wait any longer before trying the next address.
+                    startNextAttempt()
+                elif not pending:
+                    winner.errback(failures[-1])
+
+            def startNextAttempt():
+                for call in delayedCalls:
+                    if call.active():
+                        call.cancel()
+                del delayedCalls[:]
+                family, endpoint = remaining.pop(0)
+                if remaining:
+                    delayedCalls.append(self._reactor.callLater(
+                        self._attemptDelay, startNextAttempt))
+                dconn = endpoint.connect(protocolFactory)
+                pending.append(dconn)
+                dconn.addBoth(usedEndpointRemoval, dconn)
+                dconn.addCallbacks(connectSucceeded, connectFailed,
+                                   callbackArgs=(family,))
+
+            startNextAttempt()
             return winner
 
         d = self._nameResolution(self._host, self._port)
         d.addErrback(errbackForGai)
-        d.addCallback(_endpoints)
+        d.addCallback(self._endpoints)
         d.addCallback(attemptConnection)
         return d
 
+
+    def _endpoints(self, gaiResult):
+        """
+        Match each address returned by name resolution with an endpoint, in
+        the order they should be attempted in.
+
+        The addresses are kept in the order they were returned in within each
+        address family, but the families are interleaved.  The first address
+        is from the family of the last connection any L{HostnameEndpoint}
+        established to the same host name, if that is remembered, and
+        otherwise from the family of the first address returned.
+        Addresses of families other than C{AF_INET6} and C{AF_INET} are
+        ignored.
+
+        @param gaiResult: A list of 5-tuples as returned by GAI.
+        @type gaiResult: list
+
+        @return: A C{list} of C{(family, endpoint)} tuples.
+        """
+        families = []
+        byFamily = {AF_INET6: [], AF_INET: []}
+        for family, socktype, proto, canonname, sockaddr in gaiResult:
+            if family == AF_INET6:
+                endpoint = TCP6ClientEndpoint(
+                    self._reactor, sockaddr[0], sockaddr[1], self._timeout,
+                    self._bindAddress)
+            elif family == AF_INET:
+                endpoint = TCP4ClientEndpoint(
+                    self._reactor, sockaddr[0], sockaddr[1], self._timeout,
+                    self._bindAddress)
+            else:
+                continue
+            if family not in families:
+                families.append(family)
+            byFamily[family].append((family, endpoint))
+
+        preferred = self._preferredFamilies.get(self._host)
+        if preferred in families:
+            families.remove(preferred)
+            families.insert(0, preferred)
+        first = byFamily[families[0]] if families else []
+        second = byFamily[families[1]] if len(families) > 1 else []
+        endpoints = []
+        for i in range(max(len(first), len(second))):
+            endpoints.extend(first[i:i + 1])
+            endpoints.extend(second[i:i + 1])
+        return endpoints
+
+
     def _nameResolution(self, host, port):
         """
         Resolve the hostname string into a tuple containig the host
         address.
         """
+        if self._resolver is not None:
+            return self._resolverNameResolution(host, port)
         return self._deferToThread(self._getaddrinfo, host, port, 0,
                 socket.SOCK_STREAM)
 
 
+    def _resolverNameResolution(self, host, port):
+        """
+        Look up the host's IPv6 and IPv4 addresses with C{_resolver}, at the
+        same time.
+
+        Hosts which are IP addresses are not looked up, just as C{getaddrinfo}
+        doesn't look them up.
+
+        @return: A L{Deferred} which fires with a list of 5-tuples like those
+            returned by GAI, IPv6 addresses first, once both lookups are done,
+            or with the failure of one of the lookups if neither found an
+            address.
+        """
+        from twisted.names import dns
+
+        try:
+            address = nativeString(host)
+        except UnicodeError:
+            pass
+        else:
+            if isIPv6Address(address):
+                return defer.succeed([
+                    (AF_INET6, socket.SOCK_STREAM, socket.IPPROTO_TCP, '',
+                     (address, port, 0, 0))])
+            if isIPAddress(address):
+                return defer.succeed([
+                    (AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '',
+                     (address, port))])
+
+        def addresses(result, family, recordType, sockaddr):
+            answers, authority, additional = result
+            return [(family, socket.SOCK_STREAM, socket.IPPROTO_TCP, '',
+                     sockaddr(record.payload))
+                    for record in answers if record.type == recordType]
+
+        def ipv6Address(payload):
+            return (socket.inet_ntop(AF_INET6, payload.address), port, 0, 0)
+
+        def ipv4Address(payload):
+            return (payload.dottedQuad(), port)
+
+        lookups = [
+            self._resolver.lookupIPV6Address(host).addCallback(
+                addresses, AF_INET6, dns.AAAA, ipv6Address),
+            self._resolver.lookupAddress(host).addCallback(
+                addresses, AF_INET, dns.A, ipv4Address)]
+
+        def combine(results):
+            gaiResult = []
+            for success, result in results:
+                if success:
+                    gaiResult.extend(result)
+            if not gaiResult:
+                for success, result in results:
+                    if not success:
+                        return result
+            return gaiResult
+
+        return defer.DeferredList(lookups, consumeErrors=True).addCallback(
+            combine)
+
+
 
 @implementer(interfaces.IStreamServerEndpoint)
 class SSL4ServerEndpoint(object):
@@ -830,7 +1056,7 @@ class SSL4ClientEndpoint(object):
     """
 
     def __init__(self, reactor, host, port, sslContextFactory,
-                 timeout=30, bindAddress=None):
+                 timeout=30, bindAddress=None, sessionCache=None):
         """
         @param reactor: An L{IReactorSSL} provider.
 
@@ -850,6 +1076,17 @@ class SSL4ClientEndpoint(object):
         @param bindAddress: A (host, port) tuple of local address to bind to,
             or None.
         @type bindAddress: tuple
+
+        @param sessionCache: A cache to resume TLS sessions from, so that
+            connecting again to the same server costs an abbreviated
+            handshake rather than a full one, or C{None} to always perform a
+            full handshake.  Sessions are cached under C{(host, port, None,
+            sslContextFactory)}: the third element is the server name
+            indicated to the server, which this endpoint doesn't send, and
+            the last keeps sessions negotiated under one context factory's
+            certificate verification settings from being resumed, without
+            verification, by connections using another.
+        @type sessionCache: L{twisted.internet.ssl.ClientSessionCache}
         """
         self._reactor = reactor
         self._host = host
@@ -857,6 +1094,7 @@ class SSL4ClientEndpoint(object):
         self._sslContextFactory = sslContextFactory
         self._timeout = timeout
         self._bindAddress = bindAddress
+        self._sessionCache = sessionCache
 
 
     def connect(self, protocolFactory):
@@ -866,8 +1104,15 @@ class SSL4ClientEndpoint(object):
         """
         try:
             wf = _WrappingFactory(protocolFactory)
+            contextFactory = self._sslContextFactory
+            if self._sessionCache is not None:
+                from twisted.internet._sslverify import (
+                    _SessionCachingContextFactory)
+                contextFactory = _SessionCachingContextFactory(
+                    contextFactory, self._sessionCache,
+                    (self._host, self._port, None, contextFactory))
             self._reactor.connectSSL(
-                self._host, self._port, wf, self._sslContextFactory,
+                self._host, self._port, wf, contextFactory,
                 timeout=self._timeout, bindAddress=self._bindAddress)
             return wf._onConnection
         except:
@@ -1000,7 +1245,7 @@ class AdoptedStreamServerEndpoint(object):
 
 
 
-def _parseTCP(factory, port, interface="", backlog=50):
+def _parseTCP(factory, port, interface="", backlog=50, reusePort=None):
     """
     Internal parser function for L{_parseServer} to convert the string
     arguments for a TCP(IPv4) stream endpoint into the structured arguments.
@@ -1018,12 +1263,19 @@ def _parseTCP(factory, port, interface="", backlog=50):
     @param backlog: the length of the listen queue
     @type backlog: C{str}
 
+    @param reusePort: A string '0' or '1', mapping to False and True: whether
+        to set C{SO_REUSEPORT} on the listening socket.  It is only included
+        in the result if it is given.
+    @type reusePort: C{str}
+
     @return: a 2-tuple of (args, kwargs), describing  the parameters to
         L{IReactorTCP.listenTCP} (or, modulo argument 2, the factory, arguments
         to L{TCP4ServerEndpoint}.
     """
-    return (int(port), factory), {'interface': interface,
-                                  'backlog': int(backlog)}
+    kwargs = {'interface': interface, 'backlog': int(backlog)}
+    if reusePort is not None:
+        kwargs['reusePort'] = bool(int(reusePort))
+    return (int(port), factory), kwargs
 
 
 
@@ -1232,7 +1484,8 @@ class _TCP6ServerParser(object):
     """
     prefix = "tcp6"     # Used in _parseServer to identify the plugin with the endpoint type
 
-    def _parseServer(self, reactor, port, backlog=50, interface='::'):
+    def _parseServer(self, reactor, port, backlog=50, interface='::',
+                     reusePort='0'):
         """
         Internal parser function for L{_parseServer} to convert the string
         arguments into structured arguments for the L{TCP6ServerEndpoint}
@@ -1247,10 +1500,15 @@ class _TCP6ServerParser(object):
 
         @param interface: The hostname to bind to
         @type interface: str
+
+        @param reusePort: A string '0' or '1', mapping to False and True:
+            whether to set C{SO_REUSEPORT} on the listening socket
+        @type reusePort: str
         """
         port = int(port)
         backlog = int(backlog)
-        return TCP6ServerEndpoint(reactor, port, backlog, interface)
+        return TCP6ServerEndpoint(
+            reactor, port, backlog, interface, bool(int(reusePort)))
 
 
     def parseStreamServer(self, reactor, *args, **kwargs):
@@ -1434,6 +1692,11 @@ def serverFromString(reactor, description):
 
         serverFromString(reactor, "tcp:80:interface=127.0.0.1")
 
+    Several processes can listen on the same TCP port, with the kernel
+    spreading connections between them, if each sets C{SO_REUSEPORT}::
+
+        serverFromString(reactor, "tcp:80:reusePort=1")
+
     SSL server endpoints may be specified with the 'ssl' prefix, and the
     private key and certificate files may be specified by the C{privateKey} and
     C{certKey} arguments::
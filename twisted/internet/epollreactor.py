@@ -235,6 +235,24 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
         posixbase.PosixReactorBase.__init__(self)
 
 
+    def _afterFork(self):
+        """
+        Replace the epoll object, which is shared with the process this one
+        was forked from, and register every watched descriptor with the new
+        one.  Then replace the waker.
+        """
+        self._poller.close()
+        self._poller = epoll(1024)
+        for fd in self._reads | self._writes:
+            flags = 0
+            if fd in self._reads:
+                flags |= EPOLLIN
+            if fd in self._writes:
+                flags |= EPOLLOUT
+            self._poller.register(fd, flags)
+        posixbase.PosixReactorBase._afterFork(self)
+
+
     def _add(self, xer, primary, other, selectables, event, antievent):
         """
         Private method for adding a descriptor from the event loop.
@@ -371,6 +389,9 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
         if timeout is None:
             timeout = -1  # Wait indefinitely.
 
+        instrumentation = self._instrumentation
+        if instrumentation is not None:
+            start = self.seconds()
         try:
             # Limit the number of events to the number of io objects we're
             # currently tracking (because that's maybe a good heuristic) and
@@ -386,6 +407,9 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
             # loudly.
             raise
 
+        if instrumentation is not None:
+            instrumentation.pollCompleted(self.seconds() - start, len(l))
+
         _drdw = self._doReadOrWrite
         for fd, event in l:
             try:
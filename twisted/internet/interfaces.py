@@ -1216,6 +1216,46 @@ class IDelayedCall(Interface):
                  called or cancelled.
         """
 
+
+
+class ITimerWheel(Interface):
+    """
+    A scheduler for large numbers of coarse-grained timed calls, such as idle
+    timeouts, which are frequently rescheduled and rarely expire.
+
+    Calls are grouped into buckets of L{granularity} seconds.  Rescheduling a
+    call moves it between buckets without touching the reactor's own timed
+    call queue, and a call may run up to L{granularity} seconds later than
+    requested but never earlier.
+    """
+
+    granularity = Attribute(
+        "The width, in seconds, of the buckets into which calls are grouped.")
+
+    def callLater(delay, callable, *args, **kw):
+        """
+        Call a function no sooner than C{delay} seconds from now.
+
+        @param delay: the number of seconds to wait.
+        @param callable: the callable object to call later.
+        @param args: the arguments to call it with.
+        @param kw: the keyword arguments to call it with.
+
+        @return: An object which provides L{IDelayedCall} and can be used to
+                 cancel or reschedule the call.
+        """
+
+
+    def seconds():
+        """
+        Get the current time, according to the clock the wheel's calls are
+        scheduled with.
+
+        @return: A number of seconds, as L{IReactorTime.seconds} returns.
+        """
+
+
+
 class IReactorThreads(Interface):
     """
     Dispatch methods to be run in threads.
@@ -1408,6 +1448,98 @@ class IReactorPluggableResolver(Interface):
         """
 
 
+class IReactorInstrumentation(Interface):
+    """
+    An observer of where a reactor spends its time, installed with
+    L{IReactorInstrumented.setInstrumentation}.
+
+    Each method is called at most once per reactor iteration, for the part of
+    the iteration it describes; a part which did no work (for example, no
+    timed calls were due) is not reported.  Durations are in seconds, as
+    measured by the reactor's C{seconds} method.  Implementations should be
+    cheap, since they run inside the event loop; in particular they must not
+    raise.
+
+    @ivar slowThreshold: The duration in seconds at or above which a single
+        callback, C{doRead} or C{doWrite} is reported to L{slowCall}.
+    @type slowThreshold: C{float}
+    """
+
+    slowThreshold = Attribute(
+        "The duration, in seconds, at or above which a single call is "
+        "reported to slowCall.")
+
+    def pollCompleted(waited, ready):
+        """
+        The reactor has finished waiting for its file descriptors.
+
+        @param waited: How long the reactor waited.
+        @type waited: C{float}
+
+        @param ready: The number of file descriptors reported ready.
+        @type ready: C{int}
+        """
+
+
+    def threadCallsRun(count, elapsed):
+        """
+        The reactor has run the calls queued with
+        L{IReactorThreads.callFromThread}.
+
+        @param count: The number of calls which were run.
+        @type count: C{int}
+
+        @param elapsed: How long running them took.
+        @type elapsed: C{float}
+        """
+
+
+    def timedCallsRun(count, elapsed):
+        """
+        The reactor has run the timed calls which were due.
+
+        @param count: The number of calls which were run.
+        @type count: C{int}
+
+        @param elapsed: How long running them took.
+        @type elapsed: C{float}
+        """
+
+
+    def slowCall(name, elapsed):
+        """
+        A single callable took at least C{slowThreshold} seconds.
+
+        @param name: The fully qualified name of the callable, for example
+            C{"twisted.internet.tcp.Server.doRead"}.
+        @type name: C{str}
+
+        @param elapsed: How long the call took.
+        @type elapsed: C{float}
+        """
+
+
+
+class IReactorInstrumented(Interface):
+    """
+    A reactor which can report where it spends its time to an
+    L{IReactorInstrumentation} provider.
+    """
+
+    def setInstrumentation(instrumentation):
+        """
+        Start reporting to C{instrumentation}, replacing whatever was
+        reporting before.
+
+        @param instrumentation: An L{IReactorInstrumentation} provider, or
+            C{None} to stop reporting.  Without instrumentation the reactor
+            does no extra timing.
+
+        @return: The previously installed instrumentation, or C{None}.
+        """
+
+
+
 class IReactorDaemonize(Interface):
     """
     A reactor which provides hooks that need to be called before and after
@@ -1925,6 +2057,26 @@ class IHalfCloseableProtocol(Interface):
 
 
 
+class IBatchedDatagramProtocol(Interface):
+    """
+    Datagram protocols may implement L{IBatchedDatagramProtocol} to be given
+    all of the datagrams read in one reactor iteration at once, instead of
+    one call to C{datagramReceived} for each.
+    """
+
+    def datagramsReceived(datagrams):
+        """
+        Called with the datagrams which were read together.
+
+        @param datagrams: The datagrams, in the order they were received.
+        @type datagrams: C{list} of C{(bytes, addr)} C{tuple}s, where C{addr}
+            is as would be passed to C{datagramReceived}.
+
+        @return: C{None}
+        """
+
+
+
 class IFileDescriptorReceiver(Interface):
     """
     Protocols may implement L{IFileDescriptorReceiver} to receive file
@@ -1944,6 +2096,29 @@ class IFileDescriptorReceiver(Interface):
 
 
 
+class IBufferedProtocol(Interface):
+    """
+    Protocols may implement L{IBufferedProtocol} to have received data
+    delivered as a view of a buffer which the transport reuses, instead of
+    as a new string for each read.  Transports which support this call
+    C{bufferReceived} in place of L{IProtocol.dataReceived}; others continue
+    to call C{dataReceived}, so providers must implement both.
+    """
+    def bufferReceived(data):
+        """
+        Called whenever data is received.
+
+        @param data: The bytes which were received.  The transport will
+            overwrite the underlying buffer with the next read, so the
+            protocol must copy any part of C{data} it needs to keep after
+            this method returns.
+        @type data: C{memoryview}
+
+        @return: C{None}
+        """
+
+
+
 class IProtocolFactory(Interface):
     """
     Interface for protocol factories.
@@ -2130,6 +2305,44 @@ class IUNIXTransport(ITransport):
 
 
 
+class ISendFileTransport(ITransport):
+    """
+    A transport which can send the contents of a file without the data
+    passing through Python, for example with C{sendfile(2)}.
+    """
+    def sendFile(fileObject, offset=0, count=None):
+        """
+        Send part or all of the contents of a file after any data already
+        written to this transport.
+
+        The file is sent as the transport becomes writeable, without blocking.
+        A producer is registered with the transport while the file is being
+        sent, so no other producer may be registered until the returned
+        L{Deferred} fires.  Nothing else should be written to the transport
+        until then either, or it may be sent in the middle of the file.
+
+        Where the file cannot be sent directly by the operating system (for
+        example, because the connection uses TLS), it is read and written in
+        chunks instead.
+
+        @param fileObject: A file object with a C{fileno} method, open for
+            reading in binary mode.
+
+        @param offset: The position in the file at which to start.
+        @type offset: C{int}
+
+        @param count: The number of bytes to send, or C{None} to send
+            everything up to the end of the file.
+        @type count: C{int} or C{NoneType}
+
+        @return: A L{Deferred} which fires with the number of bytes sent once
+            they have all been handed to the operating system, or fails if
+            the connection is lost first.
+        @rtype: L{twisted.internet.defer.Deferred}
+        """
+
+
+
 class ITLSTransport(ITCPTransport):
     """
     A TCP transport that supports switching to TLS midstream.
@@ -2348,6 +2561,28 @@ class IUDPTransport(Interface):
         """
 
 
+
+class IBatchedUDPTransport(IUDPTransport):
+    """
+    A UDP transport which can send many datagrams in one call.
+    """
+
+    def writeSequenceTo(datagrams):
+        """
+        Write several datagrams, each to its own address.
+
+        This is equivalent to calling L{IUDPTransport.write} for each
+        datagram in turn, but each distinct address is only checked once.
+
+        @param datagrams: An iterable of C{(datagram, addr)} pairs, each of
+            which is as would be passed to L{IUDPTransport.write}.
+
+        @raise twisted.internet.error.MessageLengthError: One of the
+            datagrams was too long.  Datagrams before it have been sent,
+            those after it have not.
+        """
+
+
 class IUNIXDatagramTransport(Interface):
     """
     Transport for UDP PacketProtocols.
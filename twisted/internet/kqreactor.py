@@ -119,6 +119,17 @@ class KQueueReactor(posixbase.PosixReactorBase):
             self._updateRegistration(fd, KQ_FILTER_WRITE, KQ_EV_ADD)
 
 
+    def _afterFork(self):
+        """
+        Replace the kqueue, which is not inherited by forked processes, and
+        register every watched descriptor with the new one.  Then replace the
+        waker.
+        """
+        self.beforeDaemonize()
+        self.afterDaemonize()
+        posixbase.PosixReactorBase._afterFork(self)
+
+
     def addReader(self, reader):
         """
         Implement L{IReactorFDSet.addReader}.
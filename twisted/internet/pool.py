@@ -0,0 +1,453 @@
+# -*- test-case-name: twisted.internet.test.test_pool -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A pool of client connections, made with endpoints and reused for as long as
+they stay healthy.
+
+Connections are kept under keys chosen by the application, such that any
+connection stored under a given key can be used in place of any other: for
+example, C{(host, port)}, or C{(host, port, username)} if connections
+authenticate.  A connection is checked out with
+L{EndpointConnectionPool.getConnection} and, once the application is done
+with it, either handed back for reuse with L{EndpointConnectionPool.release}
+or given up with L{EndpointConnectionPool.discard}::
+
+    pool = EndpointConnectionPool(reactor, factory)
+    d = pool.getConnection(key, endpoint)
+    def gotConnection(protocol):
+        d = protocol.doSomething()
+        d.addBoth(lambda result: pool.release(key, protocol) or result)
+        return d
+    d.addCallback(gotConnection)
+"""
+
+from __future__ import division, absolute_import
+
+from twisted.internet import defer
+from twisted.python import log
+
+
+def _transportIsOpen(connection):
+    """
+    The default health check of L{EndpointConnectionPool}: a connection is
+    healthy unless its transport is gone, or is being or has been
+    disconnected.
+    """
+    transport = getattr(connection, "transport", None)
+    return (transport is not None and
+            not getattr(transport, "disconnecting", False) and
+            not getattr(transport, "disconnected", False))
+
+
+
+class EndpointConnectionPool(object):
+    """
+    A pool of client connections, made with endpoints.
+
+    By default, idle connections are kept on a stack per key, so that the
+    connection used most recently, which is the least likely to have been
+    closed by the server, is reused first and the others can time out; see
+    C{reuseMostRecent}.  A single timer
+    closes idle connections once they have been idle for C{idleTimeout}
+    seconds, however many there are.
+
+    Every connection checked out with L{getConnection} counts against
+    C{maxPerKey} until it is passed to L{release} or L{discard}, so each one
+    must be passed to exactly one of them.
+
+    @ivar maxPerKey: The most connections per key which may be checked out
+        or being connected at once, or C{None} for no limit.  Once there are
+        that many, L{getConnection} waits until one is released or
+        discarded.  Requests waiting for a connection are served in the
+        order they were made.
+
+    @ivar maxIdlePerKey: The most idle connections kept per key.  When
+        another is released, the one which has been idle longest is closed.
+
+    @ivar reuseMostRecent: If C{True}, the idle connection released most
+        recently is reused first; if C{False}, the one idle longest is.
+
+    @ivar idleTimeout: The number of seconds an idle connection is kept
+        before it is closed.
+
+    @ivar connects: The number of connections made.
+
+    @ivar connectFailures: The number of connection attempts which failed.
+
+    @ivar connectTime: The total number of seconds the connections made took
+        to connect.
+
+    @ivar checkouts: The number of connections L{getConnection} supplied.
+
+    @ivar reuses: How many of C{checkouts} were of idle connections rather
+        than new ones.
+
+    @ivar checkoutTime: The total number of seconds callers of
+        L{getConnection} waited for their connections, including the time
+        spent waiting for C{maxPerKey} to allow a connection and connecting
+        it.
+
+    @ivar evictions: The number of idle connections closed because they were
+        idle for too long or there were too many of them.
+
+    @ivar _reactor: The L{IReactorTime} provider used to time connections
+        and to schedule the closing of idle ones.  If it has no C{seconds}
+        method, connections are not timed.
+
+    @ivar _protocolFactory: The protocol factory connections are made with,
+        unless another is given to L{getConnection}.
+
+    @ivar _healthCheck: A callable which is given an idle connection before
+        it is reused, and returns C{True} if it is still usable.
+
+    @ivar _idle: A C{dict} mapping keys to C{list}s of idle connections, the
+        one idle longest first.  Keys without idle connections are removed.
+
+    @ivar _idleSince: A C{dict} mapping idle connections to the time they
+        became idle.
+
+    @ivar _active: A C{dict} mapping keys to the number of connections
+        checked out or being connected for them.
+
+    @ivar _waiting: A C{dict} mapping keys to C{list}s of the requests
+        waiting for C{maxPerKey} to allow another connection, oldest first.
+        Each is a C{list} of the L{Deferred} returned by L{getConnection},
+        the endpoint to connect with, the time the request was made and the
+        L{Deferred} of the connection attempt started for it, if any.
+
+    @ivar _sweeper: The L{IDelayedCall} which will close the idle connections
+        which have timed out, or C{None} if there are no idle connections.
+    """
+    maxPerKey = None
+    maxIdlePerKey = 2
+    idleTimeout = 240
+    reuseMostRecent = True
+
+    connects = 0
+    connectFailures = 0
+    connectTime = 0.0
+    checkouts = 0
+    reuses = 0
+    checkoutTime = 0.0
+    evictions = 0
+
+    _sweeper = None
+
+    def __init__(self, reactor, factory=None, healthCheck=None):
+        """
+        @param reactor: The L{IReactorTime} provider used to time connections
+            and to schedule the closing of idle ones.  It is only needed to
+            keep idle connections, so C{None} will do if none are ever
+            released.
+
+        @param factory: The protocol factory to connect with, or C{None} if
+            one will be passed to each call of L{getConnection}.
+
+        @param healthCheck: A one-argument callable which is given an idle
+            connection before it is reused, and returns C{True} if it is
+            still usable.  Connections which aren't are closed and forgotten.
+            By default a connection is usable unless its transport has been
+            disconnected.
+        """
+        self._reactor = reactor
+        self._protocolFactory = factory
+        if healthCheck is None:
+            healthCheck = _transportIsOpen
+        self._healthCheck = healthCheck
+        self._idle = {}
+        self._idleSince = {}
+        self._active = {}
+        self._waiting = {}
+
+
+    def getConnection(self, key, endpoint, factory=None):
+        """
+        Supply a connection, either an idle one or a new one made with
+        C{endpoint}.  It is not supplied to anyone else until it is passed to
+        L{release}.
+
+        @param key: A key identifying connections which can be used
+            interchangeably.
+
+        @param endpoint: The L{IStreamClientEndpoint} to connect with if no
+            idle connection is available.
+
+        @param factory: The protocol factory to connect with, if it is not
+            the one given to the pool.
+
+        @return: A L{Deferred} which fires with the connected protocol.
+            Cancelling it cancels the connection attempt, or if the request is
+            still waiting for C{maxPerKey} to allow it, withdraws it.
+        """
+        started = self._seconds()
+        connection = self._takeIdle(key)
+        if connection is not None:
+            self._active[key] = self._active.get(key, 0) + 1
+            self._checkedOut(started, True)
+            return defer.succeed(connection)
+
+        if self.maxPerKey is None or self._active.get(key, 0) < self.maxPerKey:
+            self._active[key] = self._active.get(key, 0) + 1
+            d = self._connect(key, endpoint, factory)
+            d.addCallbacks(self._connected, self._connectFailed,
+                           callbackArgs=(started,), errbackArgs=(key,))
+            return d
+
+        request = []
+        def cancel(d):
+            if request[3] is not None:
+                request[3].cancel()
+            else:
+                self._waiting[key].remove(request)
+                if not self._waiting[key]:
+                    del self._waiting[key]
+        d = defer.Deferred(cancel)
+        request.extend([d, endpoint, started, None, factory])
+        self._waiting.setdefault(key, []).append(request)
+        return d
+
+
+    def release(self, key, connection):
+        """
+        Hand back a connection supplied by L{getConnection}, so that it can be
+        reused.  If someone is waiting for a connection with the same key it
+        is supplied to them; otherwise it is kept idle, unless it is no
+        longer healthy, in which case it is closed.
+
+        @param key: The key the connection was supplied for.
+
+        @param connection: The connected protocol.
+        """
+        waiting = self._waiting.get(key)
+        if waiting and self._healthCheck(connection):
+            request = waiting.pop(0)
+            if not waiting:
+                del self._waiting[key]
+            self._checkedOut(request[2], True)
+            request[0].callback(connection)
+            return
+        self._active[key] -= 1
+        if not self._active[key]:
+            del self._active[key]
+        self._putIdle(key, connection)
+        self._serveWaiting(key)
+
+
+    def discard(self, key, connection):
+        """
+        Give up a connection supplied by L{getConnection} which isn't to be
+        reused, closing it if it is still open.
+
+        @param key: The key the connection was supplied for.
+
+        @param connection: The connected protocol.
+        """
+        self._active[key] -= 1
+        if not self._active[key]:
+            del self._active[key]
+        if _transportIsOpen(connection):
+            self._disconnect(connection)
+        self._serveWaiting(key)
+
+
+    def closeCachedConnections(self):
+        """
+        Close all idle connections and forget them.
+
+        @return: A L{Deferred} which has already fired with C{None}.
+        """
+        for connections in self._idle.values():
+            for connection in connections:
+                self._disconnect(connection)
+        self._forgetIdle()
+        return defer.succeed(None)
+
+
+    def _forgetIdle(self):
+        """
+        Forget all idle connections, and stop the timer which would have
+        closed them.
+        """
+        self._idle = {}
+        self._idleSince = {}
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+
+    def _seconds(self):
+        """
+        Get the current time, for timing connections, or C{0} if the reactor
+        can't tell it.
+        """
+        seconds = getattr(self._reactor, "seconds", None)
+        if seconds is None:
+            return 0
+        return seconds()
+
+
+    def _connect(self, key, endpoint, factory=None):
+        """
+        Make a new connection with C{endpoint}, and time it.
+
+        @return: The L{Deferred} returned by C{endpoint.connect}, so that
+            cancelling it cancels the connection attempt.
+        """
+        if factory is None:
+            factory = self._protocolFactory
+        started = self._seconds()
+        def connected(connection):
+            self.connects += 1
+            self.connectTime += self._seconds() - started
+            return connection
+        def failed(reason):
+            self.connectFailures += 1
+            return reason
+        return endpoint.connect(factory).addCallbacks(connected, failed)
+
+
+    def _connected(self, connection, started):
+        """
+        Supply a new connection to the L{getConnection} caller who asked for
+        it at C{started}.
+        """
+        self._checkedOut(started, False)
+        return connection
+
+
+    def _connectFailed(self, reason, key):
+        """
+        A connection attempt for C{key} failed, so allow another.
+        """
+        self._active[key] -= 1
+        if not self._active[key]:
+            del self._active[key]
+        self._serveWaiting(key)
+        return reason
+
+
+    def _checkedOut(self, started, reused):
+        """
+        Record that a connection asked for at C{started} was supplied.
+        """
+        self.checkouts += 1
+        if reused:
+            self.reuses += 1
+        self.checkoutTime += self._seconds() - started
+
+
+    def _serveWaiting(self, key):
+        """
+        Supply connections to the requests waiting for C{key}, as far as
+        C{maxPerKey} allows.
+        """
+        while self._waiting.get(key) and (
+                self.maxPerKey is None or
+                self._active.get(key, 0) < self.maxPerKey):
+            waiting = self._waiting[key]
+            request = waiting.pop(0)
+            if not waiting:
+                del self._waiting[key]
+            d, endpoint, started, ignored, factory = request
+            connection = self._takeIdle(key)
+            self._active[key] = self._active.get(key, 0) + 1
+            if connection is not None:
+                self._checkedOut(started, True)
+                d.callback(connection)
+                continue
+            connecting = self._connect(key, endpoint, factory)
+            request[3] = connecting
+            connecting.addCallbacks(self._connected, self._connectFailed,
+                                    callbackArgs=(started,),
+                                    errbackArgs=(key,))
+            connecting.chainDeferred(d)
+
+
+    def _takeIdle(self, key):
+        """
+        Take a healthy connection for C{key} out of the idle connections, the
+        one released most recently or the one idle longest according to
+        C{reuseMostRecent}, closing any unhealthy ones found on the way.
+
+        @return: The connection, or C{None} if there is none.
+        """
+        connections = self._idle.get(key)
+        while connections:
+            if self.reuseMostRecent:
+                connection = connections.pop()
+            else:
+                connection = connections.pop(0)
+            del self._idleSince[connection]
+            if not connections:
+                del self._idle[key]
+            if self._healthCheck(connection):
+                return connection
+            self._disconnect(connection)
+        return None
+
+
+    def _putIdle(self, key, connection):
+        """
+        Keep C{connection} as an idle connection for C{key} if it is healthy,
+        closing the one idle longest if there are then more than
+        C{maxIdlePerKey}, or close it.
+        """
+        if self.maxIdlePerKey < 1 or not self._healthCheck(connection):
+            self._disconnect(connection)
+            return
+        connections = self._idle.get(key, [])
+        while len(connections) >= self.maxIdlePerKey:
+            self._evict(key, connections[0])
+        self._idle.setdefault(key, connections).append(connection)
+        self._idleSince[connection] = self._reactor.seconds()
+        if self._sweeper is None:
+            self._sweeper = self._reactor.callLater(
+                self.idleTimeout, self._sweep)
+
+
+    def _evict(self, key, connection):
+        """
+        Close an idle connection and forget it.
+        """
+        connections = self._idle[key]
+        connections.remove(connection)
+        if not connections:
+            del self._idle[key]
+        del self._idleSince[connection]
+        self.evictions += 1
+        self._disconnect(connection)
+
+
+    def _sweep(self):
+        """
+        Close the idle connections which have timed out, and schedule the
+        next sweep for when the next one will.
+        """
+        self._sweeper = None
+        now = self._reactor.seconds()
+        for key, connections in list(self._idle.items()):
+            for connection in connections[:]:
+                if now - self._idleSince[connection] >= self.idleTimeout:
+                    self._evict(key, connection)
+        if self._idleSince:
+            due = min(self._idleSince.values()) + self.idleTimeout
+            self._sweeper = self._reactor.callLater(
+                max(due - now, 0), self._sweep)
+
+
+    def _disconnect(self, connection):
+        """
+        Close a connection.
+        """
+        transport = getattr(connection, "transport", None)
+        if transport is not None:
+            try:
+                transport.loseConnection()
+            except:
+                log.err(None, "Error closing pooled connection")
+
+
+
+__all__ = ["EndpointConnectionPool"]
@@ -187,8 +187,77 @@ class _UnixWaker(_FDWaker):
 
 
 
+if getattr(os, 'eventfd', None) is not None:
+    _eventfd = os
+else:
+    try:
+        from twisted.internet import _eventfd
+    except ImportError:
+        _eventfd = None
+
+
+
+class _EventFDWaker(_FDWaker):
+    """
+    A waker using a Linux C{eventfd} instead of a pipe.
+
+    An C{eventfd} is a single file descriptor holding a counter, so it costs
+    one descriptor instead of two and any number of wakeups are read back in
+    one C{read}.  Both L{i<_FDWaker.i>} and L{o<_FDWaker.o>} refer to it.
+    """
+
+    def __init__(self, reactor):
+        """Initialize.
+        """
+        self.reactor = reactor
+        self.i = self.o = _eventfd.eventfd(
+            0, _eventfd.EFD_NONBLOCK | _eventfd.EFD_CLOEXEC)
+        self.fileno = lambda: self.i
+
+
+    def wakeUp(self):
+        """
+        Add one to the counter.
+        """
+        if self.o is not None:
+            try:
+                util.untilConcludes(_eventfd.eventfd_write, self.o, 1)
+            except OSError as e:
+                # The counter is full, so a wakeup is pending anyway.
+                if e.errno != errno.EAGAIN:
+                    raise
+
+
+    def doRead(self):
+        """
+        Reset the counter.
+        """
+        try:
+            util.untilConcludes(_eventfd.eventfd_read, self.i)
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
+
+
+    def connectionLost(self, reason):
+        """
+        Close the C{eventfd}.
+        """
+        if self.i is None:
+            return
+        try:
+            os.close(self.i)
+        except OSError:
+            pass
+        del self.i, self.o
+
+
+
 if platformType == 'posix':
-    _Waker = _UnixWaker
+    if _eventfd is not None:
+        _Waker = _EventFDWaker
+    else:
+        _Waker = _UnixWaker
 else:
     # Primarily Windows and Jython.
     _Waker = _SocketWaker
@@ -291,6 +360,24 @@ class PosixReactorBase(_SignalReactorMixin, _DisconnectSelectableMixin,
             self.addReader(self.waker)
 
 
+    def _afterFork(self):
+        """
+        Replace the waker, in a process forked after this reactor was
+        created, so that waking this process's reactor does not wake the
+        reactor of the process it was forked from, or of its siblings.
+
+        Subclasses which wait on a kernel object, such as an epoll instance,
+        extend this to replace that as well, before calling this.
+        """
+        waker = self.waker
+        if waker is not None:
+            self.removeReader(waker)
+            self._internalReaders.discard(waker)
+            waker.connectionLost(None)
+            self.waker = None
+            self.installWaker()
+
+
     _childWaker = None
     def _handleSignals(self):
         """
@@ -490,8 +577,16 @@ class PosixReactorBase(_SignalReactorMixin, _DisconnectSelectableMixin,
 
     # IReactorTCP
 
-    def listenTCP(self, port, factory, backlog=50, interface=''):
-        p = tcp.Port(port, factory, backlog, interface, self)
+    def listenTCP(self, port, factory, backlog=50, interface='',
+                  reusePort=False):
+        """
+        @see: L{twisted.internet.interfaces.IReactorTCP.listenTCP}
+
+        @param reusePort: If C{True}, set C{SO_REUSEPORT} on the listening
+            socket so that several processes can listen on the same port.
+            See L{tcp.Port}.
+        """
+        p = tcp.Port(port, factory, backlog, interface, self, reusePort)
         p.startListening()
         return p
 
@@ -567,7 +662,12 @@ class _PollLikeMixin(object):
 
     Must be mixed in to a subclass of PosixReactorBase (for
     _disconnectSelectable).
+
+    @ivar _instrumentation: See L{ReactorBase._instrumentation
+        <twisted.internet.base.ReactorBase>}.  Helpers which are not reactors
+        themselves never have any.
     """
+    _instrumentation = None
 
     def _doReadOrWrite(self, selectable, fd, event):
         """
@@ -608,7 +708,7 @@ class _PollLikeMixin(object):
                     # returns -1.  Eventually it'd be good to deprecate this
                     # case.
                     why = _NO_FILEDESC
-                else:
+                elif self._instrumentation is None:
                     if event & self._POLL_IN:
                         # Handle a read event.
                         why = selectable.doRead()
@@ -618,6 +718,16 @@ class _PollLikeMixin(object):
                         # disconnect us.
                         why = selectable.doWrite()
                         inRead = False
+                else:
+                    # The same, timing each call.
+                    if event & self._POLL_IN:
+                        why = self._timeCall(
+                            self._instrumentation, selectable.doRead)
+                        inRead = True
+                    if not why and event & self._POLL_OUT:
+                        why = self._timeCall(
+                            self._instrumentation, selectable.doWrite)
+                        inRead = False
             except:
                 # Any exception from application code gets logged and will
                 # cause us to disconnect the selectable.
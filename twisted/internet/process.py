@@ -23,6 +23,11 @@ try:
 except ImportError:
     fcntl = None
 
+try:
+    from twisted.internet import _posixspawn
+except ImportError:
+    _posixspawn = None
+
 from zope.interface import implements
 
 from twisted.python import log, failure
@@ -583,6 +588,23 @@ def _listOpenFDs():
     return detector._listOpenFDs()
 
 
+def _findExecutable(executable, environment):
+    """
+    Find the program C{os.execvpe} would run, searching the C{PATH} of the
+    given environment if the name of the program has no directory part.
+
+    @return: The path of the program, or C{None} if it was not found.
+    """
+    if os.path.dirname(executable):
+        return executable
+    for directory in environment.get('PATH', os.defpath).split(os.pathsep):
+        candidate = os.path.join(directory, executable)
+        if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            return candidate
+    return None
+
+
+
 class Process(_BaseProcess):
     """
     An operating-system Process.
@@ -594,7 +616,8 @@ class Process(_BaseProcess):
     On UNIX, this is implemented using fork(), exec(), pipe()
     and fcntl(). These calls may not exist elsewhere so this
     code is not cross-platform. (also, windows can only select
-    on sockets...)
+    on sockets...)  Where possible, posix_spawn() is used instead of fork()
+    and exec(); see L{_spawn}.
     """
     implements(IProcessTransport)
 
@@ -674,7 +697,10 @@ class Process(_BaseProcess):
             if debug: print "helpers", helpers
             # the child only cares about fdmap.values()
 
-            self._fork(path, uid, gid, executable, args, environment, fdmap=fdmap)
+            if not self._spawn(path, uid, gid, executable, args, environment,
+                               fdmap):
+                self._fork(path, uid, gid, executable, args, environment,
+                           fdmap=fdmap)
         except:
             map(os.close, _openedPipes)
             raise
@@ -710,6 +736,52 @@ class Process(_BaseProcess):
         registerReapProcessHandler(self.pid, self)
 
 
+    def _spawn(self, path, uid, gid, executable, args, environment, fdmap):
+        """
+        Start the sub-process with posix_spawn(), which unlike L{_fork} does
+        not copy this process's address space, if that gives the same result.
+
+        That is not the case if the uid or gid is to be changed, the child is
+        being debugged, L{_setupChild} or L{_execChild} is overridden, or
+        the C library can't change the working directory of the new process.
+        If the program can't be run, it is left to L{_fork} to report it the
+        usual way.
+
+        The parameters are those of L{_fork}.
+
+        @return: C{True} if the sub-process was started, C{False} if
+            L{_fork} should be used instead.
+        """
+        if (_posixspawn is None or uid is not None or gid is not None or
+                self.debug_child or
+                self._setupChild.__func__ is not
+                    Process._setupChild.__func__ or
+                self._execChild.__func__ is not
+                    _BaseProcess._execChild.__func__):
+            return False
+        path = path or None
+        if path is not None and not _posixspawn.canChangeDirectory:
+            return False
+        if environment is None:
+            environment = os.environ
+        executable = _findExecutable(executable, environment)
+        if executable is None or (
+                path is not None and not os.path.isabs(executable)):
+            return False
+
+        defaultSignals = [
+            signalnum for signalnum in range(1, signal.NSIG)
+            if signal.getsignal(signalnum) == signal.SIG_IGN]
+        try:
+            self.pid = _posixspawn.spawn(
+                executable, args, environment, fdmap, path, defaultSignals,
+                _listOpenFDs)
+        except OSError:
+            return False
+        self.status = -1
+        return True
+
+
     def _setupChild(self, fdmap):
         """
         fdmap[childFD] = parentFD
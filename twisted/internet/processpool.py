@@ -0,0 +1,503 @@
+# -*- test-case-name: twisted.internet.test.test_processpool -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A pool of worker processes for CPU-bound work, the process counterpart to
+L{twisted.internet.threads.deferToThreadPool}.
+
+Threads in one process are serialized by the GIL, so they do not help with
+work like rendering, compression or cryptography written in Python.  A
+L{ProcessPool} keeps a number of Python worker processes running, sends each
+call to an idle one over L{AMP<twisted.protocols.amp>} and returns the result
+as a L{Deferred}::
+
+    pool = ProcessPool(4)
+    pool.setServiceParent(application)
+    d = deferToProcessPool(pool, renderPage, template, context)
+
+Functions are sent by name, so they must be defined at the top level of a
+module the workers can import.  Arguments and results are pickled.
+"""
+
+import os
+import sys
+import pickle
+from collections import deque
+
+from twisted.application import service
+from twisted.internet import defer
+from twisted.internet.protocol import ProcessProtocol
+from twisted.protocols import amp
+from twisted.python import log
+from twisted.python.failure import Failure
+from twisted.python.reflect import namedAny
+
+# File descriptors used for AMP in the worker processes, as seen by them.
+_WORKER_AMP_STDIN = 3
+
+_WORKER_AMP_STDOUT = 4
+
+
+
+class ProcessPoolFull(Exception):
+    """
+    A call was refused because the pool's queue of waiting calls is full.
+    """
+
+
+
+class WorkerCrashed(Exception):
+    """
+    The worker process running a call exited before returning its result.
+    The call may or may not have had side effects.
+    """
+
+
+
+class RemoteCallError(Exception):
+    """
+    A call raised an exception in a worker process which could not be
+    pickled.  The only argument is the formatted traceback from the worker.
+    """
+
+
+
+class _BigString(amp.Argument):
+    """
+    A byte string of any length, split over as many AMP values as it takes to
+    stay under L{amp.MAX_VALUE_LENGTH}.
+
+    The value named C{name} in the box is the number of chunks, and the
+    chunks are named C{name.0}, C{name.1} and so on.
+    """
+
+    def toBox(self, name, strings, objects, proto):
+        value = objects.get(name)
+        if self.optional and value is None:
+            return
+        chunks = [value[i:i + amp.MAX_VALUE_LENGTH]
+                  for i in range(0, len(value), amp.MAX_VALUE_LENGTH)]
+        strings[name] = str(len(chunks))
+        for i, chunk in enumerate(chunks):
+            strings['%s.%d' % (name, i)] = chunk
+
+
+    def fromBox(self, name, strings, objects, proto):
+        count = strings.get(name)
+        if self.optional and count is None:
+            objects[name] = None
+            return
+        objects[name] = ''.join([strings['%s.%d' % (name, i)]
+                                 for i in range(int(count))])
+
+
+
+class CallFunction(amp.Command):
+    """
+    Call a function in a worker process.
+
+    The function is named by its fully qualified name and its arguments are
+    a pickled C{(args, kwargs)} tuple.  The response holds either the
+    pickled result or a pickled C{(exception, traceback)} tuple describing
+    how the call failed, where C{exception} is C{None} if it could not be
+    pickled.
+    """
+    arguments = [('function', amp.String()),
+                 ('arguments', _BigString())]
+    response = [('result', _BigString(optional=True)),
+                ('failure', _BigString(optional=True))]
+
+
+
+class WorkerProtocol(amp.AMP):
+    """
+    The worker side of the process pool protocol.
+    """
+
+    def callFunction(self, function, arguments):
+        """
+        Call a function and return its pickled result, or a pickled
+        description of its failure.
+        """
+        try:
+            args, kwargs = pickle.loads(arguments)
+            result = namedAny(function)(*args, **kwargs)
+            return {'result': pickle.dumps(result, pickle.HIGHEST_PROTOCOL)}
+        except:
+            return {'failure': _pickleFailure(Failure())}
+
+    CallFunction.responder(callFunction)
+
+
+
+def _pickleFailure(failure):
+    """
+    Pickle the exception and traceback of C{failure}, leaving the exception
+    out if it cannot be pickled.
+
+    @type failure: L{Failure}
+    @rtype: C{str}
+    """
+    traceback = failure.getTraceback()
+    try:
+        return pickle.dumps(
+            (failure.value, traceback), pickle.HIGHEST_PROTOCOL)
+    except:
+        return pickle.dumps((None, traceback), pickle.HIGHEST_PROTOCOL)
+
+
+
+def _unpickleResponse(response):
+    """
+    Turn a L{CallFunction} response into a result or a L{Failure}.
+    """
+    if response['failure'] is not None:
+        exception, traceback = pickle.loads(response['failure'])
+        if exception is None:
+            exception = RemoteCallError(traceback)
+        return Failure(exception)
+    return pickle.loads(response['result'])
+
+
+
+def _functionName(f):
+    """
+    Return the fully qualified name of a module level function, by which a
+    worker process can import it.
+
+    @raise TypeError: If C{f} cannot be found by its name, or is defined in
+        the C{__main__} module, which is a different module in the workers.
+    """
+    module = getattr(f, '__module__', None)
+    name = getattr(f, '__name__', None)
+    if module == '__main__':
+        raise TypeError(
+            "%r is defined in __main__, which workers cannot import it from; "
+            "move it into an importable module to call it in a process pool"
+            % (f,))
+    if getattr(sys.modules.get(module), str(name), None) is not f:
+        raise TypeError(
+            "%r is not a module level function and cannot be called in a "
+            "process pool" % (f,))
+    return '%s.%s' % (module, name)
+
+
+
+class _WorkerTransport(object):
+    """
+    An L{ITransport<twisted.internet.interfaces.ITransport>} for the AMP
+    connection to a worker, writing to its AMP input descriptor.
+    """
+
+    def __init__(self, transport):
+        self._transport = transport
+
+
+    def write(self, data):
+        self._transport.writeToChild(_WORKER_AMP_STDIN, data)
+
+
+    def writeSequence(self, sequence):
+        self.write(''.join(sequence))
+
+
+    def loseConnection(self):
+        """
+        Close the worker's AMP input, which tells it to exit, along with its
+        standard I/O.
+        """
+        self._transport.closeChildFD(_WORKER_AMP_STDIN)
+        self._transport.loseConnection()
+
+
+    def getPeer(self):
+        return None
+
+
+    def getHost(self):
+        return None
+
+
+
+class _WorkerProcess(ProcessProtocol):
+    """
+    The process protocol of one worker in a L{ProcessPool}.
+
+    @ivar amp: The L{amp.AMP} connection to the worker.
+
+    @ivar tasks: The number of calls the worker has completed.
+
+    @ivar retired: C{True} once the pool has decided to shut the worker down
+        and, if necessary, has started another in its place.
+
+    @ivar exited: C{True} once the process has ended.
+
+    @ivar ended: A L{Deferred} which fires when the process has ended.
+    """
+    retired = False
+    exited = False
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.amp = amp.AMP()
+        self.tasks = 0
+        self.ended = defer.Deferred()
+
+
+    def connectionMade(self):
+        self.amp.makeConnection(_WorkerTransport(self.transport))
+
+
+    def childDataReceived(self, childFD, data):
+        """
+        Feed the AMP connection, and log anything the worker writes to its
+        standard output or error.
+        """
+        if childFD == _WORKER_AMP_STDOUT:
+            self.amp.dataReceived(data)
+        else:
+            log.msg(format="Process pool worker %(pid)s wrote: %(data)r",
+                    pid=self.transport.pid, data=data)
+
+
+    def processEnded(self, reason):
+        self.exited = True
+        self.amp.connectionLost(reason)
+        self.pool._workerEnded(self, reason)
+        self.ended.callback(None)
+
+
+
+class ProcessPool(service.Service):
+    """
+    A pool of Python worker processes which run functions and return their
+    results.
+
+    A L{ProcessPool} is a L{service.IService}: starting it starts the
+    workers, and stopping it lets them finish every queued call before
+    they are shut down.  Calls may be queued before the pool is started.
+
+    Each worker runs one call at a time.  If a worker exits, the call it
+    was running fails with L{WorkerCrashed} and, while the pool is running
+    or has calls waiting, a new worker takes its place.
+
+    @ivar size: The number of worker processes.
+
+    @ivar maxTasksPerWorker: If not C{None}, the number of calls after which
+        a worker is replaced with a fresh process, to contain leaks in the
+        code it runs.
+
+    @ivar maxPending: If not C{None}, how many calls may wait for a worker
+        before further calls fail with L{ProcessPoolFull}.
+
+    @ivar _idle: A C{list} of L{_WorkerProcess}es waiting for a call.
+
+    @ivar _pending: A C{deque} of C{(function, arguments, Deferred)} tuples
+        waiting for a worker.
+
+    @ivar _workers: The C{set} of all L{_WorkerProcess}es which have not
+        ended yet.
+
+    @ivar _stopping: A C{list} of the L{Deferred}s returned by
+        L{stopService} which have not fired yet.
+    """
+
+    def __init__(self, size=None, maxTasksPerWorker=None, maxPending=None,
+                 reactor=None):
+        """
+        @param size: The number of worker processes, by default the number
+            of CPUs.
+
+        @param reactor: The L{IReactorProcess
+            <twisted.internet.interfaces.IReactorProcess>} provider to spawn
+            the workers with, by default the global reactor.
+        """
+        if size is None:
+            import multiprocessing
+            size = multiprocessing.cpu_count()
+        if reactor is None:
+            from twisted.internet import reactor
+        self.size = size
+        self.maxTasksPerWorker = maxTasksPerWorker
+        self.maxPending = maxPending
+        self._reactor = reactor
+        self._idle = []
+        self._pending = deque()
+        self._workers = set()
+        self._stopping = []
+
+
+    def startService(self):
+        """
+        Start the worker processes.
+        """
+        service.Service.startService(self)
+        while len(self._workers) < self.size:
+            self._spawnWorker()
+        self._dispatch()
+
+
+    def stopService(self):
+        """
+        Stop the worker processes once every queued call has run.
+
+        @return: A L{Deferred} which fires when all the workers have exited.
+        """
+        service.Service.stopService(self)
+        d = defer.Deferred()
+        self._stopping.append(d)
+        self._dispatch()
+        self._checkStopped()
+        return d
+
+
+    def _checkStopped(self):
+        """
+        Fire the L{Deferred}s returned by L{stopService} if the pool is
+        stopped and all its workers have exited.
+        """
+        if self.running or self._workers:
+            return
+        stopping, self._stopping = self._stopping, []
+        for d in stopping:
+            d.callback(None)
+
+
+    def callInProcess(self, f, *args, **kwargs):
+        """
+        Call C{f(*args, **kwargs)} in a worker process.
+
+        @param f: A function defined at the top level of a module.
+
+        @return: A L{Deferred} which fires with the result of the call, or
+            fails with the exception it raised (or L{RemoteCallError} if
+            that exception could not be pickled), with L{WorkerCrashed} if
+            the worker exited during the call, or with L{ProcessPoolFull} if
+            C{maxPending} calls are already waiting.
+        """
+        try:
+            name = _functionName(f)
+            arguments = pickle.dumps((args, kwargs), pickle.HIGHEST_PROTOCOL)
+        except:
+            return defer.fail()
+        if (self.maxPending is not None and
+                len(self._pending) >= self.maxPending):
+            return defer.fail(ProcessPoolFull(
+                "%d calls are already waiting" % (len(self._pending),)))
+        d = defer.Deferred()
+        self._pending.append((name, arguments, d))
+        self._dispatch()
+        return d
+
+
+    def _spawnWorker(self):
+        """
+        Start a new worker process, which is idle until given a call.
+        """
+        worker = _WorkerProcess(self)
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+        self._reactor.spawnProcess(
+            worker, sys.executable,
+            [sys.executable, '-m', 'twisted.internet._processworker'],
+            env=env,
+            childFDs={0: 'w', 1: 'r', 2: 'r',
+                      _WORKER_AMP_STDIN: 'w', _WORKER_AMP_STDOUT: 'r'})
+        self._workers.add(worker)
+        self._idle.append(worker)
+
+
+    def _dispatch(self):
+        """
+        Give waiting calls to idle workers, and shut the idle workers down
+        if the pool is stopping and no calls are left.
+        """
+        while self._pending and self._idle:
+            worker = self._idle.pop()
+            name, arguments, d = self._pending.popleft()
+            self._call(worker, name, arguments, d)
+        if not self.running and not self._pending:
+            while self._idle:
+                worker = self._idle.pop()
+                worker.retired = True
+                worker.amp.transport.loseConnection()
+
+
+    def _call(self, worker, name, arguments, d):
+        """
+        Make one call in C{worker} and fire C{d} with its result.
+        """
+        def called(response):
+            worker.tasks += 1
+            if (self.maxTasksPerWorker is not None and
+                    worker.tasks >= self.maxTasksPerWorker):
+                self._retire(worker)
+            else:
+                self._idle.append(worker)
+            self._dispatch()
+            return _unpickleResponse(response)
+
+        def failed(reason):
+            # Either the worker exited or its AMP connection is broken;
+            # it can't be trusted with another call either way.
+            self._retire(worker)
+            self._dispatch()
+            return Failure(WorkerCrashed(reason.value))
+
+        result = worker.amp.callRemote(
+            CallFunction, function=name, arguments=arguments)
+        result.addCallbacks(called, failed)
+        result.chainDeferred(d)
+
+
+    def _retire(self, worker):
+        """
+        Shut C{worker} down and, if the pool is running or calls are still
+        waiting, start another in its place.
+        """
+        worker.retired = True
+        if not worker.exited:
+            worker.amp.transport.loseConnection()
+        if self.running or self._pending:
+            self._spawnWorker()
+
+
+    def _workerEnded(self, worker, reason):
+        """
+        Forget about a worker which has exited and, if it exited on its own
+        while idle, start another in its place as long as the pool is running
+        or calls are still waiting.
+        """
+        self._workers.discard(worker)
+        if worker in self._idle:
+            self._idle.remove(worker)
+        if not worker.retired and (self.running or self._pending):
+            log.msg(format="Process pool worker exited: %(reason)s",
+                    reason=reason.getErrorMessage())
+            self._spawnWorker()
+        self._dispatch()
+        self._checkStopped()
+
+
+
+def deferToProcessPool(pool, f, *args, **kwargs):
+    """
+    Call the function C{f} in a worker process of C{pool} and return the
+    result as a L{Deferred}.
+
+    @param pool: A L{ProcessPool}.
+
+    @param f: The function to call.  It must be defined at the top level of
+        a module which the worker processes can import.
+    @param *args: positional arguments to pass to f.
+    @param **kwargs: keyword arguments to pass to f.
+
+    @return: See L{ProcessPool.callInProcess}.
+    """
+    return pool.callInProcess(f, *args, **kwargs)
+
+
+
+__all__ = ['ProcessPool', 'deferToProcessPool', 'ProcessPoolFull',
+           'WorkerCrashed', 'RemoteCallError']
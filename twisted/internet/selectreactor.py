@@ -97,6 +97,9 @@ class SelectReactor(posixbase.PosixReactorBase, _extraBase):
         This will run all selectables who had input or output readiness
         waiting for them.
         """
+        instrumentation = self._instrumentation
+        if instrumentation is not None:
+            start = self.seconds()
         try:
             r, w, ignored = _select(self._reads,
                                     self._writes,
@@ -130,6 +133,10 @@ class SelectReactor(posixbase.PosixReactorBase, _extraBase):
                 # OK, I really don't know what's going on.  Blow up.
                 raise
 
+        if instrumentation is not None:
+            instrumentation.pollCompleted(
+                self.seconds() - start, len(r) + len(w))
+
         _drdw = self._doReadOrWrite
         _logrun = log.callWithLogger
         for selectables, method, fdset in ((r, "doRead", self._reads),
@@ -146,7 +153,11 @@ class SelectReactor(posixbase.PosixReactorBase, _extraBase):
 
     def _doReadOrWrite(self, selectable, method):
         try:
-            why = getattr(selectable, method)()
+            if self._instrumentation is None:
+                why = getattr(selectable, method)()
+            else:
+                why = self._timeCall(
+                    self._instrumentation, getattr(selectable, method))
         except:
             why = sys.exc_info()[1]
             log.err()
@@ -192,7 +192,7 @@ class Connector(tcp.Connector):
 
 from twisted.internet._sslverify import DistinguishedName, DN, Certificate
 from twisted.internet._sslverify import CertificateRequest, PrivateCertificate
-from twisted.internet._sslverify import KeyPair
+from twisted.internet._sslverify import KeyPair, ClientSessionCache
 from twisted.internet._sslverify import (
     OpenSSLAcceptableCiphers as AcceptableCiphers,
     OpenSSLCertificateOptions as CertificateOptions,
@@ -206,4 +206,5 @@ __all__ = [
     'Certificate', 'CertificateRequest', 'PrivateCertificate',
     'KeyPair',
     'AcceptableCiphers', 'CertificateOptions', 'DiffieHellmanParameters',
+    'ClientSessionCache',
     ]
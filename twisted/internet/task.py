@@ -10,18 +10,24 @@ from __future__ import division, absolute_import
 
 __metaclass__ = type
 
+import math
 import sys
-import time
+from collections import deque
+from heapq import heappush, heappop
 
 from zope.interface import implementer
 
 from twisted.python import log
 from twisted.python import _reflectpy3 as reflect
+from twisted.python.context import _currentContext
 from twisted.python.failure import Failure
+from twisted.python.runtime import monotonic
 
 from twisted.internet import base, defer
-from twisted.internet.interfaces import IReactorTime
+from twisted.internet.defer import _timedCallSeconds
+from twisted.internet.interfaces import IReactorTime, IDelayedCall, ITimerWheel
 from twisted.internet.error import ReactorNotRunning
+from twisted.internet.error import AlreadyCalled, AlreadyCancelled
 
 
 class LoopingCall:
@@ -57,12 +63,26 @@ class LoopingCall:
     @type _runAtStart: C{bool}
     @ivar _runAtStart: A flag indicating whether the 'now' argument was passed
         to L{LoopingCall.start}.
+
+    @type catchUp: C{bool}
+    @ivar catchUp: What to do about calls which could not be made on time,
+        because the reactor was blocked or a previous call took too long.  If
+        C{False}, they are skipped and the next call is made when the next
+        interval comes around.  If C{True}, they are made late, one after the
+        other, until the calls are back on schedule.  See L{start}.
+
+    @type missed: C{int}
+    @ivar missed: The number of times the interval came around again while a
+        call was still waiting to be made, so that a call was skipped or
+        made late according to L{catchUp}.
     """
 
     call = None
     running = False
     deferred = None
     interval = None
+    catchUp = False
+    missed = 0
     _expectNextCallAt = 0.0
     _runAtStart = False
     starttime = None
@@ -106,7 +126,7 @@ class LoopingCall:
         """
 
         def counter():
-            now = self.clock.seconds()
+            now = _timedCallSeconds(self.clock)
             lastTime = self._realLastTime
             if lastTime is None:
                 lastTime = self.starttime
@@ -143,10 +163,16 @@ class LoopingCall:
         return intervalNum
 
 
-    def start(self, interval, now=True):
+    def start(self, interval, now=True, catchUp=False):
         """
         Start running function every interval seconds.
 
+        Calls are scheduled at whole numbers of intervals after the start,
+        so they do not drift however long each one takes.  They are measured
+        by the clock the reactor schedules timed calls with, which changes to
+        the system time do not affect, so those changes do not skip calls or
+        bunch them up.
+
         @param interval: The number of seconds between calls.  May be
         less than one.  Precision will depend on the underlying
         platform, the available hardware, and the load on the system.
@@ -154,6 +180,8 @@ class LoopingCall:
         @param now: If True, run this call right now.  Otherwise, wait
         until the interval has elapsed before beginning.
 
+        @param catchUp: See L{catchUp}.
+
         @return: A Deferred whose callback will be invoked with
         C{self} when C{self.stop} is called, or whose errback will be
         invoked when the function raises an exception or returned a
@@ -165,9 +193,10 @@ class LoopingCall:
             raise ValueError("interval must be >= 0")
         self.running = True
         d = self.deferred = defer.Deferred()
-        self.starttime = self.clock.seconds()
+        self.starttime = _timedCallSeconds(self.clock)
         self._expectNextCallAt = self.starttime
         self.interval = interval
+        self.catchUp = catchUp
         self._runAtStart = now
         if now:
             self()
@@ -198,7 +227,7 @@ class LoopingCall:
         if self.call is not None:
             self.call.cancel()
             self.call = None
-            self._expectNextCallAt = self.clock.seconds()
+            self._expectNextCallAt = _timedCallSeconds(self.clock)
             self._reschedule()
 
     def __call__(self):
@@ -228,17 +257,27 @@ class LoopingCall:
             self.call = self.clock.callLater(0, self)
             return
 
-        currentTime = self.clock.seconds()
+        currentTime = _timedCallSeconds(self.clock)
+        dueTime = self._expectNextCallAt + self.interval
+        if self.catchUp:
+            # Make the next call on schedule, even if that is now late.
+            if dueTime < currentTime:
+                self.missed += 1
+            self._expectNextCallAt = dueTime
+            self.call = self.clock.callLater(
+                max(0, dueTime - currentTime), self)
+            return
+
         # Find how long is left until the interval comes around again.
         untilNextTime = (self._expectNextCallAt - currentTime) % self.interval
         # Make sure it is in the future, in case more than one interval worth
         # of time passed since the previous call was made.
-        nextTime = max(
-            self._expectNextCallAt + self.interval, currentTime + untilNextTime)
+        nextTime = max(dueTime, currentTime + untilNextTime)
         # If the interval falls on the current time exactly, skip it and
         # schedule the call for the next interval.
         if nextTime == currentTime:
             nextTime += self.interval
+        self.missed += int(round((nextTime - dueTime) / self.interval))
         self._expectNextCallAt = nextTime
         self.call = self.clock.callLater(nextTime - currentTime, self)
 
@@ -318,11 +357,11 @@ class NotPaused(SchedulerError):
 class _Timer(object):
     MAX_SLICE = 0.01
     def __init__(self):
-        self.end = time.time() + self.MAX_SLICE
+        self.end = monotonic() + self.MAX_SLICE
 
 
     def __call__(self):
-        return time.time() >= self.end
+        return monotonic() >= self.end
 
 
 
@@ -332,6 +371,181 @@ def _defaultScheduler(x):
     return reactor.callLater(_EPSILON, x)
 
 
+
+class AdaptiveScheduler(object):
+    """
+    A scheduler for L{Cooperator} which spaces its steps out further while
+    the reactor is busy.
+
+    Each step is scheduled with C{callLater}, and this measures how late it
+    runs.  A late step means the reactor spent that long on other work,
+    such as I/O, before getting to it.  The next step is delayed by a moving
+    average of that lateness, so that a busy reactor gets a larger share of
+    its time for the other work, while an idle one runs steps back to back.
+
+    @ivar load: The moving average of how late steps have run, in seconds.
+
+    @ivar minDelay: The delay before a step when the reactor is idle.
+
+    @ivar maxDelay: The longest delay before a step.
+
+    @ivar smoothing: The weight, between 0 and 1, given to the latest
+        measurement in L{load}.
+    """
+
+    def __init__(self, clock=None, minDelay=_EPSILON, maxDelay=0.05,
+                 smoothing=0.2):
+        """
+        @param clock: The L{IReactorTime} provider to schedule steps with, by
+            default the global reactor.
+        """
+        self._clock = clock
+        self.minDelay = minDelay
+        self.maxDelay = maxDelay
+        self.smoothing = smoothing
+        self.load = 0.0
+
+
+    def __call__(self, step):
+        """
+        Schedule C{step} to run after a delay based on L{load}.
+
+        @return: The L{IDelayedCall} which will run C{step}.
+        """
+        clock = self._clock
+        if clock is None:
+            from twisted.internet import reactor as clock
+        delay = min(self.maxDelay, max(self.minDelay, self.load))
+        due = _timedCallSeconds(clock) + delay
+        return clock.callLater(delay, self._run, clock, due, step)
+
+
+    def _run(self, clock, due, step):
+        """
+        Update L{load} with how late this call is, then run C{step}.
+        """
+        lateness = max(0, _timedCallSeconds(clock) - due)
+        self.load += (lateness - self.load) * self.smoothing
+        step()
+
+
+
+class RoundRobinPolicy(object):
+    """
+    The default policy of a L{Cooperator}: its tasks each do one unit of
+    work in turn, however long that takes.
+    """
+
+    def __init__(self):
+        self._tasks = deque()
+
+
+    def added(self, task):
+        """
+        Start scheduling C{task}, which has been added to the L{Cooperator}
+        or resumed.
+        """
+        self._tasks.append(task)
+
+
+    def removed(self, task):
+        """
+        Stop scheduling C{task}, which has been paused or has finished.
+        """
+        self._tasks.remove(task)
+
+
+    def nextTask(self):
+        """
+        @return: The L{CooperativeTask} which should do the next unit of
+            work, or C{None} if there is none.
+        """
+        tasks = self._tasks
+        if not tasks:
+            return None
+        task = tasks[0]
+        tasks.rotate(-1)
+        return task
+
+
+    def ran(self, task, elapsed):
+        """
+        Record that C{task} did a unit of work which took C{elapsed}
+        seconds.
+        """
+
+
+
+class WeightedFairPolicy(object):
+    """
+    A policy for a L{Cooperator} which shares its time between tasks in
+    proportion to their L{weight<CooperativeTask.weight>}s, by the time
+    their work takes rather than by how many units of it they do.
+
+    Each task has a virtual time: the time its work has taken, divided by
+    its weight.  The task with the earliest virtual time goes next, so a
+    task with expensive units of work runs less often than one with cheap
+    units, rather than starving it.  A task which is added or resumed starts
+    no earlier than the virtual time of the task which ran last, so time it
+    spent paused does not entitle it to catch up.
+
+    @ivar _heap: A heap of C{(virtualTime, sequence, task)} tuples.  Only
+        the entry whose C{sequence} matches the task's C{_fairSequence} is
+        current; others are skipped when they reach the top.
+
+    @ivar _virtualNow: The virtual time of the task which ran last.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._sequence = 0
+        self._virtualNow = 0.0
+
+
+    def _push(self, task):
+        self._sequence += 1
+        task._fairSequence = self._sequence
+        heappush(self._heap, (task._virtualTime, self._sequence, task))
+
+
+    def added(self, task):
+        """
+        See L{RoundRobinPolicy.added}.
+        """
+        task._virtualTime = max(task._virtualTime, self._virtualNow)
+        self._push(task)
+
+
+    def removed(self, task):
+        """
+        See L{RoundRobinPolicy.removed}.
+        """
+        task._fairSequence = None
+
+
+    def nextTask(self):
+        """
+        See L{RoundRobinPolicy.nextTask}.
+        """
+        heap = self._heap
+        while heap:
+            virtualTime, sequence, task = heap[0]
+            if task._fairSequence == sequence:
+                self._virtualNow = virtualTime
+                return task
+            heappop(heap)
+        return None
+
+
+    def ran(self, task, elapsed):
+        """
+        See L{RoundRobinPolicy.ran}.
+        """
+        task._virtualTime += elapsed / task.weight
+        if task._fairSequence is not None:
+            self._push(task)
+
+
 class CooperativeTask(object):
     """
     A L{CooperativeTask} is a task object inside a L{Cooperator}, which can be
@@ -366,13 +580,33 @@ class CooperativeTask(object):
         C{StopIteration}.
 
     @type _completionState: L{TaskFinished}
+
+    @ivar weight: This task's share of its L{Cooperator}'s time, relative to
+        its other tasks, if it uses a L{WeightedFairPolicy}.  This may be
+        changed at any time.
+
+    @ivar iterations: The number of units of work this task has done.
+
+    @ivar timeUsed: The number of seconds this task's units of work have
+        taken.
+
+    @ivar pauses: The number of times this task has been paused, including
+        each time its iterator yielded a L{defer.Deferred}.
     """
 
-    def __init__(self, iterator, cooperator):
+    # Scheduling state for WeightedFairPolicy.
+    _virtualTime = 0.0
+    _fairSequence = None
+
+    def __init__(self, iterator, cooperator, weight=1):
         """
         A private constructor: to create a new L{CooperativeTask}, see
         L{Cooperator.cooperate}.
         """
+        self.weight = weight
+        self.iterations = 0
+        self.timeUsed = 0.0
+        self.pauses = 0
         self._iterator = iterator
         self._cooperator = cooperator
         self._deferreds = []
@@ -413,6 +647,7 @@ class CooperativeTask(object):
         """
         self._checkFinish()
         self._pauseCount += 1
+        self.pauses += 1
         if self._pauseCount == 1:
             self._cooperator._removeTask(self)
 
@@ -526,13 +761,21 @@ class Cooperator(object):
         asynchronous tasks)
 
     Multiple L{Cooperator}s do not cooperate with each other, so for most
-    cases you should use the L{global cooperator<task.cooperate>}.
+    cases you should use the L{global cooperator<task.cooperate>}.  It
+    shares its time between tasks with a L{WeightedFairPolicy} and spaces
+    its steps out with an L{AdaptiveScheduler}.
+
+    @ivar _seconds: A no-argument callable returning the current time, used
+        to measure how long each unit of work takes.
     """
 
+    _seconds = staticmethod(monotonic)
+
     def __init__(self,
                  terminationPredicateFactory=_Timer,
                  scheduler=_defaultScheduler,
-                 started=True):
+                 started=True,
+                 policy=None):
         """
         Create a scheduler-like object to which iterators may be added.
 
@@ -549,9 +792,15 @@ class Cooperator(object):
         @param started: A boolean which indicates whether iterators should be
         stepped as soon as they are added, or if they will be queued up until
         L{Cooperator.start} is called.
+
+        @param policy: The object which decides which task does each unit of
+        work, with the methods of L{RoundRobinPolicy}.  By default a new
+        L{RoundRobinPolicy}.
         """
+        if policy is None:
+            policy = RoundRobinPolicy()
         self._tasks = []
-        self._metarator = iter(())
+        self._policy = policy
         self._terminationPredicateFactory = terminationPredicateFactory
         self._scheduler = scheduler
         self._delayedCall = None
@@ -579,16 +828,18 @@ class Cooperator(object):
         return doneDeferred
 
 
-    def cooperate(self, iterator):
+    def cooperate(self, iterator, weight=1):
         """
         Start running the given iterator as a long-running cooperative task, by
         calling next() on it as a periodic timed event.
 
         @param iterator: the iterator to invoke.
 
+        @param weight: See L{CooperativeTask.weight}.
+
         @return: a L{CooperativeTask} object representing this task.
         """
-        return CooperativeTask(iterator, self)
+        return CooperativeTask(iterator, self, weight)
 
 
     def _addTask(self, task):
@@ -598,9 +849,11 @@ class Cooperator(object):
         if self._stopped:
             self._tasks.append(task) # XXX silly, I know, but _completeWith
                                      # does the inverse
+            self._policy.added(task)
             task._completeWith(SchedulerStopped(), Failure(SchedulerStopped()))
         else:
             self._tasks.append(task)
+            self._policy.added(task)
             self._reschedule()
 
 
@@ -609,33 +862,34 @@ class Cooperator(object):
         Remove a L{CooperativeTask} from this L{Cooperator}.
         """
         self._tasks.remove(task)
+        self._policy.removed(task)
         # If no work left to do, cancel the delayed call:
         if not self._tasks and self._delayedCall:
             self._delayedCall.cancel()
             self._delayedCall = None
 
 
-    def _tasksWhileNotStopped(self):
-        """
-        Yield all L{CooperativeTask} objects in a loop as long as this
-        L{Cooperator}'s termination condition has not been met.
-        """
-        terminator = self._terminationPredicateFactory()
-        while self._tasks:
-            for t in self._metarator:
-                yield t
-                if terminator():
-                    return
-            self._metarator = iter(self._tasks)
-
-
     def _tick(self):
         """
-        Run one scheduler tick.
+        Run one scheduler tick: have the tasks chosen by the policy do units
+        of work until the termination condition is met or there are none
+        left.
         """
         self._delayedCall = None
-        for taskObj in self._tasksWhileNotStopped():
+        terminator = self._terminationPredicateFactory()
+        policy = self._policy
+        seconds = self._seconds
+        taskObj = policy.nextTask()
+        while taskObj is not None:
+            started = seconds()
             taskObj._oneWorkUnit()
+            elapsed = seconds() - started
+            taskObj.iterations += 1
+            taskObj.timeUsed += elapsed
+            policy.ran(taskObj, elapsed)
+            if terminator():
+                break
+            taskObj = policy.nextTask()
         self._reschedule()
 
 
@@ -669,6 +923,8 @@ class Cooperator(object):
             taskObj._completeWith(SchedulerStopped(),
                                   Failure(SchedulerStopped()))
         self._tasks = []
+        for taskObj in iter(self._policy.nextTask, None):
+            self._policy.removed(taskObj)
         if self._delayedCall is not None:
             self._delayedCall.cancel()
             self._delayedCall = None
@@ -686,7 +942,8 @@ class Cooperator(object):
 
 
 
-_theCooperator = Cooperator()
+_theCooperator = Cooperator(scheduler=AdaptiveScheduler(),
+                            policy=WeightedFairPolicy())
 
 def coiterate(iterator):
     """
@@ -702,7 +959,7 @@ def coiterate(iterator):
 
 
 
-def cooperate(iterator):
+def cooperate(iterator, weight=1):
     """
     Start running the given iterator as a long-running cooperative task, by
     calling next() on it as a periodic timed event.
@@ -715,9 +972,11 @@ def cooperate(iterator):
 
     @param iterator: the iterator to invoke.
 
+    @param weight: See L{CooperativeTask.weight}.
+
     @return: a L{CooperativeTask} object representing this task.
     """
-    return _theCooperator.cooperate(iterator)
+    return _theCooperator.cooperate(iterator, weight)
 
 
 
@@ -789,7 +1048,12 @@ class Clock:
         while self.calls and self.calls[0].getTime() <= self.seconds():
             call = self.calls.pop(0)
             call.called = 1
-            call.func(*call.args, **call.kw)
+            previousContext = _currentContext.values
+            _currentContext.values = call._context
+            try:
+                call.func(*call.args, **call.kw)
+            finally:
+                _currentContext.values = previousContext
             self._sortCalls()
 
 
@@ -804,6 +1068,247 @@ class Clock:
 
 
 
+@implementer(IDelayedCall)
+class _WheelCall(object):
+    """
+    A call scheduled with a L{TimerWheel}.
+
+    @ivar time: The time at which the call was requested to run.
+    @ivar _slot: The number of the bucket of the wheel this call is in.
+    @ivar _context: The values of
+        L{ContextVariable<twisted.python.context.ContextVariable>}s which were
+        current when the call was scheduled, and which it runs with.
+    """
+    cancelled = called = False
+
+    def __init__(self, wheel, time, func, args, kw):
+        self._wheel = wheel
+        self.time = time
+        self.func, self.args, self.kw = func, args, kw
+        self._slot = None
+        self._context = _currentContext.values
+
+
+    def getTime(self):
+        """
+        See L{IDelayedCall.getTime}.
+        """
+        return self.time
+
+
+    def _checkActive(self):
+        if self.cancelled:
+            raise AlreadyCancelled()
+        elif self.called:
+            raise AlreadyCalled()
+
+
+    def cancel(self):
+        """
+        See L{IDelayedCall.cancel}.
+        """
+        self._checkActive()
+        self._wheel._remove(self)
+        self.cancelled = True
+        del self.func, self.args, self.kw
+
+
+    def reset(self, secondsFromNow):
+        """
+        See L{IDelayedCall.reset}.
+        """
+        self._checkActive()
+        self.time = _timedCallSeconds(self._wheel.clock) + secondsFromNow
+        self._wheel._move(self)
+
+
+    def delay(self, secondsLater):
+        """
+        See L{IDelayedCall.delay}.
+        """
+        self._checkActive()
+        self.time += secondsLater
+        self._wheel._move(self)
+
+
+    def active(self):
+        """
+        See L{IDelayedCall.active}.
+        """
+        return not (self.cancelled or self.called)
+
+
+
+@implementer(ITimerWheel)
+class TimerWheel(object):
+    """
+    Schedule many coarse-grained timed calls using a single reactor timer.
+
+    Calls are kept in buckets of C{granularity} seconds, and the wheel only
+    asks its clock to wake it up when the earliest non-empty bucket is due.
+    Resetting a call, as L{twisted.protocols.policies.TimeoutMixin} does each
+    time data arrives, usually only moves it from one bucket to another and
+    does not reschedule anything with the clock at all.
+
+    @ivar clock: The L{IReactorTime} provider used to schedule the wheel's
+        own timer.
+
+    @ivar granularity: See L{ITimerWheel.granularity}.
+
+    @ivar _slots: A C{dict} mapping bucket numbers to C{set}s of
+        L{_WheelCall}s.  Bucket C{n} holds the calls due at or before
+        C{n * granularity}.  Emptied buckets are kept until they are due so
+        that each bucket number appears in C{_slotHeap} only once.
+
+    @ivar _slotHeap: A heap of the keys of C{_slots}.
+
+    @ivar _lastSlot: The number of the last bucket to have been expired, or
+        C{None}.  Calls are never placed in a bucket at or before this one.
+
+    @ivar _tick: The L{IDelayedCall} which will expire the bucket numbered
+        C{_tickSlot}, or C{None}.
+    """
+
+    def __init__(self, granularity=0.1, clock=None):
+        """
+        @param granularity: See L{ITimerWheel.granularity}.
+
+        @param clock: The L{IReactorTime} provider to use, by default the
+            global reactor.
+        """
+        if clock is None:
+            from twisted.internet import reactor as clock
+        self.clock = clock
+        self.granularity = granularity
+        self._slots = {}
+        self._slotHeap = []
+        self._lastSlot = None
+        self._tick = None
+        self._tickSlot = None
+
+
+    def callLater(self, delay, callable, *args, **kw):
+        """
+        See L{ITimerWheel.callLater}.
+        """
+        call = _WheelCall(self, _timedCallSeconds(self.clock) + delay,
+                          callable, args, kw)
+        self._add(call)
+        return call
+
+
+    def seconds(self):
+        """
+        See L{ITimerWheel.seconds}.
+        """
+        return _timedCallSeconds(self.clock)
+
+
+    def getDelayedCalls(self):
+        """
+        Return all the calls which have not yet run or been cancelled, in no
+        particular order.
+
+        @rtype: C{list} of L{IDelayedCall} providers
+        """
+        calls = []
+        for slot in self._slots.values():
+            calls.extend(slot)
+        return calls
+
+
+    def _slotFor(self, time):
+        """
+        Find the number of the bucket in which a call due at C{time} belongs.
+        """
+        slot = int(math.ceil(time / self.granularity))
+        if self._lastSlot is not None and slot <= self._lastSlot:
+            slot = self._lastSlot + 1
+        return slot
+
+
+    def _add(self, call):
+        """
+        Put C{call} in the bucket for its time, scheduling the wheel's timer
+        if that bucket is due earlier than any other.
+        """
+        slot = self._slotFor(call.time)
+        call._slot = slot
+        calls = self._slots.get(slot)
+        if calls is None:
+            calls = self._slots[slot] = set()
+            heappush(self._slotHeap, slot)
+            if self._tickSlot is None or slot < self._tickSlot:
+                self._schedule(slot)
+        calls.add(call)
+
+
+    def _remove(self, call):
+        """
+        Take C{call} out of its bucket.
+        """
+        calls = self._slots.get(call._slot)
+        if calls is not None:
+            calls.discard(call)
+
+
+    def _move(self, call):
+        """
+        Move C{call} to the bucket for its new time, if that differs from its
+        current bucket.
+        """
+        if self._slotFor(call.time) != call._slot:
+            self._remove(call)
+            self._add(call)
+
+
+    def _schedule(self, slot):
+        """
+        Arrange for L{_advance} to be called when bucket C{slot} is due.
+        """
+        now = _timedCallSeconds(self.clock)
+        delay = max(0, slot * self.granularity - now)
+        if self._tick is not None:
+            self._tick.reset(delay)
+        else:
+            self._tick = self.clock.callLater(delay, self._advance)
+        self._tickSlot = slot
+
+
+    def _advance(self):
+        """
+        Run the calls in every bucket which is now due, then schedule the
+        wheel's timer for the next non-empty bucket.
+        """
+        self._tick = None
+        currentSlot = max(
+            self._tickSlot,
+            int(math.floor(
+                    _timedCallSeconds(self.clock) / self.granularity)))
+        self._tickSlot = None
+        heap, slots = self._slotHeap, self._slots
+        previousContext = _currentContext.values
+        while heap and heap[0] <= currentSlot:
+            slot = self._lastSlot = heappop(heap)
+            for call in slots.pop(slot):
+                # Calls which are cancelled or moved while this bucket is
+                # being expired are left in it, so check each one.
+                if call.cancelled or call._slot != slot:
+                    continue
+                call.called = True
+                _currentContext.values = call._context
+                try:
+                    call.func(*call.args, **call.kw)
+                except:
+                    log.err(None, "Unhandled error in TimerWheel call:")
+        _currentContext.values = previousContext
+        while heap and not slots[heap[0]]:
+            del slots[heappop(heap)]
+        if heap and self._tick is None:
+            self._schedule(heap[0])
+
+
+
 def deferLater(clock, delay, callable, *args, **kw):
     """
     Call the given function after a certain period of time has passed.
@@ -909,6 +1414,9 @@ __all__ = [
 
     'Clock',
 
+    'TimerWheel',
+
     'SchedulerStopped', 'Cooperator', 'coiterate',
+    'RoundRobinPolicy', 'WeightedFairPolicy', 'AdaptiveScheduler',
 
     'deferLater', 'react']
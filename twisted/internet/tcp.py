@@ -11,6 +11,7 @@ End users shouldn't use this module directly - use the reactor APIs instead.
 from __future__ import division, absolute_import
 
 # System Imports
+import os
 import types
 import socket
 import sys
@@ -50,6 +51,15 @@ except ImportError:
         class _TLSServerMixin(object):
             pass
 
+# Python 2 has no os.sendfile, but on Linux the system call can be made
+# through ctypes.
+_sendfile = getattr(os, "sendfile", None)
+if _sendfile is None:
+    try:
+        from twisted.internet._sendfile import sendfile as _sendfile
+    except ImportError:
+        pass
+
 if platformType == 'win32':
     # no such thing as WSAEPERM or error code 10001 according to winsock.h or MSDN
     EPERM = object()
@@ -91,11 +101,21 @@ else:
     from os import strerror
 
 
-from errno import errorcode
+from errno import errorcode, ENOPROTOOPT
+
+# The socket module only defines SO_REUSEPORT from Python 3.4 on, so fall back
+# to the value Linux and the BSDs (including OS X) use.
+_SO_REUSEPORT = getattr(socket, "SO_REUSEPORT", None)
+if _SO_REUSEPORT is None:
+    if sys.platform.startswith("linux"):
+        _SO_REUSEPORT = 15
+    elif sys.platform.startswith(("darwin", "freebsd", "openbsd", "netbsd")):
+        _SO_REUSEPORT = 0x200
 
 # Twisted Imports
 from twisted.internet import base, address, fdesc
 from twisted.internet.task import deferLater
+from twisted.internet.defer import Deferred
 from twisted.python import log, failure, _reflectpy3 as reflect
 from twisted.python.util import untilConcludes
 from twisted.internet.error import CannotListenError
@@ -169,7 +189,136 @@ class _AbortingMixin(object):
 
 
 
-@implementer(interfaces.ITCPTransport, interfaces.ISystemHandle)
+@implementer(interfaces.IPullProducer)
+class _FileSender(object):
+    """
+    A pull producer which sends part of a file over a L{Connection}, using
+    C{sendfile(2)} where possible and falling back to reading the file and
+    writing it to the connection.
+
+    One chunk is sent each time the connection asks for more data, which it
+    does once everything it has buffered has been written, so the file is sent
+    at the pace the connection becomes writeable.
+
+    @ivar deferred: The L{Deferred} returned by L{Connection.sendFile}.
+
+    @ivar offset: The position in the file of the next byte to send.
+
+    @ivar remaining: The number of bytes still to send, or C{None} to send
+        everything up to the end of the file.
+
+    @ivar sent: The number of bytes sent so far.
+
+    @ivar useSendfile: C{True} as long as C{sendfile(2)} is to be tried.
+    """
+    chunkSize = 2 ** 16
+
+    def __init__(self, transport, fileObject, offset, count):
+        self.transport = transport
+        self.fileObject = fileObject
+        self.offset = offset
+        self.remaining = count
+        self.sent = 0
+        self.deferred = Deferred()
+        self.useSendfile = (
+            _sendfile is not None and not transport.TLS)
+        if not self.useSendfile:
+            fileObject.seek(offset)
+
+
+    def _nextChunkSize(self):
+        if self.remaining is None:
+            return self.chunkSize
+        return min(self.chunkSize, self.remaining)
+
+
+    def _sendChunk(self):
+        """
+        Send the next chunk of the file with C{sendfile(2)}.
+
+        If C{sendfile(2)} fails before anything has been sent, it is assumed
+        not to support this kind of file or socket, and L{useSendfile} is
+        turned off.
+
+        @return: The number of bytes sent, C{None} if nothing could be sent,
+            or a L{failure.Failure} if the connection can no longer be used.
+        """
+        try:
+            return untilConcludes(
+                _sendfile, self.transport.fileno(),
+                self.fileObject.fileno(), self.offset, self._nextChunkSize())
+        except (OSError, socket.error) as e:
+            if e.args[0] in (EWOULDBLOCK, EAGAIN):
+                return None
+            elif not self.sent:
+                self.useSendfile = False
+                self.fileObject.seek(self.offset)
+                return None
+            return failure.Failure()
+
+
+    def resumeProducing(self):
+        """
+        Send the next chunk of the file, or finish if there is nothing left to
+        send.
+        """
+        if self.deferred is None:
+            return
+        if self.transport.dataBuffer or self.transport._tempDataLen:
+            # Other data is still buffered; it will be written first and then
+            # this method will be called again.
+            self.transport.startWriting()
+            return
+
+        if self.remaining == 0:
+            return self._finished()
+
+        if self.useSendfile:
+            count = self._sendChunk()
+            if isinstance(count, failure.Failure):
+                # Part of the file has been sent, so the connection cannot be
+                # used for anything else.
+                deferred, self.deferred = self.deferred, None
+                self.transport.abortConnection()
+                deferred.errback(count)
+                return
+            # Whatever happened, check back once the connection is writeable.
+            self.transport.startWriting()
+            if count is None:
+                return
+        else:
+            data = self.fileObject.read(self._nextChunkSize())
+            count = len(data)
+            if count:
+                self.transport.write(data)
+
+        if not count:
+            # The end of the file.
+            return self._finished()
+        self.offset += count
+        self.sent += count
+        if self.remaining is not None:
+            self.remaining -= count
+
+
+    def _finished(self):
+        deferred, self.deferred = self.deferred, None
+        self.transport.unregisterProducer()
+        deferred.callback(self.sent)
+
+
+    def stopProducing(self):
+        """
+        The connection was lost before the whole file could be sent.
+        """
+        if self.deferred is not None:
+            deferred, self.deferred = self.deferred, None
+            deferred.errback(error.ConnectionLost())
+
+
+
+@implementer(interfaces.ITCPTransport, interfaces.ISystemHandle,
+             interfaces.ISendFileTransport)
 class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
                  _AbortingMixin):
     """
@@ -180,7 +329,28 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
 
     @ivar logstr: prefix used when logging events related to this connection.
     @type logstr: C{str}
+
+    @ivar _vectoredWrites: C{True} if buffered data is written with
+        C{socket.sendmsg}, which is given the chunks passed to C{write} and
+        C{writeSequence} without first joining them together.  This is turned
+        off for sockets which have no C{sendmsg} method.
+
+    @ivar _readBuffer: A C{memoryview} of a C{bytearray} of C{bufferSize}
+        bytes which C{socket.recv_into} fills for protocols which provide
+        L{IBufferedProtocol<interfaces.IBufferedProtocol>}, or C{None} if no
+        such read has happened yet.
+
+    @ivar _readCheckedProtocol: The protocol for which C{_bufferedReads} was
+        last computed.
+
+    @ivar _bufferedReads: C{True} if received data is delivered to
+        C{_readCheckedProtocol} with C{bufferReceived} rather than
+        C{dataReceived}.
     """
+    _vectoredWrites = True
+    _readBuffer = None
+    _readCheckedProtocol = None
+    _bufferedReads = False
 
 
     def __init__(self, skt, protocol, reactor=None):
@@ -189,6 +359,8 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         self.socket.setblocking(0)
         self.fileno = skt.fileno
         self.protocol = protocol
+        if getattr(skt, "sendmsg", None) is None:
+            self._vectoredWrites = False
 
 
     def getHandle(self):
@@ -203,7 +375,13 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         calls self.dataReceived(data) to process it.  If the connection is not
         lost through an error in the physical recv(), this function will return
         the result of the dataReceived call.
+
+        If the protocol provides L{interfaces.IBufferedProtocol}, the data is
+        instead read into a buffer owned by this connection and passed to
+        its C{bufferReceived} method.
         """
+        if self._usesBufferedReads():
+            return self._doReadInto()
         try:
             data = self.socket.recv(self.bufferSize)
         except socket.error as se:
@@ -215,6 +393,60 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         return self._dataReceived(data)
 
 
+    def _usesBufferedReads(self):
+        """
+        @return: C{True} if received data is to be read into a buffer and
+            passed to the protocol's C{bufferReceived} method.
+        """
+        protocol = self.protocol
+        if protocol is not self._readCheckedProtocol:
+            self._readCheckedProtocol = protocol
+            self._bufferedReads = (
+                interfaces.IBufferedProtocol.providedBy(protocol) and
+                getattr(self.socket, "recv_into", None) is not None)
+        return self._bufferedReads and not self.TLS
+
+
+    def _doReadInto(self):
+        """
+        Read available data into C{self._readBuffer} and pass a view of the
+        bytes which were read to the protocol's C{bufferReceived} method.
+        The buffer is allocated on the first read and reused afterwards, so
+        no new string is created for each read.
+        """
+        if self._readBuffer is None:
+            self._readBuffer = memoryview(bytearray(self.bufferSize))
+        try:
+            count = self.socket.recv_into(self._readBuffer)
+        except socket.error as se:
+            if se.args[0] == EWOULDBLOCK:
+                return
+            else:
+                return main.CONNECTION_LOST
+        return self._dataReadInto(self._readBuffer, count)
+
+
+    def _dataReadInto(self, buffer, count):
+        """
+        Deliver data which has been read into a buffer, by L{doRead} or by
+        other means such as a request to an io_uring reactor, to the
+        protocol.
+
+        @param buffer: A C{memoryview} of the buffer.
+
+        @param count: The number of bytes read into the start of the buffer,
+            C{0} at the end of the stream.
+
+        @return: See L{doRead}.
+        """
+        if not count:
+            return main.CONNECTION_DONE
+        if self._usesBufferedReads():
+            self.protocol.bufferReceived(buffer[:count])
+            return None
+        return self._dataReceived(buffer[:count].tobytes())
+
+
     def _dataReceived(self, data):
         if not data:
             return main.CONNECTION_DONE
@@ -252,6 +484,35 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
                 return main.CONNECTION_LOST
 
 
+    def _writeSomeVectors(self, vectors):
+        """
+        Write as much as possible of the given chunks of data to this TCP
+        connection with a single C{sendmsg} call.
+
+        If the connection is lost, an exception is returned.  Otherwise, the
+        number of bytes successfully written is returned.
+        """
+        try:
+            return untilConcludes(self.socket.sendmsg, vectors)
+        except socket.error as se:
+            if se.args[0] in (EWOULDBLOCK, ENOBUFS):
+                return 0
+            else:
+                return main.CONNECTION_LOST
+
+
+    def sendFile(self, fileObject, offset=0, count=None):
+        """
+        Send part or all of the contents of a file, with C{sendfile(2)} where
+        it is available and the connection does not use TLS.
+
+        @see: L{twisted.internet.interfaces.ISendFileTransport.sendFile}
+        """
+        sender = _FileSender(self, fileObject, offset, count)
+        self.registerProducer(sender, False)
+        return sender.deferred
+
+
     def _closeWriteConnection(self):
         try:
             getattr(self.socket, self._socketShutdownMethod)(1)
@@ -853,6 +1114,120 @@ class Server(_TLSServerMixin, Connection):
 
 
 
+class AcceptPolicy(object):
+    """
+    Decide how many connections a L{Port} accepts each time its socket
+    becomes readable.
+
+    The limit tracks the depth of the listen queue: when accepting empties
+    the queue, the next limit is the number which were waiting; when the
+    limit is reached first, it grows by C{step}.  If C{timeBudget} is set,
+    accepting also stops once that much time has been spent, and the limit
+    is scaled down to what fitted in the budget, leaving the rest of the
+    reactor iteration for the protocols.
+
+    A policy has no state of its own, so one instance may be shared by any
+    number of ports.
+
+    @ivar initial: The limit a port starts with.
+    @type initial: C{int}
+
+    @ivar minimum: The smallest limit.
+    @type minimum: C{int}
+
+    @ivar maximum: The largest limit, or C{None} for no maximum.
+    @type maximum: C{int} or C{NoneType}
+
+    @ivar step: How much the limit grows when it is reached.
+    @type step: C{int}
+
+    @ivar timeBudget: The number of seconds one readiness event may spend
+        accepting connections and connecting protocols to them, or C{None}
+        for no limit.
+    @type timeBudget: C{float} or C{NoneType}
+    """
+
+    def __init__(self, initial=100, minimum=1, maximum=None, step=20,
+                 timeBudget=None):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.step = step
+        self.timeBudget = timeBudget
+
+
+    def nextLimit(self, limit, accepted, drained, elapsed):
+        """
+        Compute the limit for a port's next readiness event.
+
+        @param limit: The limit for the event which has just been handled.
+        @type limit: C{int}
+
+        @param accepted: The number of connections accepted.
+        @type accepted: C{int}
+
+        @param drained: Whether accepting stopped because there were no more
+            connections waiting.
+        @type drained: C{bool}
+
+        @param elapsed: The number of seconds spent.
+        @type elapsed: C{float}
+
+        @return: The new limit.
+        @rtype: C{int}
+        """
+        if drained:
+            limit = accepted
+        elif accepted >= limit:
+            limit += self.step
+        if (self.timeBudget is not None and elapsed > self.timeBudget
+                and accepted):
+            limit = min(limit, int(accepted * self.timeBudget / elapsed))
+        if self.maximum is not None:
+            limit = min(limit, self.maximum)
+        return max(limit, self.minimum)
+
+
+
+class AcceptStatistics(object):
+    """
+    Counters describing how a L{Port} has been accepting connections.
+
+    @ivar wakeups: The number of times the port's socket became readable.
+    @ivar accepted: The number of connections accepted.
+    @ivar maxAccepted: The most connections accepted in one wakeup.
+    @ivar resourceErrors: The number of times accepting stopped early
+        because of C{EMFILE}, C{ENFILE}, C{ENOBUFS}, C{ENOMEM} or
+        C{ECONNABORTED}.
+    @ivar budgetExceeded: The number of times accepting stopped early
+        because the L{AcceptPolicy}'s time budget was spent.
+    @ivar acceptTime: The total number of seconds spent handling wakeups.
+    @ivar protocolTime: The part of C{acceptTime} spent building protocols
+        and connecting them to their transports, as opposed to in C{accept}
+        itself.
+    """
+
+    def __init__(self):
+        self.wakeups = 0
+        self.accepted = 0
+        self.maxAccepted = 0
+        self.resourceErrors = 0
+        self.budgetExceeded = 0
+        self.acceptTime = 0.0
+        self.protocolTime = 0.0
+
+
+    def acceptsPerWakeup(self):
+        """
+        @return: The mean number of connections accepted per wakeup.
+        @rtype: C{float}
+        """
+        if not self.wakeups:
+            return 0.0
+        return self.accepted / self.wakeups
+
+
+
 @implementer(interfaces.IListeningPort)
 class Port(base.BasePort, _SocketCloser):
     """
@@ -888,6 +1263,24 @@ class Port(base.BasePort, _SocketCloser):
         was created and initialized outside of the reactor and will be used to
         listen for connections (instead of a new socket being created by this
         L{Port}).
+
+    @ivar reusePort: If C{True}, C{SO_REUSEPORT} is set on the listening
+        socket, so that other processes doing the same can listen on the same
+        port and the kernel will spread incoming connections between them.
+    @type reusePort: C{bool}
+
+    @ivar acceptPolicy: Decides how many connections are accepted each time
+        the socket becomes readable.
+    @type acceptPolicy: L{AcceptPolicy}
+
+    @ivar acceptStatistics: Counters describing how connections have been
+        accepted.
+    @type acceptStatistics: L{AcceptStatistics}
+
+    @ivar numberAccepts: The most connections which will be accepted the
+        next time the socket becomes readable, as last decided by
+        C{acceptPolicy}.
+    @type numberAccepts: C{int}
     """
 
     socketType = socket.SOCK_STREAM
@@ -896,6 +1289,8 @@ class Port(base.BasePort, _SocketCloser):
     sessionno = 0
     interface = ''
     backlog = 50
+    reusePort = False
+    acceptPolicy = AcceptPolicy()
 
     _type = 'TCP'
 
@@ -910,13 +1305,16 @@ class Port(base.BasePort, _SocketCloser):
     addressFamily = socket.AF_INET
     _addressType = address.IPv4Address
 
-    def __init__(self, port, factory, backlog=50, interface='', reactor=None):
+    def __init__(self, port, factory, backlog=50, interface='', reactor=None,
+                 reusePort=False):
         """Initialize with a numeric port to listen on.
         """
         base.BasePort.__init__(self, reactor=reactor)
         self.port = port
         self.factory = factory
         self.backlog = backlog
+        self.reusePort = reusePort
+        self.acceptStatistics = AcceptStatistics()
         if abstract.isIPv6Address(interface):
             self.addressFamily = socket.AF_INET6
             self._addressType = address.IPv6Address
@@ -958,6 +1356,13 @@ class Port(base.BasePort, _SocketCloser):
         s = base.BasePort.createInternetSocket(self)
         if platformType == "posix" and sys.platform != "cygwin":
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reusePort:
+            if _SO_REUSEPORT is None:
+                s.close()
+                raise socket.error(
+                    ENOPROTOOPT, "SO_REUSEPORT is not supported on %s" % (
+                        sys.platform,))
+            s.setsockopt(socket.SOL_SOCKET, _SO_REUSEPORT, 1)
         return s
 
 
@@ -999,7 +1404,7 @@ class Port(base.BasePort, _SocketCloser):
         self.connected = True
         self.socket = skt
         self.fileno = self.socket.fileno
-        self.numberAccepts = 100
+        self.numberAccepts = self.acceptPolicy.initial
 
         self.startReading()
 
@@ -1012,9 +1417,15 @@ class Port(base.BasePort, _SocketCloser):
     def doRead(self):
         """Called when my socket is ready for reading.
 
-        This accepts a connection and calls self.protocol() to handle the
-        wire-level protocol.
+        This accepts connections, up to the limit set by C{acceptPolicy}, and
+        calls self.protocol() to handle the wire-level protocol of each.
         """
+        stats = self.acceptStatistics
+        seconds = self.reactor.seconds
+        timeBudget = self.acceptPolicy.timeBudget
+        start = seconds()
+        accepted = 0
+        drained = False
         try:
             if platformType == "posix":
                 numAccepts = self.numberAccepts
@@ -1026,12 +1437,16 @@ class Port(base.BasePort, _SocketCloser):
                 # we need this so we can deal with a factory's buildProtocol
                 # calling our loseConnection
                 if self.disconnecting:
-                    return
+                    break
+                if (timeBudget is not None and accepted and
+                        seconds() - start > timeBudget):
+                    stats.budgetExceeded += 1
+                    break
                 try:
                     skt, addr = self.socket.accept()
                 except socket.error as e:
                     if e.args[0] in (EWOULDBLOCK, EAGAIN):
-                        self.numberAccepts = i
+                        drained = True
                         break
                     elif e.args[0] == EPERM:
                         # Netfilter on Linux may have rejected the
@@ -1054,22 +1469,28 @@ class Port(base.BasePort, _SocketCloser):
                         # calls accept(2), however at least on Linux this
                         # _seems_ to be short-circuited by syncookies.
 
+                        stats.resourceErrors += 1
                         log.msg("Could not accept new connection (%s)" % (
                             errorcode[e.args[0]],))
                         break
                     raise
 
-                fdesc._setCloseOnExec(skt.fileno())
-                protocol = self.factory.buildProtocol(self._buildAddr(addr))
-                if protocol is None:
-                    skt.close()
-                    continue
-                s = self.sessionno
-                self.sessionno = s+1
-                transport = self.transport(skt, protocol, addr, self, s, self.reactor)
-                protocol.makeConnection(transport)
-            else:
-                self.numberAccepts = self.numberAccepts+20
+                accepted += 1
+                protocolStart = seconds()
+                try:
+                    fdesc._setCloseOnExec(skt.fileno())
+                    protocol = self.factory.buildProtocol(
+                        self._buildAddr(addr))
+                    if protocol is None:
+                        skt.close()
+                        continue
+                    s = self.sessionno
+                    self.sessionno = s+1
+                    transport = self.transport(
+                        skt, protocol, addr, self, s, self.reactor)
+                    protocol.makeConnection(transport)
+                finally:
+                    stats.protocolTime += seconds() - protocolStart
         except:
             # Note that in TLS mode, this will possibly catch SSL.Errors
             # raised by self.socket.accept()
@@ -1080,6 +1501,16 @@ class Port(base.BasePort, _SocketCloser):
             # and return, so handling it here works just as well.
             log.deferr()
 
+        elapsed = seconds() - start
+        stats.wakeups += 1
+        stats.accepted += accepted
+        stats.maxAccepted = max(stats.maxAccepted, accepted)
+        stats.acceptTime += elapsed
+        if platformType == "posix":
+            self.numberAccepts = self.acceptPolicy.nextLimit(
+                numAccepts, accepted, drained, elapsed)
+
+
     def loseConnection(self, connDone=failure.Failure(main.CONNECTION_DONE)):
         """
         Stop accepting connections on this port.
@@ -6,6 +6,7 @@ Tests for L{twisted.internet.base}.
 """
 
 import socket
+import time
 try:
     from Queue import Queue
 except ImportError:
@@ -14,9 +15,16 @@ except ImportError:
 from zope.interface import implementer
 
 from twisted.python.threadpool import ThreadPool
+from twisted.python.context import ContextVariable
+from twisted.python.runtime import seconds as runtimeSeconds
 from twisted.internet.interfaces import IReactorTime, IReactorThreads
+from twisted.internet.interfaces import IReactorInstrumentation
+from twisted.internet.interfaces import IReactorInstrumented
 from twisted.internet.error import DNSLookupError
-from twisted.internet.base import ThreadedResolver, DelayedCall
+from twisted.internet.base import ThreadedResolver, DelayedCall, ReactorBase
+from twisted.internet.base import _qualifiedName
+from twisted.internet.defer import _timedCallSeconds
+from twisted.internet import base
 from twisted.internet.task import Clock
 from twisted.trial.unittest import TestCase
 
@@ -92,6 +100,25 @@ class ThreadedResolverTests(TestCase):
         self.assertEqual(reactor._clock.calls, [])
 
 
+    def test_priority(self):
+        """
+        L{ThreadedResolver.getHostByName} runs L{socket.gethostbyname} with
+        L{ThreadedResolver.lookupPriority}, ahead of ordinary work in the
+        reactor's threadpool.
+        """
+        reactor = FakeReactor()
+        self.addCleanup(reactor._stop)
+        calls = []
+        pool = reactor.getThreadPool()
+        self.patch(pool, 'callInThreadWithPriority',
+                   lambda priority, *args: calls.append(priority))
+        d = ThreadedResolver(reactor).getHostByName("example.com", (30,))
+        self.assertEqual(calls, [ThreadedResolver.lookupPriority])
+        self.assertTrue(ThreadedResolver.lookupPriority < pool.defaultPriority)
+        reactor._clock.advance(31)
+        self.failureResultOf(d, DNSLookupError)
+
+
     def test_failure(self):
         """
         L{ThreadedResolver.getHostByName} returns a L{Deferred} which fires a
@@ -166,6 +193,16 @@ class DelayedCallTests(TestCase):
     """
     Tests for L{DelayedCall}.
     """
+    def test_systemTime(self):
+        """
+        L{ReactorBase.seconds} gives the system time, and so does a
+        L{DelayedCall} by default.
+        """
+        self.assertIdentical(ReactorBase.seconds, runtimeSeconds)
+        call = DelayedCall(1, nothing, (), {}, None, None)
+        self.assertIdentical(call.seconds, runtimeSeconds)
+
+
     def _getDelayedCallAt(self, time):
         """
         Get a L{DelayedCall} instance at a given C{time}.
@@ -270,3 +307,523 @@ class DelayedCallTests(TestCase):
         self.assertTrue(self.zero != self.one)
         self.assertFalse(self.zero != self.zero)
         self.assertFalse(self.one != self.one)
+
+
+
+class TimedCallReactor(ReactorBase):
+    """
+    A L{ReactorBase} with a controllable clock and no waker, suitable for
+    exercising the timed call bookkeeping without real I/O.
+
+    @ivar now: The value returned by L{seconds}.
+    """
+    now = 0
+
+    def installWaker(self):
+        pass
+
+
+    def seconds(self):
+        return self.now
+
+
+
+class MonotonicReactor(ReactorBase):
+    """
+    A L{ReactorBase} with no waker, which keeps the system time as
+    L{ReactorBase.seconds}.
+    """
+    def installWaker(self):
+        pass
+
+
+
+class TimedCallClockTests(TestCase):
+    """
+    Tests for the clock which L{ReactorBase} schedules timed calls with.
+    """
+    def setUp(self):
+        self.now = 1000.0
+        self.patch(base, "monotonicSeconds", lambda: self.now)
+        self.reactor = MonotonicReactor()
+
+
+    def test_monotonic(self):
+        """
+        Timed calls are scheduled and run by L{runtime.monotonicSeconds}
+        rather than by the system time which L{ReactorBase.seconds} gives,
+        so changes to the system time neither run them early nor hold them
+        up.
+        """
+        calls = []
+        call = self.reactor.callLater(5, calls.append, "call")
+        self.assertEqual(call.getTime(), 1005.0)
+        self.assertEqual(self.reactor.timeout(), 5.0)
+        self.assertTrue(abs(self.reactor.seconds() - time.time()) < 60)
+
+        self.reactor.runUntilCurrent()
+        self.assertEqual(calls, [])
+        self.now = 1005.0
+        self.reactor.runUntilCurrent()
+        self.assertEqual(calls, ["call"])
+
+
+    def test_replacedSeconds(self):
+        """
+        If L{ReactorBase.seconds} is replaced, timed calls are scheduled and
+        run by the replacement instead.
+        """
+        self.reactor.seconds = lambda: 10.0
+        call = self.reactor.callLater(5, nothing)
+        self.assertEqual(call.getTime(), 15.0)
+        self.assertEqual(_timedCallSeconds(self.reactor), 10.0)
+
+
+    def test_timedCallSeconds(self):
+        """
+        L{_timedCallSeconds} gives the time by the clock a reactor schedules
+        timed calls with, or by L{IReactorTime.seconds} for clocks which do
+        not say what that is.
+        """
+        self.assertEqual(_timedCallSeconds(self.reactor), 1000.0)
+        clock = Clock()
+        clock.advance(7)
+        self.assertEqual(_timedCallSeconds(clock), 7)
+
+
+
+class TimedCallHeapTests(TestCase):
+    """
+    Tests for the indexed heap of pending timed calls maintained by
+    L{ReactorBase}.
+    """
+    def setUp(self):
+        self.reactor = TimedCallReactor()
+        self.calls = []
+
+
+    def _schedule(self, delay, name):
+        """
+        Schedule a call which records C{name} when it runs and move it into
+        the heap of pending timed calls.
+        """
+        call = self.reactor.callLater(delay, self.calls.append, name)
+        self.reactor._insertNewDelayedCalls()
+        return call
+
+
+    def _assertHeapConsistent(self):
+        """
+        Assert that every call in the heap knows its own position and that no
+        call is scheduled before its parent.
+        """
+        heap = self.reactor._pendingTimedCalls
+        for pos, call in enumerate(heap):
+            self.assertEqual(call._heapIndex, pos)
+            if pos:
+                self.assertTrue(heap[(pos - 1) // 2].time <= call.time)
+
+
+    def test_cancelRemovesFromHeap(self):
+        """
+        Cancelling a L{DelayedCall} removes it from the heap immediately
+        rather than leaving it there to be skipped later.
+        """
+        calls = [self._schedule(i, i) for i in range(10)]
+        calls[0].cancel()
+        calls[5].cancel()
+        calls[9].cancel()
+        self.assertEqual(len(self.reactor._pendingTimedCalls), 7)
+        self.assertEqual(calls[5]._heapIndex, -1)
+        self._assertHeapConsistent()
+        self.reactor.now = 10
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [1, 2, 3, 4, 6, 7, 8])
+
+
+    def test_cancelNewCall(self):
+        """
+        A L{DelayedCall} cancelled before it is moved into the heap is never
+        added to it.
+        """
+        call = self.reactor.callLater(1, self.calls.append, None)
+        call.cancel()
+        self.reactor._insertNewDelayedCalls()
+        self.assertEqual(self.reactor._pendingTimedCalls, [])
+
+
+    def test_resetSooner(self):
+        """
+        Resetting a L{DelayedCall} to an earlier time moves it up the heap
+        so that it runs before calls which were previously ahead of it.
+        """
+        calls = [self._schedule(i + 1, i) for i in range(10)]
+        calls[8].reset(0.5)
+        self._assertHeapConsistent()
+        self.assertIs(self.reactor._pendingTimedCalls[0], calls[8])
+        self.reactor.now = 1
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [8, 0])
+
+
+    def test_resetLater(self):
+        """
+        Resetting a L{DelayedCall} to a later time defers it until that time
+        while the other calls run as scheduled.
+        """
+        calls = [self._schedule(i + 1, i) for i in range(3)]
+        calls[0].reset(5)
+        self.reactor.now = 3
+        self.reactor.runUntilCurrent()
+        self._assertHeapConsistent()
+        self.assertEqual(self.calls, [1, 2])
+        self.reactor.now = 5
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [1, 2, 0])
+
+
+    def test_negativeDelay(self):
+        """
+        Delaying a L{DelayedCall} by a negative amount moves it up the heap.
+        """
+        first = self._schedule(1, "first")
+        second = self._schedule(3, "second")
+        second.delay(-2.5)
+        self._assertHeapConsistent()
+        self.assertIs(self.reactor._pendingTimedCalls[0], second)
+        self.reactor.now = 1
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, ["second", "first"])
+
+
+    def test_cancelDuringRun(self):
+        """
+        A timed call may cancel another call which is due in the same
+        iteration, and the cancelled call does not run.
+        """
+        second = []
+        def first():
+            self.calls.append("first")
+            second[0].cancel()
+        self.reactor.callLater(1, first)
+        second.append(self.reactor.callLater(1, self.calls.append, "second"))
+        self.reactor.now = 1
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, ["first"])
+        self.assertEqual(self.reactor._pendingTimedCalls, [])
+
+
+    def test_manyOperations(self):
+        """
+        The heap remains consistent, and calls run in time order, after an
+        arbitrary mix of scheduling, cancellation and rescheduling.
+        """
+        calls = [self._schedule((i * 7919) % 101, i) for i in range(101)]
+        for i in range(0, 101, 3):
+            calls[i].cancel()
+        for i in range(1, 101, 4):
+            if calls[i].active():
+                calls[i].reset((i * 31) % 17)
+        self._assertHeapConsistent()
+        expected = sorted(
+            [call for call in calls if call.active()],
+            key=lambda call: (call.getTime(), call.args[0]))
+        self.reactor.now = 200
+        self.reactor.runUntilCurrent()
+        self.assertEqual(sorted(self.calls),
+                         sorted([call.args[0] for call in expected]))
+        self.assertEqual(self.reactor._pendingTimedCalls, [])
+
+
+
+    def test_context(self):
+        """
+        Each timed call runs with the values of L{ContextVariable}s which
+        were current when it was scheduled, and the reactor's own values are
+        restored afterwards.
+        """
+        variable = ContextVariable("test")
+        def record():
+            self.calls.append(variable.get())
+        variable.callWithValue("first", self.reactor.callLater, 1, record)
+        variable.callWithValue("second", self.reactor.callLater, 2, record)
+        self.reactor.now = 2
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, ["first", "second"])
+        self.assertIdentical(variable.get(), None)
+
+
+class WakeUpCountingReactor(TimedCallReactor):
+    """
+    A L{TimedCallReactor} which counts how many times it is woken up.
+
+    @ivar wakeUps: The number of calls to L{wakeUp}.
+    """
+    wakeUps = 0
+
+    def wakeUp(self):
+        self.wakeUps += 1
+
+
+
+class CallFromThreadTests(TestCase):
+    """
+    Tests for the wakeup coalescing and batching of calls queued by
+    L{ReactorBase.callFromThread}.
+    """
+    def setUp(self):
+        self.reactor = WakeUpCountingReactor()
+        self.calls = []
+
+
+    def test_coalescedWakeUps(self):
+        """
+        Only the first of several calls queued before the reactor runs them
+        wakes the reactor up.
+        """
+        for i in range(3):
+            self.reactor.callFromThread(self.calls.append, i)
+        self.assertEqual(self.reactor.wakeUps, 1)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [0, 1, 2])
+        self.assertEqual(self.reactor.wakeUps, 1)
+
+
+    def test_wakeUpAfterRun(self):
+        """
+        A call queued after L{ReactorBase.runUntilCurrent} has run the queue
+        wakes the reactor up again.
+        """
+        self.reactor.callFromThread(self.calls.append, 0)
+        self.reactor.runUntilCurrent()
+        self.reactor.callFromThread(self.calls.append, 1)
+        self.assertEqual(self.reactor.wakeUps, 2)
+
+
+    def test_queuedWhileRunning(self):
+        """
+        A call queued by a call being run from the queue wakes the reactor up
+        and is run by the next L{ReactorBase.runUntilCurrent}, not the
+        current one.
+        """
+        def queueAnother():
+            self.calls.append(0)
+            self.reactor.callFromThread(self.calls.append, 1)
+        self.reactor.callFromThread(queueAnother)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [0])
+        self.assertEqual(self.reactor.wakeUps, 2)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [0, 1])
+
+
+    def test_batchSize(self):
+        """
+        L{ReactorBase.runUntilCurrent} runs at most C{_threadCallBatchSize}
+        queued calls and wakes the reactor up to run the rest.
+        """
+        self.reactor._threadCallBatchSize = 2
+        for i in range(5):
+            self.reactor.callFromThread(self.calls.append, i)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [0, 1])
+        self.assertEqual(self.reactor.wakeUps, 2)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [0, 1, 2, 3])
+        self.assertEqual(self.reactor.wakeUps, 3)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [0, 1, 2, 3, 4])
+        self.assertEqual(self.reactor.wakeUps, 3)
+
+
+    def test_failingCall(self):
+        """
+        A call which raises is logged and the calls after it still run.
+        """
+        self.reactor.callFromThread(lambda: 1 // 0)
+        self.reactor.callFromThread(self.calls.append, 1)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(len(self.flushLoggedErrors(ZeroDivisionError)), 1)
+        self.assertEqual(self.calls, [1])
+
+
+    def test_context(self):
+        """
+        Each queued call runs with the values of L{ContextVariable}s which
+        were current when it was queued, and the reactor's own values are
+        restored afterwards.
+        """
+        variable = ContextVariable("test")
+        def record():
+            self.calls.append(variable.get())
+        variable.callWithValue("first", self.reactor.callFromThread, record)
+        self.reactor.callFromThread(record)
+        variable.callWithValue("second", self.reactor.callFromThread, record)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, ["first", None, "second"])
+        self.assertIdentical(variable.get(), None)
+
+
+
+@implementer(IReactorInstrumentation)
+class RecordingInstrumentation(object):
+    """
+    An L{IReactorInstrumentation} which records everything reported to it.
+
+    @ivar events: A C{list} of tuples, the name of the method called followed
+        by its arguments.
+    """
+    slowThreshold = 1
+
+    def __init__(self):
+        self.events = []
+
+
+    def pollCompleted(self, waited, ready):
+        self.events.append(("pollCompleted", waited, ready))
+
+
+    def threadCallsRun(self, count, elapsed):
+        self.events.append(("threadCallsRun", count, elapsed))
+
+
+    def timedCallsRun(self, count, elapsed):
+        self.events.append(("timedCallsRun", count, elapsed))
+
+
+    def slowCall(self, name, elapsed):
+        self.events.append(("slowCall", name, elapsed))
+
+
+
+def advance(reactor, amount):
+    """
+    Advance the clock of a L{TimedCallReactor}, simulating a call which takes
+    C{amount} seconds.
+    """
+    reactor.now += amount
+
+
+
+class ReactorInstrumentationTests(TestCase):
+    """
+    Tests for the L{IReactorInstrumented} support in L{ReactorBase}.
+    """
+    def setUp(self):
+        self.reactor = TimedCallReactor()
+        self.instrumentation = RecordingInstrumentation()
+        self.reactor.setInstrumentation(self.instrumentation)
+
+
+    def test_interface(self):
+        """
+        L{ReactorBase} provides L{IReactorInstrumented}.
+        """
+        self.assertTrue(IReactorInstrumented.providedBy(self.reactor))
+
+
+    def test_setInstrumentation(self):
+        """
+        L{ReactorBase.setInstrumentation} returns the instrumentation it
+        replaces, and C{None} turns instrumentation off.
+        """
+        self.assertIdentical(
+            self.reactor.setInstrumentation(None), self.instrumentation)
+        self.reactor.callLater(0, advance, self.reactor, 5)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.instrumentation.events, [])
+        self.assertIdentical(self.reactor.setInstrumentation(None), None)
+
+
+    def test_timedCalls(self):
+        """
+        The timed calls run by L{ReactorBase.runUntilCurrent} are reported to
+        L{IReactorInstrumentation.timedCallsRun} with how long they took, and
+        any which took at least C{slowThreshold} are reported individually to
+        L{IReactorInstrumentation.slowCall}.
+        """
+        self.reactor.callLater(0, advance, self.reactor, 0.5)
+        self.reactor.callLater(0, advance, self.reactor, 2)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.instrumentation.events, [
+                ("slowCall", __name__ + ".advance", 2),
+                ("timedCallsRun", 2, 2.5)])
+
+
+    def test_noTimedCalls(self):
+        """
+        When no timed calls are due nothing is reported.
+        """
+        self.reactor.callLater(1, advance, self.reactor, 2)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.instrumentation.events, [])
+
+
+    def test_threadCalls(self):
+        """
+        The calls in C{threadCallQueue} run by L{ReactorBase.runUntilCurrent}
+        are reported to L{IReactorInstrumentation.threadCallsRun}, with slow
+        ones reported to L{IReactorInstrumentation.slowCall}.
+        """
+        self.reactor.callFromThread(advance, self.reactor, 3)
+        self.reactor.callFromThread(advance, self.reactor, 0.25)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.instrumentation.events, [
+                ("slowCall", __name__ + ".advance", 3),
+                ("threadCallsRun", 2, 3.25)])
+
+
+    def test_slowCallRaises(self):
+        """
+        A slow call is reported even if it raises, and the exception is still
+        logged.
+        """
+        def fail():
+            advance(self.reactor, 1)
+            raise RuntimeError("fail")
+        self.reactor.callLater(0, fail)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
+        self.assertEqual(self.instrumentation.events[0][0], "slowCall")
+
+
+
+class QualifiedNameTests(TestCase):
+    """
+    Tests for L{twisted.internet.base._qualifiedName}.
+    """
+    def test_function(self):
+        """
+        A function is named by its module and name.
+        """
+        self.assertEqual(_qualifiedName(advance), __name__ + ".advance")
+
+
+    def test_boundMethod(self):
+        """
+        A bound method is named by the class of its instance, which need not
+        be the class defining the method, and its name.
+        """
+        self.assertEqual(
+            _qualifiedName(TimedCallReactor().runUntilCurrent),
+            __name__ + ".TimedCallReactor.runUntilCurrent")
+
+
+    def test_builtin(self):
+        """
+        A builtin function is named by its module and name.
+        """
+        self.assertEqual(_qualifiedName(time.sleep), "time.sleep")
+
+
+    def test_other(self):
+        """
+        Any other callable is named by its C{repr}.
+        """
+        class Callable(object):
+            def __call__(self):
+                pass
+
+            def __repr__(self):
+                return "<callable>"
+        self.assertEqual(_qualifiedName(Callable()), "<callable>")
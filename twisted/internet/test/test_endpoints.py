@@ -29,6 +29,7 @@ from twisted.python.filepath import FilePath
 from twisted.python.runtime import platform
 from twisted.python import log
 from twisted.protocols import basic
+from twisted.names import dns
 from twisted.internet.task import Clock
 from twisted.test.proto_helpers import (MemoryReactorClock as MemoryReactor)
 from twisted.test import __file__ as testInitPath
@@ -54,6 +55,7 @@ try:
     from twisted.internet.ssl import PrivateCertificate, Certificate
     from twisted.internet.ssl import CertificateOptions, KeyPair
     from twisted.internet.ssl import DiffieHellmanParameters
+    from twisted.internet.ssl import ClientSessionCache
     from OpenSSL.SSL import ContextType, SSLv23_METHOD, TLSv1_METHOD
     testCertificate = Certificate.loadPEM(pemPath.getContent())
     testPrivateCertificate = PrivateCertificate.loadPEM(pemPath.getContent())
@@ -1220,6 +1222,23 @@ class TCP4EndpointsTestCase(EndpointTestCaseMixin, unittest.TestCase):
                 address)
 
 
+    def test_reusePort(self):
+        """
+        L{TCP4ServerEndpoint.listen} passes C{reusePort=True} to
+        L{IReactorTCP.listenTCP} if the endpoint was created with it, and
+        otherwise does not pass C{reusePort} at all.
+        """
+        calls = []
+        class ReusePortReactor(object):
+            def listenTCP(self, port, factory, backlog=50, interface='',
+                          **kwargs):
+                calls.append(kwargs)
+        reactor = ReusePortReactor()
+        endpoints.TCP4ServerEndpoint(reactor, 80, reusePort=True).listen(None)
+        endpoints.TCP4ServerEndpoint(reactor, 80).listen(None)
+        self.assertEqual(calls, [{'reusePort': True}, {}])
+
+
 
 class TCP6EndpointsTestCase(EndpointTestCaseMixin, unittest.TestCase):
     """
@@ -1818,6 +1837,8 @@ class HostnameEndpointsFasterConnectionTestCase(unittest.TestCase):
     """
     def setUp(self):
         self.mreactor = MemoryReactor()
+        self.patch(endpoints.HostnameEndpoint, "_preferredFamilies",
+                   endpoints._AddressFamilyCache(clock=self.mreactor))
         self.endpoint = endpoints.HostnameEndpoint(self.mreactor,
                 b"www.example.com", 80)
 
@@ -1956,6 +1977,373 @@ class HostnameEndpointsFasterConnectionTestCase(unittest.TestCase):
 
 
 
+class HostnameEndpointsHappyEyeballsTestCase(unittest.TestCase):
+    """
+    Tests for how L{HostnameEndpoint} orders, staggers and races its
+    connection attempts when a host name has several addresses.
+    """
+    def setUp(self):
+        self.mreactor = MemoryReactor()
+        self.patch(endpoints.HostnameEndpoint, "_preferredFamilies",
+                   endpoints._AddressFamilyCache(clock=self.mreactor))
+        self.endpoint = self.makeEndpoint()
+        self.addresses = [
+            (AF_INET6, SOCK_STREAM, IPPROTO_TCP, '', ('1::1', 80, 0, 0)),
+            (AF_INET6, SOCK_STREAM, IPPROTO_TCP, '', ('1::2', 80, 0, 0)),
+            (AF_INET, SOCK_STREAM, IPPROTO_TCP, '', ('1.1.1.1', 80)),
+            (AF_INET, SOCK_STREAM, IPPROTO_TCP, '', ('1.1.1.2', 80))]
+        self.clientFactory = protocol.Factory()
+        self.clientFactory.protocol = protocol.Protocol
+
+
+    def makeEndpoint(self, host=b"www.example.com"):
+        """
+        Make a L{HostnameEndpoint} to port 80 of C{host}, which resolves to
+        C{self.addresses}.
+        """
+        endpoint = endpoints.HostnameEndpoint(self.mreactor, host, 80)
+        endpoint._nameResolution = (
+            lambda host, port: defer.succeed(self.addresses))
+        return endpoint
+
+
+    def forgetAttempts(self):
+        """
+        Forget the connection attempts made so far.
+        """
+        del self.mreactor.tcpClients[:]
+        del self.mreactor.connectors[:]
+
+
+    def attemptedHosts(self):
+        """
+        @return: The hosts connections have been attempted to so far.
+        """
+        return [client[0] for client in self.mreactor.tcpClients]
+
+
+    def succeed(self, index):
+        """
+        Make the connection attempt with the given index succeed.
+        """
+        host, port, factory, timeout, bindAddress = (
+            self.mreactor.tcpClients[index])
+        factory.buildProtocol((host, port)).makeConnection(object())
+
+
+    def fail(self, index):
+        """
+        Make the connection attempt with the given index fail.
+        """
+        factory = self.mreactor.tcpClients[index][2]
+        factory.clientConnectionFailed(
+            self.mreactor.connectors[index],
+            Failure(error.ConnectError(string=str(index))))
+
+
+    def test_attemptDelay(self):
+        """
+        Each connection attempt is given C{attemptDelay} seconds before the
+        next one is started.
+        """
+        self.endpoint._attemptDelay = 0.5
+        self.endpoint.connect(self.clientFactory)
+        self.assertEqual(len(self.mreactor.tcpClients), 1)
+        self.mreactor.advance(0.49)
+        self.assertEqual(len(self.mreactor.tcpClients), 1)
+        self.mreactor.advance(0.01)
+        self.assertEqual(len(self.mreactor.tcpClients), 2)
+
+
+    def test_defaultAttemptDelay(self):
+        """
+        By default, connection attempts are started 250ms apart.
+        """
+        self.endpoint.connect(self.clientFactory)
+        self.mreactor.advance(0.25)
+        self.assertEqual(len(self.mreactor.tcpClients), 2)
+
+
+    def test_interleaveFamilies(self):
+        """
+        Addresses are attempted alternating between address families,
+        starting with the family of the first address resolved.
+        """
+        self.endpoint.connect(self.clientFactory)
+        self.mreactor.pump([0.25] * 3)
+        self.assertEqual(
+            self.attemptedHosts(), ['1::1', '1.1.1.1', '1::2', '1.1.1.2'])
+
+
+    def test_failureStartsNextAttempt(self):
+        """
+        When a connection attempt fails, the next one is started right away.
+        """
+        self.endpoint.connect(self.clientFactory)
+        self.fail(0)
+        self.assertEqual(self.attemptedHosts(), ['1::1', '1.1.1.1'])
+        self.mreactor.advance(0.25)
+        self.assertEqual(len(self.mreactor.tcpClients), 3)
+
+
+    def test_successCancelsOthers(self):
+        """
+        Once a connection attempt succeeds, the attempts in progress are
+        cancelled, no more are started, and no delayed calls are left behind.
+        """
+        d = self.endpoint.connect(self.clientFactory)
+        self.mreactor.advance(0.25)
+        self.succeed(1)
+        self.assertIsInstance(self.successResultOf(d), protocol.Protocol)
+        self.assertTrue(
+            self.mreactor.tcpClients[0][2]._connector.stoppedConnecting)
+        self.assertEqual(self.mreactor.getDelayedCalls(), [])
+        self.assertEqual(len(self.mreactor.tcpClients), 2)
+
+
+    def test_allFail(self):
+        """
+        If every connection attempt fails, the L{Deferred} returned by
+        C{connect} fails with the reason the last one failed.
+        """
+        d = self.endpoint.connect(self.clientFactory)
+        self.mreactor.advance(0.25)
+        self.fail(1)
+        self.fail(0)
+        self.fail(2)
+        self.assertNoResult(d)
+        self.fail(3)
+        self.assertEqual(self.failureResultOf(d).value.args, ('3',))
+
+
+    def test_preferWinningFamily(self):
+        """
+        Connection attempts start with the address family of the last
+        connection established to the same host name, even by another
+        endpoint.
+        """
+        self.endpoint.connect(self.clientFactory)
+        self.mreactor.advance(0.25)
+        self.succeed(1)
+        self.forgetAttempts()
+        self.makeEndpoint().connect(self.clientFactory)
+        self.assertEqual(self.attemptedHosts(), ['1.1.1.1'])
+
+
+    def test_preferWinningFamilyPerHost(self):
+        """
+        The address family of the last connection established to one host
+        name does not affect the order of attempts to another.
+        """
+        self.endpoint.connect(self.clientFactory)
+        self.mreactor.advance(0.25)
+        self.succeed(1)
+        self.forgetAttempts()
+        self.makeEndpoint(b"www.example.org").connect(self.clientFactory)
+        self.assertEqual(self.attemptedHosts(), ['1::1'])
+
+
+    def test_winningFamilyExpires(self):
+        """
+        The address family of the last connection established to a host name
+        is only preferred for C{lifetime} seconds.
+        """
+        self.endpoint.connect(self.clientFactory)
+        self.mreactor.advance(0.25)
+        self.succeed(1)
+        self.forgetAttempts()
+        self.mreactor.advance(
+            endpoints.HostnameEndpoint._preferredFamilies.lifetime)
+        self.makeEndpoint().connect(self.clientFactory)
+        self.assertEqual(self.attemptedHosts(), ['1::1'])
+
+
+    def test_noAddresses(self):
+        """
+        If name resolution succeeds without any addresses, the L{Deferred}
+        returned by C{connect} fails with L{error.DNSLookupError}.
+        """
+        self.addresses = []
+        d = self.endpoint.connect(self.clientFactory)
+        self.failureResultOf(d, error.DNSLookupError)
+
+
+
+class AddressFamilyCacheTests(unittest.TestCase):
+    """
+    Tests for L{endpoints._AddressFamilyCache}.
+    """
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = endpoints._AddressFamilyCache(
+            maxSize=2, lifetime=10, clock=self.clock)
+
+
+    def test_store(self):
+        """
+        L{endpoints._AddressFamilyCache.get} returns the family last stored
+        for a host name, or C{None} if none was.
+        """
+        self.assertIdentical(self.cache.get(b"example.com"), None)
+        self.cache.store(b"example.com", AF_INET6)
+        self.cache.store(b"example.com", AF_INET)
+        self.assertEqual(self.cache.get(b"example.com"), AF_INET)
+        self.assertEqual(len(self.cache), 1)
+
+
+    def test_expiry(self):
+        """
+        A family is only remembered for C{lifetime} seconds.
+        """
+        self.cache.store(b"example.com", AF_INET)
+        self.clock.advance(9)
+        self.assertEqual(self.cache.get(b"example.com"), AF_INET)
+        self.clock.advance(1)
+        self.assertIdentical(self.cache.get(b"example.com"), None)
+        self.assertEqual(len(self.cache), 0)
+
+
+    def test_leastRecentlyUsedForgotten(self):
+        """
+        Once C{maxSize} host names are remembered, storing another forgets
+        the one least recently stored or looked up.
+        """
+        self.cache.store(b"a.example.com", AF_INET)
+        self.cache.store(b"b.example.com", AF_INET)
+        self.cache.get(b"a.example.com")
+        self.cache.store(b"c.example.com", AF_INET6)
+        self.assertEqual(len(self.cache), 2)
+        self.assertIdentical(self.cache.get(b"b.example.com"), None)
+        self.assertEqual(self.cache.get(b"a.example.com"), AF_INET)
+        self.assertEqual(self.cache.get(b"c.example.com"), AF_INET6)
+
+
+    def test_monotonic(self):
+        """
+        By default, lifetimes are measured with L{runtime.monotonic}.
+        """
+        from twisted.python.runtime import monotonic
+        cache = endpoints._AddressFamilyCache()
+        self.assertIdentical(cache._seconds, monotonic)
+
+
+
+class FakeResolver(object):
+    """
+    A fake L{IResolver} which answers IPv6 and IPv4 address lookups from a
+    dictionary.
+
+    @ivar results: A C{dict} mapping the names of C{IResolver} methods to the
+        records they answer with, or to an exception they fail with.
+    """
+    def __init__(self, results):
+        self.results = results
+
+
+    def _lookup(self, method, name):
+        result = self.results[method]
+        if isinstance(result, Exception):
+            return defer.fail(result)
+        return defer.succeed((
+            [dns.RRHeader(name, record.TYPE, payload=record)
+             for record in result], [], []))
+
+
+    def lookupIPV6Address(self, name, timeout=None):
+        return self._lookup("lookupIPV6Address", name)
+
+
+    def lookupAddress(self, name, timeout=None):
+        return self._lookup("lookupAddress", name)
+
+
+
+class HostnameEndpointResolverTestCase(unittest.TestCase):
+    """
+    Tests for L{HostnameEndpoint} when it is given an L{IResolver}.
+    """
+    def resolve(self, results):
+        """
+        Resolve a host name with a L{FakeResolver} giving the results given.
+
+        @return: The L{Deferred} returned by C{_nameResolution}.
+        """
+        endpoint = endpoints.HostnameEndpoint(
+            MemoryReactor(), b"example.com", 80,
+            resolver=FakeResolver(results))
+        endpoint._deferToThread = lambda *args: self.fail("Used a thread")
+        return endpoint._nameResolution(b"example.com", 80)
+
+
+    def test_addresses(self):
+        """
+        The IPv6 and IPv4 addresses looked up are returned like GAI would
+        return them, IPv6 addresses first, and other records are ignored.
+        """
+        d = self.resolve({
+                "lookupIPV6Address": [dns.Record_AAAA('1::2')],
+                "lookupAddress": [
+                    dns.Record_CNAME(b'example.org'),
+                    dns.Record_A('1.2.3.4')]})
+        self.assertEqual(self.successResultOf(d), [
+                (AF_INET6, SOCK_STREAM, IPPROTO_TCP, '', ('1::2', 80, 0, 0)),
+                (AF_INET, SOCK_STREAM, IPPROTO_TCP, '', ('1.2.3.4', 80))])
+
+
+    def test_oneLookupFails(self):
+        """
+        If one of the lookups fails, the addresses found by the other are
+        returned.
+        """
+        d = self.resolve({
+                "lookupIPV6Address": error.DNSLookupError("no AAAA"),
+                "lookupAddress": [dns.Record_A('1.2.3.4')]})
+        self.assertEqual(self.successResultOf(d), [
+                (AF_INET, SOCK_STREAM, IPPROTO_TCP, '', ('1.2.3.4', 80))])
+
+
+    def test_bothLookupsFail(self):
+        """
+        If neither lookup finds an address, connecting fails with
+        L{error.DNSLookupError}.
+        """
+        endpoint = endpoints.HostnameEndpoint(
+            MemoryReactor(), b"example.com", 80, resolver=FakeResolver({
+                    "lookupIPV6Address": error.DNSLookupError("no AAAA"),
+                    "lookupAddress": []}))
+        d = endpoint.connect(protocol.Factory())
+        self.failureResultOf(d, error.DNSLookupError)
+
+
+    def assertConnectsToLiteral(self, host, address):
+        """
+        Connecting a L{endpoints.HostnameEndpoint} with a resolver to C{host},
+        an IP address, connects to C{address} without a lookup.
+        """
+        reactor = MemoryReactor()
+        endpoint = endpoints.HostnameEndpoint(
+            reactor, host, 80, resolver=FakeResolver({}))
+        endpoint.connect(protocol.Factory())
+        self.assertEqual(
+            [(client[0], client[1]) for client in reactor.tcpClients],
+            [(address, 80)])
+
+
+    def test_ipv4Literal(self):
+        """
+        An IPv4 address isn't looked up with the resolver.
+        """
+        self.assertConnectsToLiteral(b"127.0.0.1", "127.0.0.1")
+
+
+    def test_ipv6Literal(self):
+        """
+        An IPv6 address isn't looked up with the resolver.
+        """
+        self.assertConnectsToLiteral(b"::1", "::1")
+
+
+
 class SSL4EndpointsTestCase(EndpointTestCaseMixin,
                             unittest.TestCase):
     """
@@ -2090,6 +2478,27 @@ class SSL4EndpointsTestCase(EndpointTestCaseMixin,
                 address)
 
 
+    def test_sessionCache(self):
+        """
+        L{SSL4ClientEndpoint} given a session cache connects with a context
+        factory which gets its contexts from the one it was given and makes
+        the connection use the cache, under C{(host, port, None,
+        contextFactory)}.
+        """
+        reactor = MemoryReactor()
+        cache = ClientSessionCache()
+        endpoint = endpoints.SSL4ClientEndpoint(
+            reactor, "example.com", 443, self.clientSSLContext,
+            sessionCache=cache)
+        endpoint.connect(ClientFactory())
+        contextFactory = reactor.sslClients[0][3]
+        self.assertIdentical(contextFactory.sessionCache, cache)
+        self.assertEqual(contextFactory.sessionKey,
+                         ("example.com", 443, None, self.clientSSLContext))
+        self.assertIdentical(contextFactory.getContext(),
+                             self.clientSSLContext.getContext())
+
+
 
 class UNIXEndpointsTestCase(EndpointTestCaseMixin,
                             unittest.TestCase):
@@ -2241,6 +2650,21 @@ class ParserTestCase(unittest.TestCase):
             ('TCP', (80, self.f), {'interface': '', 'backlog': 6}))
 
 
+    def test_reusePortTCP(self):
+        """
+        TCP port descriptions parse their 'reusePort' argument as a boolean
+        given as an integer.
+        """
+        self.assertEqual(
+            self.parse('tcp:80:reusePort=1', self.f),
+            ('TCP', (80, self.f),
+             {'interface': '', 'backlog': 50, 'reusePort': True}))
+        self.assertEqual(
+            self.parse('tcp:80:reusePort=0', self.f),
+            ('TCP', (80, self.f),
+             {'interface': '', 'backlog': 50, 'reusePort': False}))
+
+
     def test_simpleUNIX(self):
         """
         L{endpoints._parseServer} returns a C{'UNIX'} port description with
@@ -2345,6 +2769,17 @@ class ServerStringTests(unittest.TestCase):
         self.assertEqual(server._port, 1234)
         self.assertEqual(server._backlog, 12)
         self.assertEqual(server._interface, "10.0.0.1")
+        self.assertFalse(server._reusePort)
+
+
+    def test_tcpReusePort(self):
+        """
+        When passed a TCP strports description with C{reusePort=1},
+        L{endpoints.serverFromString} returns a L{TCP4ServerEndpoint} which
+        will set C{SO_REUSEPORT}.
+        """
+        server = endpoints.serverFromString(object(), "tcp:1234:reusePort=1")
+        self.assertTrue(server._reusePort)
 
 
     def test_ssl(self):
@@ -3087,6 +3522,17 @@ class TCP6ServerEndpointPluginTests(unittest.TestCase):
         self.assertEqual(ep._port, 8080)
         self.assertEqual(ep._backlog, 12)
         self.assertEqual(ep._interface, '::1')
+        self.assertFalse(ep._reusePort)
+
+
+    def test_stringDescriptionReusePort(self):
+        """
+        The C{reusePort} argument of a 'tcp6' endpoint string description is
+        parsed as a boolean given as an integer.
+        """
+        ep = endpoints.serverFromString(
+            MemoryReactor(), "tcp6:8080:reusePort=1")
+        self.assertTrue(ep._reusePort)
 
 
 
@@ -7,9 +7,12 @@ Tests for L{twisted.internet.epollreactor}.
 
 from __future__ import division, absolute_import
 
+import os
+
 from twisted.trial.unittest import TestCase
 try:
     from twisted.internet.epollreactor import _ContinuousPolling
+    from twisted.internet.epollreactor import EPollReactor, EPOLLIN
 except ImportError:
     _ContinuousPolling = None
 from twisted.internet.task import Clock
@@ -246,3 +249,35 @@ class ContinuousPollingTests(TestCase):
 
     if _ContinuousPolling is None:
         skip = "epoll not supported in this environment."
+
+
+
+class EPollReactorTests(TestCase):
+    """
+    Tests for L{EPollReactor}.
+    """
+
+    def test_afterFork(self):
+        """
+        L{EPollReactor._afterFork} closes the epoll object, which a forked
+        process shares with its parent, and replaces it with one watching the
+        same descriptors.  It also replaces the waker.
+        """
+        reactor = EPollReactor()
+        r, w = os.pipe()
+        self.addCleanup(os.close, r)
+        self.addCleanup(os.close, w)
+        reader = Descriptor()
+        reader.fileno = lambda: r
+        reactor.addReader(reader)
+        poller, waker = reactor._poller, reactor.waker
+        reactor._afterFork()
+        self.addCleanup(reactor._poller.close)
+        self.addCleanup(reactor.waker.connectionLost, None)
+        self.assertTrue(poller.closed)
+        self.assertIsNot(reactor.waker, waker)
+        os.write(w, b"x")
+        self.assertEqual(reactor._poller.poll(0), [(r, EPOLLIN)])
+
+    if _ContinuousPolling is None:
+        skip = "epoll not supported in this environment."
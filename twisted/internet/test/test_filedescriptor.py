@@ -97,3 +97,149 @@ class WriteDescriptorTests(SynchronousTestCase):
         descriptor = MemoryFile()
         descriptor.write(b"hello, world")
         self.assertIs(None, descriptor.doWrite())
+
+
+
+class VectoredMemoryFile(MemoryFile):
+    """
+    A L{MemoryFile} which accepts data through
+    L{FileDescriptor._writeSomeVectors} instead of C{writeSomeData}.
+
+    @ivar _vectors: A C{list} of the lists of chunks passed to
+        C{_writeSomeVectors}, converted to C{bytes}.
+    """
+    _vectoredWrites = True
+
+    def __init__(self):
+        MemoryFile.__init__(self)
+        self._vectors = []
+
+
+    def writeSomeData(self, data):
+        raise AssertionError("writeSomeData should not be called")
+
+
+    def _writeSomeVectors(self, vectors):
+        """
+        Accept at most C{self._freeSpace} bytes from C{vectors}.
+        """
+        self._vectors.append(
+            [memoryview(vector).tobytes() for vector in vectors])
+        accepted = 0
+        for vector in vectors:
+            acceptLength = min(self._freeSpace, len(vector))
+            if acceptLength:
+                self._freeSpace -= acceptLength
+                self._written.append(
+                    memoryview(vector)[:acceptLength].tobytes())
+            accepted += acceptLength
+        return accepted
+
+
+
+class VectoredWriteTests(SynchronousTestCase):
+    """
+    Tests for L{FileDescriptor.doWrite} with C{_vectoredWrites} set.
+    """
+    def test_chunksNotJoined(self):
+        """
+        The chunks passed to C{write} and C{writeSequence} are passed on to
+        C{_writeSomeVectors} separately.
+        """
+        descriptor = VectoredMemoryFile()
+        descriptor._freeSpace = 100
+        descriptor.write(b"hello, ")
+        descriptor.writeSequence([b"world", b"!"])
+        self.assertIs(None, descriptor.doWrite())
+        self.assertEqual(descriptor._vectors, [[b"hello, ", b"world", b"!"]])
+        self.assertEqual(descriptor._tempDataBuffer, [])
+        self.assertEqual(descriptor._tempDataLen, 0)
+
+
+    def test_partialWrite(self):
+        """
+        When only part of the buffered data is written, the next call to
+        C{doWrite} resumes from the chunk and offset where writing stopped.
+        """
+        descriptor = VectoredMemoryFile()
+        descriptor.writeSequence([b"abc", b"defg", b"hi"])
+        descriptor._freeSpace = 5
+        descriptor.doWrite()
+        self.assertEqual(descriptor._tempDataLen, 4)
+        descriptor._freeSpace = 100
+        descriptor.doWrite()
+        self.assertEqual(descriptor._vectors[1], [b"fg", b"hi"])
+        self.assertEqual(b"".join(descriptor._written), b"abcdefghi")
+        self.assertEqual(descriptor._tempDataLen, 0)
+        self.assertEqual(descriptor._tempDataOffset, 0)
+
+
+    def test_kernelBufferFull(self):
+        """
+        When C{_writeSomeVectors} writes nothing, L{FileDescriptor.doWrite}
+        returns C{None} and keeps all of the data buffered.
+        """
+        descriptor = VectoredMemoryFile()
+        descriptor.write(b"hello, world")
+        self.assertIs(None, descriptor.doWrite())
+        self.assertEqual(descriptor._tempDataBuffer, [b"hello, world"])
+        self.assertEqual(descriptor._tempDataLen, 12)
+
+
+    def test_sendLimit(self):
+        """
+        No more than C{SEND_LIMIT} bytes, give or take the size of the last
+        chunk, are passed to C{_writeSomeVectors} at once.
+        """
+        descriptor = VectoredMemoryFile()
+        descriptor.SEND_LIMIT = 4
+        descriptor._freeSpace = 100
+        descriptor.writeSequence([b"ab", b"cd", b"ef"])
+        descriptor.doWrite()
+        self.assertEqual(descriptor._vectors, [[b"ab", b"cd"]])
+        descriptor.doWrite()
+        self.assertEqual(descriptor._vectors[1], [b"ef"])
+
+
+    def test_vectorLimit(self):
+        """
+        No more than C{_VECTOR_LIMIT} chunks are passed to
+        C{_writeSomeVectors} at once.
+        """
+        descriptor = VectoredMemoryFile()
+        descriptor._VECTOR_LIMIT = 2
+        descriptor._freeSpace = 100
+        descriptor.writeSequence([b"a", b"b", b"c"])
+        descriptor.doWrite()
+        self.assertEqual(descriptor._vectors, [[b"a", b"b"]])
+
+
+    def test_emptyChunks(self):
+        """
+        Empty chunks in the buffer are discarded along with the data around
+        them.
+        """
+        descriptor = VectoredMemoryFile()
+        descriptor._freeSpace = 100
+        descriptor.writeSequence([b"a", b"", b"b", b""])
+        descriptor.doWrite()
+        self.assertEqual(descriptor._tempDataBuffer, [])
+        self.assertEqual(b"".join(descriptor._written), b"ab")
+
+
+    def test_fallBackToWriteSomeData(self):
+        """
+        If vectored writing is turned off part way through a chunk, the rest
+        of the data is written with C{writeSomeData} without repeating the
+        part already written.
+        """
+        descriptor = VectoredMemoryFile()
+        descriptor.writeSequence([b"abc", b"def"])
+        descriptor._freeSpace = 2
+        descriptor.doWrite()
+        descriptor._vectoredWrites = False
+        descriptor.writeSomeData = lambda data: MemoryFile.writeSomeData(
+            descriptor, data)
+        descriptor._freeSpace = 100
+        descriptor.doWrite()
+        self.assertEqual(b"".join(descriptor._written), b"abcdef")
@@ -12,7 +12,8 @@ well.
 from __future__ import division, absolute_import
 
 from twisted.trial.unittest import TestCase
-from twisted.internet.defer import Deferred, returnValue, inlineCallbacks
+from twisted.internet.defer import (
+    Deferred, returnValue, inlineCallbacks, succeed, fail)
 
 class NonLocalExitTests(TestCase):
     """
@@ -88,3 +89,98 @@ class NonLocalExitTests(TestCase):
         self.assertMistakenMethodWarning(results)
 
 
+
+
+
+class YieldDeferredTests(TestCase):
+    """
+    Tests for yielding L{Deferred}s, with or without a result, from an
+    L{inlineCallbacks} generator.
+    """
+
+    def test_fired(self):
+        """
+        Yielding a L{Deferred} which already has a result resumes the
+        generator with that result right away, and leaves the L{Deferred}
+        with a result of C{None}.
+        """
+        ready = succeed(1)
+        @inlineCallbacks
+        def inline():
+            result = yield ready
+            returnValue(result + 1)
+        self.assertEqual(self.successResultOf(inline()), 2)
+        self.assertEqual(self.successResultOf(ready), None)
+
+
+    def test_failed(self):
+        """
+        Yielding a L{Deferred} which has already failed raises its exception
+        in the generator, and the failure is not logged as unhandled when the
+        L{Deferred} is garbage collected.
+        """
+        ready = fail(ZeroDivisionError())
+        @inlineCallbacks
+        def inline():
+            try:
+                yield ready
+            except ZeroDivisionError:
+                returnValue("handled")
+        self.assertEqual(self.successResultOf(inline()), "handled")
+        self.assertEqual(self.successResultOf(ready), None)
+        self.assertIdentical(ready._debugInfo.failResult, None)
+
+
+    def test_unfired(self):
+        """
+        Yielding a L{Deferred} with no result waits for it, and then leaves it
+        with a result of C{None}.
+        """
+        waiting = Deferred()
+        @inlineCallbacks
+        def inline():
+            result = yield waiting
+            returnValue(result + 1)
+        d = inline()
+        self.assertNoResult(d)
+        waiting.callback(1)
+        self.assertEqual(self.successResultOf(d), 2)
+        self.assertEqual(self.successResultOf(waiting), None)
+
+
+    def test_paused(self):
+        """
+        Yielding a L{Deferred} which has a result but is paused waits for it to
+        be unpaused and to run its other callbacks.
+        """
+        ready = succeed(1)
+        ready.pause()
+        ready.addCallback(lambda result: result + 1)
+        @inlineCallbacks
+        def inline():
+            result = yield ready
+            returnValue(result)
+        d = inline()
+        self.assertNoResult(d)
+        ready.unpause()
+        self.assertEqual(self.successResultOf(d), 2)
+
+
+    def test_runningCallbacks(self):
+        """
+        Yielding a L{Deferred} from one of its own callbacks waits for that
+        callback to return and gets the result it returns.
+        """
+        results = []
+        ready = Deferred()
+        @inlineCallbacks
+        def inline():
+            result = yield ready
+            results.append(result)
+        def callback(result):
+            inline()
+            self.assertEqual(results, [])
+            return result + 1
+        ready.addCallback(callback)
+        ready.callback(1)
+        self.assertEqual(results, [2])
@@ -0,0 +1,380 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.internet.pool}.
+"""
+
+from __future__ import division, absolute_import
+
+from twisted.trial.unittest import SynchronousTestCase
+from twisted.internet.defer import Deferred, CancelledError
+from twisted.internet.error import ConnectionRefusedError
+from twisted.internet.protocol import Protocol, Factory
+from twisted.internet.task import Clock
+from twisted.internet.pool import EndpointConnectionPool
+from twisted.test.proto_helpers import StringTransport
+
+
+
+class FakeEndpoint(object):
+    """
+    A client endpoint whose connection attempts are completed by the test.
+
+    @ivar attempts: A C{list} of C{(factory, Deferred)} pairs, one for each
+        connection attempt.
+    """
+
+    def __init__(self):
+        self.attempts = []
+
+
+    def connect(self, factory):
+        d = Deferred()
+        self.attempts.append((factory, d))
+        return d
+
+
+    def succeed(self, index=-1):
+        """
+        Complete a connection attempt, by default the latest.
+
+        @return: The connected protocol.
+        """
+        factory, d = self.attempts[index]
+        protocol = factory.buildProtocol(None)
+        protocol.makeConnection(StringTransport())
+        d.callback(protocol)
+        return protocol
+
+
+
+class EndpointConnectionPoolTests(SynchronousTestCase):
+    """
+    Tests for L{EndpointConnectionPool}.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.factory = Factory.forProtocol(Protocol)
+        self.pool = EndpointConnectionPool(self.clock, self.factory)
+        self.endpoint = FakeEndpoint()
+
+
+    def connection(self, key="key"):
+        """
+        Check a new connection out of the pool.
+        """
+        result = []
+        self.pool.getConnection(key, self.endpoint).addCallback(result.append)
+        self.endpoint.succeed()
+        return result[0]
+
+
+    def test_newConnection(self):
+        """
+        If there is no idle connection, L{EndpointConnectionPool.getConnection}
+        connects with the given endpoint and the pool's factory.
+        """
+        result = []
+        self.pool.getConnection("key", self.endpoint).addCallback(
+            result.append)
+        self.assertEqual(result, [])
+        self.assertIdentical(self.endpoint.attempts[0][0], self.factory)
+        protocol = self.endpoint.succeed()
+        self.assertEqual(result, [protocol])
+        self.assertEqual((self.pool.connects, self.pool.checkouts,
+                          self.pool.reuses), (1, 1, 0))
+
+
+    def test_factory(self):
+        """
+        A factory passed to L{EndpointConnectionPool.getConnection} is used
+        instead of the pool's.
+        """
+        factory = Factory.forProtocol(Protocol)
+        self.pool.getConnection("key", self.endpoint, factory)
+        self.assertIdentical(self.endpoint.attempts[0][0], factory)
+
+
+    def test_reuse(self):
+        """
+        A released connection is supplied again for the same key, without
+        connecting, but not for other keys.
+        """
+        protocol = self.connection()
+        self.pool.release("key", protocol)
+        result = []
+        self.pool.getConnection("key", self.endpoint).addCallback(
+            result.append)
+        self.assertEqual(result, [protocol])
+        self.assertEqual(len(self.endpoint.attempts), 1)
+        self.assertEqual((self.pool.checkouts, self.pool.reuses), (2, 1))
+
+        self.pool.release("key", protocol)
+        self.pool.getConnection("other", self.endpoint)
+        self.assertEqual(len(self.endpoint.attempts), 2)
+
+
+    def test_mostRecentFirst(self):
+        """
+        The idle connection released most recently is reused first.
+        """
+        first = self.connection()
+        second = self.connection()
+        self.pool.release("key", first)
+        self.pool.release("key", second)
+        result = []
+        self.pool.getConnection("key", self.endpoint).addCallback(
+            result.append)
+        self.assertEqual(result, [second])
+
+
+    def test_longestIdleFirst(self):
+        """
+        If C{reuseMostRecent} is C{False}, the connection idle longest is
+        reused first.
+        """
+        self.pool.reuseMostRecent = False
+        first = self.connection()
+        second = self.connection()
+        self.pool.release("key", first)
+        self.pool.release("key", second)
+        result = []
+        self.pool.getConnection("key", self.endpoint).addCallback(
+            result.append)
+        self.assertEqual(result, [first])
+
+
+    def test_withoutReactorTime(self):
+        """
+        Connections can be checked out of a pool whose reactor can't tell the
+        time, without being timed.
+        """
+        self.pool = EndpointConnectionPool(None, self.factory)
+        self.assertIsInstance(self.connection(), Protocol)
+        self.assertEqual((self.pool.connectTime, self.pool.checkoutTime),
+                         (0, 0))
+
+
+    def test_healthCheck(self):
+        """
+        Idle connections which fail the health check when they would be
+        reused are closed and forgotten, and the next is tried.
+        """
+        checked = []
+        broken = []
+        def healthCheck(connection):
+            checked.append(connection)
+            return connection not in broken
+        self.pool = EndpointConnectionPool(self.clock, self.factory,
+                                           healthCheck)
+        healthy = self.connection()
+        unhealthy = self.connection()
+        self.pool.release("key", healthy)
+        self.pool.release("key", unhealthy)
+        broken.append(unhealthy)
+        unhealthy.transport.loseConnection = lambda: checked.append("closed")
+        del checked[:]
+
+        result = []
+        self.pool.getConnection("key", self.endpoint).addCallback(
+            result.append)
+        self.assertEqual(result, [healthy])
+        self.assertEqual(checked, [unhealthy, "closed", healthy])
+        self.assertEqual(self.pool._idle, {})
+
+
+    def test_defaultHealthCheck(self):
+        """
+        By default, connections whose transports are disconnecting are not
+        reused.
+        """
+        protocol = self.connection()
+        self.pool.release("key", protocol)
+        protocol.transport.loseConnection()
+        self.pool.getConnection("key", self.endpoint)
+        self.assertEqual(len(self.endpoint.attempts), 2)
+
+
+    def test_releaseUnhealthy(self):
+        """
+        A connection which fails the health check when it is released is
+        closed rather than kept.
+        """
+        self.pool = EndpointConnectionPool(
+            self.clock, self.factory, lambda connection: False)
+        protocol = self.connection()
+        self.pool.release("key", protocol)
+        self.assertTrue(protocol.transport.disconnecting)
+        self.assertEqual(self.pool._idle, {})
+
+
+    def test_maxIdlePerKey(self):
+        """
+        When more than C{maxIdlePerKey} connections are idle for a key, the
+        one idle longest is closed.
+        """
+        connections = [self.connection() for i in range(3)]
+        for protocol in connections:
+            self.pool.release("key", protocol)
+        self.assertEqual(self.pool._idle, {"key": connections[1:]})
+        self.assertEqual(
+            [protocol.transport.disconnecting for protocol in connections],
+            [True, False, False])
+        self.assertEqual(self.pool.evictions, 1)
+
+
+    def test_idleTimeout(self):
+        """
+        Idle connections are closed once they have been idle for
+        C{idleTimeout} seconds, by a single timer.
+        """
+        first, second = self.connection(), self.connection()
+        self.pool.release("key", first)
+        self.clock.advance(100)
+        self.pool.release("key", second)
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+
+        self.clock.advance(139)
+        self.assertFalse(first.transport.disconnecting)
+        self.clock.advance(1)
+        self.assertTrue(first.transport.disconnecting)
+        self.assertFalse(second.transport.disconnecting)
+        self.assertEqual(self.pool._idle, {"key": [second]})
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+
+        self.clock.advance(100)
+        self.assertTrue(second.transport.disconnecting)
+        self.assertEqual(self.pool._idle, {})
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+        self.assertEqual(self.pool.evictions, 2)
+
+
+    def test_reusedNotTimedOut(self):
+        """
+        A connection which is checked out again is not closed when it would
+        have timed out.
+        """
+        protocol = self.connection()
+        self.pool.release("key", protocol)
+        self.pool.getConnection("key", self.endpoint)
+        self.clock.advance(self.pool.idleTimeout + 1)
+        self.assertFalse(protocol.transport.disconnecting)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_maxPerKey(self):
+        """
+        Once C{maxPerKey} connections for a key are checked out or being
+        connected, further requests wait, in order, for one to be released.
+        """
+        self.pool.maxPerKey = 1
+        protocol = self.connection()
+        result = []
+        for i in range(2):
+            self.pool.getConnection("key", self.endpoint).addCallback(
+                result.append)
+        self.assertEqual(result, [])
+        self.assertEqual(len(self.endpoint.attempts), 1)
+
+        self.pool.release("key", protocol)
+        self.assertEqual(result, [protocol])
+        self.pool.release("key", protocol)
+        self.assertEqual(result, [protocol, protocol])
+        self.assertEqual(self.pool._waiting, {})
+
+
+    def test_maxPerKeyDiscard(self):
+        """
+        Discarding a connection closes it and lets a waiting request connect.
+        """
+        self.pool.maxPerKey = 1
+        protocol = self.connection()
+        result = []
+        self.pool.getConnection("key", self.endpoint).addCallback(
+            result.append)
+        self.pool.discard("key", protocol)
+        self.assertTrue(protocol.transport.disconnecting)
+        self.assertEqual(len(self.endpoint.attempts), 2)
+        self.assertEqual(result, [self.endpoint.succeed()])
+
+
+    def test_connectFailure(self):
+        """
+        A failed connection attempt is reported to the caller, counted, and
+        lets a waiting request try to connect.
+        """
+        self.pool.maxPerKey = 1
+        first = self.pool.getConnection("key", self.endpoint)
+        result = []
+        self.pool.getConnection("key", self.endpoint).addCallback(
+            result.append)
+        self.endpoint.attempts[0][1].errback(ConnectionRefusedError())
+        self.failureResultOf(first, ConnectionRefusedError)
+        self.assertEqual(self.pool.connectFailures, 1)
+        self.assertEqual(result, [self.endpoint.succeed()])
+
+
+    def test_cancelWaiting(self):
+        """
+        Cancelling a request which is waiting for a connection withdraws it.
+        """
+        self.pool.maxPerKey = 1
+        protocol = self.connection()
+        d = self.pool.getConnection("key", self.endpoint)
+        d.cancel()
+        self.failureResultOf(d, CancelledError)
+        self.assertEqual(self.pool._waiting, {})
+        self.pool.release("key", protocol)
+        self.assertEqual(self.pool._idle, {"key": [protocol]})
+
+
+    def test_cancelConnecting(self):
+        """
+        Cancelling a request whose connection is being made cancels the
+        connection attempt, including for requests which had to wait.
+        """
+        self.pool.maxPerKey = 1
+        first = self.pool.getConnection("key", self.endpoint)
+        second = self.pool.getConnection("key", self.endpoint)
+        first.cancel()
+        self.failureResultOf(first, CancelledError)
+        self.assertEqual(len(self.endpoint.attempts), 2)
+        second.cancel()
+        self.failureResultOf(second, CancelledError)
+        self.assertTrue(self.endpoint.attempts[1][1].called)
+        self.assertEqual(self.pool._active, {})
+
+
+    def test_latency(self):
+        """
+        The time spent connecting and the time callers wait for connections
+        are recorded.
+        """
+        self.pool.maxPerKey = 1
+        self.pool.getConnection("key", self.endpoint)
+        self.clock.advance(2)
+        protocol = self.endpoint.succeed()
+        self.pool.getConnection("key", self.endpoint)
+        self.clock.advance(3)
+        self.pool.release("key", protocol)
+        self.assertEqual(self.pool.connectTime, 2)
+        self.assertEqual(self.pool.checkoutTime, 5)
+        self.assertEqual((self.pool.checkouts, self.pool.reuses), (2, 1))
+
+
+    def test_closeCachedConnections(self):
+        """
+        L{EndpointConnectionPool.closeCachedConnections} closes and forgets all
+        idle connections and stops the idle timer.
+        """
+        connections = [self.connection("a"), self.connection("b")]
+        for key, protocol in zip(["a", "b"], connections):
+            self.pool.release(key, protocol)
+        self.successResultOf(self.pool.closeCachedConnections())
+        self.assertEqual(
+            [protocol.transport.disconnecting for protocol in connections],
+            [True, True])
+        self.assertEqual(self.pool._idle, {})
+        self.assertEqual(self.clock.getDelayedCalls(), [])
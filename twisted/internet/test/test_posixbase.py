@@ -7,10 +7,16 @@ Tests for L{twisted.internet.posixbase} and supporting code.
 
 from __future__ import division, absolute_import
 
+import errno
+import os
+import select
+
 from twisted.python.compat import _PY3
-from twisted.trial.unittest import TestCase
+from twisted.trial.unittest import SkipTest, TestCase
 from twisted.internet.defer import Deferred
 from twisted.internet.posixbase import PosixReactorBase, _Waker
+from twisted.internet.posixbase import _PollLikeMixin, _EventFDWaker
+from twisted.internet.posixbase import _eventfd
 from twisted.internet.protocol import ServerFactory
 
 skipSockets = None
@@ -105,6 +111,191 @@ class PosixReactorBaseTests(TestCase):
         self.assertNotIn(writer, reactor._writers)
 
 
+    def test_afterForkReplacesWaker(self):
+        """
+        L{PosixReactorBase._afterFork} closes the waker, which a forked
+        process shares with its parent, and installs a new one.
+        """
+        reactor = TrivialReactor()
+        waker = reactor.waker
+        closed = []
+        self.patch(waker, "connectionLost", closed.append)
+        reactor._afterFork()
+        self._checkWaker(reactor)
+        self.assertIsNot(reactor.waker, waker)
+        self.assertNotIn(waker, reactor._readers)
+        self.assertNotIn(waker, reactor._internalReaders)
+        self.assertEqual(closed, [None])
+
+
+
+class EventFDTests(TestCase):
+    """
+    Tests for L{twisted.internet._eventfd}, the C{ctypes} binding used where
+    the C{os} module does not have C{eventfd}.
+    """
+    def setUp(self):
+        try:
+            from twisted.internet import _eventfd
+        except ImportError as e:
+            raise SkipTest(str(e))
+        self.eventfd = _eventfd
+        self.fd = _eventfd.eventfd(
+            3, _eventfd.EFD_NONBLOCK | _eventfd.EFD_CLOEXEC)
+        self.addCleanup(os.close, self.fd)
+
+
+    def test_counter(self):
+        """
+        L{_eventfd.eventfd_write} adds to the counter, and
+        L{_eventfd.eventfd_read} returns it and resets it.
+        """
+        self.eventfd.eventfd_write(self.fd, 2)
+        self.eventfd.eventfd_write(self.fd, 5)
+        self.assertEqual(self.eventfd.eventfd_read(self.fd), 10)
+        error = self.assertRaises(
+            OSError, self.eventfd.eventfd_read, self.fd)
+        self.assertEqual(error.errno, errno.EAGAIN)
+
+
+    def test_flags(self):
+        """
+        L{_eventfd.EFD_CLOEXEC} and L{_eventfd.EFD_NONBLOCK} make the
+        descriptor close-on-exec and non-blocking.
+        """
+        import fcntl
+        self.assertTrue(fcntl.fcntl(self.fd, fcntl.F_GETFD) & fcntl.FD_CLOEXEC)
+        self.assertTrue(fcntl.fcntl(self.fd, fcntl.F_GETFL) & os.O_NONBLOCK)
+
+
+    def test_error(self):
+        """
+        L{_eventfd.eventfd} raises L{OSError} if C{eventfd(2)} fails.
+        """
+        error = self.assertRaises(OSError, self.eventfd.eventfd, 0, -1)
+        self.assertEqual(error.errno, errno.EINVAL)
+
+
+    def test_waker(self):
+        """
+        Where C{eventfd} is available, reactors are woken up through an
+        L{_EventFDWaker}.
+        """
+        self.assertIdentical(_Waker, _EventFDWaker)
+
+
+
+class EventFDWakerTests(TestCase):
+    """
+    Tests for L{_EventFDWaker}.
+    """
+    if _eventfd is None:
+        skip = "eventfd is not available on this platform."
+
+    def setUp(self):
+        self.waker = _EventFDWaker(None)
+        self.addCleanup(self.waker.connectionLost, None)
+
+
+    def _readable(self):
+        return bool(select.select([self.waker.fileno()], [], [], 0)[0])
+
+
+    def test_wakeUp(self):
+        """
+        L{_EventFDWaker.wakeUp} makes the descriptor readable, and one
+        L{_EventFDWaker.doRead} consumes any number of wakeups.
+        """
+        self.assertFalse(self._readable())
+        self.waker.wakeUp()
+        self.waker.wakeUp()
+        self.assertTrue(self._readable())
+        self.waker.doRead()
+        self.assertFalse(self._readable())
+
+
+    def test_doReadWithoutWakeUp(self):
+        """
+        L{_EventFDWaker.doRead} does nothing if there was no wakeup.
+        """
+        self.waker.doRead()
+        self.assertFalse(self._readable())
+
+
+    def test_connectionLost(self):
+        """
+        L{_EventFDWaker.connectionLost} closes the descriptor once, and
+        L{_EventFDWaker.wakeUp} does nothing afterwards.
+        """
+        fd = self.waker.fileno()
+        self.waker.connectionLost(None)
+        self.assertRaises(OSError, os.fstat, fd)
+        self.waker.wakeUp()
+
+
+
+class PollLikeReactor(_PollLikeMixin, TrivialReactor):
+    """
+    A L{TrivialReactor} with the read and write dispatch of poll-like
+    reactors.
+    """
+    _POLL_DISCONNECTED = 1
+    _POLL_IN = 2
+    _POLL_OUT = 4
+
+    _reads = ()
+
+
+
+class Descriptor(object):
+    """
+    A descriptor whose C{doRead} and C{doWrite} advance a fake clock.
+
+    @ivar clock: A one element C{list} holding the current time.
+    """
+    def __init__(self, clock, readTime, writeTime):
+        self.clock = clock
+        self.readTime = readTime
+        self.writeTime = writeTime
+
+
+    def fileno(self):
+        return 3
+
+
+    def doRead(self):
+        self.clock[0] += self.readTime
+
+
+    def doWrite(self):
+        self.clock[0] += self.writeTime
+
+
+
+class InstrumentedReadWriteTests(TestCase):
+    """
+    Tests for the instrumentation of C{doRead} and C{doWrite} by
+    L{PosixReactorBase._doReadOrWrite}.
+    """
+    def test_slowReadAndWrite(self):
+        """
+        A C{doRead} or C{doWrite} which takes at least C{slowThreshold}
+        seconds is reported to L{IReactorInstrumentation.slowCall} by the
+        qualified name of the descriptor's class and the method.
+        """
+        from twisted.internet.test.test_base import RecordingInstrumentation
+        reactor = PollLikeReactor()
+        clock = [0]
+        reactor.seconds = lambda: clock[0]
+        instrumentation = RecordingInstrumentation()
+        reactor.setInstrumentation(instrumentation)
+        descriptor = Descriptor(clock, 2, 0.5)
+        reactor._doReadOrWrite(
+            descriptor, 3, reactor._POLL_IN | reactor._POLL_OUT)
+        self.assertEqual(instrumentation.events, [
+                ("slowCall", __name__ + ".Descriptor.doRead", 2)])
+
+
 
 class TCPPortTests(TestCase):
     """
@@ -0,0 +1,485 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.internet.processpool}.
+"""
+
+import os
+import pickle
+import sys
+import time
+from StringIO import StringIO
+
+from twisted.trial.unittest import TestCase
+from twisted.internet import reactor, interfaces, defer
+from twisted.internet import _processworker
+from twisted.internet.processpool import (
+    ProcessPool, deferToProcessPool, ProcessPoolFull, WorkerCrashed,
+    RemoteCallError, WorkerProtocol, CallFunction, _BigString, _functionName,
+    _unpickleResponse, _WORKER_AMP_STDIN, _WORKER_AMP_STDOUT)
+from twisted.protocols import amp
+
+
+
+def add(a, b=0):
+    """
+    Return C{a + b}, in a worker process.
+    """
+    return a + b
+
+
+
+def fail(message):
+    """
+    Raise a L{ValueError}.
+    """
+    raise ValueError(message)
+
+
+
+class UnpicklableError(Exception):
+    """
+    An exception which cannot be pickled, because it refers to a function
+    which is not defined at module level.
+    """
+    def __init__(self):
+        Exception.__init__(self, "unpicklable")
+        self.function = lambda: None
+
+
+
+def failUnpicklably():
+    """
+    Raise an L{UnpicklableError}.
+    """
+    raise UnpicklableError()
+
+
+
+def crash():
+    """
+    Exit the worker process without responding.
+    """
+    os._exit(1)
+
+
+
+def sleep(seconds):
+    """
+    Sleep and then return the worker's process ID.
+    """
+    time.sleep(seconds)
+    return os.getpid()
+
+
+
+class BigStringTests(TestCase):
+    """
+    Tests for L{_BigString}.
+    """
+    def test_roundTrip(self):
+        """
+        A string longer than L{amp.MAX_VALUE_LENGTH} is split into values no
+        longer than that and reassembled.
+        """
+        value = ''.join([chr(i % 256) for i in range(amp.MAX_VALUE_LENGTH)])
+        value = value * 2 + 'x'
+        argument = _BigString()
+        strings = {}
+        argument.toBox('data', strings, {'data': value}, None)
+        self.assertEqual(
+            sorted(strings), ['data', 'data.0', 'data.1', 'data.2'])
+        self.assertEqual(strings['data'], '3')
+        self.assertTrue(max([len(v) for v in strings.values()])
+                        <= amp.MAX_VALUE_LENGTH)
+        objects = {}
+        argument.fromBox('data', strings, objects, None)
+        self.assertEqual(objects, {'data': value})
+
+
+    def test_empty(self):
+        """
+        The empty string is sent as no chunks.
+        """
+        argument = _BigString()
+        strings = {}
+        argument.toBox('data', strings, {'data': ''}, None)
+        self.assertEqual(strings, {'data': '0'})
+        objects = {}
+        argument.fromBox('data', strings, objects, None)
+        self.assertEqual(objects, {'data': ''})
+
+
+    def test_optional(self):
+        """
+        An optional L{_BigString} which is C{None} is left out of the box,
+        and is C{None} when it is missing from one.
+        """
+        argument = _BigString(optional=True)
+        strings = {}
+        argument.toBox('data', strings, {'data': None}, None)
+        self.assertEqual(strings, {})
+        objects = {}
+        argument.fromBox('data', strings, objects, None)
+        self.assertEqual(objects, {'data': None})
+
+
+
+class WorkerProtocolTests(TestCase):
+    """
+    Tests for L{WorkerProtocol}, the worker side of the pool.
+    """
+    def call(self, function, *args, **kwargs):
+        """
+        Call C{function} as L{WorkerProtocol} would for a L{CallFunction}
+        command, and turn the response into a result or a failure.
+        """
+        response = WorkerProtocol().callFunction(
+            _functionName(function), pickle.dumps((args, kwargs)))
+        self.assertEqual(len(response), 1)
+        response.setdefault('result', None)
+        response.setdefault('failure', None)
+        return defer.maybeDeferred(_unpickleResponse, response)
+
+
+    def test_result(self):
+        """
+        The pickled result of the call is returned.
+        """
+        d = self.call(add, 1, b=2)
+        d.addCallback(self.assertEqual, 3)
+        return d
+
+
+    def test_exception(self):
+        """
+        An exception raised by the call is pickled and raised again.
+        """
+        d = self.call(fail, "bad")
+        d = self.assertFailure(d, ValueError)
+        d.addCallback(lambda e: self.assertEqual(e.args, ("bad",)))
+        return d
+
+
+    def test_unpicklableException(self):
+        """
+        An exception which cannot be pickled is replaced with a
+        L{RemoteCallError} holding the traceback.
+        """
+        d = self.call(failUnpicklably)
+        d = self.assertFailure(d, RemoteCallError)
+        d.addCallback(
+            lambda e: self.assertIn("UnpicklableError", e.args[0]))
+        return d
+
+
+    def test_unpicklableResult(self):
+        """
+        A result which cannot be pickled fails the call.
+        """
+        d = self.call(UnpicklableError)
+        return self.assertFailure(d, pickle.PicklingError)
+
+
+
+class FunctionNameTests(TestCase):
+    """
+    Tests for L{_functionName}.
+    """
+    def test_moduleFunction(self):
+        """
+        A module level function is named by its module and name.
+        """
+        self.assertEqual(_functionName(add), __name__ + ".add")
+
+
+    def test_builtin(self):
+        """
+        A builtin function is named by its module and name.
+        """
+        self.assertEqual(_functionName(os.getpid), os.name + ".getpid")
+
+
+    def test_notModuleLevel(self):
+        """
+        L{_functionName} raises L{TypeError} for a callable which can't be
+        found by its name.
+        """
+        self.assertRaises(TypeError, _functionName, lambda: None)
+        self.assertRaises(TypeError, _functionName, self.test_notModuleLevel)
+
+
+    def test_main(self):
+        """
+        L{_functionName} raises L{TypeError} for a function defined in
+        C{__main__}, since C{__main__} is a different module in the workers,
+        with a message saying to move the function.
+        """
+        def processPoolMain():
+            pass
+        processPoolMain.__module__ = '__main__'
+        mainModule = sys.modules['__main__']
+        mainModule.processPoolMain = processPoolMain
+        self.addCleanup(delattr, mainModule, 'processPoolMain')
+        error = self.assertRaises(TypeError, _functionName, processPoolMain)
+        self.assertIn("move it into an importable module", str(error))
+
+
+
+class FakeRead(object):
+    """
+    A replacement for C{os.read} returning canned data.
+
+    @ivar chunks: The C{list} of strings still to return.
+    """
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+
+    def __call__(self, fd, size):
+        assert fd == _WORKER_AMP_STDIN
+        if self.chunks:
+            return self.chunks.pop(0)
+        return ''
+
+
+
+class BoxCollector(object):
+    """
+    An AMP box receiver which collects the boxes it receives.
+
+    @ivar boxes: A C{list} of the boxes received.
+    """
+    def __init__(self):
+        self.boxes = []
+
+
+    def startReceivingBoxes(self, sender):
+        pass
+
+
+    def ampBoxReceived(self, box):
+        self.boxes.append(box)
+
+
+
+class MainTests(TestCase):
+    """
+    Tests for L{twisted.internet._processworker.main}.
+    """
+    def test_main(self):
+        """
+        L{_processworker.main} answers the commands read from its AMP input
+        on its AMP output, and returns when its input is closed.
+        """
+        output = StringIO()
+        output.close = lambda: None
+        def fdopen(fd, mode):
+            self.assertEqual(fd, _WORKER_AMP_STDOUT)
+            return output
+        command = amp.AmpBox(_command=CallFunction.commandName, _ask='1')
+        _BigString().toBox(
+            'arguments', command, {'arguments': pickle.dumps(((1, 2), {}))},
+            None)
+        command['function'] = _functionName(add)
+        data = command.serialize()
+        _processworker.main(fdopen, FakeRead([data[:10], data[10:]]))
+        receiver = BoxCollector()
+        amp.BinaryBoxProtocol(receiver).dataReceived(output.getvalue())
+        boxes = receiver.boxes
+        self.assertEqual(len(boxes), 1)
+        self.assertEqual(boxes[0]['_answer'], '1')
+        self.assertEqual(pickle.loads(boxes[0]['result.0']), 3)
+
+
+
+class ProcessPoolTests(TestCase):
+    """
+    Tests for L{ProcessPool}, running real worker processes.
+    """
+    if interfaces.IReactorProcess(reactor, None) is None:
+        skip = "This reactor does not support spawning processes."
+
+    def makePool(self, *args, **kwargs):
+        """
+        Create and start a L{ProcessPool} which is stopped after the test.
+        """
+        pool = ProcessPool(*args, **kwargs)
+        pool.startService()
+        self.addCleanup(pool.stopService)
+        return pool
+
+
+    def test_call(self):
+        """
+        L{deferToProcessPool} returns a L{Deferred} which fires with the
+        result of calling the function with the given arguments in a worker
+        process.
+        """
+        pool = self.makePool(1)
+        d = deferToProcessPool(pool, add, 40, b=2)
+        d.addCallback(self.assertEqual, 42)
+        return d
+
+
+    def test_differentProcess(self):
+        """
+        The function is called in another process.
+        """
+        pool = self.makePool(1)
+        d = deferToProcessPool(pool, os.getpid)
+        d.addCallback(self.assertNotEqual, os.getpid())
+        return d
+
+
+    def test_exception(self):
+        """
+        The L{Deferred} fails with the exception raised by the function.
+        """
+        pool = self.makePool(1)
+        d = deferToProcessPool(pool, fail, "bad")
+        return self.assertFailure(d, ValueError)
+
+
+    def test_notModuleLevel(self):
+        """
+        A function which the workers cannot import by name is refused.
+        """
+        pool = self.makePool(1)
+        d = deferToProcessPool(pool, lambda: None)
+        return self.assertFailure(d, TypeError)
+
+
+    def test_largeArgumentsAndResult(self):
+        """
+        Arguments and results larger than an AMP value are passed whole.
+        """
+        pool = self.makePool(1)
+        data = 'x' * (amp.MAX_VALUE_LENGTH * 3)
+        d = deferToProcessPool(pool, add, data, data)
+        d.addCallback(self.assertEqual, data * 2)
+        return d
+
+
+    def test_concurrency(self):
+        """
+        Each worker runs one call at a time, and calls are spread over all
+        the workers.
+        """
+        pool = self.makePool(2)
+        d = defer.gatherResults(
+            [deferToProcessPool(pool, sleep, 0.5) for i in range(2)])
+        d.addCallback(lambda pids: self.assertEqual(len(set(pids)), 2))
+        return d
+
+
+    def test_queuedBeforeStart(self):
+        """
+        Calls made before the pool is started run once it is.
+        """
+        pool = ProcessPool(1)
+        d = deferToProcessPool(pool, add, 1, 2)
+        self.assertNoResult(d)
+        pool.startService()
+        self.addCleanup(pool.stopService)
+        d.addCallback(self.assertEqual, 3)
+        return d
+
+
+    def test_maxPending(self):
+        """
+        When C{maxPending} calls are already waiting for a worker, further
+        calls fail with L{ProcessPoolFull}.
+        """
+        pool = self.makePool(1, maxPending=1)
+        running = deferToProcessPool(pool, add, 1)
+        waiting = deferToProcessPool(pool, add, 2)
+        refused = deferToProcessPool(pool, add, 3)
+        self.failureResultOf(refused, ProcessPoolFull)
+        return defer.gatherResults([running, waiting])
+
+
+    def test_maxTasksPerWorker(self):
+        """
+        A worker is replaced with a new process after C{maxTasksPerWorker}
+        calls.
+        """
+        pool = self.makePool(1, maxTasksPerWorker=2)
+        d = defer.gatherResults(
+            [deferToProcessPool(pool, os.getpid) for i in range(4)])
+        def checkPIDs(pids):
+            self.assertEqual(pids[0], pids[1])
+            self.assertEqual(pids[2], pids[3])
+            self.assertNotEqual(pids[0], pids[2])
+        d.addCallback(checkPIDs)
+        return d
+
+
+    def test_crash(self):
+        """
+        If a worker exits during a call, the call fails with
+        L{WorkerCrashed} and a new worker runs later calls.
+        """
+        pool = self.makePool(1)
+        crashed = deferToProcessPool(pool, crash)
+        later = deferToProcessPool(pool, add, 1, 2)
+        self.assertFailure(crashed, WorkerCrashed)
+        later.addCallback(self.assertEqual, 3)
+        return defer.gatherResults([crashed, later])
+
+
+    def test_stopRunsPendingCalls(self):
+        """
+        L{ProcessPool.stopService} lets the calls already made finish, and
+        returns a L{Deferred} which fires once the workers have exited.
+        """
+        pool = ProcessPool(1)
+        pool.startService()
+        results = [deferToProcessPool(pool, add, i) for i in range(3)]
+        stopped = pool.stopService()
+        d = defer.gatherResults(results + [stopped])
+        def check(result):
+            self.assertEqual(result, [0, 1, 2, None])
+            self.assertEqual(pool._workers, set())
+        d.addCallback(check)
+        return d
+
+
+    def test_crashWhileStopping(self):
+        """
+        If a worker exits during a call while the pool is stopping, a new
+        worker runs the calls still waiting before the pool stops.
+        """
+        pool = ProcessPool(1)
+        pool.startService()
+        crashed = deferToProcessPool(pool, crash)
+        later = deferToProcessPool(pool, add, 1, 2)
+        stopped = pool.stopService()
+        self.assertFailure(crashed, WorkerCrashed)
+        d = defer.gatherResults([crashed, later, stopped])
+        def check(result):
+            self.assertEqual(result[1:], [3, None])
+            self.assertEqual(pool._workers, set())
+        d.addCallback(check)
+        return d
+
+
+    def test_maxTasksPerWorkerWhileStopping(self):
+        """
+        A worker which reaches C{maxTasksPerWorker} calls while the pool is
+        stopping is replaced if calls are still waiting, and the pool stops
+        once they have run.
+        """
+        pool = ProcessPool(1, maxTasksPerWorker=1)
+        pool.startService()
+        results = [deferToProcessPool(pool, os.getpid) for i in range(2)]
+        stopped = pool.stopService()
+        d = defer.gatherResults(results + [stopped])
+        def check(result):
+            first, second, stopResult = result
+            self.assertNotEqual(first, second)
+            self.assertIdentical(stopResult, None)
+            self.assertEqual(pool._workers, set())
+        d.addCallback(check)
+        return d
@@ -16,8 +16,9 @@ import socket
 from functools import wraps
 
 from zope.interface import implementer
-from zope.interface.verify import verifyClass
+from zope.interface.verify import verifyClass, verifyObject
 
+from twisted.python.compat import intToBytes
 from twisted.python.runtime import platform
 from twisted.python.failure import Failure
 from twisted.python import log
@@ -25,7 +26,7 @@ from twisted.python import log
 from twisted.trial.unittest import SkipTest, TestCase
 from twisted.internet.error import (
     ConnectionLost, UserError, ConnectionRefusedError, ConnectionDone,
-    ConnectionAborted, DNSLookupError)
+    ConnectionAborted, DNSLookupError, CannotListenError)
 from twisted.internet.test.connectionmixins import (
     LogObserverMixin, ConnectionTestsMixin, StreamClientTestsMixin,
     findFreePort, ConnectableProtocol, EndpointCreator,
@@ -34,7 +35,7 @@ from twisted.internet.test.reactormixins import (
     ReactorBuilder, needsRunningReactor)
 from twisted.internet.interfaces import (
     ILoggingContext, IConnector, IReactorFDSet, IReactorSocket, IReactorTCP,
-    IResolverSimple, ITLSTransport)
+    IResolverSimple, ITLSTransport, ISendFileTransport, IBufferedProtocol)
 from twisted.internet.address import IPv4Address, IPv6Address
 from twisted.internet.defer import (
     Deferred, DeferredList, maybeDeferred, gatherResults, succeed, fail)
@@ -42,7 +43,9 @@ from twisted.internet.endpoints import TCP4ServerEndpoint, TCP4ClientEndpoint
 from twisted.internet.protocol import ServerFactory, ClientFactory, Protocol
 from twisted.internet.interfaces import (
     IPushProducer, IPullProducer, IHalfCloseableProtocol)
-from twisted.internet.tcp import Connection, Server, _resolveIPv6
+from twisted.internet import tcp, fdesc
+from twisted.internet.tcp import (
+    Connection, Server, Port, AcceptPolicy, AcceptStatistics, _resolveIPv6)
 from twisted.internet.test.test_core import ObjectModelIntegrationMixin
 from twisted.test.test_tcp import MyClientFactory, MyServerFactory
 from twisted.test.test_tcp import ClosingFactory, ClientStartStopFactory
@@ -329,6 +332,611 @@ class TCPServerTests(TestCase):
 
 
 
+class AcceptPolicyTests(TestCase):
+    """
+    Tests for L{AcceptPolicy}.
+    """
+    def test_drained(self):
+        """
+        If accepting emptied the listen queue, the next limit is the number
+        of connections which were accepted.
+        """
+        self.assertEqual(AcceptPolicy().nextLimit(100, 7, True, 0), 7)
+
+
+    def test_limitReached(self):
+        """
+        If the limit was reached without emptying the listen queue, the next
+        limit is larger by C{step}.
+        """
+        self.assertEqual(AcceptPolicy(step=5).nextLimit(10, 10, False, 0), 15)
+
+
+    def test_stoppedEarly(self):
+        """
+        If accepting stopped early for some other reason, the limit is
+        unchanged.
+        """
+        self.assertEqual(AcceptPolicy().nextLimit(10, 3, False, 0), 10)
+
+
+    def test_bounds(self):
+        """
+        The next limit is never less than C{minimum} or more than C{maximum}.
+        """
+        policy = AcceptPolicy(minimum=2, maximum=25)
+        self.assertEqual(policy.nextLimit(100, 0, True, 0), 2)
+        self.assertEqual(policy.nextLimit(20, 20, False, 0), 25)
+
+
+    def test_timeBudget(self):
+        """
+        If accepting took longer than C{timeBudget}, the next limit is the
+        number of connections which could have been accepted within it.
+        """
+        policy = AcceptPolicy(timeBudget=1.0)
+        self.assertEqual(policy.nextLimit(100, 40, False, 4.0), 10)
+        self.assertEqual(policy.nextLimit(100, 40, True, 0.5), 40)
+
+
+
+class FakeListeningSocket(object):
+    """
+    A fake listening socket.
+
+    @ivar results: A C{list} of the C{(socket, address)} tuples which
+        L{FakeListeningSocket.accept} will return, or exceptions it will raise,
+        in order.  Once they are used up it raises C{EAGAIN}.
+    """
+    def __init__(self, results):
+        self.results = results
+
+
+    def accept(self):
+        if not self.results:
+            raise socket.error(errno.EAGAIN, "")
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+
+class _FakeClockFDSetReactor(_FakeFDSetReactor):
+    """
+    A L{_FakeFDSetReactor} with a C{seconds} method which returns C{now}.
+    """
+    now = 0.0
+
+    def seconds(self):
+        return self.now
+
+
+
+class PortAcceptTests(TestCase):
+    """
+    Whitebox tests for the accepting of connections by L{Port.doRead}.
+    """
+    def setUp(self):
+        self.patch(fdesc, "_setCloseOnExec", lambda fd: None)
+        self.reactor = _FakeClockFDSetReactor()
+        self.factory = ServerFactory()
+        self.factory.protocol = Protocol
+        self.port = Port(0, self.factory, reactor=self.reactor)
+        self.port.numberAccepts = self.port.acceptPolicy.initial
+
+
+    def queue(self, count):
+        """
+        Put C{count} connections in the port's listen queue.
+        """
+        self.port.socket = FakeListeningSocket(
+            [(FakeSocket(b""), ("127.0.0.1", 1234 + i))
+             for i in range(count)])
+
+
+    def test_drained(self):
+        """
+        L{Port.doRead} accepts every waiting connection up to the limit and
+        then sets the limit to the number there were.
+        """
+        self.queue(3)
+        self.port.doRead()
+        self.assertEqual(self.port.socket.results, [])
+        self.assertEqual(self.port.numberAccepts, 3)
+        stats = self.port.acceptStatistics
+        self.assertEqual(
+            (stats.wakeups, stats.accepted, stats.maxAccepted), (1, 3, 3))
+        self.assertEqual(len(self.reactor.getReaders()), 3)
+
+
+    def test_limitReached(self):
+        """
+        L{Port.doRead} accepts no more than C{numberAccepts} connections, and
+        raises the limit if there were more.
+        """
+        self.queue(5)
+        self.port.numberAccepts = 2
+        self.port.doRead()
+        self.assertEqual(len(self.port.socket.results), 3)
+        self.assertEqual(self.port.numberAccepts, 22)
+        self.assertEqual(self.port.acceptStatistics.accepted, 2)
+
+
+    def test_resourceError(self):
+        """
+        L{Port.doRead} stops accepting and counts a resource error when
+        C{accept} fails with C{EMFILE}.
+        """
+        self.queue(2)
+        self.port.socket.results.insert(1, socket.error(errno.EMFILE, ""))
+        self.port.doRead()
+        stats = self.port.acceptStatistics
+        self.assertEqual((stats.accepted, stats.resourceErrors), (1, 1))
+        self.assertEqual(self.port.numberAccepts, 100)
+
+
+    def test_time(self):
+        """
+        L{Port.doRead} records the time spent accepting, and the part of it
+        spent building and connecting protocols.
+        """
+        reactor = self.reactor
+        class SlowProtocol(Protocol):
+            def connectionMade(self):
+                reactor.now += 1
+        self.factory.protocol = SlowProtocol
+        self.queue(3)
+        self.port.doRead()
+        stats = self.port.acceptStatistics
+        self.assertEqual((stats.acceptTime, stats.protocolTime), (3.0, 3.0))
+
+
+    def test_timeBudget(self):
+        """
+        If the port's L{AcceptPolicy} has a time budget, L{Port.doRead} stops
+        accepting once it is spent and lowers the limit to fit.
+        """
+        reactor = self.reactor
+        class SlowProtocol(Protocol):
+            def connectionMade(self):
+                reactor.now += 1
+        self.factory.protocol = SlowProtocol
+        self.port.acceptPolicy = AcceptPolicy(timeBudget=1.5)
+        self.queue(5)
+        self.port.doRead()
+        stats = self.port.acceptStatistics
+        self.assertEqual((stats.accepted, stats.budgetExceeded), (2, 1))
+        self.assertEqual(self.port.numberAccepts, 1)
+
+
+    def test_acceptsPerWakeup(self):
+        """
+        L{AcceptStatistics.acceptsPerWakeup} is the mean number of
+        connections accepted each time the port was readable.
+        """
+        stats = AcceptStatistics()
+        self.assertEqual(stats.acceptsPerWakeup(), 0.0)
+        self.queue(3)
+        self.port.doRead()
+        self.queue(0)
+        self.port.doRead()
+        self.assertEqual(self.port.acceptStatistics.acceptsPerWakeup(), 1.5)
+
+
+
+class ReusePortTests(TestCase):
+    """
+    Tests for the C{reusePort} option of L{twisted.internet.tcp.Port}.
+    """
+    if tcp._SO_REUSEPORT is None:
+        skip = "SO_REUSEPORT is not supported on this platform"
+
+    def listen(self, port=0, reusePort=True):
+        """
+        Start listening on C{port} on the loopback interface with a new
+        L{tcp.Port}, to be stopped when the test is over.
+        """
+        from twisted.internet import reactor
+        port = tcp.Port(port, ServerFactory(), interface="127.0.0.1",
+                        reactor=reactor, reusePort=reusePort)
+        port.startListening()
+        self.addCleanup(port.stopListening)
+        return port
+
+
+    def test_reusePort(self):
+        """
+        Several L{tcp.Port}s created with C{reusePort=True} can listen on the
+        same port number.
+        """
+        first = self.listen()
+        second = self.listen(first.getHost().port)
+        self.assertEqual(first.getHost(), second.getHost())
+        self.assertEqual(
+            second.socket.getsockopt(socket.SOL_SOCKET, tcp._SO_REUSEPORT), 1)
+
+
+    def test_withoutReusePort(self):
+        """
+        A L{tcp.Port} created without C{reusePort=True} cannot listen on a
+        port which another L{tcp.Port} is listening on, even if that one set
+        C{SO_REUSEPORT}.
+        """
+        first = self.listen()
+        self.assertRaises(
+            CannotListenError, self.listen, first.getHost().port, False)
+
+
+    def test_unsupported(self):
+        """
+        If C{SO_REUSEPORT} is not supported, a L{tcp.Port} created with
+        C{reusePort=True} fails to listen with L{CannotListenError}.
+        """
+        self.patch(tcp, "_SO_REUSEPORT", None)
+        self.assertRaises(CannotListenError, self.listen)
+
+
+
+class FakeVectorSocket(FakeSocket):
+    """
+    A L{FakeSocket} which also supports C{sendmsg}.
+
+    @ivar sendmsgCalls: A C{list} of the lists of buffers passed to
+        L{FakeVectorSocket.sendmsg}.
+
+    @ivar sendmsgError: If not C{None}, an exception for
+        L{FakeVectorSocket.sendmsg} to raise.
+    """
+    sendmsgError = None
+
+    def __init__(self, data):
+        FakeSocket.__init__(self, data)
+        self.sendmsgCalls = []
+
+
+    def sendmsg(self, buffers):
+        """
+        I{Send} all of the given buffers, recording them separately.
+
+        @return: The total length of C{buffers}.
+        """
+        if self.sendmsgError is not None:
+            raise self.sendmsgError
+        self.sendmsgCalls.append([memoryview(b).tobytes() for b in buffers])
+        return sum(len(b) for b in buffers)
+
+
+
+class TCPVectoredWriteTests(TestCase):
+    """
+    Tests for the use of C{sendmsg} by L{twisted.internet.tcp.Connection} to
+    write buffered data without joining it together.
+    """
+    def setUp(self):
+        self.reactor = _FakeFDSetReactor()
+        class FakePort(object):
+            _realPortNumber = 3
+        self.FakePort = FakePort
+
+
+    def _server(self, skt):
+        return Server(
+            skt, Protocol(), ("", 0), self.FakePort(), None, self.reactor)
+
+
+    def test_sendmsgUsed(self):
+        """
+        If the socket has a C{sendmsg} method, the chunks given to C{write}
+        and C{writeSequence} are passed to it separately.
+        """
+        skt = FakeVectorSocket(b"")
+        server = self._server(skt)
+        server.write(b"foo")
+        server.writeSequence([b"bar", b"baz"])
+        self.assertIs(None, server.doWrite())
+        self.assertEqual(skt.sendmsgCalls, [[b"foo", b"bar", b"baz"]])
+        self.assertEqual(skt.sendBuffer, [])
+        self.assertNotIn(server, self.reactor.getWriters())
+
+
+    def test_sendWithoutSendmsg(self):
+        """
+        If the socket has no C{sendmsg} method, buffered data is joined and
+        written with C{send}.
+        """
+        skt = FakeSocket(b"")
+        server = self._server(skt)
+        self.assertFalse(server._vectoredWrites)
+        server.writeSequence([b"foo", b"bar"])
+        server.doWrite()
+        self.assertEqual([bytes(b) for b in skt.sendBuffer], [b"foobar"])
+
+
+    def test_sendmsgWouldBlock(self):
+        """
+        If C{sendmsg} fails with C{EWOULDBLOCK}, the data stays buffered.
+        """
+        skt = FakeVectorSocket(b"")
+        skt.sendmsgError = socket.error(errno.EWOULDBLOCK, "")
+        server = self._server(skt)
+        server.write(b"foo")
+        self.assertIs(None, server.doWrite())
+        self.assertEqual(server._tempDataBuffer, [b"foo"])
+        self.assertIn(server, self.reactor.getWriters())
+
+
+    def test_sendmsgConnectionLost(self):
+        """
+        If C{sendmsg} fails with any other error, C{doWrite} reports that the
+        connection was lost.
+        """
+        skt = FakeVectorSocket(b"")
+        skt.sendmsgError = socket.error(errno.ECONNRESET, "")
+        server = self._server(skt)
+        server.write(b"foo")
+        self.assertIsInstance(server.doWrite(), ConnectionLost)
+
+
+
+class FakeRecvIntoSocket(FakeSocket):
+    """
+    A L{FakeSocket} which also supports C{recv_into}.
+
+    @ivar recvIntoBuffers: A C{list} of the buffers passed to
+        L{FakeRecvIntoSocket.recv_into}.
+    """
+    def __init__(self, data):
+        FakeSocket.__init__(self, data)
+        self.recvIntoBuffers = []
+
+
+    def recv_into(self, buffer):
+        """
+        Copy C{self.data} into C{buffer}.
+
+        @return: The number of bytes copied.
+        """
+        self.recvIntoBuffers.append(buffer)
+        buffer[:len(self.data)] = self.data
+        return len(self.data)
+
+
+
+@implementer(IBufferedProtocol)
+class BufferedProtocol(Protocol):
+    """
+    An L{IBufferedProtocol} which records copies of the buffers it is given.
+
+    @ivar buffers: A C{list} of C{bytes} copied from the buffers passed to
+        L{BufferedProtocol.bufferReceived}.
+
+    @ivar data: A C{list} of the strings passed to
+        L{BufferedProtocol.dataReceived}.
+    """
+    def __init__(self):
+        self.buffers = []
+        self.data = []
+
+
+    def bufferReceived(self, data):
+        self.buffers.append(data.tobytes())
+
+
+    def dataReceived(self, data):
+        self.data.append(data)
+
+
+
+class TCPBufferedReadTests(TestCase):
+    """
+    Tests for the delivery of received data to L{IBufferedProtocol} providers
+    by L{twisted.internet.tcp.Connection.doRead}.
+    """
+    def test_bufferReceived(self):
+        """
+        If the protocol provides L{IBufferedProtocol}, C{doRead} reads into a
+        buffer with C{recv_into} and passes a view of the bytes read to
+        C{bufferReceived}.
+        """
+        skt = FakeRecvIntoSocket(b"someData")
+        protocol = BufferedProtocol()
+        conn = Connection(skt, protocol)
+        self.assertIs(None, conn.doRead())
+        self.assertEqual(protocol.buffers, [b"someData"])
+        self.assertEqual(protocol.data, [])
+
+
+    def test_bufferReused(self):
+        """
+        The same buffer, of C{bufferSize} bytes, is used for every read.
+        """
+        skt = FakeRecvIntoSocket(b"someData")
+        conn = Connection(skt, BufferedProtocol())
+        conn.doRead()
+        conn.doRead()
+        first, second = skt.recvIntoBuffers
+        self.assertIs(first, second)
+        self.assertEqual(len(first), conn.bufferSize)
+
+
+    def test_connectionDone(self):
+        """
+        If C{recv_into} reads nothing, C{doRead} reports that the connection
+        was closed cleanly.
+        """
+        conn = Connection(FakeRecvIntoSocket(b""), BufferedProtocol())
+        self.assertIsInstance(conn.doRead(), ConnectionDone)
+
+
+    def test_otherProtocols(self):
+        """
+        Protocols which do not provide L{IBufferedProtocol} are still given
+        new strings with C{dataReceived}.
+        """
+        skt = FakeRecvIntoSocket(b"someData")
+        protocol = Protocol()
+        received = []
+        protocol.dataReceived = received.append
+        conn = Connection(skt, protocol)
+        conn.doRead()
+        self.assertEqual(received, [b"someData"])
+        self.assertEqual(skt.recvIntoBuffers, [])
+
+
+    def test_protocolSwitched(self):
+        """
+        If the connection's protocol is replaced, C{doRead} delivers data in
+        the way the new protocol supports.
+        """
+        skt = FakeRecvIntoSocket(b"someData")
+        buffered = BufferedProtocol()
+        conn = Connection(skt, Protocol())
+        conn.doRead()
+        conn.protocol = buffered
+        conn.doRead()
+        self.assertEqual(buffered.buffers, [b"someData"])
+
+
+    def test_noRecvInto(self):
+        """
+        If the socket has no C{recv_into} method, L{IBufferedProtocol}
+        providers are given new strings with C{dataReceived}.
+        """
+        protocol = BufferedProtocol()
+        conn = Connection(FakeSocket(b"someData"), protocol)
+        conn.doRead()
+        self.assertEqual(protocol.data, [b"someData"])
+        self.assertEqual(protocol.buffers, [])
+
+
+
+class SendFileTests(TestCase):
+    """
+    Tests for L{twisted.internet.tcp.Connection.sendFile}.
+    """
+    if getattr(socket, "socketpair", None) is None:
+        skip = "socket.socketpair is not available"
+
+    def setUp(self):
+        self.reactor = _FakeFDSetReactor()
+        class FakePort(object):
+            _realPortNumber = 3
+        local, self.peer = socket.socketpair()
+        self.addCleanup(local.close)
+        self.addCleanup(self.peer.close)
+        self.peer.setblocking(False)
+        self.server = Server(
+            local, Protocol(), ("", 0), FakePort(), None, self.reactor)
+        self.received = []
+
+        self.content = b"".join(
+            [intToBytes(i) + b"\n" for i in range(20000)])
+        path = self.mktemp()
+        with open(path, "wb") as f:
+            f.write(self.content)
+        self.fileObject = open(path, "rb")
+        self.addCleanup(self.fileObject.close)
+
+
+    def _receive(self):
+        """
+        Read everything currently available from the other end of the
+        connection.
+        """
+        while True:
+            try:
+                data = self.peer.recv(2 ** 16)
+            except socket.error as e:
+                if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise
+            if not data:
+                return
+            self.received.append(data)
+
+
+    def _pump(self):
+        """
+        Let the server write for as long as it wants to, reading from the
+        other end of the connection in between.
+        """
+        while self.server in self.reactor.getWriters():
+            self.server.doWrite()
+            self._receive()
+        self._receive()
+
+
+    def test_interface(self):
+        """
+        L{twisted.internet.tcp.Server} provides L{ISendFileTransport}.
+        """
+        self.assertTrue(verifyObject(ISendFileTransport, self.server))
+
+
+    def test_sendFile(self):
+        """
+        L{Connection.sendFile} sends the whole file and returns a L{Deferred}
+        which fires with the number of bytes sent.
+        """
+        d = self.server.sendFile(self.fileObject)
+        self._pump()
+        self.assertEqual(b"".join(self.received), self.content)
+        self.assertEqual(self.successResultOf(d), len(self.content))
+        self.assertIs(self.server.producer, None)
+
+
+    def test_offsetAndCount(self):
+        """
+        L{Connection.sendFile} sends C{count} bytes starting at C{offset}.
+        """
+        d = self.server.sendFile(self.fileObject, 10, 70000)
+        self._pump()
+        self.assertEqual(b"".join(self.received), self.content[10:70010])
+        self.assertEqual(self.successResultOf(d), 70000)
+
+
+    def test_afterBufferedData(self):
+        """
+        Data written before L{Connection.sendFile} is called is sent before
+        the file.
+        """
+        self.server.write(b"header\r\n")
+        d = self.server.sendFile(self.fileObject, 0, 10)
+        self._pump()
+        self.assertEqual(b"".join(self.received),
+                         b"header\r\n" + self.content[:10])
+        self.assertEqual(self.successResultOf(d), 10)
+
+
+    def test_fallback(self):
+        """
+        If C{sendfile(2)} fails before anything has been sent, the file is
+        read and written to the connection instead.
+        """
+        if tcp._sendfile is None:
+            raise SkipTest("sendfile is not available")
+        def sendfile(*args):
+            raise OSError(errno.EINVAL, "Invalid argument")
+        self.patch(tcp, "_sendfile", sendfile)
+        d = self.server.sendFile(self.fileObject, 5)
+        self._pump()
+        self.assertEqual(b"".join(self.received), self.content[5:])
+        self.assertEqual(self.successResultOf(d), len(self.content) - 5)
+
+
+    def test_connectionLost(self):
+        """
+        If the connection is lost before the file has been sent, the
+        L{Deferred} returned by L{Connection.sendFile} fails with
+        L{ConnectionLost}.
+        """
+        d = self.server.sendFile(self.fileObject)
+        self.server.connectionLost(Failure(ConnectionDone()))
+        self.failureResultOf(d, ConnectionLost)
+
+
+
 class TCPConnectionTests(TestCase):
     """
     Whitebox tests for L{twisted.internet.tcp.Connection}.
@@ -10,6 +10,7 @@ from __future__ import division, absolute_import
 
 __metaclass__ = type
 
+import errno
 import socket
 
 from zope.interface import implementer
@@ -20,15 +21,16 @@ from twisted.python.log import ILogContext, err
 from twisted.internet.test.reactormixins import ReactorBuilder
 from twisted.internet.defer import Deferred, maybeDeferred
 from twisted.internet.interfaces import (
-    ILoggingContext, IListeningPort, IReactorUDP, IReactorSocket)
+    ILoggingContext, IListeningPort, IReactorUDP, IReactorSocket,
+    IBatchedDatagramProtocol, IBatchedUDPTransport)
 from twisted.internet.address import IPv4Address, IPv6Address
 from twisted.internet.protocol import DatagramProtocol
 
 from twisted.internet.test.connectionmixins import (LogObserverMixin,
                                                     findFreePort)
-from twisted.internet import defer, error
+from twisted.internet import defer, error, udp
 from twisted.test.test_udp import Server, GoodClient
-from twisted.trial.unittest import SkipTest
+from twisted.trial.unittest import SkipTest, TestCase
 
 
 
@@ -452,5 +454,183 @@ class UDPFDServerTestsBuilder(ReactorBuilder,
 
 
 
+@implementer(IBatchedDatagramProtocol)
+class BatchedDatagramProtocol(DatagramProtocol):
+    """
+    An L{IBatchedDatagramProtocol} which records the batches it is given.
+
+    @ivar batches: A C{list} of the lists passed to C{datagramsReceived}.
+    """
+    def __init__(self):
+        self.batches = []
+
+
+    def datagramsReceived(self, datagrams):
+        self.batches.append(datagrams)
+
+
+
+class FakeDatagramSocket(object):
+    """
+    A fake UDP socket which returns queued datagrams from C{recvfrom_into}
+    and then raises a given error.
+
+    @ivar datagrams: A C{list} of C{(bytes, addr)} tuples still to be read.
+
+    @ivar error: The L{socket.error} to raise once C{datagrams} is empty.
+    """
+    def __init__(self, datagrams, error):
+        self.datagrams = datagrams
+        self.error = error
+
+
+    def recvfrom_into(self, buffer):
+        if not self.datagrams:
+            raise self.error
+        data, addr = self.datagrams.pop(0)
+        buffer[:len(data)] = data
+        return len(data), addr
+
+
+
+class BatchedDatagramTests(TestCase):
+    """
+    Tests for the batched receiving and sending of datagrams by
+    L{udp.Port}.
+    """
+    def setUp(self):
+        self.protocol = BatchedDatagramProtocol()
+        self.port = udp.Port(0, self.protocol, interface="127.0.0.1")
+        self.port._bindSocket()
+        self.addCleanup(self.port.socket.close)
+        self.protocol.makeConnection(self.port)
+        self.address = ("127.0.0.1", self.port.getHost().port)
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.client.bind(("127.0.0.1", 0))
+        self.addCleanup(self.client.close)
+
+
+    def test_interface(self):
+        """
+        L{udp.Port} provides L{IBatchedUDPTransport}.
+        """
+        self.assertTrue(verifyObject(IBatchedUDPTransport, self.port))
+
+
+    def test_datagramsReceived(self):
+        """
+        All of the datagrams available when L{udp.Port.doRead} is called are
+        passed to C{datagramsReceived} in one list, in order.
+        """
+        for data in [b"foo", b"bar", b"baz"]:
+            self.client.sendto(data, self.address)
+        self.port.doRead()
+        clientAddress = self.client.getsockname()
+        self.assertEqual(
+            self.protocol.batches,
+            [[(b"foo", clientAddress), (b"bar", clientAddress),
+              (b"baz", clientAddress)]])
+
+
+    def test_maxThroughput(self):
+        """
+        No more datagrams are read by one call to L{udp.Port.doRead} once
+        C{maxThroughput} bytes have been read.
+        """
+        self.port.maxThroughput = 5
+        for data in [b"foo", b"bar", b"baz"]:
+            self.client.sendto(data, self.address)
+        self.port.doRead()
+        self.port.doRead()
+        self.assertEqual(
+            [[data for (data, addr) in batch]
+             for batch in self.protocol.batches],
+            [[b"foo", b"bar"], [b"baz"]])
+
+
+    def test_nothingToRead(self):
+        """
+        If no datagrams can be read, C{datagramsReceived} is not called.
+        """
+        self.port.doRead()
+        self.assertEqual(self.protocol.batches, [])
+
+
+    def test_datagramsReceivedRaises(self):
+        """
+        An exception raised by C{datagramsReceived} is logged.
+        """
+        def datagramsReceived(datagrams):
+            1 // 0
+        self.protocol.datagramsReceived = datagramsReceived
+        self.client.sendto(b"foo", self.address)
+        self.port.doRead()
+        self.assertEqual(len(self.flushLoggedErrors(ZeroDivisionError)), 1)
+
+
+    def test_connectionRefused(self):
+        """
+        If reading fails with C{ECONNREFUSED} on a connected port, the
+        datagrams read before the error are delivered and then
+        C{connectionRefused} is called.
+        """
+        refused = []
+        self.protocol.connectionRefused = lambda: refused.append(
+            len(self.protocol.batches))
+        self.port._connectedAddr = self.client.getsockname()
+        self.port.socket.close()
+        self.port.socket = FakeDatagramSocket(
+            [(b"foo", self.port._connectedAddr)],
+            socket.error(errno.ECONNREFUSED, "refused"))
+        self.port.doRead()
+        self.assertEqual(
+            self.protocol.batches, [[(b"foo", self.port._connectedAddr)]])
+        self.assertEqual(refused, [1])
+
+
+    def test_otherError(self):
+        """
+        Unexpected errors from reading are raised by L{udp.Port.doRead} after
+        the datagrams read before the error are delivered.
+        """
+        self.port.socket.close()
+        self.port.socket = FakeDatagramSocket(
+            [(b"foo", ("127.0.0.1", 1))], socket.error(errno.EBADF, "bad"))
+        self.assertRaises(socket.error, self.port.doRead)
+        self.assertEqual(self.protocol.batches, [[(b"foo", ("127.0.0.1", 1))]])
+
+
+    def test_writeSequenceTo(self):
+        """
+        L{udp.Port.writeSequenceTo} sends each datagram to its address.
+        """
+        other = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        other.bind(("127.0.0.1", 0))
+        self.addCleanup(other.close)
+        self.port.writeSequenceTo([
+                (b"foo", self.client.getsockname()),
+                (b"bar", other.getsockname()),
+                (b"baz", self.client.getsockname())])
+        self.assertEqual(self.client.recv(100), b"foo")
+        self.assertEqual(self.client.recv(100), b"baz")
+        self.assertEqual(other.recv(100), b"bar")
+
+
+    def test_writeSequenceToHostname(self):
+        """
+        L{udp.Port.writeSequenceTo} raises L{error.InvalidAddressError} when
+        given a hostname, after sending the datagrams before it.
+        """
+        self.client.setblocking(False)
+        self.assertRaises(
+            error.InvalidAddressError, self.port.writeSequenceTo,
+            [(b"foo", self.client.getsockname()),
+             (b"bar", ("localhost", 1234)),
+             (b"baz", self.client.getsockname())])
+        self.assertEqual(self.client.recv(100), b"foo")
+        self.assertRaises(socket.error, self.client.recv, 100)
+
+
+
 globals().update(UDPServerTestsBuilder.makeTestCaseClasses())
 globals().update(UDPFDServerTestsBuilder.makeTestCaseClasses())
@@ -0,0 +1,490 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.internet.uringreactor} and L{twisted.internet._uring}.
+
+The io_uring reactor is not in the list of reactors every reactor builder
+test runs against.  A selection of the builder tests runs against it here
+instead, along with tests for what is particular to io_uring.
+"""
+
+from __future__ import division, absolute_import
+
+import ctypes
+import os
+import socket
+from select import POLLIN, POLLOUT
+
+from twisted.internet import tcp
+from twisted.internet.protocol import Protocol
+from twisted.internet.test.test_core import SystemEventTestsBuilder
+from twisted.internet.test.test_tcp import (
+    TCP4ClientTestsBuilder, TCPConnectionTestsBuilder, TCPPortTestsBuilder)
+from twisted.internet.test.test_threads import ThreadTestsBuilder
+from twisted.internet.test.test_time import TimeTestsBuilder
+from twisted.trial.unittest import TestCase
+
+try:
+    from twisted.internet._uring import ECANCELED, Ring
+    from twisted.internet.uringreactor import UringReactor
+    Ring().close()
+except (ImportError, IOError) as e:
+    skip = "io_uring not supported in this environment: %s" % (e,)
+
+
+
+class Descriptor(object):
+    """
+    Records reads and writes of one end of a pipe, as if it were a
+    C{FileDescriptor}.
+    """
+
+    def __init__(self, fd, onWrite=lambda: None):
+        self.fd = fd
+        self.events = []
+        self.onWrite = onWrite
+
+
+    def fileno(self):
+        return self.fd
+
+
+    def logPrefix(self):
+        return "Descriptor"
+
+
+    def doRead(self):
+        self.events.append("read")
+
+
+    def doWrite(self):
+        self.events.append("write")
+        self.onWrite()
+
+
+
+class Accumulator(Protocol):
+    """
+    Records the data it receives.
+    """
+
+    def __init__(self):
+        self.data = []
+
+
+    def dataReceived(self, data):
+        self.data.append(data)
+
+
+
+class PipeMixin(object):
+    """
+    Create pipes which are closed when the test ends.
+    """
+
+    def pipe(self):
+        """
+        @return: The read and write ends of a new pipe.
+        """
+        r, w = os.pipe()
+        self.addCleanup(os.close, r)
+        self.addCleanup(os.close, w)
+        return r, w
+
+
+    def socketpair(self):
+        """
+        @return: Two connected non-blocking stream sockets.
+        """
+        a, b = socket.socketpair()
+        for s in a, b:
+            s.setblocking(False)
+            self.addCleanup(s.close)
+        return a, b
+
+
+    def completeAll(self, ring, count):
+        """
+        Wait for C{count} completions on C{ring}.
+        """
+        completions = []
+        while len(completions) < count:
+            ring.submitAndWait(None)
+            completions.extend(ring.reap())
+        return completions
+
+
+
+class RingTests(PipeMixin, TestCase):
+    """
+    Tests for L{Ring}.
+    """
+
+    def setUp(self):
+        self.ring = Ring()
+        self.addCleanup(self.ring.close)
+
+
+    def test_pollCompletes(self):
+        """
+        A poll completes with its identifier and the events which occurred.
+        """
+        r, w = self.pipe()
+        self.ring.pollAdd(w, POLLOUT, 3)
+        self.ring.submitAndWait(None)
+        self.assertEqual(self.ring.reap(), [(3, POLLOUT)])
+
+
+    def test_batchedSubmission(self):
+        """
+        Any number of queued requests are submitted, and waited for, with a
+        single system call.
+        """
+        descriptors = [self.pipe()[1] for i in range(10)]
+        for i, w in enumerate(descriptors):
+            self.ring.pollAdd(w, POLLOUT, i + 1)
+        self.assertEqual(self.ring.pending(), 10)
+        self.ring.submitAndWait(None)
+        self.assertEqual(self.ring.enters, 1)
+        self.assertEqual(self.ring.submitted, 10)
+        self.assertEqual(self.ring.pending(), 0)
+
+
+    def test_fullQueue(self):
+        """
+        When the submission queue is full, it is submitted to make room for
+        another request.
+        """
+        ring = Ring(entries=2)
+        self.addCleanup(ring.close)
+        r, w = self.pipe()
+        for i in range(5):
+            ring.pollAdd(w, POLLOUT, i + 1)
+        self.assertEqual(ring.submitted, 4)
+        ring.submitAndWait(None)
+        self.assertEqual(
+            sorted(ring.reap()), [(i + 1, POLLOUT) for i in range(5)])
+
+
+    def test_timeout(self):
+        """
+        L{Ring.submitAndWait} returns once its timeout passes even if nothing
+        completed.
+        """
+        r, w = self.pipe()
+        self.ring.pollAdd(r, POLLIN, 1)
+        self.ring.submitAndWait(0.01)
+        self.assertEqual(self.ring.reap(), [])
+
+
+    def test_pollRemove(self):
+        """
+        A poll cancelled with L{Ring.pollRemove} completes with an error,
+        and the cancellation with an identifier of zero.
+        """
+        r, w = self.pipe()
+        self.ring.pollAdd(r, POLLIN, 1)
+        self.ring.pollRemove(1)
+        self.ring.submitAndWait(None)
+        completions = self.ring.reap()
+        while len(completions) < 2:
+            self.ring.submitAndWait(None)
+            completions.extend(self.ring.reap())
+        cancellation, poll = sorted(completions)
+        self.assertEqual(cancellation, (0, 0))
+        self.assertEqual(poll[0], 1)
+        self.assertTrue(poll[1] < 0)
+
+
+    def test_sendAndReceive(self):
+        """
+        A send completes with the number of bytes sent, and a receive with
+        the number of bytes received into the given memory.
+        """
+        a, b = self.socketpair()
+        data = b"hello, world"
+        buffer = ctypes.create_string_buffer(64)
+        self.ring.send(
+            a.fileno(), ctypes.cast(ctypes.c_char_p(data),
+                                    ctypes.c_void_p).value,
+            len(data), 1)
+        self.ring.recv(b.fileno(), ctypes.addressof(buffer), 64, 2)
+        self.assertEqual(
+            sorted(self.completeAll(self.ring, 2)),
+            [(1, len(data)), (2, len(data))])
+        self.assertEqual(buffer.raw[:len(data)], data)
+
+
+    def test_cancel(self):
+        """
+        A receive cancelled with L{Ring.cancel} completes with
+        C{-ECANCELED}, and the cancellation with an identifier of zero.
+        """
+        a, b = self.socketpair()
+        buffer = ctypes.create_string_buffer(64)
+        self.ring.recv(b.fileno(), ctypes.addressof(buffer), 64, 1)
+        self.ring.submitAndWait(0)
+        self.ring.cancel(1)
+        self.assertEqual(
+            sorted(self.completeAll(self.ring, 2)),
+            [(0, 0), (1, -ECANCELED)])
+
+
+
+class UringReactorTests(PipeMixin, TestCase):
+    """
+    Tests for L{UringReactor}.
+    """
+
+    def setUp(self):
+        self.reactor = UringReactor()
+        self.ring = self.reactor._ring
+        self.addCleanup(lambda: self.reactor.waker.connectionLost(None))
+        self.addCleanup(self.ring.close)
+
+
+    def test_oneSystemCallPerIteration(self):
+        """
+        Polls for every descriptor added since the last iteration are
+        submitted together with the wait for the next one.
+        """
+        descriptors = [Descriptor(self.pipe()[1]) for i in range(10)]
+        for descriptor in descriptors:
+            self.reactor.addWriter(descriptor)
+        self.reactor.doIteration(0)
+        enters = self.ring.enters
+        self.reactor.doIteration(0)
+        self.assertEqual(self.ring.enters, enters + 1)
+        for descriptor in descriptors:
+            self.assertEqual(descriptor.events, ["write", "write"])
+
+
+    def test_removeCancelsImmediately(self):
+        """
+        Removing the last event watched on a descriptor cancels its poll
+        right away, so the descriptor can really be closed.
+        """
+        r, w = self.pipe()
+        descriptor = Descriptor(r)
+        self.reactor.addReader(descriptor)
+        self.reactor.doIteration(0)
+        enters = self.ring.enters
+        self.reactor.removeReader(descriptor)
+        self.assertEqual(self.ring.enters, enters + 1)
+        self.assertEqual(self.ring.pending(), 0)
+        self.assertNotIn(r, self.reactor._armed)
+
+
+    def test_unwatchedEventsNotReported(self):
+        """
+        Events which stopped being watched after a poll fired are not
+        dispatched, even though the poll's completion was already reaped.
+        """
+        descriptors = []
+        def stopOthers():
+            for descriptor in descriptors:
+                self.reactor.removeWriter(descriptor)
+        for i in range(2):
+            descriptor = Descriptor(self.pipe()[1], stopOthers)
+            descriptors.append(descriptor)
+            self.reactor.addReader(descriptor)
+            self.reactor.addWriter(descriptor)
+        self.reactor.doIteration(0)
+        self.assertEqual(
+            sum([descriptor.events for descriptor in descriptors], []),
+            ["write"])
+
+
+    def test_afterFork(self):
+        """
+        L{UringReactor._afterFork} closes the ring, which a forked process
+        shares with its parent, and replaces it with one on which requests
+        for every watched descriptor are submitted.  It also replaces the
+        waker.
+        """
+        descriptor = Descriptor(self.pipe()[1])
+        self.reactor.addWriter(descriptor)
+        self.reactor.doIteration(0)
+        waker = self.reactor.waker
+        self.reactor._afterFork()
+        self.addCleanup(self.reactor._ring.close)
+        self.assertEqual(self.ring._fd, -1)
+        self.assertIsNot(self.reactor._ring, self.ring)
+        self.assertIsNot(self.reactor.waker, waker)
+        self.reactor.doIteration(0)
+        self.assertEqual(descriptor.events, ["write", "write"])
+        self.assertEqual(self.reactor._ring.enters, 1)
+
+
+    def test_closedDescriptor(self):
+        """
+        A descriptor closed without being removed first is disconnected.
+        """
+        r, w = os.pipe()
+        os.close(w)
+        os.close(r)
+        lost = []
+        descriptor = Descriptor(r)
+        descriptor.connectionLost = lost.append
+        self.reactor.addReader(descriptor)
+        self.reactor.doIteration(0)
+        self.assertEqual(len(lost), 1)
+        self.assertNotIn(descriptor, self.reactor.getReaders())
+
+
+    def connection(self):
+        """
+        @return: A L{tcp.Connection} for one end of a new socket pair, whose
+            protocol is an L{Accumulator}, and the socket for the other end.
+        """
+        a, b = self.socketpair()
+        protocol = Accumulator()
+        connection = tcp.Connection(a, protocol, self.reactor)
+        connection.connected = 1
+        protocol.makeConnection(connection)
+        self.addCleanup(connection.stopWriting)
+        self.addCleanup(connection.stopReading)
+        return connection, b
+
+
+    def iterateUntil(self, condition):
+        """
+        Iterate the reactor until C{condition} returns true.
+        """
+        for i in range(100):
+            if condition():
+                return
+            self.reactor.doIteration(0.01)
+        self.fail("Condition was never met")
+
+
+    def test_receive(self):
+        """
+        A TCP connection's data is received for it with a receive request,
+        rather than by polling the connection and having it read.
+        """
+        connection, other = self.connection()
+        connection.startReading()
+        self.reactor.doIteration(0)
+        self.assertIn(connection.fileno(), self.reactor._receiving)
+        self.assertNotIn(connection.fileno(), self.reactor._armed)
+        other.send(b"hello")
+        self.iterateUntil(lambda: connection.protocol.data)
+        self.assertEqual(connection.protocol.data, [b"hello"])
+
+
+    def test_send(self):
+        """
+        A TCP connection's buffered data is written with a send request,
+        rather than by polling the connection and having it write.
+        """
+        connection, other = self.connection()
+        sends = []
+        send = self.ring.send
+        def recordSend(fd, address, length, userData):
+            sends.append((fd, length))
+            send(fd, address, length, userData)
+        self.patch(self.ring, "send", recordSend)
+        connection.write(b"hello")
+        self.reactor.doIteration(0)
+        self.assertEqual(sends, [(connection.fileno(), 5)])
+        self.assertNotIn(connection.fileno(), self.reactor._armed)
+        self.iterateUntil(lambda: not connection.dataBuffer and
+                          not connection._tempDataLen)
+        self.assertEqual(other.recv(64), b"hello")
+
+
+    def test_receivedWhileNotReading(self):
+        """
+        Data received for a TCP connection which stopped reading before the
+        receive completed is only delivered once it starts reading again.
+        """
+        connection, other = self.connection()
+        connection.startReading()
+        self.reactor.doIteration(0)
+        other.send(b"hello")
+        connection.stopReading()
+        for i in range(3):
+            self.reactor.doIteration(0.01)
+        self.assertEqual(connection.protocol.data, [])
+        connection.startReading()
+        self.iterateUntil(lambda: connection.protocol.data)
+        self.assertEqual(connection.protocol.data, [b"hello"])
+
+
+    def test_customisedRead(self):
+        """
+        A TCP connection which does its own reading is polled instead.
+        """
+        connection, other = self.connection()
+        reads = []
+        connection.doRead = lambda: reads.append(connection.socket.recv(64))
+        connection.startReading()
+        other.send(b"hello")
+        self.iterateUntil(lambda: reads)
+        self.assertEqual(reads, [b"hello"])
+        self.assertNotIn(connection.fileno(), self.reactor._receiving)
+
+
+
+class UringReactorBuilder(object):
+    """
+    A mixin for a L{ReactorBuilder} subclass which runs its tests against the
+    io_uring reactor only.
+    """
+    _reactors = ["twisted.internet.uringreactor.UringReactor"]
+
+
+
+class UringSystemEventTestsBuilder(UringReactorBuilder,
+                                   SystemEventTestsBuilder):
+    """
+    L{SystemEventTestsBuilder} for the io_uring reactor.
+    """
+
+
+
+class UringTimeTestsBuilder(UringReactorBuilder, TimeTestsBuilder):
+    """
+    L{TimeTestsBuilder} for the io_uring reactor.
+    """
+
+
+
+class UringThreadTestsBuilder(UringReactorBuilder, ThreadTestsBuilder):
+    """
+    L{ThreadTestsBuilder} for the io_uring reactor.
+    """
+
+
+
+class UringTCP4ClientTestsBuilder(UringReactorBuilder,
+                                  TCP4ClientTestsBuilder):
+    """
+    L{TCP4ClientTestsBuilder} for the io_uring reactor.
+    """
+
+
+
+class UringTCPPortTestsBuilder(UringReactorBuilder, TCPPortTestsBuilder):
+    """
+    L{TCPPortTestsBuilder} for the io_uring reactor.
+    """
+
+
+
+class UringTCPConnectionTestsBuilder(UringReactorBuilder,
+                                     TCPConnectionTestsBuilder):
+    """
+    L{TCPConnectionTestsBuilder} for the io_uring reactor.
+    """
+
+
+
+globals().update(UringSystemEventTestsBuilder.makeTestCaseClasses())
+globals().update(UringTimeTestsBuilder.makeTestCaseClasses())
+globals().update(UringThreadTestsBuilder.makeTestCaseClasses())
+globals().update(UringTCP4ClientTestsBuilder.makeTestCaseClasses())
+globals().update(UringTCPPortTestsBuilder.makeTestCaseClasses())
+globals().update(UringTCPConnectionTestsBuilder.makeTestCaseClasses())
@@ -16,6 +16,7 @@ else:
     import queue as Queue
 
 from twisted.python import failure
+from twisted.python.threadpool import ThreadPoolFull
 from twisted.internet import defer
 
 
@@ -40,19 +41,51 @@ def deferToThreadPool(reactor, threadpool, f, *args, **kwargs):
 
     @return: A Deferred which fires a callback with the result of f, or an
         errback with a L{twisted.python.failure.Failure} if f throws an
-        exception.
+        exception, or if the threadpool refuses the work with
+        L{twisted.python.threadpool.ThreadPoolFull}.
     """
     d = defer.Deferred()
+    try:
+        threadpool.callInThreadWithCallback(
+            _deliverer(reactor, d), f, *args, **kwargs)
+    except ThreadPoolFull:
+        return defer.fail()
+    return d
+
+
+def deferToThreadPoolWithPriority(reactor, threadpool, priority, f, *args,
+                                  **kwargs):
+    """
+    Like L{deferToThreadPool}, but run C{f} ahead of any waiting work with a
+    larger C{priority}.
 
+    @param threadpool: An object which supports the
+        C{callInThreadWithPriority} method of
+        C{twisted.python.threadpool.ThreadPool}.
+
+    @param priority: See
+        L{twisted.python.threadpool.ThreadPool.callInThreadWithPriority}.
+    """
+    d = defer.Deferred()
+    try:
+        threadpool.callInThreadWithPriority(
+            priority, _deliverer(reactor, d), f, *args, **kwargs)
+    except ThreadPoolFull:
+        return defer.fail()
+    return d
+
+
+def _deliverer(reactor, d):
+    """
+    Make an C{onResult} callback for a threadpool which fires C{d} with the
+    result in the reactor thread.
+    """
     def onResult(success, result):
         if success:
             reactor.callFromThread(d.callback, result)
         else:
             reactor.callFromThread(d.errback, result)
-
-    threadpool.callInThreadWithCallback(onResult, f, *args, **kwargs)
-
-    return d
+    return onResult
 
 
 def deferToThread(f, *args, **kwargs):
@@ -123,5 +156,6 @@ def blockingCallFromThread(reactor, f, *a, **kw):
     return result
 
 
-__all__ = ["deferToThread", "deferToThreadPool", "callMultipleInThread",
+__all__ = ["deferToThread", "deferToThreadPool",
+           "deferToThreadPoolWithPriority", "callMultipleInThread",
            "blockingCallFromThread"]
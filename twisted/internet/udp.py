@@ -55,15 +55,24 @@ from twisted.internet import abstract, error, interfaces
 
 
 @implementer(
-    interfaces.IListeningPort, interfaces.IUDPTransport,
+    interfaces.IListeningPort, interfaces.IBatchedUDPTransport,
     interfaces.ISystemHandle)
 class Port(base.BasePort):
     """
     UDP port, listening for packets.
 
+    If the protocol provides L{interfaces.IBatchedDatagramProtocol}, all of
+    the datagrams read in one event loop iteration are passed to its
+    C{datagramsReceived} method together.
+
     @ivar maxThroughput: Maximum number of bytes read in one event
         loop iteration.
 
+    @ivar _readBuffer: A C{memoryview} of a C{bytearray} of C{maxPacketSize}
+        bytes into which datagrams are read for an
+        L{interfaces.IBatchedDatagramProtocol}, or C{None} if it has not been
+        allocated yet.
+
     @ivar addressFamily: L{socket.AF_INET} or L{socket.AF_INET6}, depending on
         whether this port is listening on an IPv4 address or an IPv6 address.
 
@@ -82,6 +91,7 @@ class Port(base.BasePort):
 
     _realPortNumber = None
     _preexistingSocket = None
+    _readBuffer = None
 
     def __init__(self, port, proto, interface='', maxPacketSize=8192, reactor=None):
         """
@@ -219,6 +229,8 @@ class Port(base.BasePort):
         """
         Called when my socket is ready for reading.
         """
+        if interfaces.IBatchedDatagramProtocol.providedBy(self.protocol):
+            return self._doReadBatch()
         read = 0
         while read < self.maxThroughput:
             try:
@@ -248,6 +260,48 @@ class Port(base.BasePort):
                     log.err()
 
 
+    def _doReadBatch(self):
+        """
+        Read datagrams until there are none left or C{maxThroughput} bytes
+        have been read, and pass them all to the protocol's
+        C{datagramsReceived} method.
+
+        Each datagram is received into the same preallocated buffer and then
+        copied into a string of exactly its own length.
+        """
+        if (self._readBuffer is None or
+                len(self._readBuffer) != self.maxPacketSize):
+            self._readBuffer = memoryview(bytearray(self.maxPacketSize))
+        buf = self._readBuffer
+        recvfrom_into = self.socket.recvfrom_into
+        stripAddress = self.addressFamily == socket.AF_INET6
+        datagrams = []
+        refused = False
+        read = 0
+        try:
+            while read < self.maxThroughput:
+                count, addr = recvfrom_into(buf)
+                read += count
+                if stripAddress:
+                    # See doRead.
+                    addr = addr[:2]
+                datagrams.append((buf[:count].tobytes(), addr))
+        except socket.error as se:
+            no = se.args[0]
+            if no in _sockErrReadRefuse:
+                refused = bool(self._connectedAddr)
+            elif no not in _sockErrReadIgnore:
+                raise
+        finally:
+            if datagrams:
+                try:
+                    self.protocol.datagramsReceived(datagrams)
+                except:
+                    log.err()
+        if refused:
+            self.protocol.connectionRefused()
+
+
     def write(self, datagram, addr=None):
         """
         Write a datagram.
@@ -275,22 +329,7 @@ class Port(base.BasePort):
                 else:
                     raise
         else:
-            assert addr != None
-            if (not abstract.isIPAddress(addr[0])
-                    and not abstract.isIPv6Address(addr[0])
-                    and addr[0] != "<broadcast>"):
-                raise error.InvalidAddressError(
-                    addr[0],
-                    "write() only accepts IP addresses, not hostnames")
-            if ((abstract.isIPAddress(addr[0]) or addr[0] == "<broadcast>")
-                    and self.addressFamily == socket.AF_INET6):
-                raise error.InvalidAddressError(
-                    addr[0],
-                    "IPv6 port write() called with IPv4 or broadcast address")
-            if (abstract.isIPv6Address(addr[0])
-                    and self.addressFamily == socket.AF_INET):
-                raise error.InvalidAddressError(
-                    addr[0], "IPv4 port write() called with IPv6 address")
+            self._checkAddress(addr)
             try:
                 return self.socket.sendto(datagram, addr)
             except socket.error as se:
@@ -307,9 +346,57 @@ class Port(base.BasePort):
                 else:
                     raise
 
+    def _checkAddress(self, addr):
+        """
+        Check that C{addr} is an address of this port's family which
+        datagrams can be written to.
+
+        @raise error.InvalidAddressError: If it is not.
+        """
+        assert addr != None
+        if (not abstract.isIPAddress(addr[0])
+                and not abstract.isIPv6Address(addr[0])
+                and addr[0] != "<broadcast>"):
+            raise error.InvalidAddressError(
+                addr[0],
+                "write() only accepts IP addresses, not hostnames")
+        if ((abstract.isIPAddress(addr[0]) or addr[0] == "<broadcast>")
+                and self.addressFamily == socket.AF_INET6):
+            raise error.InvalidAddressError(
+                addr[0],
+                "IPv6 port write() called with IPv4 or broadcast address")
+        if (abstract.isIPv6Address(addr[0])
+                and self.addressFamily == socket.AF_INET):
+            raise error.InvalidAddressError(
+                addr[0], "IPv4 port write() called with IPv6 address")
+
+
     def writeSequence(self, seq, addr):
         self.write("".join(seq), addr)
 
+
+    def writeSequenceTo(self, datagrams):
+        """
+        Write several datagrams, each to its own address.
+
+        See L{interfaces.IBatchedUDPTransport.writeSequenceTo}.
+        """
+        if self._connectedAddr:
+            for datagram, addr in datagrams:
+                self.write(datagram, addr)
+            return
+        sendto = self.socket.sendto
+        checked = set()
+        for datagram, addr in datagrams:
+            if addr not in checked:
+                self._checkAddress(addr)
+                checked.add(addr)
+            try:
+                sendto(datagram, addr)
+            except socket.error:
+                # Let write deal with (or retry after) the error.
+                self.write(datagram, addr)
+
     def connect(self, host, port):
         """
         'Connect' to remote server.
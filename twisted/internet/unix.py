@@ -59,11 +59,15 @@ class _SendmsgMixin(object):
     @ivar _fileDescriptorBufferSize: An C{int} giving the maximum number of file
         descriptors to accept and queue for sending before pausing the
         registered producer, if there is one.
+
+    @ivar _vectoredWrites: Always C{False}, since file descriptors are sent
+        along with the bytes given to C{writeSomeData}.
     """
     implements(interfaces.IUNIXTransport)
 
     _writeSomeDataBase = None
     _fileDescriptorBufferSize = 64
+    _vectoredWrites = False
 
     def __init__(self):
         self._sendmsgQueue = []
@@ -299,7 +303,7 @@ class Port(_UNIXPort, tcp.Port):
             self.connected = True
             self.socket = skt
             self.fileno = self.socket.fileno
-            self.numberAccepts = 100
+            self.numberAccepts = self.acceptPolicy.initial
             self.startReading()
 
 
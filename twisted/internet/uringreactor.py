@@ -0,0 +1,562 @@
+# -*- test-case-name: twisted.internet.test.test_uringreactor -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+An io_uring(7) based implementation of the twisted main loop.
+
+TCP connections are read and written with io_uring receive and send
+requests: instead of waiting for a socket to become readable or writeable
+and then making a C{recv} or C{send} system call, the reactor asks the
+kernel to do the I/O once it can, and hands the outcome to the connection.
+Every other file descriptor, and connections whose reading or writing has
+been customised, are watched with one-shot io_uring poll requests and do
+their own I/O exactly as with the other POSIX reactors.
+
+Every request, whether a receive, a send, a poll or the re-arming of a poll
+which fired, is queued during an iteration and submitted together with the
+wait for the next one, so an iteration costs a single system call no matter
+how much I/O it does.  (L{epollreactor} needs a system call for each read
+and write, and an C{epoll_ctl} call for each change, as well as the
+C{epoll_wait}.)  This needs Linux 5.11 or later.
+
+To install the event loop (and you should do this before any connections,
+listeners or connectors are added)::
+
+    from twisted.internet import uringreactor
+    uringreactor.install()
+"""
+
+from __future__ import division, absolute_import
+
+import ctypes
+import errno
+import sys
+from select import POLLIN, POLLOUT, POLLERR, POLLHUP, POLLNVAL
+from weakref import WeakKeyDictionary
+
+from zope.interface import implementer
+
+from twisted.internet.interfaces import IReactorFDSet
+
+from twisted.python import log
+from twisted.internet import abstract, posixbase, tcp
+from twisted.internet.main import CONNECTION_LOST
+from twisted.internet._uring import ECANCELED, Ring
+
+# The kinds of I/O request submitted for TCP connections.
+_RECEIVE = "receive"
+_SEND = "send"
+
+# Results of receive and send requests which are not reported to the
+# connection; another request is made if one is still needed.
+_RETRY = (-errno.EAGAIN, -errno.EINTR, -ECANCELED)
+
+
+
+def _function(method):
+    """
+    Get the function a method was created from.
+    """
+    return getattr(method, "__func__", method)
+
+
+
+_CONNECTION_READ = _function(tcp.Connection.doRead)
+_CONNECTION_WRITE = (_function(abstract.FileDescriptor.doWrite),
+                     _function(tcp.Connection.writeSomeData),
+                     _function(tcp.Connection._writeSomeVectors))
+
+
+
+# Whether instances of each class which has been watched have their I/O done
+# for them; see _completes.
+_completesByClass = {}
+
+
+
+def _completes(selectable):
+    """
+    Find out whether the reactor can do a selectable's I/O for it.
+
+    @return: A C{tuple} of whether C{selectable} is a TCP connection whose
+        data can be received for it, rather than by its C{doRead} method, and
+        whether it is one whose buffered data can be sent for it, rather than
+        by its C{doWrite} method.
+    """
+    cls = selectable.__class__
+    try:
+        receives, sends = _completesByClass[cls]
+    except KeyError:
+        connection = issubclass(cls, tcp.Connection)
+        receives = connection and _function(cls.doRead) is _CONNECTION_READ
+        sends = connection and (
+            _function(cls.doWrite), _function(cls.writeSomeData),
+            _function(cls._writeSomeVectors)) == _CONNECTION_WRITE
+        receives, sends = _completesByClass[cls] = (receives, sends)
+    # Clients read and write with other methods until they are connected.
+    overrides = getattr(selectable, "__dict__", ())
+    return (receives and "doRead" not in overrides,
+            sends and "doWrite" not in overrides)
+
+
+
+@implementer(IReactorFDSet)
+class UringReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
+    """
+    A reactor that uses io_uring(7) receive, send and poll requests.
+
+    @ivar _ring: The L{Ring} which requests are submitted to.
+
+    @ivar _selectables: A dictionary mapping integer file descriptors to
+        instances of C{FileDescriptor} which have been registered with the
+        reactor.
+
+    @ivar _reads: A set containing integer file descriptors which should be
+        watched for read readiness.
+
+    @ivar _writes: A set containing integer file descriptors which should be
+        watched for write readiness.
+
+    @ivar _armed: A dictionary mapping integer file descriptors to a tuple of
+        the identifier and the event mask of the poll currently submitted for
+        them.
+
+    @ivar _tokens: A dictionary mapping the identifiers of submitted polls to
+        the file descriptors they are for.  Completions of polls which are no
+        longer in here were cancelled and are ignored.
+
+    @ivar _dirty: A set containing integer file descriptors whose requests
+        need to be submitted, changed or cancelled before the next wait,
+        either because the events they are watched for changed or because a
+        request completed.
+
+    @ivar _lastToken: The identifier most recently given to a request.
+
+    @ivar _requests: A dictionary mapping the identifiers of submitted
+        receives and sends to tuples of their kind, the file descriptor, the
+        connection and the memory the kernel reads or writes, which has to
+        be kept until they complete.
+
+    @ivar _receiving: A dictionary mapping integer file descriptors to the
+        identifier of the receive submitted for them, until it completes.
+
+    @ivar _sending: A dictionary mapping integer file descriptors to the
+        identifier of the send submitted for them, until it completes.
+
+    @ivar _cancelled: A set containing the identifiers of the receives and
+        sends which have been cancelled but have not completed yet.
+
+    @ivar _receiveBuffers: A weak key dictionary mapping connections to the
+        C{memoryview} of the buffer they receive into and the address of the
+        buffer.
+
+    @ivar _undelivered: A weak key dictionary mapping connections to the
+        C{memoryview} and result of a receive which completed while they were
+        not reading, to be delivered once they are again.
+    """
+
+    # Attributes for _PollLikeMixin
+    _POLL_DISCONNECTED = (POLLHUP | POLLERR | POLLNVAL)
+    _POLL_IN = POLLIN
+    _POLL_OUT = POLLOUT
+
+    def __init__(self):
+        """
+        Set up the ring, the file descriptor tracking state and the base
+        class.
+        """
+        self._ring = Ring()
+        self._selectables = {}
+        self._reads = set()
+        self._writes = set()
+        self._armed = {}
+        self._tokens = {}
+        self._dirty = set()
+        self._lastToken = 0
+        self._requests = {}
+        self._receiving = {}
+        self._sending = {}
+        self._cancelled = set()
+        self._receiveBuffers = WeakKeyDictionary()
+        self._undelivered = WeakKeyDictionary()
+        posixbase.PosixReactorBase.__init__(self)
+
+
+    def _afterFork(self):
+        """
+        Replace the ring, which is shared with the process this one was
+        forked from, and queue new requests for every watched descriptor on
+        the new one.  Then replace the waker.
+        """
+        self._ring.close()
+        self._ring = Ring()
+        for state in (self._armed, self._tokens, self._requests,
+                      self._receiving, self._sending, self._cancelled):
+            state.clear()
+        self._dirty.update(self._selectables)
+        posixbase.PosixReactorBase._afterFork(self)
+
+
+    def _add(self, xer, primary, selectables):
+        """
+        Private method for adding a descriptor to the event loop.  The poll
+        for it is submitted with the next wait.
+        """
+        fd = xer.fileno()
+        if fd not in primary:
+            primary.add(fd)
+            selectables[fd] = xer
+            self._dirty.add(fd)
+
+
+    def addReader(self, reader):
+        """
+        Add a FileDescriptor for notification of data available to read.
+        """
+        self._add(reader, self._reads, self._selectables)
+
+
+    def addWriter(self, writer):
+        """
+        Add a FileDescriptor for notification of data available to write.
+        """
+        self._add(writer, self._writes, self._selectables)
+
+
+    def _remove(self, xer, primary, other, selectables):
+        """
+        Private method for removing a descriptor from the event loop.
+
+        If nothing is watched on the descriptor any more, its requests are
+        cancelled immediately rather than with the next wait: a submitted
+        request holds a reference to the open file, which would keep a
+        descriptor the caller is about to close from really being closed.
+        """
+        fd = xer.fileno()
+        if fd == -1:
+            for fd, fdes in selectables.items():
+                if xer is fdes:
+                    break
+            else:
+                return
+        if fd in primary:
+            primary.remove(fd)
+            if fd in other:
+                self._dirty.add(fd)
+            else:
+                del selectables[fd]
+                self._dirty.discard(fd)
+                cancelled = self._cancel(self._receiving, fd)
+                cancelled = self._cancel(self._sending, fd) or cancelled
+                if fd in self._armed:
+                    self._disarm(fd)
+                    cancelled = True
+                if cancelled:
+                    self._ring.submit()
+
+
+    def removeReader(self, reader):
+        """
+        Remove a Selectable for notification of data available to read.
+        """
+        self._remove(reader, self._reads, self._writes, self._selectables)
+
+
+    def removeWriter(self, writer):
+        """
+        Remove a Selectable for notification of data available to write.
+        """
+        self._remove(writer, self._writes, self._reads, self._selectables)
+
+
+    def removeAll(self):
+        """
+        Remove all selectables, and return a list of them.
+        """
+        return self._removeAll(
+            [self._selectables[fd] for fd in self._reads],
+            [self._selectables[fd] for fd in self._writes])
+
+
+    def getReaders(self):
+        return [self._selectables[fd] for fd in self._reads]
+
+
+    def getWriters(self):
+        return [self._selectables[fd] for fd in self._writes]
+
+
+    def _disarm(self, fd):
+        """
+        Queue the cancellation of the poll submitted for C{fd} and forget it,
+        so its completion is ignored if it already fired.
+        """
+        token, events = self._armed.pop(fd)
+        del self._tokens[token]
+        self._ring.pollRemove(token)
+
+
+    def _cancel(self, requests, fd):
+        """
+        Queue the cancellation of the receive or send submitted for a
+        descriptor, if there is one which is not cancelled already.  It is
+        still tracked until it completes, since it may have completed
+        already.
+
+        @param requests: L{_receiving} or L{_sending}.
+
+        @return: C{True} if a cancellation was queued.
+        """
+        token = requests.get(fd)
+        if token is None or token in self._cancelled:
+            return False
+        self._cancelled.add(token)
+        self._ring.cancel(token)
+        return True
+
+
+    def _receive(self, fd, selectable, buffer=None):
+        """
+        Queue a receive for a connection.
+
+        @param buffer: The C{memoryview} of the buffer to receive into and
+            its address, or C{None} to use the connection's usual buffer.
+        """
+        if buffer is None:
+            buffer = self._receiveBuffers.get(selectable)
+            if buffer is None:
+                data = bytearray(selectable.bufferSize)
+                address = ctypes.addressof(
+                    (ctypes.c_char * len(data)).from_buffer(data))
+                buffer = self._receiveBuffers[selectable] = (
+                    memoryview(data), address)
+        self._lastToken += 1
+        token = self._lastToken
+        self._requests[token] = (_RECEIVE, fd, selectable, buffer)
+        self._receiving[fd] = token
+        self._ring.recv(fd, buffer[1], len(buffer[0]), token)
+
+
+    def _send(self, fd, selectable):
+        """
+        Queue a send of the start of a connection's buffered data.
+        """
+        data = selectable._pendingData()
+        self._lastToken += 1
+        token = self._lastToken
+        self._requests[token] = (_SEND, fd, selectable, data)
+        self._sending[fd] = token
+        self._ring.send(
+            fd, ctypes.c_void_p.from_buffer(ctypes.c_char_p(data)).value,
+            len(data), token)
+
+
+    def _arm(self):
+        """
+        Queue the receives, sends, polls and cancellations needed for every
+        descriptor whose watched events changed or whose requests completed.
+
+        @return: A C{list} of the connections for which a receive completed
+            while they were not reading, and which are reading again.
+        """
+        undelivered = []
+        selectables, receiving, sending = (
+            self._selectables, self._receiving, self._sending)
+        for fd in self._dirty:
+            selectable = selectables.get(fd)
+            events = 0
+            if fd in self._reads:
+                if fd in receiving:
+                    # Keep waiting for the receive already submitted.
+                    pass
+                elif not _completes(selectable)[0]:
+                    events |= POLLIN
+                elif selectable in self._undelivered:
+                    undelivered.append(selectable)
+                else:
+                    self._receive(fd, selectable)
+            elif fd in receiving:
+                self._cancel(receiving, fd)
+            if fd in self._writes:
+                if fd in sending:
+                    pass
+                elif not _completes(selectable)[1] or not (
+                        selectable._tempDataLen or
+                        len(selectable.dataBuffer) > selectable.offset):
+                    # Nothing is buffered; the connection may be waiting to
+                    # be told it can write, for example by a producer.
+                    events |= POLLOUT
+                else:
+                    self._send(fd, selectable)
+            elif fd in sending:
+                self._cancel(sending, fd)
+            armed = self._armed.get(fd)
+            if armed is not None:
+                if armed[1] == events:
+                    continue
+                self._disarm(fd)
+            if events:
+                self._lastToken += 1
+                token = self._lastToken
+                self._armed[fd] = (token, events)
+                self._tokens[token] = fd
+                self._ring.pollAdd(fd, events, token)
+        self._dirty.clear()
+        return undelivered
+
+
+    def _completeReceive(self, selectable, buffer, result):
+        """
+        Hand the outcome of a receive to the connection it was for, and
+        disconnect it if that fails.
+        """
+        why = None
+        try:
+            if result < 0:
+                why = CONNECTION_LOST
+            elif self._instrumentation is None:
+                why = selectable._dataReadInto(buffer, result)
+            else:
+                why = self._timeCall(
+                    self._instrumentation, selectable._dataReadInto,
+                    (buffer, result))
+        except:
+            why = sys.exc_info()[1]
+            log.err()
+        if why:
+            self._disconnectSelectable(selectable, why, True)
+
+
+    def _completeSend(self, selectable, result):
+        """
+        Tell a connection how much of its buffered data a send wrote, and
+        disconnect it if the send or the connection fails.
+        """
+        why = None
+        try:
+            if result < 0:
+                why = CONNECTION_LOST
+            else:
+                selectable._discardWritten(result)
+                why = selectable._afterWrite()
+        except:
+            why = sys.exc_info()[1]
+            log.err()
+        if why:
+            self._disconnectSelectable(selectable, why, False)
+
+
+    def _completeRequest(self, token, result):
+        """
+        Handle the completion of a receive or send.
+        """
+        kind, fd, selectable, memory = self._requests.pop(token)
+        if self._cancelled:
+            self._cancelled.discard(token)
+        registered = self._selectables.get(fd) is selectable
+        if kind is _RECEIVE:
+            del self._receiving[fd]
+            if result < 0 and result in _RETRY:
+                self._dirty.add(fd)
+                return
+            if registered and fd in self._reads:
+                log.callWithLogger(selectable, self._completeReceive,
+                                   selectable, memory[0], result)
+                # Keep receiving straight away, unless that changed.
+                if (result > 0 and fd in self._reads and
+                        fd not in self._receiving and
+                        self._selectables.get(fd) is selectable):
+                    self._receive(fd, selectable, memory)
+                    return
+            elif result >= 0:
+                # Reading stopped after the data was received; keep it for
+                # when it starts again.
+                self._undelivered[selectable] = (memory[0], result)
+            self._dirty.add(fd)
+        else:
+            del self._sending[fd]
+            # Another send, or a poll, may be needed.
+            self._dirty.add(fd)
+            if result < 0 and result in _RETRY:
+                return
+            if registered and fd in self._writes:
+                log.callWithLogger(selectable, self._completeSend,
+                                   selectable, result)
+            elif result > 0:
+                # Writing stopped after the data was sent; it must not be
+                # sent again.
+                selectable._discardWritten(result)
+
+
+    def doPoll(self, timeout):
+        """
+        Submit all queued requests and wait for some of them to complete.
+        """
+        undelivered = self._arm()
+        if undelivered:
+            timeout = 0
+
+        instrumentation = self._instrumentation
+        if instrumentation is not None:
+            start = self.seconds()
+        # Interruption by a signal and timing out are both treated as a
+        # wait that ended without events.
+        self._ring.submitAndWait(timeout)
+        completions = self._ring.reap()
+
+        if instrumentation is not None:
+            instrumentation.pollCompleted(
+                self.seconds() - start, len(completions))
+
+        _drdw = self._doReadOrWrite
+        for token, event in completions:
+            if token in self._requests:
+                self._completeRequest(token, event)
+                continue
+            fd = self._tokens.pop(token, None)
+            if fd is None:
+                # A cancellation, or a poll which was cancelled after firing.
+                continue
+            del self._armed[fd]
+            # Polls are one-shot; submit a new one with the next wait if the
+            # descriptor is still being watched.
+            self._dirty.add(fd)
+            if event < 0:
+                # The poll could not be submitted at all, most likely because
+                # the descriptor was closed without being removed first.
+                event = POLLNVAL
+            else:
+                # Events may have stopped being watched since the poll was
+                # submitted; don't report those.
+                if fd not in self._reads:
+                    event &= ~POLLIN
+                if fd not in self._writes:
+                    event &= ~POLLOUT
+                if not event:
+                    continue
+            selectable = self._selectables[fd]
+            log.callWithLogger(selectable, _drdw, selectable, fd, event)
+
+        for selectable in undelivered:
+            fd = selectable.fileno()
+            if (self._selectables.get(fd) is selectable and
+                    fd in self._reads and selectable in self._undelivered):
+                buffer, result = self._undelivered.pop(selectable)
+                self._dirty.add(fd)
+                log.callWithLogger(selectable, self._completeReceive,
+                                   selectable, buffer, result)
+
+    doIteration = doPoll
+
+
+def install():
+    """
+    Install the io_uring() reactor.
+    """
+    p = UringReactor()
+    from twisted.internet.main import installReactor
+    installReactor(p)
+
+
+__all__ = ["UringReactor", "install"]
@@ -11,7 +11,7 @@ from __future__ import absolute_import, division
 
 # System imports
 import re
-from struct import pack, unpack, calcsize
+from struct import pack, unpack, unpack_from, calcsize
 from io import BytesIO
 import math
 
@@ -674,10 +674,15 @@ class _RecvdCompatHack(object):
     the default __set__ behavior in both new-style and old-style subclasses.
     """
     def __get__(self, oself, type=None):
-        return oself._unprocessed[oself._compatibilityOffset:]
+        recvd = oself._unprocessed[oself._compatibilityOffset:]
+        if isinstance(recvd, memoryview):
+            # IntNStringReceiver.bufferReceived parses in place.
+            recvd = recvd.tobytes()
+        return recvd
 
 
 
+@implementer(interfaces.IBufferedProtocol)
 class IntNStringReceiver(protocol.Protocol, _PauseableMixin):
     """
     Generic class for length prefixed protocols.
@@ -685,7 +690,8 @@ class IntNStringReceiver(protocol.Protocol, _PauseableMixin):
     @ivar _unprocessed: bytes received, but not yet broken up into messages /
         sent to stringReceived.  _compatibilityOffset must be updated when this
         value is updated so that the C{recvd} attribute can be generated
-        correctly.
+        correctly.  While L{bufferReceived} is delivering messages this is
+        the C{memoryview} it is parsing.
     @type _unprocessed: C{bytes}
 
     @ivar structFormat: format used for struct packing/unpacking. Define it in
@@ -782,6 +788,76 @@ class IntNStringReceiver(protocol.Protocol, _PauseableMixin):
         self._compatibilityOffset = 0
 
 
+    def bufferReceived(self, data):
+        """
+        Convert int prefixed strings in a C{memoryview} into calls to
+        stringReceived.
+
+        Each complete message is copied out of C{data} exactly once and only
+        an incomplete trailing message is kept for the next call.  Subclasses
+        which override C{dataReceived} have it called with a copy of C{data}
+        instead.
+        """
+        dataReceived = self.__class__.dataReceived
+        if getattr(dataReceived, '__func__', dataReceived) is not (
+                IntNStringReceiver.__dict__['dataReceived']):
+            self.dataReceived(data.tobytes())
+            return
+
+        prefixLength = self.prefixLength
+        fmt = self.structFormat
+        currentOffset = 0
+        end = len(data)
+
+        # Finish any message left over from an earlier call by handing
+        # dataReceived just the bytes it is still missing.
+        while self._unprocessed and currentOffset < end:
+            if self.paused or self._compatibilityOffset:
+                self.dataReceived(data[currentOffset:].tobytes())
+                return
+            pending = len(self._unprocessed)
+            if pending < prefixLength:
+                needed = prefixLength - pending
+            else:
+                length, = unpack_from(fmt, self._unprocessed)
+                needed = prefixLength + length - pending
+            self.dataReceived(
+                data[currentOffset:currentOffset + needed].tobytes())
+            currentOffset += needed
+        if self._unprocessed:
+            return
+
+        self._unprocessed = data
+        self._compatibilityOffset = currentOffset
+
+        while end >= (currentOffset + prefixLength) and not self.paused:
+            messageStart = currentOffset + prefixLength
+            length, = unpack_from(fmt, data, currentOffset)
+            if length > self.MAX_LENGTH:
+                self._unprocessed = data[currentOffset:].tobytes()
+                self._compatibilityOffset = 0
+                self.lengthLimitExceeded(length)
+                return
+            messageEnd = messageStart + length
+            if end < messageEnd:
+                break
+
+            packet = data[messageStart:messageEnd].tobytes()
+            currentOffset = messageEnd
+            self._compatibilityOffset = currentOffset
+            self.stringReceived(packet)
+
+            # See dataReceived.
+            if 'recvd' in self.__dict__:
+                self._unprocessed = b""
+                self._compatibilityOffset = 0
+                self.dataReceived(self.__dict__.pop('recvd'))
+                return
+
+        self._unprocessed = data[currentOffset:].tobytes()
+        self._compatibilityOffset = 0
+
+
     def sendString(self, string):
         """
         Send a prefixed string to the other end of the connection.
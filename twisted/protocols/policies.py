@@ -546,12 +546,16 @@ class TimeoutProtocol(ProtocolWrapper):
 class TimeoutFactory(WrappingFactory):
     """
     Factory for TimeoutWrapper.
+
+    @ivar timerWheel: If not C{None}, an L{ITimerWheel} provider used to
+        schedule the timeouts of all the protocols built by this factory.
     """
     protocol = TimeoutProtocol
 
 
-    def __init__(self, wrappedFactory, timeoutPeriod=30*60):
+    def __init__(self, wrappedFactory, timeoutPeriod=30*60, timerWheel=None):
         self.timeoutPeriod = timeoutPeriod
+        self.timerWheel = timerWheel
         WrappingFactory.__init__(self, wrappedFactory)
 
 
@@ -563,7 +567,11 @@ class TimeoutFactory(WrappingFactory):
     def callLater(self, period, func):
         """
         Wrapper around L{reactor.callLater} for test purpose.
+
+        If L{timerWheel} is set, the call is scheduled with it instead.
         """
+        if self.timerWheel is not None:
+            return self.timerWheel.callLater(period, func)
         from twisted.internet import reactor
         return reactor.callLater(period, func)
 
@@ -674,15 +682,25 @@ class TimeoutMixin:
     default, closes the connection.
 
     @cvar timeOut: The number of seconds after which to timeout the connection.
+
+    @cvar timerWheel: If not C{None}, an L{ITimerWheel} provider used to
+        schedule the timeout instead of the reactor.  Sharing one wheel
+        between many connections makes resetting their timeouts much cheaper,
+        at the cost of timeouts firing up to the wheel's granularity late.
     """
     timeOut = None
+    timerWheel = None
 
     __timeoutCall = None
 
     def callLater(self, period, func):
         """
         Wrapper around L{reactor.callLater} for test purpose.
+
+        If L{timerWheel} is set, the call is scheduled with it instead.
         """
+        if self.timerWheel is not None:
+            return self.timerWheel.callLater(period, func)
         from twisted.internet import reactor
         return reactor.callLater(period, func)
 
@@ -17,7 +17,7 @@ from twisted.python.compat import _PY3, iterbytes
 from twisted.trial import unittest
 from twisted.protocols import basic
 from twisted.internet import protocol, error, task
-from twisted.internet.interfaces import IProducer
+from twisted.internet.interfaces import IProducer, IBufferedProtocol
 from twisted.test import proto_helpers
 
 _PY3NEWSTYLESKIP = "All classes are new style on Python 3."
@@ -959,6 +959,151 @@ class RecvdAttributeMixin(object):
 
 
 
+class BufferReceivedMixin(object):
+    """
+    Mixin defining tests for L{IntNStringReceiver.bufferReceived}, to be
+    combined with L{IntNTestCaseMixin} on a L{TestCase} subclass.
+    """
+
+    def makeMessage(self, protocol, data):
+        """
+        Return C{data} prefixed with message length in C{protocol.structFormat}
+        form.
+        """
+        return struct.pack(protocol.structFormat, len(data)) + data
+
+
+    def test_interface(self):
+        """
+        L{IntNStringReceiver} instances provide L{IBufferedProtocol}.
+        """
+        self.assertTrue(verifyObject(IBufferedProtocol, self.getProtocol()))
+
+
+    def test_bufferReceived(self):
+        """
+        Every complete message in the C{memoryview} passed to
+        L{IntNStringReceiver.bufferReceived} is delivered to
+        C{stringReceived} as C{bytes}.
+        """
+        r = self.getProtocol()
+        r.bufferReceived(memoryview(
+                b"".join([self.makeMessage(r, s) for s in self.strings])))
+        self.assertEqual(r.received, self.strings)
+        self.assertEqual([type(s) for s in r.received],
+                         [bytes] * len(self.strings))
+
+
+    def test_bufferReceivedPartial(self):
+        """
+        Messages split across several calls to
+        L{IntNStringReceiver.bufferReceived} are reassembled.
+        """
+        r = self.getProtocol()
+        for s in self.strings:
+            for c in iterbytes(self.makeMessage(r, s)):
+                r.bufferReceived(memoryview(c))
+        self.assertEqual(r.received, self.strings)
+
+
+    def test_bufferReceivedCopiesRemainder(self):
+        """
+        L{IntNStringReceiver.bufferReceived} copies an incomplete trailing
+        message out of the buffer, so it is unaffected when the transport
+        reuses the buffer for the next read.
+        """
+        r = self.getProtocol()
+        message = self.makeMessage(r, b"hello")
+        buf = bytearray(message[:3])
+        r.bufferReceived(memoryview(buf))
+        buf[:] = b"xxx"
+        r.bufferReceived(memoryview(bytearray(message[3:])))
+        self.assertEqual(r.received, [b"hello"])
+
+
+    def test_bufferReceivedRecvd(self):
+        """
+        In stringReceived, recvd contains the remaining data that was passed
+        to L{IntNStringReceiver.bufferReceived} as C{bytes}.
+        """
+        result = []
+        r = self.getProtocol()
+        def stringReceived(receivedString):
+            result.append(r.recvd)
+        r.stringReceived = stringReceived
+        completeMessage = self.makeMessage(r, b'a' * 5)
+        incompleteMessage = self.makeMessage(r, b'b' * 5)[:-1]
+        r.bufferReceived(memoryview(completeMessage + incompleteMessage))
+        self.assertEqual(result, [incompleteMessage])
+        self.assertEqual(r.recvd, incompleteMessage)
+
+
+    def test_bufferReceivedRecvdChanged(self):
+        """
+        In stringReceived, if recvd is changed, messages are parsed from it
+        rather than the rest of the buffer.
+        """
+        r = self.getProtocol()
+        result = []
+        messageC = self.makeMessage(r, b'c' * 5)
+        def stringReceived(receivedString):
+            if not result:
+                r.recvd = messageC
+            result.append(receivedString)
+        r.stringReceived = stringReceived
+        r.bufferReceived(memoryview(
+                self.makeMessage(r, b'a' * 5) + self.makeMessage(r, b'b' * 5)))
+        self.assertEqual(result, [b'a' * 5, b'c' * 5])
+
+
+    def test_bufferReceivedLengthLimitExceeded(self):
+        """
+        When a length prefix greater than C{MAX_LENGTH} is passed to
+        L{IntNStringReceiver.bufferReceived}, C{lengthLimitExceeded} is called
+        and the message is not delivered.
+        """
+        r = self.getProtocol()
+        result = []
+        def lengthLimitExceeded(length):
+            result.append((length, r.recvd))
+        r.lengthLimitExceeded = lengthLimitExceeded
+        r.MAX_LENGTH = 10
+        message = self.makeMessage(r, b'x' * 11)
+        r.bufferReceived(memoryview(message))
+        self.assertEqual(result, [(11, message)])
+        self.assertEqual(r.received, [])
+
+
+    def test_bufferReceivedPaused(self):
+        """
+        Data passed to L{IntNStringReceiver.bufferReceived} while the
+        protocol is paused is delivered when it is resumed.
+        """
+        r = self.getProtocol()
+        data = b"".join([self.makeMessage(r, s) for s in self.strings])
+        r.pauseProducing()
+        r.bufferReceived(memoryview(data[:1]))
+        r.bufferReceived(memoryview(data[1:]))
+        self.assertEqual(r.received, [])
+        r.resumeProducing()
+        self.assertEqual(r.received, self.strings)
+
+
+    def test_bufferReceivedOverriddenDataReceived(self):
+        """
+        If a subclass overrides C{dataReceived},
+        L{IntNStringReceiver.bufferReceived} passes it a copy of the buffer.
+        """
+        data = []
+        class DataReceivedOverride(self.protocol):
+            def dataReceived(self, bytes):
+                data.append(bytes)
+        r = DataReceivedOverride()
+        r.bufferReceived(memoryview(b"abc"))
+        self.assertEqual(data, [b"abc"])
+
+
+
 class TestInt32(TestMixin, basic.Int32StringReceiver):
     """
     A L{basic.Int32StringReceiver} storing received strings in an array.
@@ -968,7 +1113,8 @@ class TestInt32(TestMixin, basic.Int32StringReceiver):
 
 
 
-class Int32TestCase(unittest.SynchronousTestCase, IntNTestCaseMixin, RecvdAttributeMixin):
+class Int32TestCase(unittest.SynchronousTestCase, IntNTestCaseMixin,
+                  RecvdAttributeMixin, BufferReceivedMixin):
     """
     Test case for int32-prefixed protocol
     """
@@ -998,7 +1144,8 @@ class TestInt16(TestMixin, basic.Int16StringReceiver):
 
 
 
-class Int16TestCase(unittest.SynchronousTestCase, IntNTestCaseMixin, RecvdAttributeMixin):
+class Int16TestCase(unittest.SynchronousTestCase, IntNTestCaseMixin,
+                  RecvdAttributeMixin, BufferReceivedMixin):
     """
     Test case for int16-prefixed protocol
     """
@@ -1056,7 +1203,8 @@ class TestInt8(TestMixin, basic.Int8StringReceiver):
 
 
 
-class Int8TestCase(unittest.SynchronousTestCase, IntNTestCaseMixin, RecvdAttributeMixin):
+class Int8TestCase(unittest.SynchronousTestCase, IntNTestCaseMixin,
+                  RecvdAttributeMixin, BufferReceivedMixin):
     """
     Test case for int8-prefixed protocol
     """
@@ -23,7 +23,9 @@ else:
     from OpenSSL.crypto import X509Type
     from OpenSSL.SSL import (TLSv1_METHOD, Error, Context, ConnectionType,
                              WantReadError)
-    from twisted.internet.ssl import PrivateCertificate
+    from OpenSSL.SSL import VERIFY_PEER
+    from twisted.internet.ssl import PrivateCertificate, ClientSessionCache
+    from twisted.internet._sslverify import _SessionCachingContextFactory
     from twisted.test.ssl_helpers import (ClientTLSContext, ServerTLSContext,
                                           certPath)
 
@@ -853,6 +855,300 @@ class TLSMemoryBIOTests(TestCase):
 
 
 
+class CountingTransport(StringTransport):
+    """
+    A L{StringTransport} which counts how many times it is written to.
+
+    @ivar writes: The number of calls to C{write} and C{writeSequence}.
+    """
+    writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        StringTransport.write(self, data)
+
+
+    def writeSequence(self, data):
+        self.writes += 1
+        StringTransport.writeSequence(self, data)
+
+
+
+class RecordingConnection(object):
+    """
+    A stand-in for an L{OpenSSL.SSL.Connection} which records the bytes
+    passed to C{send}.
+    """
+
+    def __init__(self):
+        self.sent = []
+
+
+    def send(self, bytes):
+        self.sent.append(bytes)
+        return len(bytes)
+
+
+    def bio_read(self, size):
+        raise WantReadError()
+
+
+
+class TLSBatchingTests(TestCase):
+    """
+    Tests for how L{TLSMemoryBIOProtocol} groups the bytes written to it and
+    received by it.
+    """
+
+    def connect(self, serverProtocol, clientProtocol):
+        """
+        Connect a client and a server over L{CountingTransport}s and complete
+        the handshake.
+
+        @return: The client and server L{TLSMemoryBIOProtocol}s.
+        """
+        clientFactory = TLSMemoryBIOFactory(
+            ClientTLSContext(), True,
+            ClientFactory.forProtocol(lambda: clientProtocol))
+        serverFactory = TLSMemoryBIOFactory(
+            ServerTLSContext(), False,
+            ServerFactory.forProtocol(lambda: serverProtocol))
+        client = clientFactory.buildProtocol(None)
+        server = serverFactory.buildProtocol(None)
+        client.makeConnection(CountingTransport())
+        server.makeConnection(CountingTransport())
+        self.pump(client, server)
+        return client, server
+
+
+    def pump(self, client, server):
+        """
+        Transfer bytes back and forth between two TLS protocols until neither
+        has anything more to send.
+        """
+        while True:
+            clientData = client.transport.value()
+            client.transport.clear()
+            if clientData:
+                server.dataReceived(clientData)
+            serverData = server.transport.value()
+            server.transport.clear()
+            if serverData:
+                client.dataReceived(serverData)
+            if not clientData and not serverData:
+                break
+
+
+    def test_writesWhileReceivingBatched(self):
+        """
+        The bytes a protocol writes in response to received bytes are
+        encrypted together once it has handled them, and sent with a single
+        write to the underlying transport.
+        """
+        class Responder(Protocol):
+            def dataReceived(self, bytes):
+                for i in range(10):
+                    self.transport.write(b"x" * 10)
+                self.transport.writeSequence([b"y" * 10] * 10)
+
+        clientProtocol = AccumulatingProtocol(999999)
+        client, server = self.connect(Responder(), clientProtocol)
+        client.write(b"?")
+        server.transport.writes = 0
+        server.dataReceived(client.transport.value())
+        self.assertEqual(server.transport.writes, 1)
+
+        client.dataReceived(server.transport.value())
+        self.assertEqual(clientProtocol.received, [b"x" * 100 + b"y" * 100])
+
+
+    def test_loseConnectionWhileReceiving(self):
+        """
+        Bytes written in response to received bytes before C{loseConnection}
+        is called are sent before the TLS close alert.
+        """
+        class Responder(Protocol):
+            def dataReceived(self, bytes):
+                self.transport.write(b"goodbye")
+                self.transport.loseConnection()
+
+        clientProtocol = AccumulatingProtocol(999999)
+        client, server = self.connect(Responder(), clientProtocol)
+        client.write(b"?")
+        self.pump(client, server)
+        self.assertEqual(clientProtocol.received, [b"goodbye"])
+        self.assertTrue(server.transport.disconnecting)
+
+
+    def test_writeSequenceGroupsSmallChunks(self):
+        """
+        L{TLSMemoryBIOProtocol.writeSequence} joins runs of chunks smaller than
+        a TLS record before encrypting them, but passes on larger chunks
+        as-is.
+        """
+        client, server = self.connect(Protocol(), Protocol())
+        connection = client._tlsConnection = RecordingConnection()
+        big = b"z" * 2 ** 15
+        client.writeSequence([b"a", b"b", big, b"c", b"d"])
+        self.assertEqual(connection.sent, [b"ab", big, b"cd"])
+        self.assertIdentical(connection.sent[1], big)
+
+
+    def test_sendBIODrained(self):
+        """
+        All of the TLS traffic resulting from a write is sent with a single
+        write to the underlying transport, however much of it there is.
+        """
+        clientProtocol = AccumulatingProtocol(999999999)
+        client, server = self.connect(Protocol(), clientProtocol)
+        bytes = b"x" * 2 ** 18
+        server.transport.writes = 0
+        server.write(bytes)
+        self.assertEqual(server.transport.writes, 1)
+        client.dataReceived(server.transport.value())
+        self.assertEqual(b"".join(clientProtocol.received), bytes)
+
+
+    def test_receivedRecordsCoalesced(self):
+        """
+        Application bytes from several TLS records which arrive together are
+        delivered to the protocol together, in chunks of up to
+        C{_receiveBatchSize} bytes.
+        """
+        clientProtocol = AccumulatingProtocol(999999999)
+        client, server = self.connect(Protocol(), clientProtocol)
+        client._receiveBatchSize = 3 * 2 ** 14
+        for i in range(5):
+            server.write(b"x" * 2 ** 14)
+        client.dataReceived(server.transport.value())
+        self.assertEqual(
+            [len(bytes) for bytes in clientProtocol.received],
+            [3 * 2 ** 14, 2 * 2 ** 14])
+
+
+
+class VerifyingClientTLSContext(object):
+    """
+    A client context factory whose contexts record the certificates they
+    verify.  A resumed session is not verified again.
+
+    @ivar verified: A C{list} with an element for every call of the
+        verification callback.
+    """
+    isClient = True
+
+    def __init__(self):
+        self.verified = []
+
+
+    def _verify(self, connection, certificate, errno, depth, ok):
+        self.verified.append(depth)
+        return True
+
+
+    def getContext(self):
+        context = Context(TLSv1_METHOD)
+        context.set_verify(VERIFY_PEER, self._verify)
+        return context
+
+
+
+class SingleContextFactory(object):
+    """
+    A server context factory which returns the same context every time, so
+    that it remembers sessions across connections.
+    """
+    isClient = False
+
+    def __init__(self):
+        self._context = ServerTLSContext().getContext()
+
+
+    def getContext(self):
+        return self._context
+
+
+
+class GreetingProtocol(Protocol):
+    """
+    A protocol which writes a byte as soon as it is connected.
+    """
+    def connectionMade(self):
+        self.transport.write(b"x")
+
+
+
+class ClientSessionCacheTests(TestCase):
+    """
+    Tests for L{TLSMemoryBIOProtocol}'s use of a client session cache given by
+    its context factory.
+    """
+
+    def setUp(self):
+        self.cache = ClientSessionCache()
+        self.clientContextFactory = VerifyingClientTLSContext()
+        self.serverContextFactory = SingleContextFactory()
+
+
+    def connect(self):
+        """
+        Connect a client, which caches sessions in C{self.cache}, to a server
+        over a loopback connection.  The client writes a byte, and the server
+        disconnects once it has received it.
+
+        @return: A L{Deferred} which fires once the connection is lost.
+        """
+        clientFactory = ClientFactory()
+        clientFactory.protocol = GreetingProtocol
+        clientContextFactory = _SessionCachingContextFactory(
+            self.clientContextFactory, self.cache, ("example.com", 443, None))
+        sslClientProtocol = TLSMemoryBIOFactory(
+            clientContextFactory, True, clientFactory).buildProtocol(None)
+
+        serverFactory = ServerFactory()
+        serverFactory.protocol = lambda: AccumulatingProtocol(1)
+        sslServerProtocol = TLSMemoryBIOFactory(
+            self.serverContextFactory, False,
+            serverFactory).buildProtocol(None)
+
+        return loopbackAsync(sslServerProtocol, sslClientProtocol)
+
+
+    def test_sessionStored(self):
+        """
+        The session a client negotiates is stored in the cache under the key
+        given by its context factory.
+        """
+        d = self.connect()
+        def disconnected(ignored):
+            self.assertEqual(self.cache.misses, 1)
+            self.assertEqual(len(self.cache), 1)
+            self.assertNotIdentical(
+                self.cache.get(("example.com", 443, None)), None)
+        d.addCallback(disconnected)
+        return d
+
+
+    def test_sessionResumed(self):
+        """
+        A client offers the session stored in the cache, and the server
+        resumes it rather than performing a full handshake, so the server's
+        certificate is not verified again.
+        """
+        d = self.connect()
+        def disconnected(ignored):
+            self.assertNotEqual(self.clientContextFactory.verified, [])
+            del self.clientContextFactory.verified[:]
+            return self.connect()
+        d.addCallback(disconnected)
+        def reconnected(ignored):
+            self.assertEqual(self.cache.hits, 1)
+            self.assertEqual(self.clientContextFactory.verified, [])
+        d.addCallback(reconnected)
+        return d
+
+
+
 class TLSProducerTests(TestCase):
     """
     The TLS transport must support the IConsumer interface.
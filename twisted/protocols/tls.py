@@ -261,6 +261,25 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
     @ivar _producer: The current producer registered via C{registerProducer},
         or C{None} if no producer has been registered or a previous one was
         unregistered.
+
+    @ivar _sessionCache: For a client whose context factory has a
+        C{sessionCache} attribute, that L{ClientSessionCache
+        <twisted.internet.ssl.ClientSessionCache>}; otherwise C{None}.  A
+        session stored in it under the context factory's C{sessionKey} is
+        offered to the server when connecting, and the session negotiated is
+        stored in it once the handshake is known to have completed and again
+        when the connection is lost (TLS 1.3 servers only send the tickets
+        which make a session resumable after the handshake).
+
+    @ivar _sessionKey: The key sessions are looked up and stored under in
+        C{_sessionCache}.
+
+    @ivar _writeBatch: While received bytes are being delivered to the
+        application, a C{list} of the application-level bytes it writes.
+        These are encrypted together once delivery is finished, so that
+        small writes share TLS records and all of the resulting TLS traffic
+        is written to the underlying transport at once.  C{None} at other
+        times, when writes are encrypted and sent immediately.
     """
 
     _reason = None
@@ -268,6 +287,18 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
     _lostTLSConnection = False
     _writeBlockedOnRead = False
     _producer = None
+    _sessionCache = None
+    _sessionKey = None
+    _writeBatch = None
+
+    # The most cleartext a single TLS record carries.
+    _recordSize = 2 ** 14
+    # The most application-level bytes delivered to the protocol at once.
+    _receiveBatchSize = 2 ** 18
+    # Large enough that the send BIO is usually drained in one read, small
+    # enough that the temporary buffer pyOpenSSL allocates for it isn't
+    # mapped and unmapped every time.
+    _sendBIOReadSize = 2 ** 16
 
     def __init__(self, factory, wrappedProtocol, _connectWrapped=True):
         ProtocolWrapper.__init__(self, factory, wrappedProtocol)
@@ -292,10 +323,12 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
         Connect this wrapper to the given transport and initialize the
         necessary L{OpenSSL.SSL.Connection} with a memory BIO.
         """
-        tlsContext = self.factory._contextFactory.getContext()
+        contextFactory = self.factory._contextFactory
+        tlsContext = contextFactory.getContext()
         self._tlsConnection = Connection(tlsContext, None)
         if self.factory._isClient:
             self._tlsConnection.set_connect_state()
+            self._offerSession(contextFactory)
         else:
             self._tlsConnection.set_accept_state()
         self._appSendBuffer = []
@@ -327,18 +360,63 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
             self._flushSendBIO()
 
 
+    def _offerSession(self, contextFactory):
+        """
+        Offer the session cached for this connection's server, if sessions
+        are being cached and there is one.
+        """
+        self._sessionCache = getattr(contextFactory, "sessionCache", None)
+        if self._sessionCache is None:
+            return
+        self._sessionKey = contextFactory.sessionKey
+        session = self._sessionCache.get(self._sessionKey)
+        if session is not None:
+            try:
+                self._tlsConnection.set_session(session)
+            except Error:
+                # For example, the session was negotiated with a protocol
+                # version this connection won't use.
+                self._sessionCache.invalidate(self._sessionKey)
+
+
+    def _recordSession(self):
+        """
+        Store the session negotiated on this connection, if sessions are being
+        cached.
+        """
+        if self._sessionCache is not None:
+            session = self._tlsConnection.get_session()
+            if session is not None:
+                self._sessionCache.store(self._sessionKey, session)
+
+
+    def _handshakeFinished(self):
+        """
+        Note that the handshake is known to have completed.
+        """
+        self._handshakeDone = True
+        self._recordSession()
+
+
     def _flushSendBIO(self):
         """
-        Read any bytes out of the send BIO and write them to the underlying
-        transport.
+        Read all of the bytes out of the send BIO and write them to the
+        underlying transport with a single call.
         """
-        try:
-            bytes = self._tlsConnection.bio_read(2 ** 15)
-        except WantReadError:
-            # There may be nothing in the send BIO right now.
-            pass
-        else:
-            self.transport.write(bytes)
+        chunks = []
+        while True:
+            try:
+                bytes = self._tlsConnection.bio_read(self._sendBIOReadSize)
+            except WantReadError:
+                # There may be nothing (more) in the send BIO right now.
+                break
+            chunks.append(bytes)
+            if len(bytes) < self._sendBIOReadSize:
+                break
+        if len(chunks) == 1:
+            self.transport.write(chunks[0])
+        elif chunks:
+            self.transport.writeSequence(chunks)
 
 
     def _flushReceiveBIO(self):
@@ -348,21 +426,60 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
         care of delivering any application-level bytes which are received to
         the protocol, as well as handling of the various exceptions which
         can come from trying to get such bytes.
+
+        Anything the protocol writes in response is batched, and encrypted
+        and sent once all of the received bytes have been delivered.
+        """
+        batching = self._writeBatch is None
+        if batching:
+            self._writeBatch = []
+        try:
+            self._receive()
+        finally:
+            if batching:
+                self._encryptWriteBatch()
+                self._writeBatch = None
+
+        # The received bytes might have generated a response which needs to be
+        # sent now.  For example, the handshake involves several round-trip
+        # exchanges without ever producing application-bytes.
+        self._flushSendBIO()
+
+
+    def _receive(self):
+        """
+        Decrypt and deliver application-level bytes from the receive BIO, for
+        L{_flushReceiveBIO}.
+
+        As many bytes as are available, up to C{_receiveBatchSize}, are
+        delivered to the protocol with a single call.  The records they were
+        decrypted from are only joined if there is more than one.
         """
         # Keep trying this until an error indicates we should stop or we
         # close the connection.  Looping is necessary to make sure we
         # process all of the data which was put into the receive BIO, as
         # there is no guarantee that a single recv call will do it all.
         while not self._lostTLSConnection:
+            received = []
+            size = 0
             try:
-                bytes = self._tlsConnection.recv(2 ** 15)
+                while size < self._receiveBatchSize:
+                    # No more than a record is decrypted per call anyway, and
+                    # asking for more only makes pyOpenSSL allocate a bigger
+                    # temporary buffer.
+                    bytes = self._tlsConnection.recv(self._recordSize)
+                    received.append(bytes)
+                    size += len(bytes)
             except WantReadError:
                 # The newly received bytes might not have been enough to produce
-                # any application data.
+                # any (more) application data.
+                self._deliver(received)
                 break
             except ZeroReturnError:
+                self._deliver(received)
                 # TLS has shut down and no more TLS data will be received over
                 # this connection.
+                self._encryptWriteBatch()
                 self._shutdownTLS()
                 # Passing in None means the user protocol's connnectionLost
                 # will get called with reason from underlying transport:
@@ -380,18 +497,31 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
                 else:
                     failure = Failure()
 
+                self._deliver(received)
                 self._flushSendBIO()
                 self._tlsShutdownFinished(failure)
             else:
-                # If we got application bytes, the handshake must be done by
-                # now.  Keep track of this to control error reporting later.
-                self._handshakeDone = True
-                ProtocolWrapper.dataReceived(self, bytes)
+                # The batch filled up, so there may be more waiting.
+                self._deliver(received)
 
-        # The received bytes might have generated a response which needs to be
-        # sent now.  For example, the handshake involves several round-trip
-        # exchanges without ever producing application-bytes.
-        self._flushSendBIO()
+
+    def _deliver(self, received):
+        """
+        Deliver application-level bytes to the protocol, if there are any.
+
+        @param received: A C{list} of C{bytes} decrypted from successive
+            records.
+        """
+        if received:
+            # If we got application bytes, the handshake must be done by
+            # now.  Keep track of this to control error reporting later.
+            if not self._handshakeDone:
+                self._handshakeFinished()
+            if len(received) == 1:
+                bytes = received[0]
+            else:
+                bytes = b"".join(received)
+            ProtocolWrapper.dataReceived(self, bytes)
 
 
     def dataReceived(self, bytes):
@@ -408,8 +538,8 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
             self._writeBlockedOnRead = False
             appSendBuffer = self._appSendBuffer
             self._appSendBuffer = []
-            for bytes in appSendBuffer:
-                self._write(bytes)
+            if not self._lostTLSConnection:
+                self._encryptBatch(appSendBuffer)
             if (not self._writeBlockedOnRead and self.disconnecting and
                 self.producer is None):
                 self._shutdownTLS()
@@ -461,6 +591,8 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
             self._tlsConnection.bio_shutdown()
             self._flushReceiveBIO()
             self._lostTLSConnection = True
+        if self._handshakeDone:
+            self._recordSession()
         reason = self._reason or reason
         self._reason = None
         ProtocolWrapper.connectionLost(self, reason)
@@ -473,6 +605,9 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
         if self.disconnecting:
             return
         self.disconnecting = True
+        # Whatever was written before this must be sent before the close
+        # alert.
+        self._encryptWriteBatch()
         if not self._writeBlockedOnRead and self._producer is None:
             self._shutdownTLS()
 
@@ -480,7 +615,9 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
     def write(self, bytes):
         """
         Process the given application bytes and send any resulting TLS traffic
-        which arrives in the send BIO.
+        which arrives in the send BIO.  While received bytes are being
+        delivered, the bytes are batched instead, and processed once delivery
+        is finished.
 
         If C{loseConnection} was called, subsequent calls to C{write} will
         drop the bytes on the floor.
@@ -492,7 +629,29 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
         # is unregistered:
         if self.disconnecting and self._producer is None:
             return
-        self._write(bytes)
+        if self._writeBatch is not None:
+            self._writeBatch.append(bytes)
+        else:
+            self._write(bytes)
+
+
+    def writeSequence(self, iovec):
+        """
+        Write a sequence of application bytes.  They are not joined first,
+        except for runs of small ones, which are joined to share TLS records.
+        """
+        iovec = list(iovec)
+        for bytes in iovec:
+            if isinstance(bytes, unicode):
+                raise TypeError(
+                    "Must write bytes to a TLS transport, not unicode.")
+        if self.disconnecting and self._producer is None:
+            return
+        if self._writeBatch is not None:
+            self._writeBatch.extend(iovec)
+        elif not self._lostTLSConnection:
+            self._encryptBatch(iovec)
+            self._flushSendBIO()
 
 
     def _write(self, bytes):
@@ -506,7 +665,21 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
         """
         if self._lostTLSConnection:
             return
+        self._encrypt(bytes)
+        self._flushSendBIO()
+
+
+    def _encrypt(self, bytes):
+        """
+        Pass the given application bytes to the TLS connection, leaving the
+        resulting TLS traffic in the send BIO.
 
+        If the TLS connection can't accept them until some bytes are
+        received, they are buffered in C{_appSendBuffer} instead.
+
+        @return: C{True} if all of the bytes were accepted, C{False}
+            otherwise.
+        """
         # A TLS payload is 16kB max
         bufferSize = 2 ** 16
 
@@ -522,7 +695,7 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
                 self._appSendBuffer.append(bytes[alreadySent:])
                 if self._producer is not None:
                     self._producer.pauseProducing()
-                break
+                return False
             except Error:
                 # Pretend TLS connection disconnected, which will trigger
                 # disconnect of underlying transport. The error will be passed
@@ -530,21 +703,61 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
                 # other SSL implementation doesn't, but losing helpful
                 # debugging information is a bad idea.
                 self._tlsShutdownFinished(Failure())
-                break
+                return False
             else:
                 # If we sent some bytes, the handshake must be done.  Keep
                 # track of this to control error reporting behavior.
-                self._handshakeDone = True
-                self._flushSendBIO()
+                if not self._handshakeDone:
+                    self._handshakeFinished()
                 alreadySent += sent
+        return True
 
 
-    def writeSequence(self, iovec):
+    def _encryptBatch(self, batch):
+        """
+        Pass a sequence of application bytes to the TLS connection with
+        L{_encrypt}, joining runs of ones smaller than a TLS record so they
+        don't each take up a record of their own.
+
+        If the TLS connection stops accepting bytes, the rest are buffered in
+        C{_appSendBuffer}, or dropped if the connection has failed.
+        """
+        groups = []
+        run = []
+        runSize = 0
+        for bytes in batch:
+            if len(bytes) >= self._recordSize:
+                if run:
+                    groups.append(b"".join(run))
+                    run = []
+                    runSize = 0
+                groups.append(bytes)
+            elif bytes:
+                run.append(bytes)
+                runSize += len(bytes)
+                if runSize >= self._recordSize:
+                    groups.append(b"".join(run))
+                    run = []
+                    runSize = 0
+        if run:
+            groups.append(b"".join(run))
+
+        for i, bytes in enumerate(groups):
+            if not self._encrypt(bytes):
+                if self._writeBlockedOnRead and not self._lostTLSConnection:
+                    self._appSendBuffer.extend(groups[i + 1:])
+                return
+
+
+    def _encryptWriteBatch(self):
         """
-        Write a sequence of application bytes by joining them into one string
-        and passing them to L{write}.
+        Pass the application bytes batched in C{_writeBatch} so far, if any,
+        to the TLS connection.  Batching continues.
         """
-        self.write(b"".join(iovec))
+        if self._writeBatch:
+            batch, self._writeBatch = self._writeBatch, []
+            if not self._lostTLSConnection:
+                self._encryptBatch(batch)
 
 
     def getPeerCertificate(self):
@@ -579,6 +792,7 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
         self._producer = None
         self._producerPaused = False
         self.transport.unregisterProducer()
+        self._encryptWriteBatch()
         if self.disconnecting and not self._writeBlockedOnRead:
             self._shutdownTLS()
 
@@ -10,6 +10,13 @@ functions that it calls will be able to use 'context.get(key)' to
 retrieve 'value'.
 
 This is thread-safe.
+
+Values set that way are only visible during the call.  A L{ContextVariable}
+also follows asynchronous work started during the call: L{Deferred
+<twisted.internet.defer.Deferred>} callbacks, L{inlineCallbacks
+<twisted.internet.defer.inlineCallbacks>} generators, delayed calls and calls
+from threads capture the values current when they are set up, and see them
+again when they run.
 """
 
 from __future__ import division, absolute_import
@@ -131,3 +138,127 @@ def installContextTracker(ctr):
     get = theContextTracker.getContext
 
 installContextTracker(ThreadedContextTracker())
+
+
+
+class _AsyncContext(local):
+    """
+    The current values of L{ContextVariable}s in each thread.
+
+    @ivar values: A C{dict} mapping L{ContextVariable}s to their values.  A
+        C{dict} is never changed once it has been made current; setting a
+        variable makes a changed copy current instead.  That makes capturing
+        the current values as cheap as keeping a reference to C{values}.
+    """
+    values = {}
+
+_currentContext = _AsyncContext()
+
+
+
+class ContextVariable(object):
+    """
+    A variable whose value is captured along with asynchronous work, so that
+    the work sees the value which was current when it was set up.
+
+    For example, a server can give every request an identifier which its log
+    messages include, however many L{Deferred
+    <twisted.internet.defer.Deferred>}s the request goes through::
+
+        requestID = ContextVariable("requestID")
+
+        def lineReceived(self, line):
+            requestID.callWithValue(uuid4().hex, self.handleRequest, line)
+
+        def handleRequest(self, line):
+            d = self.lookUp(line)
+            d.addCallback(self.render)
+            ...
+
+        def render(self, result):
+            log.msg("request %s: rendering" % (requestID.get(),))
+
+    Callbacks added to a L{Deferred}, L{inlineCallbacks
+    <twisted.internet.defer.inlineCallbacks>} generators, calls scheduled
+    with L{callLater
+    <twisted.internet.interfaces.IReactorTime.callLater>}, L{callFromThread
+    <twisted.internet.interfaces.IReactorThreads.callFromThread>} and
+    L{callInThread
+    <twisted.internet.interfaces.IReactorThreads.callInThread>} all run with
+    the values captured when they were added or scheduled.  A value set with
+    L{ContextVariable.set} while one of them runs is kept for the rest of
+    that callback or call, or for the rest of the generator, and is not seen
+    by the code which ran it.
+
+    @ivar name: A name for the variable, for debugging.
+
+    @ivar default: The value of the variable where it has not been set.
+    """
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self.default = default
+
+
+    def __repr__(self):
+        return "<ContextVariable %r>" % (self.name,)
+
+
+    def get(self):
+        """
+        Return the current value of this variable.
+        """
+        return _currentContext.values.get(self, self.default)
+
+
+    def set(self, value):
+        """
+        Set the value of this variable in the current context.
+
+        Outside of a L{Deferred<twisted.internet.defer.Deferred>} callback,
+        an L{inlineCallbacks<twisted.internet.defer.inlineCallbacks>}
+        generator or a scheduled call, the value stays set in the calling
+        thread until it is set again; use L{callWithValue} there instead.
+        """
+        values = _currentContext.values.copy()
+        values[self] = value
+        _currentContext.values = values
+
+
+    def callWithValue(self, value, f, *args, **kwargs):
+        """
+        Call C{f(*args, **kwargs)} with this variable set to C{value}, and
+        restore the previous values afterwards.
+
+        @return: Whatever C{f} returns.
+        """
+        values = _currentContext.values.copy()
+        values[self] = value
+        return callInContext(values, f, *args, **kwargs)
+
+
+
+def captureContext():
+    """
+    Capture the current values of all L{ContextVariable}s, for
+    L{callInContext}.  This is cheap: nothing is copied.
+
+    @return: An opaque object.
+    """
+    return _currentContext.values
+
+
+
+def callInContext(captured, f, *args, **kwargs):
+    """
+    Call C{f(*args, **kwargs)} with the L{ContextVariable} values captured by
+    L{captureContext}, and restore the current values afterwards.
+
+    @return: Whatever C{f} returns.
+    """
+    previous = _currentContext.values
+    _currentContext.values = captured
+    try:
+        return f(*args, **kwargs)
+    finally:
+        _currentContext.values = previous
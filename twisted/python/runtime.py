@@ -176,3 +176,84 @@ class Platform:
 platform = Platform()
 platformType = platform.getType()
 seconds = platform.seconds
+
+
+
+def _linuxMonotonic():
+    """
+    Make a function reading C{CLOCK_MONOTONIC} with C{clock_gettime(2)}, for
+    versions of Python without C{time.monotonic}.
+
+    @return: A no-argument callable returning a C{float} number of seconds,
+        or C{None} if C{clock_gettime} cannot be found.
+    """
+    try:
+        import ctypes
+        import ctypes.util
+        librt = ctypes.CDLL(ctypes.util.find_library("rt") or "librt.so.1",
+                            use_errno=True)
+        clock_gettime = librt.clock_gettime
+    except (ImportError, OSError, AttributeError):
+        return None
+
+    class timespec(ctypes.Structure):
+        _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+    CLOCK_MONOTONIC = 1
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+    def monotonic():
+        # ctypes releases the GIL around the call, so each call needs a
+        # timespec of its own for other threads not to overwrite.
+        ts = timespec()
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(ts)) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return ts.tv_sec + ts.tv_nsec * 1e-9
+
+    try:
+        monotonic()
+    except OSError:
+        return None
+    return monotonic
+
+
+
+def _findMonotonic():
+    """
+    Find the best available clock which never goes backwards.
+
+    @return: A no-argument callable returning a C{float} number of seconds
+        since an arbitrary point, and a C{bool} which is C{True} if it really
+        is monotonic and C{False} if it is only C{time.time}.
+    """
+    monotonic = getattr(time, "monotonic", None)
+    if monotonic is None and platform.isLinux():
+        monotonic = _linuxMonotonic()
+    if monotonic is None:
+        return time.time, False
+    return monotonic, True
+
+
+
+# monotonic() gets the time in seconds from an arbitrary starting point,
+# from a clock which is not affected by changes to the system time, where
+# the platform provides one.  Only the differences between its values are
+# meaningful.  isMonotonic is False where no such clock is available and
+# monotonic is time.time.
+monotonic, isMonotonic = _findMonotonic()
+
+_monotonicOffset = time.time() - monotonic()
+
+def monotonicSeconds():
+    """
+    Get the time in seconds since the epoch, as measured by L{monotonic}.
+
+    This is C{time.time()} as it was when this module was imported, plus the
+    time which has passed since according to L{monotonic}.  It stays close
+    to the system time, but does not jump when the system time is stepped,
+    for example by NTP, so intervals measured with it are always right.
+
+    @rtype: C{float}
+    """
+    return monotonic() + _monotonicOffset
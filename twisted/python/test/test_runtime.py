@@ -8,10 +8,12 @@ Tests for L{twisted.python.runtime}.
 from __future__ import division, absolute_import
 
 import sys
+import time
 
 from twisted.trial.util import suppress as SUPRESS
-from twisted.trial.unittest import SynchronousTestCase
+from twisted.trial.unittest import SkipTest, SynchronousTestCase
 
+from twisted.python import runtime
 from twisted.python.runtime import Platform, shortPythonVersion
 
 
@@ -163,3 +165,61 @@ class ForeignPlatformTests(SynchronousTestCase):
         self.assertTrue(Platform(None, 'linux2').isLinux())
         self.assertTrue(Platform(None, 'linux3').isLinux())
         self.assertFalse(Platform(None, 'win32').isLinux())
+
+
+
+class MonotonicTests(SynchronousTestCase):
+    """
+    Tests for L{twisted.python.runtime.monotonic} and
+    L{twisted.python.runtime.monotonicSeconds}.
+    """
+
+    def test_neverGoesBackwards(self):
+        """
+        Successive values of L{runtime.monotonic} never decrease.
+        """
+        values = [runtime.monotonic() for i in range(100)]
+        self.assertEqual(values, sorted(values))
+
+
+    def test_linux(self):
+        """
+        A monotonic clock is found on Linux, even without C{time.monotonic}.
+        """
+        if not runtime.platform.isLinux():
+            raise SkipTest("Only Linux is known to have CLOCK_MONOTONIC.")
+        monotonic = runtime._linuxMonotonic()
+        self.assertNotIdentical(monotonic, None)
+        self.assertTrue(runtime.isMonotonic)
+        first = monotonic()
+        self.assertTrue(monotonic() >= first)
+
+
+    def test_noMonotonic(self):
+        """
+        Where no monotonic clock is available, L{runtime.monotonic} is
+        C{time.time}.
+        """
+        self.patch(runtime, "platform", Platform(None, "win32"))
+        self.patch(runtime, "time", FakeTimeModule())
+        self.assertEqual(runtime._findMonotonic(), (time.time, False))
+
+
+    def test_monotonicSeconds(self):
+        """
+        L{runtime.monotonicSeconds} is close to the system time, but follows
+        L{runtime.monotonic} rather than the system time when that changes.
+        """
+        self.assertTrue(abs(runtime.monotonicSeconds() - time.time()) < 60)
+        self.patch(runtime, "monotonic", lambda: 100.0)
+        self.patch(runtime, "_monotonicOffset", 1000.0)
+        self.assertEqual(runtime.monotonicSeconds(), 1100.0)
+
+
+
+class FakeTimeModule(object):
+    """
+    A stand-in for the C{time} module of a version of Python without
+    C{time.monotonic}.
+    """
+    time = staticmethod(time.time)
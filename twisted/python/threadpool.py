@@ -12,18 +12,110 @@ instead of creating a thread pool directly.
 from __future__ import division, absolute_import
 
 try:
-    from Queue import Queue
+    from Queue import PriorityQueue, Empty
 except ImportError:
-    from queue import Queue
+    from queue import PriorityQueue, Empty
 import contextlib
+import itertools
+import math
 import threading
 import copy
 
 from twisted.python import log, context, failure
+from twisted.python.runtime import monotonic
 
 
 WorkerStop = object()
 
+# The priority of the entries telling workers to stop when the pool is
+# stopped, which sorts after any work so that work queued before a stop still
+# runs.
+_STOP_PRIORITY = float('inf')
+
+# The priority of the entries telling workers to stop when the pool shrinks,
+# which sorts before any work so that the pool shrinks at once, rather than
+# after all the work queued so far and any more urgent work queued later.
+_SHRINK_PRIORITY = float('-inf')
+
+
+
+class ThreadPoolFull(Exception):
+    """
+    Work was refused because the thread pool already has C{maxQueued} tasks
+    waiting for a thread.
+    """
+
+
+
+class Histogram(object):
+    """
+    A histogram of durations, with one bucket per power of two seconds.
+
+    Recording is thread-safe.
+
+    @ivar count: The number of durations recorded.
+
+    @ivar total: The sum of the durations recorded.
+
+    @ivar max: The longest duration recorded.
+    """
+    count = 0
+    total = 0
+    max = 0
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+
+    def record(self, duration):
+        """
+        Add a duration to the histogram.
+
+        @param duration: A duration in seconds.
+        @type duration: C{float}
+        """
+        # A duration d falls in the bucket 2 ** e where 2 ** (e - 1) <= d <
+        # 2 ** e.
+        exponent = math.frexp(duration)[1]
+        with self._lock:
+            self._buckets[exponent] = self._buckets.get(exponent, 0) + 1
+            self.count += 1
+            self.total += duration
+            if duration > self.max:
+                self.max = duration
+
+
+    def buckets(self):
+        """
+        @return: A C{list} of C{(upperBound, count)} tuples for the non-empty
+            buckets, in increasing order, where each count is the number of
+            durations less than C{upperBound} seconds and at least half of it.
+        """
+        with self._lock:
+            return [(2.0 ** exponent, self._buckets[exponent])
+                    for exponent in sorted(self._buckets)]
+
+
+    def percentile(self, percent):
+        """
+        Estimate a percentile of the recorded durations.
+
+        @param percent: The percentile, from 0 to 100.
+
+        @return: The upper bound of the bucket holding the percentile, or
+            C{None} if nothing has been recorded.
+        """
+        buckets = self.buckets()
+        needed = sum([count for (bound, count) in buckets]) * percent / 100.0
+        seen = 0
+        for bound, count in buckets:
+            seen += count
+            if seen >= needed:
+                return bound
+        return None
+
+
 
 class ThreadPool:
     """
@@ -33,6 +125,35 @@ class ThreadPool:
     L{callInThread} and L{stop} should only be called from
     a single thread, unless you make a subclass where L{stop} and
     L{_startSomeWorkers} are synchronized.
+
+    Work is run in order of priority, and in the order it was queued among
+    work of the same priority; see L{callInThreadWithPriority}.
+
+    @ivar maxQueued: If not C{None}, the number of tasks which may wait for
+        a thread before further work is refused with L{ThreadPoolFull}.
+
+    @ivar targetLatency: If C{None}, a thread is started whenever there is
+        more work queued than idle threads, up to C{max}.  Otherwise, a
+        thread is only started when the next task to run has already waited
+        this many seconds; this is checked whenever work is queued or a task
+        completes.
+
+    @ivar idleTimeout: If not C{None}, the number of seconds after which an
+        idle thread exits, as long as more than C{min} threads are left.
+
+    @ivar waitTime: A L{Histogram} of how long tasks waited for a thread.
+
+    @ivar runTime: A L{Histogram} of how long tasks took to run.
+
+    @ivar _seconds: The clock used for L{waitTime}, L{runTime} and
+        L{targetLatency}.
+
+    @ivar _lock: A lock held while the number of workers changes, since
+        workers stop themselves when idle and start others when
+        C{targetLatency} is set.
+
+    @ivar _stopsQueued: The number of L{WorkerStop} entries in C{q}, which
+        are not counted as tasks waiting for a thread.
     """
     min = 5
     max = 20
@@ -40,26 +161,44 @@ class ThreadPool:
     started = False
     workers = 0
     name = None
+    maxQueued = None
+    targetLatency = None
+    idleTimeout = None
+
+    defaultPriority = 0
+    _stopsQueued = 0
 
     threadFactory = threading.Thread
     currentThread = staticmethod(threading.currentThread)
+    _seconds = staticmethod(monotonic)
 
-    def __init__(self, minthreads=5, maxthreads=20, name=None):
+    def __init__(self, minthreads=5, maxthreads=20, name=None,
+                 maxQueued=None, targetLatency=None, idleTimeout=None):
         """
         Create a new threadpool.
 
         @param minthreads: minimum number of threads in the pool
         @param maxthreads: maximum number of threads in the pool
+        @param maxQueued: see L{ThreadPool.maxQueued}
+        @param targetLatency: see L{ThreadPool.targetLatency}
+        @param idleTimeout: see L{ThreadPool.idleTimeout}
         """
         assert minthreads >= 0, 'minimum is negative'
         assert minthreads <= maxthreads, 'minimum is greater than maximum'
-        self.q = Queue(0)
+        self.q = PriorityQueue(0)
         self.min = minthreads
         self.max = maxthreads
         self.name = name
+        self.maxQueued = maxQueued
+        self.targetLatency = targetLatency
+        self.idleTimeout = idleTimeout
         self.waiters = []
         self.threads = []
         self.working = []
+        self.waitTime = Histogram()
+        self.runTime = Histogram()
+        self._sequence = itertools.count()
+        self._lock = threading.RLock()
 
 
     def start(self):
@@ -73,35 +212,89 @@ class ThreadPool:
 
 
     def startAWorker(self):
-        self.workers += 1
-        name = "PoolThread-%s-%s" % (self.name or id(self), self.workers)
-        newThread = self.threadFactory(target=self._worker, name=name)
-        self.threads.append(newThread)
+        with self._lock:
+            self.workers += 1
+            name = "PoolThread-%s-%s" % (self.name or id(self), self.workers)
+            newThread = self.threadFactory(target=self._worker, name=name)
+            self.threads.append(newThread)
         newThread.start()
 
 
     def stopAWorker(self):
-        self.q.put(WorkerStop)
-        self.workers -= 1
+        with self._lock:
+            self._putStop(_SHRINK_PRIORITY)
+            self.workers -= 1
 
 
     def __setstate__(self, state):
         self.__dict__ = state
-        ThreadPool.__init__(self, self.min, self.max)
+        ThreadPool.__init__(self, self.min, self.max, None, self.maxQueued,
+                            self.targetLatency, self.idleTimeout)
 
 
     def __getstate__(self):
         state = {}
         state['min'] = self.min
         state['max'] = self.max
+        state['maxQueued'] = self.maxQueued
+        state['targetLatency'] = self.targetLatency
+        state['idleTimeout'] = self.idleTimeout
         return state
 
 
+    def _put(self, priority, o):
+        """
+        Queue C{o}, to be taken by a worker after everything already queued
+        with the same or a smaller C{priority}.
+        """
+        self.q.put((priority, next(self._sequence), self._seconds(), o))
+
+
+    def _putStop(self, priority):
+        """
+        Queue a L{WorkerStop}, to be taken by a worker after everything
+        already queued with the same or a smaller C{priority}.  The caller
+        must hold C{_lock}.
+        """
+        self._stopsQueued += 1
+        self._put(priority, WorkerStop)
+
+
+    def _queued(self):
+        """
+        @return: The number of tasks waiting for a thread.
+        """
+        return self.q.qsize() - self._stopsQueued
+
+
+    def queueLatency(self):
+        """
+        @return: How long, in seconds, the next task to run has been waiting
+            for a thread, or C{0} if nothing is waiting.
+        """
+        with self.q.mutex:
+            if not self.q.queue:
+                return 0
+            priority, sequence, queued, o = self.q.queue[0]
+        if o is WorkerStop:
+            return 0
+        return self._seconds() - queued
+
+
     def _startSomeWorkers(self):
-        neededSize = self.q.qsize() + len(self.working)
-        # Create enough, but not too many
-        while self.workers < min(self.max, neededSize):
-            self.startAWorker()
+        with self._lock:
+            queued = self._queued()
+            if self.targetLatency is None:
+                neededSize = queued + len(self.working)
+            elif queued and (
+                    not self.workers or
+                    self.queueLatency() >= self.targetLatency):
+                neededSize = self.workers + 1
+            else:
+                return
+            # Create enough, but not too many
+            while self.workers < min(self.max, neededSize):
+                self.startAWorker()
 
 
     def callInThread(self, func, *args, **kw):
@@ -113,8 +306,11 @@ class ThreadPool:
         @param *args: positional arguments to be passed to C{func}
 
         @param **kw: keyword args to be passed to C{func}
+
+        @raise ThreadPoolFull: If C{maxQueued} tasks are already waiting.
         """
-        self.callInThreadWithCallback(None, func, *args, **kw)
+        self.callInThreadWithPriority(
+            self.defaultPriority, None, func, *args, **kw)
 
 
     def callInThreadWithCallback(self, onResult, func, *args, **kw):
@@ -146,12 +342,45 @@ class ThreadPool:
         @param *args: positional arguments to be passed to C{func}
 
         @param **kwargs: keyword arguments to be passed to C{func}
+
+        @raise ThreadPoolFull: If C{maxQueued} tasks are already waiting.
+        """
+        self.callInThreadWithPriority(
+            self.defaultPriority, onResult, func, *args, **kw)
+
+
+    def callInThreadWithPriority(self, priority, onResult, func, *args, **kw):
+        """
+        Like L{callInThreadWithCallback}, but run C{func} before any waiting
+        work with a larger C{priority}.
+
+        A pool shared by quick, latency sensitive work (such as name
+        resolution) and slow work (such as database queries) can give the
+        quick work a smaller priority so that a burst of slow work does not
+        hold it up.
+
+        @param priority: A number; smaller numbers run first.  Work queued
+            with L{callInThread} and L{callInThreadWithCallback} has
+            C{defaultPriority}, C{0}.
+
+        @param onResult: See L{callInThreadWithCallback}.
+
+        @param func: callable object to be called in separate thread
+
+        @param *args: positional arguments to be passed to C{func}
+
+        @param **kw: keyword arguments to be passed to C{func}
+
+        @raise ThreadPoolFull: If C{maxQueued} tasks are already waiting.
         """
         if self.joined:
             return
+        queued = self._queued()
+        if self.maxQueued is not None and queued >= self.maxQueued:
+            raise ThreadPoolFull("%d tasks are already waiting" % (queued,))
         ctx = context.theContextTracker.currentContext().contexts[-1]
-        o = (ctx, func, args, kw, onResult)
-        self.q.put(o)
+        o = (ctx, context._currentContext.values, func, args, kw, onResult)
+        self._put(priority, o)
         if self.started:
             self._startSomeWorkers()
 
@@ -181,12 +410,14 @@ class ThreadPool:
         threadpool is stopped.
         """
         ct = self.currentThread()
-        o = self.q.get()
+        o = self._get()
         while o is not WorkerStop:
             with self._workerState(self.working, ct):
-                ctx, function, args, kwargs, onResult = o
+                ctx, values, function, args, kwargs, onResult = o
                 del o
+                context._currentContext.values = values
 
+                started = self._seconds()
                 try:
                     result = context.call(ctx, function, *args, **kwargs)
                     success = True
@@ -197,6 +428,7 @@ class ThreadPool:
                         result = None
                     else:
                         result = failure.Failure()
+                self.runTime.record(self._seconds() - started)
 
                 del function, args, kwargs
 
@@ -206,12 +438,44 @@ class ThreadPool:
                 except:
                     context.call(ctx, log.err)
 
-            del ctx, onResult, result
+            context._currentContext.values = {}
+            del ctx, values, onResult, result
+
+            if self.targetLatency is not None:
+                self._startSomeWorkers()
 
             with self._workerState(self.waiters, ct):
-                o = self.q.get()
+                o = self._get()
+
+        with self._lock:
+            self.threads.remove(ct)
 
-        self.threads.remove(ct)
+
+    def _get(self):
+        """
+        Wait for the next thing for a worker to do, recording how long it
+        waited in the queue.
+
+        @return: The next task, or L{WorkerStop} if the worker should exit,
+            either because it was told to or because it has been idle for
+            C{idleTimeout} seconds and there are more than C{min} workers.
+        """
+        while True:
+            try:
+                priority, sequence, queued, o = self.q.get(
+                    timeout=self.idleTimeout)
+            except Empty:
+                with self._lock:
+                    if self.workers > self.min:
+                        self.workers -= 1
+                        return WorkerStop
+                continue
+            if o is WorkerStop:
+                with self._lock:
+                    self._stopsQueued -= 1
+            else:
+                self.waitTime.record(self._seconds() - queued)
+            return o
 
 
     def stop(self):
@@ -219,10 +483,11 @@ class ThreadPool:
         Shutdown the threads in the threadpool.
         """
         self.joined = True
-        threads = copy.copy(self.threads)
-        while self.workers:
-            self.q.put(WorkerStop)
-            self.workers -= 1
+        with self._lock:
+            threads = copy.copy(self.threads)
+            while self.workers:
+                self._putStop(_STOP_PRIORITY)
+                self.workers -= 1
 
         # and let's just make sure
         # FIXME: threads that have died before calling stop() are not joined.
@@ -259,3 +524,6 @@ class ThreadPool:
         log.msg('waiters: %s' % self.waiters)
         log.msg('workers: %s' % self.working)
         log.msg('total: %s'   % self.threads)
+        log.msg('queue latency: %s' % self.queueLatency())
+        log.msg('wait time: %s' % self.waitTime.buckets())
+        log.msg('run time: %s'  % self.runTime.buckets())
@@ -2,7 +2,7 @@
 # Copyright (c) Twisted Matrix Laboratories.
 # See LICENSE for details.
 
-import os, errno, sys
+import os, errno, sys, signal
 
 from twisted.python import log, syslog, logfile, usage
 from twisted.python.util import (
@@ -42,6 +42,10 @@ class ServerOptions(app.ServerOptions):
                      ['gid', 'g', None, "The gid to run as.", gidFromString],
                      ['umask', None, None,
                       "The (octal) file creation mask to apply.", _umask],
+                     ['workers', None, None,
+                      "Fork this many worker processes, each running the "
+                      "application, and supervise them.  Listening TCP ports "
+                      "must be shared, eg tcp:8080:reusePort=1.", int],
                     ]
 
     compData = usage.Completions(
@@ -65,6 +69,8 @@ class ServerOptions(app.ServerOptions):
         app.ServerOptions.postOptions(self)
         if self['pidfile']:
             self['pidfile'] = os.path.abspath(self['pidfile'])
+        if self['workers'] is not None and self['workers'] < 1:
+            raise usage.UsageError("--workers must be at least 1")
 
 
 def checkPID(pidfile):
@@ -336,6 +342,74 @@ class UnixApplicationRunner(app.ApplicationRunner):
         return 0
 
 
+    def superviseWorkers(self, workers, reactor):
+        """
+        Fork worker processes which go on to start the application, and wait
+        for them all to exit in this process, the supervisor.
+
+        This only returns in the workers.  The supervisor reports a
+        successful start to the parent of a daemon, passes I{SIGTERM} on to
+        the workers, and exits once they have all exited: with status 1 if
+        any of them failed.  A worker killed by the I{SIGTERM} passed on to
+        it has not failed.
+
+        @param workers: The number of worker processes to fork.
+        @type workers: C{int}
+
+        @param reactor: The reactor in use.  It has already been created, so
+            if it has an C{_afterFork} method, each worker calls it to stop
+            sharing the reactor's kernel objects with the other processes.
+        """
+        # Only the supervisor reports on startup and owns the PID file.
+        statusPipe = self.config.get("statusPipe", None)
+        self.config["statusPipe"] = None
+        pids = []
+        for i in range(workers):
+            pid = os.fork()
+            if pid == 0:
+                self.config['pidfile'] = None
+                if statusPipe is not None:
+                    untilConcludes(os.close, statusPipe)
+                afterFork = getattr(reactor, "_afterFork", None)
+                if afterFork is not None:
+                    afterFork()
+                return
+            pids.append(pid)
+        log.msg("Started workers %s" % (", ".join(map(str, pids)),))
+        if statusPipe is not None:
+            untilConcludes(os.write, statusPipe, "0")
+            untilConcludes(os.close, statusPipe)
+
+        forwarded = set()
+        def forwardSignal(signum, frame):
+            forwarded.add(signum)
+            for pid in pids:
+                try:
+                    os.kill(pid, signum)
+                except OSError:
+                    pass
+        signal.signal(signal.SIGTERM, forwardSignal)
+        # An interactive ^C is delivered to the workers directly.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        failed = False
+        while pids:
+            pid, status = untilConcludes(os.wait)
+            if pid not in pids:
+                continue
+            pids.remove(pid)
+            if os.WIFSIGNALED(status):
+                signum = os.WTERMSIG(status)
+                log.msg("Worker %d was killed by signal %d" % (pid, signum))
+                failed = failed or signum not in forwarded
+            else:
+                code = os.WEXITSTATUS(status)
+                log.msg("Worker %d exited with status %d" % (pid, code))
+                failed = failed or code != 0
+        self.removePID(self.config['pidfile'])
+        sys.exit(failed and 1 or 0)
+
+
     def shedPrivileges(self, euid, uid, gid):
         """
         Change the UID and GID or the EUID and EGID of this process.
@@ -378,6 +452,11 @@ class UnixApplicationRunner(app.ApplicationRunner):
             self.config['nodaemon'], self.config['umask'],
             self.config['pidfile'])
 
+        workers = self.config.get('workers')
+        if workers is not None:
+            from twisted.internet import reactor
+            self.superviseWorkers(workers, reactor)
+
         service.IService(application).privilegedStartService()
 
         uid, gid = self.config['uid'], self.config['gid']
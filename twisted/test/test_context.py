@@ -10,6 +10,10 @@ from __future__ import division, absolute_import
 from twisted.trial.unittest import SynchronousTestCase
 
 from twisted.python import context
+from twisted.python.context import ContextVariable
+from twisted.python.threadpool import ThreadPool
+from twisted.internet.defer import Deferred, inlineCallbacks, succeed
+from twisted.internet.task import Clock, TimerWheel
 
 class ContextTest(SynchronousTestCase):
     """
@@ -49,3 +53,169 @@ class ContextTest(SynchronousTestCase):
         self.addCleanup(context.defaultContextDict.pop, key, None)
         context.setDefault(key, "y")
         self.assertEqual("y", context.get(key))
+
+
+
+class ContextVariableTests(SynchronousTestCase):
+    """
+    Tests for L{twisted.python.context.ContextVariable}.
+    """
+    def setUp(self):
+        self.variable = ContextVariable("test", default="default")
+        self.seen = []
+
+
+    def record(self, result=None):
+        """
+        Record the current value of C{self.variable}.
+
+        @return: C{result}
+        """
+        self.seen.append(self.variable.get())
+        return result
+
+
+    def test_default(self):
+        """
+        L{ContextVariable.get} returns the default value of a variable which
+        has not been set.
+        """
+        self.assertEqual(self.variable.get(), "default")
+        self.assertIdentical(ContextVariable("other").get(), None)
+
+
+    def test_callWithValue(self):
+        """
+        L{ContextVariable.callWithValue} calls a function with the variable
+        set, returns its result, and restores the previous value.
+        """
+        result = self.variable.callWithValue("value", self.record, 3)
+        self.assertEqual(result, 3)
+        self.assertEqual(self.seen, ["value"])
+        self.assertEqual(self.variable.get(), "default")
+
+
+    def test_setInCall(self):
+        """
+        A value set with L{ContextVariable.set} during
+        L{ContextVariable.callWithValue} is discarded when it returns.
+        """
+        def f():
+            self.variable.set("changed")
+            self.record()
+        self.variable.callWithValue("value", f)
+        self.assertEqual(self.seen, ["changed"])
+        self.assertEqual(self.variable.get(), "default")
+
+
+    def test_captureContext(self):
+        """
+        L{context.callInContext} calls a function with the values captured by
+        L{context.captureContext}, even after they have changed, and restores
+        the current values afterwards.
+        """
+        captured = self.variable.callWithValue("value", context.captureContext)
+        self.variable.callWithValue(
+            "other", context.callInContext, captured, self.record)
+        self.assertEqual(self.seen, ["value"])
+        self.assertEqual(self.variable.get(), "default")
+
+
+    def test_deferredCallback(self):
+        """
+        A callback added to a L{Deferred} which has no result yet runs with
+        the values current when it was added, not when the L{Deferred} is
+        fired.
+        """
+        d = Deferred()
+        self.variable.callWithValue("first", d.addCallback, self.record)
+        self.variable.callWithValue("second", d.addCallback, self.record)
+        self.variable.callWithValue("fired", d.callback, None)
+        self.assertEqual(self.seen, ["first", "second"])
+
+
+    def test_deferredCallbackSet(self):
+        """
+        A value set by a L{Deferred} callback is not seen by the next
+        callback, or by the code which fired the L{Deferred}.
+        """
+        def change(result):
+            self.variable.set("changed")
+        d = Deferred()
+        d.addCallback(change)
+        d.addCallback(self.record)
+        d.callback(None)
+        succeed(None).addCallback(change)
+        self.assertEqual(self.seen, ["default"])
+        self.assertEqual(self.variable.get(), "default")
+
+
+    def test_inlineCallbacks(self):
+        """
+        An L{inlineCallbacks} generator is resumed with the values current
+        when it was called, and keeps a value it sets across C{yield}s, while
+        the code resuming it does not see that value.
+        """
+        waiting = Deferred()
+        @inlineCallbacks
+        def f():
+            self.record()
+            yield waiting
+            self.record()
+            self.variable.set("changed")
+            yield succeed(None)
+            self.record()
+            yield waiting2
+            self.record()
+        waiting2 = Deferred()
+        self.variable.callWithValue("value", f)
+        self.variable.callWithValue("other", waiting.callback, None)
+        self.assertEqual(self.variable.get(), "default")
+        waiting2.callback(None)
+        self.assertEqual(self.seen, ["value", "value", "changed", "changed"])
+        self.assertEqual(self.variable.get(), "default")
+
+
+    def test_clockCallLater(self):
+        """
+        A call scheduled with L{Clock.callLater} runs with the values current
+        when it was scheduled.
+        """
+        clock = Clock()
+        self.variable.callWithValue("value", clock.callLater, 1, self.record)
+        clock.advance(1)
+        self.assertEqual(self.seen, ["value"])
+        self.assertEqual(self.variable.get(), "default")
+
+
+    def test_timerWheel(self):
+        """
+        A call scheduled with L{TimerWheel.callLater} runs with the values
+        current when it was scheduled.
+        """
+        clock = Clock()
+        wheel = TimerWheel(1, clock)
+        self.variable.callWithValue("first", wheel.callLater, 1, self.record)
+        self.variable.callWithValue("second", wheel.callLater, 1, self.record)
+        clock.advance(2)
+        self.assertEqual(self.seen, ["first", "second"])
+        self.assertEqual(self.variable.get(), "default")
+
+
+    def test_threadPool(self):
+        """
+        Work queued with L{ThreadPool.callInThreadWithCallback} and its
+        C{onResult} callback run with the values current when it was queued.
+        """
+        pool = ThreadPool(0, 1)
+        pool.start()
+        done = []
+        def onResult(success, result):
+            self.record()
+            done.append(result)
+        self.variable.callWithValue(
+            "value", pool.callInThreadWithCallback, onResult,
+            self.variable.get)
+        pool.stop()
+        self.assertEqual(done, ["value"])
+        self.assertEqual(self.seen, ["value"])
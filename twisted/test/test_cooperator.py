@@ -709,3 +709,195 @@ class RunStateTests(unittest.TestCase):
 
 
 
+
+
+
+class FakeTime(object):
+    """
+    A clock for L{task.Cooperator._seconds} which the work being measured
+    moves forward.
+
+    @ivar now: The current time.
+    """
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+    def work(self, cost, log, name):
+        """
+        Generate units of work which each take C{cost} seconds and record
+        C{name} in C{log}.
+        """
+        while True:
+            self.now += cost
+            log.append(name)
+            yield None
+
+
+
+class PolicyTests(unittest.TestCase):
+    """
+    Tests for the scheduling policies and statistics of L{task.Cooperator}.
+    """
+    def setUp(self):
+        self.scheduler = FakeScheduler()
+        self.time = FakeTime()
+        self.log = []
+
+
+    def cooperator(self, units, policy=None):
+        """
+        Make a L{task.Cooperator} with a fake scheduler and clock, whose
+        ticks each run C{units} units of work.
+        """
+        def terminationPredicateFactory():
+            remaining = [units]
+            def terminate():
+                remaining[0] -= 1
+                return not remaining[0]
+            return terminate
+        coop = task.Cooperator(
+            terminationPredicateFactory=terminationPredicateFactory,
+            scheduler=self.scheduler, policy=policy)
+        coop._seconds = self.time
+        self.addCleanup(coop.stop)
+        return coop
+
+
+    def test_roundRobin(self):
+        """
+        By default each task does one unit of work in turn, however long
+        they take.
+        """
+        coop = self.cooperator(6)
+        coop.cooperate(self.time.work(1, self.log, "slow"))
+        coop.cooperate(self.time.work(0.1, self.log, "fast"))
+        self.scheduler.pump()
+        self.assertEqual(self.log, ["slow", "fast"] * 3)
+
+
+    def test_weightedFair(self):
+        """
+        With L{task.WeightedFairPolicy}, tasks share time rather than units
+        of work, so a task with expensive units runs less often.
+        """
+        coop = self.cooperator(10, task.WeightedFairPolicy())
+        coop.cooperate(self.time.work(1, self.log, "slow"))
+        coop.cooperate(self.time.work(0.25, self.log, "fast"))
+        self.scheduler.pump()
+        self.assertEqual(self.log.count("fast"), 4 * self.log.count("slow"))
+
+
+    def test_weights(self):
+        """
+        With L{task.WeightedFairPolicy}, a task with twice the weight of
+        another gets twice the time.
+        """
+        coop = self.cooperator(30, task.WeightedFairPolicy())
+        coop.cooperate(self.time.work(1, self.log, "heavy"), weight=2)
+        coop.cooperate(self.time.work(1, self.log, "light"))
+        self.scheduler.pump()
+        self.assertEqual(self.log.count("heavy"), 20)
+        self.assertEqual(self.log.count("light"), 10)
+
+
+    def test_resumedDoesNotCatchUp(self):
+        """
+        With L{task.WeightedFairPolicy}, a task which was paused does not
+        get extra time for the time it spent paused.
+        """
+        coop = self.cooperator(10, task.WeightedFairPolicy())
+        paused = coop.cooperate(self.time.work(1, self.log, "paused"))
+        paused.pause()
+        coop.cooperate(self.time.work(1, self.log, "running"))
+        self.scheduler.pump()
+        del self.log[:]
+        paused.resume()
+        self.scheduler.pump()
+        self.assertEqual(self.log.count("paused"), 5)
+        self.assertEqual(self.log.count("running"), 5)
+
+
+    def test_statistics(self):
+        """
+        Each L{task.CooperativeTask} counts its units of work, the time they
+        took and how often it was paused, including for L{defer.Deferred}s
+        its iterator yields.
+        """
+        d = defer.Deferred()
+        def work():
+            self.time.now += 0.5
+            yield None
+            self.time.now += 0.25
+            yield d
+        coop = self.cooperator(5)
+        theTask = coop.cooperate(work())
+        self.scheduler.pump()
+        self.assertEqual(
+            (theTask.iterations, theTask.timeUsed, theTask.pauses),
+            (2, 0.75, 1))
+        d.callback(None)
+
+
+    def test_stoppedCooperatorRejectsWithPolicy(self):
+        """
+        A task added to a stopped L{task.Cooperator} fails with
+        L{task.SchedulerStopped} whatever its policy.
+        """
+        for policy in [task.RoundRobinPolicy(), task.WeightedFairPolicy()]:
+            coop = self.cooperator(1, policy)
+            coop.stop()
+            d = coop.coiterate(iter([1]))
+            self.failureResultOf(d, task.SchedulerStopped)
+            self.assertIdentical(policy.nextTask(), None)
+
+
+    def test_globalCooperator(self):
+        """
+        The global L{task.Cooperator} shares time fairly between its tasks,
+        and adapts the spacing of its steps to the reactor's load.
+        """
+        self.assertIsInstance(task._theCooperator._policy,
+                              task.WeightedFairPolicy)
+        self.assertIsInstance(task._theCooperator._scheduler,
+                              task.AdaptiveScheduler)
+
+
+
+class AdaptiveSchedulerTests(unittest.TestCase):
+    """
+    Tests for L{task.AdaptiveScheduler}.
+    """
+    def setUp(self):
+        self.clock = task.Clock()
+        self.scheduler = task.AdaptiveScheduler(
+            self.clock, minDelay=0.001, maxDelay=0.1, smoothing=0.5)
+        self.steps = []
+
+
+    def test_idle(self):
+        """
+        While steps run on time, they are scheduled after C{minDelay}.
+        """
+        call = self.scheduler(lambda: self.steps.append(1))
+        self.assertEqual(call.getTime(), 0.001)
+        self.clock.advance(0.001)
+        self.assertEqual(self.steps, [1])
+        self.assertEqual(self.scheduler.load, 0)
+
+
+    def test_busy(self):
+        """
+        When steps run late, later steps are delayed by the moving average
+        of the lateness, up to C{maxDelay}.
+        """
+        self.scheduler(lambda: None)
+        self.clock.advance(0.041)
+        self.assertAlmostEqual(self.scheduler.load, 0.02)
+        call = self.scheduler(lambda: None)
+        self.assertAlmostEqual(call.getTime() - self.clock.seconds(), 0.02)
+        self.clock.advance(1)
+        call = self.scheduler(lambda: None)
+        self.assertAlmostEqual(call.getTime() - self.clock.seconds(), 0.1)
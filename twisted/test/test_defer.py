@@ -10,11 +10,12 @@ from __future__ import division, absolute_import
 import warnings
 import gc, traceback
 import re
+import weakref
 
 from twisted.python import failure, log
 from twisted.python.compat import _PY3
 from twisted.internet import defer, reactor
-from twisted.internet.task import Clock
+from twisted.internet.task import Clock, TimerWheel
 from twisted.trial import unittest
 
 
@@ -1377,6 +1378,135 @@ class DeferredTestCase(unittest.SynchronousTestCase, ImmediateFailureMixin):
 
 
 
+class AlreadyFiredTests(unittest.SynchronousTestCase):
+    """
+    Tests for adding callbacks to a L{defer.Deferred} which already has a
+    result and no other callbacks waiting, which L{defer.Deferred.addCallbacks}
+    runs without queueing them.
+    """
+
+    def test_slots(self):
+        """
+        L{defer.Deferred} keeps its own attributes in slots rather than in
+        its C{__dict__}, but instances can still be weakly referenced and
+        still accept other attributes.
+        """
+        d = defer.Deferred()
+        d.callback(None)
+        self.assertEqual(d.__dict__, {})
+        d.foo = 1
+        self.assertEqual(d.foo, 1)
+        self.assertEqual(d.__dict__, {"foo": 1})
+        self.assertIdentical(weakref.ref(d)(), d)
+
+        class SubclassedDeferred(defer.Deferred):
+            pass
+        d = SubclassedDeferred()
+        d.foo = 1
+        self.assertEqual(d.foo, 1)
+
+
+    def test_callbackArguments(self):
+        """
+        The callback is called at once with the result and the extra
+        arguments, and its return value becomes the result.
+        """
+        calls = []
+        def callback(result, *args, **kwargs):
+            calls.append((result, args, kwargs))
+            return result + 1
+        d = defer.succeed(1)
+        d.addCallback(callback, 2, x=3)
+        self.assertEqual(calls, [(1, (2,), {'x': 3})])
+        self.assertEqual(self.successResultOf(d), 2)
+
+
+    def test_errbackArguments(self):
+        """
+        The errback is called at once with the failure and the extra
+        arguments, and its return value becomes the result.
+        """
+        calls = []
+        def errback(reason, *args, **kwargs):
+            calls.append((reason.type, args, kwargs))
+            return "handled"
+        d = defer.fail(RuntimeError())
+        d.addCallbacks(self.fail, errback, errbackArgs=(2,),
+                       errbackKeywords={'x': 3})
+        self.assertEqual(calls, [(RuntimeError, (2,), {'x': 3})])
+        self.assertEqual(self.successResultOf(d), "handled")
+
+
+    def test_raise(self):
+        """
+        An exception raised by the callback becomes the result, and is
+        logged if it is never handled.
+        """
+        d = defer.succeed(None)
+        d.addCallback(lambda ignored: 1 // 0)
+        self.assertIsInstance(d._debugInfo.failResult, failure.Failure)
+        self.failureResultOf(d, ZeroDivisionError)
+        self.assertIdentical(d._debugInfo.failResult, None)
+
+
+    def test_returnFiredDeferred(self):
+        """
+        If the callback returns a L{defer.Deferred} which has a result, that
+        result is taken from it.
+        """
+        inner = defer.succeed(2)
+        d = defer.succeed(1)
+        d.addCallback(lambda ignored: inner)
+        self.assertEqual(self.successResultOf(d), 2)
+        self.assertIdentical(inner.result, None)
+
+
+    def test_returnUnfiredDeferred(self):
+        """
+        If the callback returns a L{defer.Deferred} with no result, later
+        callbacks wait for its result.
+        """
+        inner = defer.Deferred()
+        d = defer.succeed(1)
+        d.addCallback(lambda ignored: inner)
+        results = []
+        d.addCallback(results.append)
+        self.assertEqual(results, [])
+        self.assertIdentical(d._chainedTo, inner)
+        inner.callback(2)
+        self.assertEqual(results, [2])
+        self.assertIdentical(d._chainedTo, None)
+
+
+    def test_reentrantAddCallback(self):
+        """
+        Callbacks added by the callback run after it, in order.
+        """
+        results = []
+        d = defer.succeed(1)
+        def callback(result):
+            d.addCallback(results.append)
+            results.append(result)
+            return result + 1
+        d.addCallback(callback)
+        self.assertEqual(results, [1, 2])
+
+
+    def test_paused(self):
+        """
+        Callbacks added to a paused L{defer.Deferred} wait for it to be
+        unpaused.
+        """
+        results = []
+        d = defer.succeed(1)
+        d.pause()
+        d.addCallback(results.append)
+        self.assertEqual(results, [])
+        d.unpause()
+        self.assertEqual(results, [1])
+
+
+
 class FirstErrorTests(unittest.SynchronousTestCase):
     """
     Tests for L{FirstError}.
@@ -1851,6 +1981,234 @@ class DeferredCancellerTest(unittest.SynchronousTestCase):
 
 
 
+class AddTimeoutTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{defer.Deferred.addTimeout}.
+    """
+    def setUp(self):
+        self.clock = Clock()
+
+
+    def test_result(self):
+        """
+        A L{Deferred} which gets a result in time keeps it, and its timer is
+        cancelled.
+        """
+        d = defer.Deferred().addTimeout(10, self.clock)
+        d.callback("result")
+        self.assertEqual(self.successResultOf(d), "result")
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_failure(self):
+        """
+        A L{Deferred} which fails in time keeps its failure.
+        """
+        d = defer.Deferred().addTimeout(10, self.clock)
+        d.errback(GenericError())
+        self.failureResultOf(d, GenericError)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_timedOut(self):
+        """
+        A L{Deferred} which gets no result in time is cancelled and fails
+        with L{defer.TimeoutError}.
+        """
+        cancelled = []
+        d = defer.Deferred(cancelled.append).addTimeout(10, self.clock)
+        self.clock.advance(9)
+        self.assertNoResult(d)
+        self.clock.advance(1)
+        self.assertEqual(cancelled, [d])
+        self.failureResultOf(d, defer.TimeoutError)
+
+
+    def test_cancelledByCaller(self):
+        """
+        A L{Deferred} cancelled before it times out fails with
+        L{defer.CancelledError}, not L{defer.TimeoutError}.
+        """
+        d = defer.Deferred().addTimeout(10, self.clock)
+        d.cancel()
+        self.failureResultOf(d, defer.CancelledError)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_cancellerGivesResult(self):
+        """
+        If the canceller of a L{Deferred} which times out gives it a result,
+        that result is kept.
+        """
+        d = defer.Deferred(lambda d: d.callback("fallback"))
+        d.addTimeout(10, self.clock)
+        self.clock.advance(10)
+        self.assertEqual(self.successResultOf(d), "fallback")
+
+
+    def test_onTimeoutCancel(self):
+        """
+        If C{onTimeoutCancel} is given, it is called with the result and the
+        timeout instead of the result being made a L{defer.TimeoutError}.
+        """
+        calls = []
+        def onTimeoutCancel(result, timeout):
+            calls.append((result.type, timeout))
+            return "timed out"
+        d = defer.Deferred().addTimeout(10, self.clock, onTimeoutCancel)
+        self.clock.advance(10)
+        self.assertEqual(self.successResultOf(d), "timed out")
+        self.assertEqual(calls, [(defer.CancelledError, 10)])
+
+
+    def test_timerWheel(self):
+        """
+        Timeouts scheduled with a L{TimerWheel} share its single timer.
+        """
+        wheel = TimerWheel(1, self.clock)
+        deferreds = [defer.Deferred().addTimeout(5, wheel)
+                     for i in range(10)]
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(5)
+        for d in deferreds:
+            self.failureResultOf(d, defer.TimeoutError)
+
+
+
+class DeadlineTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{defer.Deadline}.
+    """
+    def setUp(self):
+        self.clock = Clock()
+        self.deadline = defer.Deadline(10, self.clock)
+
+
+    def test_remaining(self):
+        """
+        L{defer.Deadline.remaining} is the number of seconds until the
+        deadline passes, and C{0} afterwards.
+        """
+        self.assertEqual(self.deadline.remaining(), 10)
+        self.clock.advance(4)
+        self.assertEqual(self.deadline.remaining(), 6)
+        self.assertFalse(self.deadline.expired)
+        self.clock.advance(6)
+        self.assertEqual(self.deadline.remaining(), 0)
+        self.assertTrue(self.deadline.expired)
+
+
+    def test_track(self):
+        """
+        Every L{Deferred} tracked by a deadline which has no result when it
+        passes is cancelled and fails with L{defer.TimeoutError}, using a
+        single timer.
+        """
+        first = self.deadline.track(defer.Deferred())
+        second = self.deadline.track(defer.Deferred())
+        done = self.deadline.track(defer.Deferred())
+        done.callback("result")
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(10)
+        self.failureResultOf(first, defer.TimeoutError)
+        self.failureResultOf(second, defer.TimeoutError)
+        self.assertEqual(self.successResultOf(done), "result")
+
+
+    def test_trackExpired(self):
+        """
+        A L{Deferred} tracked by a deadline which has already passed is
+        cancelled right away.
+        """
+        self.clock.advance(10)
+        d = self.deadline.track(defer.Deferred())
+        self.failureResultOf(d, defer.TimeoutError)
+
+
+    def test_stop(self):
+        """
+        After L{defer.Deadline.stop}, nothing it or its children track is
+        cancelled, and their timers are cancelled.
+        """
+        d = self.deadline.track(defer.Deferred())
+        child = self.deadline.child(5)
+        childDeferred = child.track(defer.Deferred())
+        self.deadline.stop()
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+        self.clock.advance(10)
+        self.assertNoResult(d)
+        self.assertNoResult(childDeferred)
+
+
+    def test_childSharesTimer(self):
+        """
+        A child deadline with no timeout of its own, or a longer one than
+        its parent's, passes with its parent and has no timer of its own.
+        """
+        child = self.deadline.child()
+        longer = child.child(20)
+        d = longer.track(defer.Deferred())
+        self.assertEqual(longer.remaining(), 10)
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(10)
+        self.assertTrue(child.expired)
+        self.assertTrue(longer.expired)
+        self.failureResultOf(d, defer.TimeoutError)
+
+
+    def test_shorterChild(self):
+        """
+        A child deadline with a shorter timeout than its parent passes
+        first, without expiring its parent.
+        """
+        child = self.deadline.child(3)
+        d = child.track(defer.Deferred())
+        parentDeferred = self.deadline.track(defer.Deferred())
+        self.clock.advance(3)
+        self.assertTrue(child.expired)
+        self.assertFalse(self.deadline.expired)
+        self.failureResultOf(d, defer.TimeoutError)
+        self.assertNoResult(parentDeferred)
+
+
+    def test_parentExpiresChild(self):
+        """
+        When a deadline passes, its children are expired and their timers
+        are cancelled.
+        """
+        child = self.deadline.child(8)
+        d = child.track(defer.Deferred())
+        self.deadline._call.reset(0)
+        self.clock.advance(0)
+        self.assertTrue(child.expired)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+        self.failureResultOf(d, defer.TimeoutError)
+
+
+    def test_childOfExpired(self):
+        """
+        A child of a deadline which has passed has passed too.
+        """
+        self.clock.advance(10)
+        child = self.deadline.child(5)
+        self.assertTrue(child.expired)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_timerWheel(self):
+        """
+        Deadlines may be scheduled with a L{TimerWheel}, sharing its single
+        timer.
+        """
+        wheel = TimerWheel(1, self.clock)
+        deadlines = [defer.Deadline(5, wheel) for i in range(10)]
+        # One timer for the wheel, and one for self.deadline.
+        self.assertEqual(len(self.clock.getDelayedCalls()), 2)
+        self.clock.advance(5)
+        self.assertTrue(all(deadline.expired for deadline in deadlines))
+
+
+
 class LogTestCase(unittest.SynchronousTestCase):
     """
     Test logging of unhandled errors.
@@ -1911,9 +2269,9 @@ class LogTestCase(unittest.SynchronousTestCase):
         Same as L{test_errorLogWithInnerFrameRef}, plus create a cycle.
         """
         def _subErrorLogWithInnerFrameCycle():
-            d = defer.Deferred()
+            # The canceller closes over d, so d refers to itself.
+            d = defer.Deferred(lambda ignored: d)
             d.addCallback(lambda x, d=d: 1 // 0)
-            d._d = d
             d.callback(1)
 
         _subErrorLogWithInnerFrameCycle()
@@ -1987,6 +2345,250 @@ class DeferredTestCaseII(unittest.SynchronousTestCase):
 
 
 
+class ControlledCalls(object):
+    """
+    A function for L{defer.mapConcurrently} and L{defer.asCompleted} whose
+    calls return L{defer.Deferred}s which the test fires.
+
+    @ivar calls: A C{dict} mapping each item the function has been called
+        with to the L{defer.Deferred} it returned.
+
+    @ivar read: A C{list} of the items read from L{items}, in order.
+    """
+    def __init__(self):
+        self.calls = {}
+        self.read = []
+
+
+    def __call__(self, item):
+        d = self.calls[item] = defer.Deferred()
+        return d
+
+
+    def items(self, count):
+        """
+        Generate C{count} items, recording each one as it is read.
+        """
+        for i in range(count):
+            self.read.append(i)
+            yield i
+
+
+    def running(self):
+        """
+        @return: The sorted items whose calls have no result yet.
+        """
+        return sorted(item for item, d in self.calls.items() if not d.called)
+
+
+
+class MapConcurrentlyTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{defer.mapConcurrently}.
+    """
+    def setUp(self):
+        self.f = ControlledCalls()
+
+
+    def test_results(self):
+        """
+        L{defer.mapConcurrently} fires with the results of the calls in the
+        order of the items, whatever order they finish in.
+        """
+        d = defer.mapConcurrently(self.f, self.f.items(3), 5)
+        for i in [2, 0, 1]:
+            self.f.calls[i].callback(i * 10)
+        self.assertEqual(self.successResultOf(d), [0, 10, 20])
+
+
+    def test_limit(self):
+        """
+        No more than C{limit} calls are in flight, and the iterable is only
+        read as calls finish.
+        """
+        d = defer.mapConcurrently(self.f, self.f.items(5), 2)
+        self.assertEqual(self.f.running(), [0, 1])
+        self.assertEqual(self.f.read, [0, 1])
+        self.f.calls[1].callback(None)
+        self.assertEqual(self.f.running(), [0, 2])
+        self.assertEqual(self.f.read, [0, 1, 2])
+        for i in [0, 2, 3, 4]:
+            self.f.calls[i].callback(i)
+        self.assertEqual(self.successResultOf(d), [0, None, 2, 3, 4])
+
+
+    def test_synchronous(self):
+        """
+        Functions which do not return L{defer.Deferred}s may be used, and
+        many of them do not recurse deeply.
+        """
+        d = defer.mapConcurrently(lambda x: x + 1, range(5000), 3)
+        self.assertEqual(self.successResultOf(d), list(range(1, 5001)))
+
+
+    def test_empty(self):
+        """
+        With no items, L{defer.mapConcurrently} fires with an empty list.
+        """
+        d = defer.mapConcurrently(self.f, [], 3)
+        self.assertEqual(self.successResultOf(d), [])
+
+
+    def test_failFast(self):
+        """
+        The first failure stops reading the iterable, cancels the calls in
+        flight and becomes a L{defer.FirstError}.
+        """
+        d = defer.mapConcurrently(self.f, self.f.items(10), 3)
+        self.f.calls[1].errback(GenericError())
+        self.assertEqual(self.f.running(), [])
+        self.assertEqual(self.f.read, [0, 1, 2])
+        error = self.failureResultOf(d, defer.FirstError).value
+        self.assertEqual(error.index, 1)
+        error.subFailure.trap(GenericError)
+
+
+    def test_noFailFast(self):
+        """
+        If C{failFast} is C{False}, every item is processed before the
+        first failure is reported.
+        """
+        d = defer.mapConcurrently(self.f, self.f.items(4), 2, failFast=False)
+        self.f.calls[1].errback(GenericError("first"))
+        self.f.calls[0].errback(GenericError("second"))
+        self.assertNoResult(d)
+        self.f.calls[2].callback(None)
+        self.f.calls[3].callback(None)
+        error = self.failureResultOf(d, defer.FirstError).value
+        self.assertEqual(error.index, 1)
+
+
+    def test_iterableFails(self):
+        """
+        An exception raised while reading the iterable stops it, and the
+        result fails with that exception once the calls in flight finish.
+        """
+        def items():
+            yield 0
+            raise GenericError()
+        d = defer.mapConcurrently(self.f, items(), 3)
+        self.f.calls[0].callback(None)
+        self.failureResultOf(d, GenericError)
+
+
+    def test_cancel(self):
+        """
+        Cancelling the result stops reading the iterable and cancels the
+        calls in flight.
+        """
+        d = defer.mapConcurrently(self.f, self.f.items(10), 2)
+        d.cancel()
+        self.failureResultOf(d, defer.CancelledError)
+        self.assertEqual(self.f.running(), [])
+        self.assertEqual(self.f.read, [0, 1])
+
+
+    def test_badLimit(self):
+        """
+        A limit less than one is refused.
+        """
+        self.assertRaises(ValueError, defer.mapConcurrently, self.f, [], 0)
+
+
+
+class AsCompletedTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{defer.asCompleted}.
+    """
+    def setUp(self):
+        self.f = ControlledCalls()
+
+
+    def test_completionOrder(self):
+        """
+        The L{defer.Deferred}s from L{defer.asCompleted} fire with the
+        results in the order the calls finish.
+        """
+        results = defer.asCompleted(self.f, self.f.items(3), 3)
+        first, second = next(results), next(results)
+        self.f.calls[2].callback("two")
+        self.f.calls[0].callback("zero")
+        self.assertEqual(self.successResultOf(first), "two")
+        self.assertEqual(self.successResultOf(second), "zero")
+        self.f.calls[1].errback(GenericError())
+        self.failureResultOf(next(results), GenericError)
+        self.assertRaises(StopIteration, next, results)
+
+
+    def test_limit(self):
+        """
+        No more than C{limit} calls are in flight, and the iterable is read
+        only as calls finish or as L{defer.Deferred}s are asked for.
+        """
+        results = defer.asCompleted(self.f, self.f.items(10), 2)
+        self.assertEqual(self.f.read, [0, 1])
+        ds = [next(results) for i in range(3)]
+        self.assertEqual(self.f.running(), [0, 1])
+        self.assertEqual(self.f.read, [0, 1, 2])
+        self.f.calls[0].callback(0)
+        self.assertEqual(self.f.running(), [1, 2])
+        self.assertEqual(self.successResultOf(ds[0]), 0)
+        self.assertNoResult(ds[1])
+
+
+    def test_iterate(self):
+        """
+        Iterating over L{defer.asCompleted} gives one L{defer.Deferred} for
+        each item.
+        """
+        ds = list(defer.asCompleted(self.f, self.f.items(5), 2))
+        self.assertEqual(len(ds), 5)
+        for i in range(5):
+            self.f.calls[i].callback(i)
+        self.assertEqual([self.successResultOf(d) for d in ds],
+                         list(range(5)))
+
+
+    def test_synchronous(self):
+        """
+        Functions which do not return L{defer.Deferred}s may be used.
+        """
+        results = [self.successResultOf(d)
+                   for d in defer.asCompleted(lambda x: x * 2, range(5), 2)]
+        self.assertEqual(results, [0, 2, 4, 6, 8])
+
+
+    def test_iterableFails(self):
+        """
+        An exception raised while reading the iterable is given to one of
+        the L{defer.Deferred}s, and there are no more after it.
+        """
+        def items():
+            yield 0
+            raise GenericError()
+        results = defer.asCompleted(self.f, items(), 3)
+        self.failureResultOf(next(results), GenericError)
+        d = next(results)
+        self.assertRaises(StopIteration, next, results)
+        self.f.calls[0].callback(0)
+        self.assertEqual(self.successResultOf(d), 0)
+
+
+    def test_cancel(self):
+        """
+        Cancelling the iterator cancels the calls in flight and every
+        waiting L{defer.Deferred}, and stops the iteration.
+        """
+        results = defer.asCompleted(self.f, self.f.items(10), 2)
+        d = next(results)
+        results.cancel()
+        self.assertEqual(self.f.running(), [])
+        self.failureResultOf(d, defer.CancelledError)
+        self.assertRaises(StopIteration, next, results)
+        self.assertEqual(self.f.read, [0, 1])
+
+
+
 class OtherPrimitives(unittest.SynchronousTestCase, ImmediateFailureMixin):
     def _incr(self, result):
         self.counter += 1
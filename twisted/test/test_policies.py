@@ -737,6 +737,96 @@ class TestTimeout(unittest.TestCase):
 
 
 
+class TimerWheelTimeoutTester(protocol.Protocol, policies.TimeoutMixin):
+    """
+    A protocol with a timeout which relies on L{policies.TimeoutMixin} to
+    schedule it.
+
+    @ivar timedOut: set to C{True} if a timeout has been detected.
+    @type timedOut: C{bool}
+    """
+    timedOut = False
+
+    def timeoutConnection(self):
+        """
+        Flags the timedOut variable to indicate the timeout of the connection.
+        """
+        self.timedOut = True
+
+
+
+class TimerWheelTimeoutTests(unittest.TestCase):
+    """
+    Tests for timeouts scheduled with an L{task.TimerWheel}.
+    """
+
+    def setUp(self):
+        """
+        Create a deterministic clock and a timer wheel using it.
+        """
+        self.clock = task.Clock()
+        self.wheel = task.TimerWheel(granularity=0.5, clock=self.clock)
+
+
+    def test_mixinUsesTimerWheel(self):
+        """
+        If L{policies.TimeoutMixin.timerWheel} is set, the timeout is
+        scheduled with it and resetting the timeout does not reschedule
+        anything with the clock.
+        """
+        proto = TimerWheelTimeoutTester()
+        proto.timerWheel = self.wheel
+        proto.makeConnection(StringTransport())
+        proto.setTimeout(3)
+        self.assertEqual(len(self.wheel.getDelayedCalls()), 1)
+        [tick] = self.clock.getDelayedCalls()
+
+        self.clock.advance(2)
+        proto.resetTimeout()
+        self.assertEqual(self.clock.getDelayedCalls(), [tick])
+        self.clock.advance(2.5)
+        self.assertFalse(proto.timedOut)
+        self.clock.advance(0.5)
+        self.assertTrue(proto.timedOut)
+
+
+    def test_mixinCancelWithTimerWheel(self):
+        """
+        Setting the timeout to C{None} cancels a timeout scheduled with the
+        timer wheel.
+        """
+        proto = TimerWheelTimeoutTester()
+        proto.timerWheel = self.wheel
+        proto.setTimeout(3)
+        proto.setTimeout(None)
+        self.assertEqual(self.wheel.getDelayedCalls(), [])
+        self.clock.advance(5)
+        self.assertFalse(proto.timedOut)
+
+
+    def test_factoryUsesTimerWheel(self):
+        """
+        L{policies.TimeoutFactory} schedules the timeouts of the protocols it
+        builds with the timer wheel it is given.
+        """
+        factory = policies.TimeoutFactory(
+            Server(), timeoutPeriod=3, timerWheel=self.wheel)
+        proto = factory.buildProtocol(
+            address.IPv4Address('TCP', '127.0.0.1', 12345))
+        transport = StringTransportWithDisconnection()
+        transport.protocol = proto
+        proto.makeConnection(transport)
+        self.assertEqual(len(self.wheel.getDelayedCalls()), 1)
+
+        self.clock.advance(2)
+        proto.dataReceived(b'hello')
+        self.clock.advance(2)
+        self.assertTrue(transport.connected)
+        self.clock.advance(1)
+        self.assertFalse(transport.connected)
+
+
+
 class LimitTotalConnectionsFactoryTestCase(unittest.TestCase):
     """Tests for policies.LimitTotalConnectionsFactory"""
     def testConnectionCounting(self):
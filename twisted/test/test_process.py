@@ -25,7 +25,7 @@ else:
 from zope.interface.verify import verifyObject
 
 from twisted.python.log import msg
-from twisted.internet import reactor, protocol, error, interfaces, defer
+from twisted.internet import reactor, protocol, error, interfaces, defer, utils
 from twisted.trial import unittest
 from twisted.python import util, runtime, procutils
 
@@ -1135,6 +1135,8 @@ class PosixProcessBase:
         p = TrivialProcessProtocol(d)
         def buggyexecvpe(command, args, environment):
             raise RuntimeError("Ouch")
+        # posix_spawn() doesn't call execvpe, so don't use it.
+        self.patch(process, "_posixspawn", None)
         oldexecvpe = os.execvpe
         os.execvpe = buggyexecvpe
         try:
@@ -1660,7 +1662,8 @@ class MockProcessTestCase(unittest.TestCase):
     def setUp(self):
         """
         Replace L{process} os, fcntl, sys, switchUID, fdesc and pty modules
-        with the mock class L{MockOS}.
+        with the mock class L{MockOS}, and stop L{process.Process} from using
+        posix_spawn(), which they do not cover.
         """
         if gc.isenabled():
             self.addCleanup(gc.enable)
@@ -1677,6 +1680,7 @@ class MockProcessTestCase(unittest.TestCase):
         self.patch(process.Process, "processReaderFactory", DumbProcessReader)
         self.patch(process.Process, "processWriterFactory", DumbProcessWriter)
         self.patch(process, "pty", self.mockos)
+        self.patch(process, "_posixspawn", None)
 
         self.mocksig = MockSignal()
         self.patch(process, "signal", self.mocksig)
@@ -2094,6 +2098,126 @@ class MockProcessTestCase(unittest.TestCase):
 
 
 
+class PosixSpawnTestCase(unittest.TestCase):
+    """
+    Tests for L{process.Process._spawn}, which starts processes with
+    posix_spawn() instead of fork() and exec() where it can.
+    """
+
+    def setUp(self):
+        """
+        Record the uses of L{process.Process._fork}.
+        """
+        self.forked = []
+        fork = process.Process._fork
+        def recordingFork(proc, *args, **kwargs):
+            self.forked.append(proc)
+            return fork(proc, *args, **kwargs)
+        self.patch(process.Process, "_fork", recordingFork)
+
+
+    def test_spawned(self):
+        """
+        A process which can be started with posix_spawn() is, in the given
+        working directory.
+        """
+        path = os.path.realpath(self.mktemp())
+        os.makedirs(path)
+        d = utils.getProcessOutput(
+            sys.executable, ["-c", "import os; print os.getcwd()"],
+            env=None, path=path)
+        def check(output):
+            self.assertEqual(output.strip(), path)
+            self.assertEqual(self.forked, [])
+        return d.addCallback(check)
+
+
+    def test_ignoredSignalsReset(self):
+        """
+        Signals ignored by the parent, such as C{SIGPIPE}, are not ignored by
+        the child.
+        """
+        self.assertEqual(signal.getsignal(signal.SIGPIPE), signal.SIG_IGN)
+        grep = procutils.which("grep")[0]
+        d = utils.getProcessOutput(
+            grep, ["SigIgn", "/proc/self/status"], env=None)
+        def check(output):
+            ignored = int(output.split()[1], 16)
+            self.assertFalse(ignored & (1 << (signal.SIGPIPE - 1)))
+            self.assertEqual(self.forked, [])
+        return d.addCallback(check)
+
+    if not runtime.platform.isLinux():
+        test_ignoredSignalsReset.skip = "/proc/self/status is Linux-specific"
+
+
+    def test_fallbacks(self):
+        """
+        L{process.Process._spawn} leaves starting the process to
+        L{process.Process._fork} if it has to change the uid or gid, if
+        the program is not found, or if it is found relative to a working
+        directory which is to be changed.
+        """
+        proc = process.Process.__new__(process.Process)
+        for path, uid, gid, executable in [
+                (None, 0, None, sys.executable),
+                (None, None, 0, sys.executable),
+                (None, None, None, "/nonexistent"),
+                ("/", None, None, "./python")]:
+            self.assertFalse(proc._spawn(
+                    path, uid, gid, executable, [], {}, {}))
+
+
+    def test_overriddenSetupChild(self):
+        """
+        L{process.Process._spawn} leaves starting the process to
+        L{process.Process._fork} if L{process.Process._setupChild} is
+        overridden, since posix_spawn() would not call it.
+        """
+        class SetupProcess(process.Process):
+            def _setupChild(self, fdmap):
+                pass
+        proc = SetupProcess.__new__(SetupProcess)
+        self.assertFalse(proc._spawn(
+                None, None, None, sys.executable, [], {}, {}))
+
+
+    def test_spawnError(self):
+        """
+        If posix_spawn() fails, L{process.Process._spawn} leaves starting the
+        process to L{process.Process._fork}.
+        """
+        def spawn(*args):
+            raise OSError(errno.ENOEXEC, "Exec format error")
+        self.patch(process._posixspawn, "spawn", spawn)
+        proc = process.Process.__new__(process.Process)
+        self.assertFalse(proc._spawn(
+                None, None, None, sys.executable, [], {}, {}))
+
+
+    def test_findExecutable(self):
+        """
+        L{process._findExecutable} looks programs up in the C{PATH} of the
+        environment they will run in, like C{os.execvpe}.
+        """
+        bin = os.path.abspath(self.mktemp())
+        os.makedirs(bin)
+        program = os.path.join(bin, "program")
+        open(program, "w").close()
+        environment = {"PATH": os.pathsep.join(["/nonexistent", bin])}
+        self.assertIdentical(
+            process._findExecutable("program", environment), None)
+        os.chmod(program, 0700)
+        self.assertEqual(
+            process._findExecutable("program", environment), program)
+        self.assertEqual(
+            process._findExecutable("./program", {}), "./program")
+
+if process is None or process._posixspawn is None:
+    PosixSpawnTestCase.skip = "posix_spawn is unavailable"
+
+
+
 class PosixProcessTestCase(unittest.TestCase, PosixProcessBase):
     # add two non-pty test cases
 
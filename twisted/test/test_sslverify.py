@@ -27,6 +27,7 @@ from twisted.python.constants import NamedConstant, Names
 from twisted.python.filepath import FilePath
 from twisted.trial import unittest
 from twisted.internet import protocol, defer, reactor
+from twisted.internet.task import Clock
 
 from twisted.internet.error import CertificateError, ConnectionLost
 from twisted.internet import interfaces
@@ -1142,3 +1143,88 @@ class TestDiffieHellmanParameters(unittest.TestCase):
             self.filePath
         )
         self.assertEqual(self.filePath, params._dhFile)
+
+
+
+class ClientSessionCacheTests(unittest.TestCase):
+    """
+    Tests for L{sslverify.ClientSessionCache}.
+    """
+    if skipSSL:
+        skip = skipSSL
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = sslverify.ClientSessionCache(
+            maxSize=2, lifetime=10, clock=self.clock)
+
+
+    def test_storeAndGet(self):
+        """
+        L{sslverify.ClientSessionCache.get} returns the session stored for a
+        key, and C{None} for a key nothing was stored for.
+        """
+        session = object()
+        self.cache.store("a", session)
+        self.assertIdentical(self.cache.get("a"), session)
+        self.assertIdentical(self.cache.get("b"), None)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.cache.hitRate(), 0.5)
+
+
+    def test_replace(self):
+        """
+        Storing a session for a key replaces the one stored before.
+        """
+        session = object()
+        self.cache.store("a", object())
+        self.cache.store("a", session)
+        self.assertIdentical(self.cache.get("a"), session)
+        self.assertEqual(len(self.cache), 1)
+
+
+    def test_leastRecentlyUsedEvicted(self):
+        """
+        When the cache is full, storing another session discards the least
+        recently used one.
+        """
+        self.cache.store("a", object())
+        self.cache.store("b", object())
+        self.cache.get("a")
+        self.cache.store("c", object())
+        self.assertIdentical(self.cache.get("b"), None)
+        self.assertNotIdentical(self.cache.get("a"), None)
+        self.assertNotIdentical(self.cache.get("c"), None)
+        self.assertEqual(self.cache.evictions, 1)
+
+
+    def test_expired(self):
+        """
+        Sessions are not returned, and are discarded, once they are older than
+        the cache's lifetime.
+        """
+        self.cache.store("a", object())
+        self.clock.advance(9)
+        self.assertNotIdentical(self.cache.get("a"), None)
+        self.clock.advance(1)
+        self.assertIdentical(self.cache.get("a"), None)
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.misses, 1)
+
+
+    def test_invalidate(self):
+        """
+        L{sslverify.ClientSessionCache.invalidate} discards the session stored
+        for a key.
+        """
+        self.cache.store("a", object())
+        self.cache.invalidate("a")
+        self.cache.invalidate("b")
+        self.assertIdentical(self.cache.get("a"), None)
+
+
+    def test_noLookups(self):
+        """
+        The hit rate is zero before anything has been looked up.
+        """
+        self.assertEqual(self.cache.hitRate(), 0.0)
@@ -7,6 +7,8 @@ Tests for L{twisted.internet.task}.
 
 from __future__ import division, absolute_import
 
+from zope.interface.verify import verifyObject
+
 from twisted.trial import unittest
 
 from twisted.internet import interfaces, task, reactor, defer, error
@@ -547,6 +549,44 @@ class LoopTestCase(unittest.TestCase):
         self.assertEqual(ran, [None])
 
 
+    def test_skipMissed(self):
+        """
+        By default, calls which could not be made on time are skipped, the
+        next call is made when the next interval comes around, and
+        L{LoopingCall.missed} counts the skipped calls.
+        """
+        c = task.Clock()
+        ran = []
+        lc = TestableLoopingCall(c, lambda: ran.append(c.seconds()))
+        lc.start(1, now=False)
+        c.advance(1)
+        c.advance(3.5)
+        c.advance(0.5)
+        self.assertEqual(ran, [1, 4.5, 5])
+        self.assertEqual(lc.missed, 2)
+        lc.stop()
+
+
+    def test_catchUp(self):
+        """
+        With C{catchUp=True}, calls which could not be made on time are made
+        late, one after the other, until they are back on schedule, and
+        L{LoopingCall.missed} counts them.
+        """
+        c = task.Clock()
+        ran = []
+        lc = TestableLoopingCall(c, lambda: ran.append(c.seconds()))
+        lc.start(1, now=False, catchUp=True)
+        c.advance(1)
+        c.advance(3.5)
+        self.assertEqual(ran, [1, 4.5, 4.5, 4.5])
+        self.assertEqual(lc.missed, 2)
+        c.advance(0.5)
+        self.assertEqual(ran, [1, 4.5, 4.5, 4.5, 5])
+        self.assertEqual(lc.missed, 2)
+        lc.stop()
+
+
     def test_reprFunction(self):
         """
         L{LoopingCall.__repr__} includes the wrapped function's name.
@@ -763,6 +803,187 @@ class DeferLaterTests(unittest.TestCase):
 
 
 
+class TimerWheelTests(unittest.TestCase):
+    """
+    Tests for L{task.TimerWheel}.
+    """
+    def setUp(self):
+        self.clock = task.Clock()
+        self.wheel = task.TimerWheel(granularity=1, clock=self.clock)
+        self.calls = []
+
+
+    def test_interfaces(self):
+        """
+        L{task.TimerWheel} provides L{interfaces.ITimerWheel} and the calls
+        it returns provide L{interfaces.IDelayedCall}.
+        """
+        self.assertTrue(verifyObject(interfaces.ITimerWheel, self.wheel))
+        call = self.wheel.callLater(1, lambda: None)
+        self.assertTrue(verifyObject(interfaces.IDelayedCall, call))
+
+
+    def test_seconds(self):
+        """
+        L{task.TimerWheel.seconds} is the time according to the wheel's
+        clock.
+        """
+        self.clock.advance(3.5)
+        self.assertEqual(self.wheel.seconds(), 3.5)
+
+
+    def test_callLater(self):
+        """
+        A call scheduled with L{task.TimerWheel.callLater} runs, with its
+        arguments, once its bucket is due.
+        """
+        self.wheel.callLater(2, self.calls.append, "x")
+        self.clock.advance(1.5)
+        self.assertEqual(self.calls, [])
+        self.clock.advance(0.5)
+        self.assertEqual(self.calls, ["x"])
+
+
+    def test_roundedUp(self):
+        """
+        Calls are run at the end of their bucket, never earlier than
+        requested.
+        """
+        call = self.wheel.callLater(0.25, self.calls.append, "x")
+        self.assertEqual(call.getTime(), 0.25)
+        self.clock.advance(0.5)
+        self.assertEqual(self.calls, [])
+        self.assertTrue(call.active())
+        self.clock.advance(0.5)
+        self.assertEqual(self.calls, ["x"])
+        self.assertFalse(call.active())
+
+
+    def test_singleClockCall(self):
+        """
+        However many calls are scheduled with the wheel, it schedules at most
+        one call with its clock.
+        """
+        for i in range(100):
+            self.wheel.callLater(i % 10 + 1, self.calls.append, i)
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.pump([1] * 10)
+        self.assertEqual(sorted(self.calls), list(range(100)))
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_resetDoesNotTouchClock(self):
+        """
+        Resetting a call to a later time moves it between buckets without
+        rescheduling the wheel's clock call.
+        """
+        call = self.wheel.callLater(1, self.calls.append, "x")
+        tick = self.clock.getDelayedCalls()[0]
+        when = tick.getTime()
+        call.reset(5)
+        self.assertEqual(self.clock.getDelayedCalls(), [tick])
+        self.assertEqual(tick.getTime(), when)
+        self.clock.advance(1)
+        self.assertEqual(self.calls, [])
+        self.clock.advance(4)
+        self.assertEqual(self.calls, ["x"])
+
+
+    def test_resetSooner(self):
+        """
+        Resetting a call to a time before any other pending call makes the
+        wheel wake up earlier.
+        """
+        self.wheel.callLater(10, self.calls.append, "later")
+        call = self.wheel.callLater(10, self.calls.append, "sooner")
+        call.reset(2)
+        self.clock.advance(2)
+        self.assertEqual(self.calls, ["sooner"])
+
+
+    def test_delay(self):
+        """
+        L{IDelayedCall.delay} moves a call later by the given amount.
+        """
+        call = self.wheel.callLater(1, self.calls.append, "x")
+        call.delay(2)
+        self.assertEqual(call.getTime(), 3)
+        self.clock.advance(2)
+        self.assertEqual(self.calls, [])
+        self.clock.advance(1)
+        self.assertEqual(self.calls, ["x"])
+
+
+    def test_cancel(self):
+        """
+        A cancelled call does not run and cannot be cancelled or reset again.
+        """
+        call = self.wheel.callLater(1, self.calls.append, "x")
+        call.cancel()
+        self.assertFalse(call.active())
+        self.assertRaises(error.AlreadyCancelled, call.cancel)
+        self.assertRaises(error.AlreadyCancelled, call.reset, 1)
+        self.assertRaises(error.AlreadyCancelled, call.delay, 1)
+        self.clock.advance(1)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.wheel.getDelayedCalls(), [])
+
+
+    def test_alreadyCalled(self):
+        """
+        A call which has run cannot be cancelled or reset.
+        """
+        call = self.wheel.callLater(1, self.calls.append, "x")
+        self.clock.advance(1)
+        self.assertRaises(error.AlreadyCalled, call.cancel)
+        self.assertRaises(error.AlreadyCalled, call.reset, 1)
+
+
+    def test_cancelDuringExpiry(self):
+        """
+        A call cancelled by another call in the same bucket does not run.
+        """
+        calls = []
+        def cancelOther():
+            self.calls.append("first")
+            for call in calls:
+                if call.active():
+                    call.cancel()
+        calls.append(self.wheel.callLater(1, cancelOther))
+        calls.append(self.wheel.callLater(1, cancelOther))
+        self.clock.advance(1)
+        self.assertEqual(self.calls, ["first"])
+
+
+    def test_rescheduleDuringExpiry(self):
+        """
+        A call scheduled with no delay while a bucket is being expired runs in
+        a later bucket rather than the current one.
+        """
+        def again():
+            self.calls.append(self.clock.seconds())
+            if len(self.calls) < 3:
+                self.wheel.callLater(0, again)
+        self.wheel.callLater(1, again)
+        self.clock.pump([1, 1, 1])
+        self.assertEqual(self.calls, [1, 2, 3])
+
+
+    def test_error(self):
+        """
+        An exception raised by a call is logged and does not prevent the
+        other calls in the same bucket from running.
+        """
+        def fail():
+            raise TestException()
+        self.wheel.callLater(1, fail)
+        self.wheel.callLater(1, self.calls.append, "x")
+        self.clock.advance(1)
+        self.assertEqual(self.calls, ["x"])
+        self.assertEqual(len(self.flushLoggedErrors(TestException)), 1)
+
+
+
 class _FakeReactor(object):
 
     def __init__(self):
@@ -544,6 +544,281 @@ class ThreadPoolTestCase(unittest.SynchronousTestCase):
 
 
 
+class FakeThread(object):
+    """
+    A thread which is never started, for L{ThreadPool.threadFactory}.
+    """
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+
+
+    def start(self):
+        pass
+
+
+
+class PriorityTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{ThreadPool.callInThreadWithPriority} and the bounded queue.
+    """
+
+    def test_order(self):
+        """
+        Waiting work runs in order of priority, and in the order it was queued
+        among work of the same priority.
+        """
+        pool = threadpool.ThreadPool(0, 1)
+        order = []
+        done = threading.Event()
+        pool.callInThread(order.append, "default 1")
+        pool.callInThreadWithPriority(5, None, order.append, "low")
+        pool.callInThreadWithPriority(-5, None, order.append, "high")
+        pool.callInThread(order.append, "default 2")
+        pool.callInThreadWithPriority(10, None, done.set)
+        pool.start()
+        self.addCleanup(pool.stop)
+        done.wait(5)
+        self.assertEqual(order, ["high", "default 1", "default 2", "low"])
+
+
+    def test_callback(self):
+        """
+        L{ThreadPool.callInThreadWithPriority} calls C{onResult} with the
+        result, like L{ThreadPool.callInThreadWithCallback}.
+        """
+        pool = threadpool.ThreadPool(0, 1)
+        results = []
+        done = threading.Event()
+        def onResult(success, result):
+            results.append((success, result))
+            done.set()
+        pool.callInThreadWithPriority(1, onResult, lambda x: x * 2, 21)
+        pool.start()
+        self.addCleanup(pool.stop)
+        done.wait(5)
+        self.assertEqual(results, [(True, 42)])
+
+
+    def test_stopRunsQueuedWork(self):
+        """
+        Work of any priority queued before L{ThreadPool.stop} still runs.
+        """
+        pool = threadpool.ThreadPool(0, 1)
+        order = []
+        pool.callInThreadWithPriority(1000, None, order.append, 1)
+        pool.start()
+        pool.stop()
+        self.assertEqual(order, [1])
+
+
+    def test_maxQueued(self):
+        """
+        Once C{maxQueued} tasks are waiting, L{ThreadPool.callInThread},
+        L{ThreadPool.callInThreadWithCallback} and
+        L{ThreadPool.callInThreadWithPriority} raise L{ThreadPoolFull}.
+        """
+        pool = threadpool.ThreadPool(0, 1, maxQueued=2)
+        pool.callInThread(lambda: None)
+        pool.callInThread(lambda: None)
+        self.assertRaises(
+            threadpool.ThreadPoolFull, pool.callInThread, lambda: None)
+        self.assertRaises(
+            threadpool.ThreadPoolFull,
+            pool.callInThreadWithCallback, None, lambda: None)
+        self.assertRaises(
+            threadpool.ThreadPoolFull,
+            pool.callInThreadWithPriority, -1, None, lambda: None)
+        self.assertEqual(pool.q.qsize(), 2)
+
+
+    def test_maxQueuedIgnoresStops(self):
+        """
+        The entries telling workers to stop when the pool shrinks do not count
+        against C{maxQueued}.
+        """
+        pool = threadpool.ThreadPool(2, 2, maxQueued=1)
+        pool.threadFactory = FakeThread
+        pool.start()
+        pool.adjustPoolsize(0, 0)
+        pool.callInThread(lambda: None)
+        self.assertRaises(
+            threadpool.ThreadPoolFull, pool.callInThread, lambda: None)
+        self.assertEqual(pool.q.qsize(), 3)
+
+
+    def test_shrinkBeforeLaterWork(self):
+        """
+        When the pool shrinks, the surplus workers stop before running any
+        more work, including work queued afterwards.
+        """
+        pool = threadpool.ThreadPool(0, 1)
+        pool.threadFactory = FakeThread
+        pool.callInThreadWithPriority(-5, None, lambda: None)
+        pool.start()
+        pool.adjustPoolsize(0, 0)
+        pool.callInThreadWithPriority(-10, None, lambda: None)
+        self.assertIdentical(pool._get(), threadpool.WorkerStop)
+        self.assertEqual(pool._queued(), 2)
+
+
+    def test_persistence(self):
+        """
+        The queue bound and autoscaling parameters survive pickling.
+        """
+        pool = threadpool.ThreadPool(
+            1, 2, maxQueued=3, targetLatency=0.5, idleTimeout=10)
+        copy = pickle.loads(pickle.dumps(pool))
+        self.assertEqual(
+            (copy.maxQueued, copy.targetLatency, copy.idleTimeout),
+            (3, 0.5, 10))
+
+
+
+class AutoscalingTests(unittest.SynchronousTestCase):
+    """
+    Tests for the C{targetLatency} and C{idleTimeout} autoscaling of
+    L{ThreadPool}.
+    """
+
+    def setUp(self):
+        self.now = 0
+        self.pool = threadpool.ThreadPool(0, 3, targetLatency=1)
+        self.pool._seconds = lambda: self.now
+        self.pool.threadFactory = FakeThread
+        self.pool.start()
+
+
+    def test_firstWorker(self):
+        """
+        A worker is started for the first task even if it has not waited.
+        """
+        self.pool.callInThread(lambda: None)
+        self.assertEqual(self.pool.workers, 1)
+
+
+    def test_startsWhenLatencyExceeded(self):
+        """
+        Another worker is only started once the next task to run has waited
+        C{targetLatency} seconds.
+        """
+        self.pool.callInThread(lambda: None)
+        self.pool.callInThread(lambda: None)
+        self.assertEqual(self.pool.workers, 1)
+        self.now = 1
+        self.assertEqual(self.pool.queueLatency(), 1)
+        self.pool.callInThread(lambda: None)
+        self.assertEqual(self.pool.workers, 2)
+
+
+    def test_max(self):
+        """
+        No more than C{max} workers are started however long work waits.
+        """
+        for i in range(5):
+            self.pool.callInThread(lambda: None)
+            self.now += 10
+        self.assertEqual(self.pool.workers, 3)
+
+
+    def test_queueLatency(self):
+        """
+        L{ThreadPool.queueLatency} is how long the next task to run has
+        waited, which is the one with the smallest priority, or C{0} when
+        nothing is waiting.
+        """
+        self.assertEqual(self.pool.queueLatency(), 0)
+        self.pool.callInThread(lambda: None)
+        self.now = 5
+        self.pool.callInThreadWithPriority(-1, None, lambda: None)
+        self.now = 7
+        self.assertEqual(self.pool.queueLatency(), 2)
+
+
+    def test_idleTimeout(self):
+        """
+        A thread which has been idle for C{idleTimeout} seconds exits, as
+        long as more than C{min} threads are left.
+        """
+        pool = threadpool.ThreadPool(1, 3, idleTimeout=0.01)
+        pool.start()
+        self.addCleanup(pool.stop)
+        done = threading.Event()
+        block = threading.Event()
+        pool.callInThread(block.wait)
+        pool.callInThread(block.wait)
+        pool.callInThread(done.set)
+        done.wait(5)
+        self.assertEqual(pool.workers, 3)
+        block.set()
+        for i in range(500):
+            if pool.workers == 1 and len(pool.threads) == 1:
+                break
+            time.sleep(0.01)
+        self.assertEqual(pool.workers, 1)
+        self.assertEqual(len(pool.threads), 1)
+
+
+
+class HistogramTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{threadpool.Histogram} and the histograms kept by
+    L{ThreadPool}.
+    """
+
+    def test_record(self):
+        """
+        L{threadpool.Histogram.record} counts each duration in the bucket of
+        the next power of two seconds above it.
+        """
+        histogram = threadpool.Histogram()
+        for duration in [0.3, 0.4, 0.5, 3, 0.001]:
+            histogram.record(duration)
+        self.assertEqual(histogram.buckets(),
+                         [(2.0 ** -9, 1), (0.5, 2), (1.0, 1), (4.0, 1)])
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.total, 4.201)
+        self.assertEqual(histogram.max, 3)
+
+
+    def test_percentile(self):
+        """
+        L{threadpool.Histogram.percentile} returns the upper bound of the
+        bucket containing the percentile.
+        """
+        histogram = threadpool.Histogram()
+        self.assertEqual(histogram.percentile(50), None)
+        for i in range(9):
+            histogram.record(0.1)
+        histogram.record(10)
+        self.assertEqual(histogram.percentile(50), 0.125)
+        self.assertEqual(histogram.percentile(90), 0.125)
+        self.assertEqual(histogram.percentile(99), 16)
+
+
+    def test_poolHistograms(self):
+        """
+        L{ThreadPool} records how long each task waited for a thread in
+        C{waitTime} and how long it ran in C{runTime}.
+        """
+        pool = threadpool.ThreadPool(0, 1)
+        now = [0]
+        pool._seconds = lambda: now[0]
+        done = threading.Event()
+        def work():
+            now[0] += 2
+            done.set()
+        pool.callInThread(work)
+        now[0] = 0.25
+        pool.start()
+        self.addCleanup(pool.stop)
+        done.wait(5)
+        pool.stop()
+        self.assertEqual(pool.waitTime.buckets(), [(0.5, 1)])
+        self.assertEqual(pool.runTime.buckets(), [(4.0, 1)])
+
+
+
 class RaceConditionTestCase(unittest.SynchronousTestCase):
 
     def getTimeout(self):
@@ -327,6 +327,40 @@ class DeferToThreadPoolTestCase(unittest.TestCase):
         return self.assertFailure(d, NewError)
 
 
+    def test_full(self):
+        """
+        L{threads.deferToThreadPool} returns a failed L{Deferred} when the
+        threadpool refuses the work with L{threadpool.ThreadPoolFull}.
+        """
+        tp = threadpool.ThreadPool(0, 1, maxQueued=0)
+        d = threads.deferToThreadPool(reactor, tp, lambda: None)
+        self.failureResultOf(d, threadpool.ThreadPoolFull)
+
+
+    def test_priority(self):
+        """
+        L{threads.deferToThreadPoolWithPriority} runs the function with the
+        given priority.
+        """
+        calls = []
+        self.tp.callInThreadWithPriority = (
+            lambda priority, onResult, f, *a, **kw:
+                calls.append((priority, f, a, kw)))
+        f = lambda x, y=5: x + y
+        threads.deferToThreadPoolWithPriority(reactor, self.tp, -3, f, 3, y=4)
+        self.assertEqual(calls, [(-3, f, (3,), {'y': 4})])
+
+
+    def test_priorityFull(self):
+        """
+        L{threads.deferToThreadPoolWithPriority} returns a failed L{Deferred}
+        when the threadpool refuses the work with L{threadpool.ThreadPoolFull}.
+        """
+        tp = threadpool.ThreadPool(0, 1, maxQueued=0)
+        d = threads.deferToThreadPoolWithPriority(reactor, tp, 0, lambda: None)
+        self.failureResultOf(d, threadpool.ThreadPoolFull)
+
+
 
 _callBeforeStartupProgram = """
 import time
@@ -33,14 +33,18 @@ from twisted import plugin
 from twisted.application.service import IServiceMaker
 from twisted.application import service, app, reactors
 from twisted.scripts import twistd
-from twisted.python import log
+from twisted.python import failure, log
 from twisted.python.usage import UsageError
 from twisted.python.log import ILogObserver
 from twisted.python.components import Componentized
 from twisted.internet.defer import Deferred
+from twisted.internet.error import ProcessDone
 from twisted.internet.interfaces import IReactorDaemonize
+from twisted.internet.protocol import ProcessProtocol
+from twisted.internet.task import LoopingCall
 from twisted.internet.test.modulehelpers import AlternateReactor
 from twisted.python.fakepwd import UserDatabase
+from twisted.python.filepath import FilePath
 try:
     from twisted.scripts import _twistd_unix
 except ImportError:
@@ -319,9 +323,30 @@ class ServerOptionsTest(unittest.TestCase):
         self.assertRaises(UsageError, config.parseOptions,
                           ['--umask', 'abcdef'])
 
+
+    def test_workers(self):
+        """
+        The value given for the C{workers} option is parsed as an integer,
+        and defaults to C{None}.
+        """
+        config = twistd.ServerOptions()
+        self.assertEqual(config['workers'], None)
+        config.parseOptions(['--workers', '4'])
+        self.assertEqual(config['workers'], 4)
+
+
+    def test_invalidWorkers(self):
+        """
+        If the value given for the C{workers} option is less than one,
+        L{UsageError} is raised by L{ServerOptions.parseOptions}.
+        """
+        config = twistd.ServerOptions()
+        self.assertRaises(UsageError, config.parseOptions, ['--workers', '0'])
+
     if _twistd_unix is None:
         msg = "twistd unix not available"
         test_defaultUmask.skip = test_umask.skip = test_invalidUmask.skip = msg
+        test_workers.skip = test_invalidWorkers.skip = msg
 
 
     def test_unimportableConfiguredLogObserver(self):
@@ -788,6 +813,376 @@ class UnixApplicationRunnerStartApplicationTests(unittest.TestCase):
 
 
 
+class WorkerForkingOS(object):
+    """
+    A fake of the parts of L{os} used by
+    L{UnixApplicationRunner.superviseWorkers}.
+
+    @ivar child: Whether C{fork} returns as if in the child process.
+
+    @ivar waitResults: The C{(pid, status)} tuples C{wait} will return, in
+        order.
+
+    @ivar beforeWait: A callable called with no arguments by C{wait} before
+        it returns.
+
+    @ivar actions: A C{list} of the calls made to C{fork}, C{kill}, C{write},
+        C{close} and C{unlink}.
+    """
+    def __init__(self, child=False, waitResults=()):
+        self.child = child
+        self.waitResults = list(waitResults)
+        self.beforeWait = lambda: None
+        self.actions = []
+        self._nextPID = 100
+
+
+    def fork(self):
+        self.actions.append('fork')
+        if self.child:
+            return 0
+        self._nextPID += 1
+        return self._nextPID
+
+
+    def wait(self):
+        self.beforeWait()
+        return self.waitResults.pop(0)
+
+
+    WIFSIGNALED = staticmethod(os.WIFSIGNALED)
+    WTERMSIG = staticmethod(os.WTERMSIG)
+    WEXITSTATUS = staticmethod(os.WEXITSTATUS)
+
+
+    def kill(self, pid, signum):
+        self.actions.append(('kill', pid, signum))
+
+
+    def write(self, fd, data):
+        self.actions.append(('write', fd, data))
+
+
+    def close(self, fd):
+        self.actions.append(('close', fd))
+
+
+    def unlink(self, path):
+        self.actions.append(('unlink', path))
+
+
+
+class UnixApplicationRunnerSuperviseWorkersTests(unittest.TestCase):
+    """
+    Tests for L{UnixApplicationRunner.superviseWorkers}.
+    """
+    if _twistd_unix is None:
+        skip = "twistd unix not available"
+
+    def setUp(self):
+        self.handlers = {}
+        self.patch(signal, 'signal', self.handlers.__setitem__)
+        self.config = twistd.ServerOptions()
+        self.config.parseOptions(['--pidfile', '/foo/pidfile'])
+        self.runner = UnixApplicationRunner(self.config)
+        self.reactor = object()
+        self.messages = []
+        log.addObserver(self.messages.append)
+        self.addCleanup(log.removeObserver, self.messages.append)
+
+
+    def loggedMessages(self):
+        """
+        @return: A C{list} of the messages logged since the test started.
+        """
+        return [" ".join(event["message"]) for event in self.messages]
+
+
+    def test_worker(self):
+        """
+        In a worker process, L{UnixApplicationRunner.superviseWorkers}
+        returns after a single fork, closes the daemon status pipe and clears
+        the PID file option so that the worker neither reports on startup nor
+        removes the supervisor's PID file.
+        """
+        fakeOS = WorkerForkingOS(child=True)
+        self.patch(_twistd_unix, 'os', fakeOS)
+        self.config['statusPipe'] = 7
+        self.runner.superviseWorkers(3, self.reactor)
+        self.assertEqual(fakeOS.actions, ['fork', ('close', 7)])
+        self.assertEqual(self.config['pidfile'], None)
+        self.assertEqual(self.config['statusPipe'], None)
+        self.assertEqual(self.handlers, {})
+
+
+    def test_workerAfterFork(self):
+        """
+        In a worker process, L{UnixApplicationRunner.superviseWorkers} calls
+        the reactor's C{_afterFork} method, so that the worker does not share
+        the reactor's waker and poller with the supervisor and the other
+        workers.
+        """
+        self.patch(_twistd_unix, 'os', WorkerForkingOS(child=True))
+        calls = []
+        class ForkAwareReactor(object):
+            def _afterFork(self):
+                calls.append('afterFork')
+        self.runner.superviseWorkers(3, ForkAwareReactor())
+        self.assertEqual(calls, ['afterFork'])
+
+
+    def test_supervisor(self):
+        """
+        In the supervisor process, L{UnixApplicationRunner.superviseWorkers}
+        forks the given number of workers, reports success on the daemon
+        status pipe, waits for the workers to exit, removes the PID file and
+        exits with status 0.
+        """
+        fakeOS = WorkerForkingOS(waitResults=[(102, 0), (101, 0)])
+        self.patch(_twistd_unix, 'os', fakeOS)
+        self.config['statusPipe'] = 7
+        exc = self.assertRaises(
+            SystemExit, self.runner.superviseWorkers, 2, self.reactor)
+        self.assertEqual(exc.args, (0,))
+        self.assertEqual(
+            fakeOS.actions,
+            ['fork', 'fork', ('write', 7, '0'), ('close', 7),
+             ('unlink', '/foo/pidfile')])
+        self.assertEqual(self.handlers[signal.SIGINT], signal.SIG_IGN)
+
+
+    def test_forwardSIGTERM(self):
+        """
+        I{SIGTERM} received by the supervisor is sent to the workers which
+        have not exited yet.
+        """
+        fakeOS = WorkerForkingOS(waitResults=[(101, 0), (102, 0)])
+        self.patch(_twistd_unix, 'os', fakeOS)
+        def beforeWait():
+            fakeOS.beforeWait = lambda: None
+            self.handlers[signal.SIGTERM](signal.SIGTERM, None)
+        fakeOS.beforeWait = beforeWait
+        self.assertRaises(
+            SystemExit, self.runner.superviseWorkers, 2, self.reactor)
+        self.assertIn(('kill', 101, signal.SIGTERM), fakeOS.actions)
+        self.assertIn(('kill', 102, signal.SIGTERM), fakeOS.actions)
+
+
+    def test_failedWorker(self):
+        """
+        If any worker exits with a non-zero status, the supervisor exits with
+        status 1.
+        """
+        fakeOS = WorkerForkingOS(waitResults=[(101, 256), (102, 0)])
+        self.patch(_twistd_unix, 'os', fakeOS)
+        exc = self.assertRaises(
+            SystemExit, self.runner.superviseWorkers, 2, self.reactor)
+        self.assertEqual(exc.args, (1,))
+        self.assertIn("Worker 101 exited with status 1",
+                      self.loggedMessages())
+
+
+    def test_killedWorker(self):
+        """
+        If any worker is killed by a signal, the supervisor logs the signal
+        and exits with status 1.
+        """
+        fakeOS = WorkerForkingOS(
+            waitResults=[(101, signal.SIGKILL), (102, 0)])
+        self.patch(_twistd_unix, 'os', fakeOS)
+        exc = self.assertRaises(
+            SystemExit, self.runner.superviseWorkers, 2, self.reactor)
+        self.assertEqual(exc.args, (1,))
+        self.assertIn("Worker 101 was killed by signal %d" % (signal.SIGKILL,),
+                      self.loggedMessages())
+
+
+    def test_terminatedWorker(self):
+        """
+        A worker killed by the I{SIGTERM} the supervisor passed on to it has
+        not failed.
+        """
+        fakeOS = WorkerForkingOS(
+            waitResults=[(101, signal.SIGTERM), (102, 0)])
+        self.patch(_twistd_unix, 'os', fakeOS)
+        def beforeWait():
+            fakeOS.beforeWait = lambda: None
+            self.handlers[signal.SIGTERM](signal.SIGTERM, None)
+        fakeOS.beforeWait = beforeWait
+        exc = self.assertRaises(
+            SystemExit, self.runner.superviseWorkers, 2, self.reactor)
+        self.assertEqual(exc.args, (0,))
+
+
+    def test_unexpectedSIGTERM(self):
+        """
+        A worker killed by a I{SIGTERM} which the supervisor did not pass on
+        to it has failed.
+        """
+        fakeOS = WorkerForkingOS(
+            waitResults=[(101, signal.SIGTERM), (102, 0)])
+        self.patch(_twistd_unix, 'os', fakeOS)
+        exc = self.assertRaises(
+            SystemExit, self.runner.superviseWorkers, 2, self.reactor)
+        self.assertEqual(exc.args, (1,))
+
+
+    def test_startApplication(self):
+        """
+        L{UnixApplicationRunner.startApplication} calls
+        L{UnixApplicationRunner.superviseWorkers} with the C{workers} option
+        after setting up the environment and before starting any services.
+        """
+        self.config.parseOptions(['--workers', '3'])
+        calls = []
+        self.patch(UnixApplicationRunner, 'setupEnvironment',
+                   lambda *a: calls.append('setupEnvironment'))
+        self.patch(UnixApplicationRunner, 'superviseWorkers',
+                   lambda self, workers, reactor: calls.append(workers))
+        self.patch(UnixApplicationRunner, 'shedPrivileges',
+                   lambda *a, **kw: None)
+        self.patch(app, 'startApplication', lambda *a, **kw: None)
+
+        class FakeService(service.Service):
+            def privilegedStartService(self):
+                calls.append('privilegedStartService')
+
+        application = service.Application("test_startApplication")
+        FakeService().setServiceParent(application)
+        self.runner.startApplication(application)
+        self.assertEqual(
+            calls, ['setupEnvironment', 3, 'privilegedStartService'])
+
+
+
+_workersTAC = """
+import os, threading, time
+
+from twisted.application import service
+from twisted.internet import reactor
+
+directory = %r
+
+
+class RecordWakeUp(service.Service):
+    \"\"\"
+    Once the reactor is running, wait in a thread for the test to create a
+    file named after this process in C{go}, then wake the reactor up to
+    create one in C{woken}.
+    \"\"\"
+    def startService(self):
+        reactor.callWhenRunning(self.waitForTurn)
+
+    def waitForTurn(self):
+        pid = str(os.getpid())
+        def wakeUp():
+            while not os.path.exists(os.path.join(directory, "go", pid)):
+                time.sleep(0.05)
+            reactor.callFromThread(self.record, "woken")
+        thread = threading.Thread(target=wakeUp)
+        thread.daemon = True
+        thread.start()
+        self.record("ready")
+
+    def record(self, name):
+        open(os.path.join(directory, name, str(os.getpid())), "w").close()
+
+
+application = service.Application("workers")
+RecordWakeUp().setServiceParent(application)
+"""
+
+
+
+class WorkersTests(unittest.TestCase):
+    """
+    Tests for twistd's C{--workers} option which run real worker processes.
+    """
+    if _twistd_unix is None:
+        skip = "twistd unix not available"
+
+    def waitFor(self, condition, timeout=10):
+        """
+        Check C{condition} every so often until it returns true.
+
+        @return: A L{Deferred} which fires once C{condition} returns true, or
+            fails if it has not after C{timeout} seconds.
+        """
+        from twisted.internet import reactor
+        deadline = reactor.seconds() + timeout
+        def check():
+            if condition():
+                waiting.stop()
+            elif reactor.seconds() > deadline:
+                raise RuntimeError("Timed out waiting for %r" % (condition,))
+        waiting = LoopingCall(check)
+        return waiting.start(0.05)
+
+
+    def test_separateReactors(self):
+        """
+        Each worker has a reactor of its own, although the reactor was
+        created before the workers were forked: a call made from a thread in
+        one worker wakes up that worker's reactor, rather than the reactor of
+        another worker.  The workers stop when the supervisor receives
+        I{SIGTERM}, and the supervisor then exits with status 0.
+        """
+        from twisted.internet import reactor
+        workers = 4
+        directory = FilePath(self.mktemp())
+        for name in "ready", "go", "woken":
+            directory.child(name).makedirs()
+        tac = directory.child("workers.tac")
+        tac.setContent(_workersTAC % (directory.path,))
+        logFile = directory.child("twistd.log")
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(sys.path)
+
+        ended = Deferred()
+        class Supervisor(ProcessProtocol):
+            def processEnded(self, reason):
+                ended.callback(reason.value)
+        process = reactor.spawnProcess(
+            Supervisor(), sys.executable,
+            [sys.executable, "-c",
+             "from twisted.scripts.twistd import run; run()",
+             "--nodaemon", "--workers", str(workers),
+             "--pidfile", directory.child("twistd.pid").path,
+             "--logfile", logFile.path, "--python", tac.path],
+            env=env)
+
+        def wakeEach(ignored):
+            # Wake the workers one at a time, so another worker cannot be
+            # woken instead without it being noticed.
+            d = Deferred()
+            for pid in directory.child("ready").listdir():
+                d.addCallback(wake, pid)
+            d.callback(None)
+            return d
+        def wake(ignored, pid):
+            directory.child("go").child(pid).touch()
+            return self.waitFor(directory.child("woken").child(pid).exists)
+        def stop(result):
+            process.signalProcess("TERM")
+            ended.addCallback(lambda status: (result, status))
+            return ended
+        def check(outcome):
+            result, status = outcome
+            if isinstance(result, failure.Failure):
+                return result
+            self.assertEqual(
+                len(directory.child("woken").listdir()), workers)
+            self.assertIsInstance(status, ProcessDone, logFile.getContent())
+
+        d = self.waitFor(
+            lambda: len(directory.child("ready").listdir()) == workers)
+        d.addCallback(wakeEach)
+        d.addBoth(stop)
+        d.addCallback(check)
+        return d
+
+
+
 class UnixApplicationRunnerRemovePID(unittest.TestCase):
     """
     Tests for L{UnixApplicationRunner.removePID}.
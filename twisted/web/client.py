@@ -32,6 +32,7 @@ from twisted.web import http
 from twisted.internet import defer, protocol, task, reactor
 from twisted.internet.interfaces import IProtocol
 from twisted.internet.endpoints import TCP4ClientEndpoint, SSL4ClientEndpoint
+from twisted.internet.pool import EndpointConnectionPool
 from twisted.python import failure
 from twisted.python.util import InsensitiveDict
 from twisted.python.components import proxyForInterface
@@ -794,6 +795,10 @@ class _WebToNormalContextFactory(object):
 
     @ivar _port: The port number which will be passed to
         C{_webContext.getContext}.
+
+    Instances wrapping the same web context factory, for the same hostname and
+    port, are equal, so that connections made with different instances can
+    share TLS sessions in a L{twisted.internet.ssl.ClientSessionCache}.
     """
     def __init__(self, webContext, hostname, port):
         self._webContext = webContext
@@ -801,6 +806,25 @@ class _WebToNormalContextFactory(object):
         self._port = port
 
 
+    def __eq__(self, other):
+        if not isinstance(other, _WebToNormalContextFactory):
+            return NotImplemented
+        return (self._webContext is other._webContext and
+                self._hostname == other._hostname and
+                self._port == other._port)
+
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+
+    def __hash__(self):
+        return hash((id(self._webContext), self._hostname, self._port))
+
+
     def getContext(self):
         """
         Called the wrapped web context factory's C{getContext} method with a
@@ -997,7 +1021,7 @@ class _RetryingHTTP11ClientProtocol(object):
 
 
 
-class HTTPConnectionPool(object):
+class HTTPConnectionPool(EndpointConnectionPool):
     """
     A pool of persistent HTTP connections.
 
@@ -1012,6 +1036,11 @@ class HTTPConnectionPool(object):
     once if they use an idempotent method (e.g. GET), in case the HTTP server
     timed them out.
 
+    Unlike L{EndpointConnectionPool}, connections need not be released: each
+    one returns to the pool by itself once its request is complete, and
+    C{maxPerKey} is not supported.  Cached connections are reused in the
+    order they were cached.
+
     @ivar persistent: Boolean indicating whether connections should be
         persistent. Connections are persistent by default.
 
@@ -1030,9 +1059,6 @@ class HTTPConnectionPool(object):
     @ivar _connections: Map (scheme, host, port) to lists of
         L{HTTP11ClientProtocol} instances.
 
-    @ivar _timeouts: Map L{HTTP11ClientProtocol} instances to a
-        C{IDelayedCall} instance of their timeout.
-
     @since: 12.1
     """
 
@@ -1041,11 +1067,16 @@ class HTTPConnectionPool(object):
     cachedConnectionTimeout = 240
     retryAutomatically = True
 
+    maxIdlePerKey = property(lambda self: self.maxPersistentPerHost)
+    idleTimeout = property(lambda self: self.cachedConnectionTimeout)
+    reuseMostRecent = False
+    _connections = property(lambda self: self._idle)
+
     def __init__(self, reactor, persistent=True):
-        self._reactor = reactor
+        EndpointConnectionPool.__init__(
+            self, reactor,
+            healthCheck=lambda connection: connection.state == "QUIESCENT")
         self.persistent = persistent
-        self._connections = {}
-        self._timeouts = {}
 
 
     def getConnection(self, key, endpoint):
@@ -1069,21 +1100,19 @@ class HTTPConnectionPool(object):
         @return: A C{Deferred} that will fire with a L{HTTP11ClientProtocol}
            (or a wrapper) that can be used to send a single HTTP request.
         """
-        # Try to get cached version:
-        connections = self._connections.get(key)
-        while connections:
-            connection = connections.pop(0)
-            # Cancel timeout:
-            self._timeouts[connection].cancel()
-            del self._timeouts[connection]
-            if connection.state == "QUIESCENT":
-                if self.retryAutomatically:
-                    newConnection = lambda: self._newConnection(key, endpoint)
-                    connection = _RetryingHTTP11ClientProtocol(
-                        connection, newConnection)
-                return defer.succeed(connection)
-
-        return self._newConnection(key, endpoint)
+        started = self._seconds()
+        connection = self._takeIdle(key)
+        if connection is not None:
+            self._checkedOut(started, True)
+            if self.retryAutomatically:
+                newConnection = lambda: self._newConnection(key, endpoint)
+                connection = _RetryingHTTP11ClientProtocol(
+                    connection, newConnection)
+            return defer.succeed(connection)
+
+        d = self._newConnection(key, endpoint)
+        d.addCallback(self._connected, started)
+        return d
 
 
     def _newConnection(self, key, endpoint):
@@ -1095,16 +1124,7 @@ class HTTPConnectionPool(object):
         def quiescentCallback(protocol):
             self._putConnection(key, protocol)
         factory = self._factory(quiescentCallback)
-        return endpoint.connect(factory)
-
-
-    def _removeConnection(self, key, connection):
-        """
-        Remove a connection from the cache and disconnect it.
-        """
-        connection.transport.loseConnection()
-        self._connections[key].remove(connection)
-        del self._timeouts[connection]
+        return self._connect(key, endpoint, factory)
 
 
     def _putConnection(self, key, connection):
@@ -1120,17 +1140,7 @@ class HTTPConnectionPool(object):
             except:
                 log.err()
             return
-        connections = self._connections.setdefault(key, [])
-        if len(connections) == self.maxPersistentPerHost:
-            dropped = connections.pop(0)
-            dropped.transport.loseConnection()
-            self._timeouts[dropped].cancel()
-            del self._timeouts[dropped]
-        connections.append(connection)
-        cid = self._reactor.callLater(self.cachedConnectionTimeout,
-                                      self._removeConnection,
-                                      key, connection)
-        self._timeouts[connection] = cid
+        self._putIdle(key, connection)
 
 
     def closeCachedConnections(self):
@@ -1141,13 +1151,10 @@ class HTTPConnectionPool(object):
             closed.
         """
         results = []
-        for protocols in self._connections.itervalues():
+        for protocols in self._connections.values():
             for p in protocols:
                 results.append(p.abort())
-        self._connections = {}
-        for dc in self._timeouts.values():
-            dc.cancel()
-        self._timeouts = {}
+        self._forgetIdle()
         return defer.gatherResults(results).addCallback(lambda ign: None)
 
 
@@ -1223,16 +1230,22 @@ class Agent(_AgentBase):
     @ivar _bindAddress: If not C{None}, the address passed to C{connectTCP} or
         C{connectSSL} for specifying the local address to bind to.
 
+    @ivar _sessionCache: If not C{None}, a
+        L{twisted.internet.ssl.ClientSessionCache} which I{HTTPS} connections
+        resume TLS sessions from, so that only the first connection to each
+        server (in a while) needs a full handshake.
+
     @since: 9.0
     """
 
     def __init__(self, reactor, contextFactory=WebClientContextFactory(),
                  connectTimeout=None, bindAddress=None,
-                 pool=None):
+                 pool=None, sessionCache=None):
         _AgentBase.__init__(self, reactor, pool)
         self._contextFactory = contextFactory
         self._connectTimeout = connectTimeout
         self._bindAddress = bindAddress
+        self._sessionCache = sessionCache
 
 
     def _wrapContextFactory(self, host, port):
@@ -1279,6 +1292,7 @@ class Agent(_AgentBase):
         elif scheme == 'https':
             return SSL4ClientEndpoint(self._reactor, host, port,
                                       self._wrapContextFactory(host, port),
+                                      sessionCache=self._sessionCache,
                                       **kwargs)
         else:
             raise SchemeNotSupported("Unsupported scheme: %r" % (scheme,))
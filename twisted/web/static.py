@@ -23,7 +23,7 @@ from twisted.web import http
 from twisted.web.util import redirectTo
 
 from twisted.python import components, filepath, log
-from twisted.internet import abstract, interfaces
+from twisted.internet import abstract, error, interfaces
 from twisted.persisted import styles
 from twisted.python.util import InsensitiveDict
 from twisted.python.runtime import platformType
@@ -704,12 +704,45 @@ class StaticProducer(object):
 class NoRangeStaticProducer(StaticProducer):
     """
     A L{StaticProducer} that writes the entire file to the request.
+
+    If the request's transport provides L{interfaces.ISendFileTransport}, the
+    file is handed to it to send, so that the data need not pass through
+    Python.  Otherwise it is read and written a chunk at a time.
     """
 
     def start(self):
+        transport = getattr(self.request, 'transport', None)
+        if interfaces.ISendFileTransport.providedBy(transport):
+            # Send the headers first; then, unless the response has to be
+            # chunked, the body can go straight to the transport.
+            self.request.write('')
+            if not self.request.chunked:
+                d = transport.sendFile(self.fileObject)
+                d.addCallbacks(self._sendFileDone, self._sendFileFailed)
+                return
         self.request.registerProducer(self, False)
 
 
+    def _sendFileDone(self, sent):
+        """
+        Finish the request once the transport has sent the whole file.
+        """
+        self.request.sentLength += sent
+        self.request.finish()
+        self.stopProducing()
+
+
+    def _sendFileFailed(self, reason):
+        """
+        Close the file if it could not be sent, which means the connection
+        was lost or has been aborted, and log the reason unless the
+        connection was simply lost.
+        """
+        self.stopProducing()
+        if not reason.check(error.ConnectionLost, error.ConnectionDone):
+            log.err(reason, "Error sending file")
+
+
     def resumeProducing(self):
         if not self.request:
             return
@@ -412,14 +412,14 @@ class HTTPConnectionPoolTests(TestCase, FakeReactorAndConnectMixin):
         self.assertEqual(protocol.transport.disconnecting, False)
         self.assertIn(protocol,
                       self.pool._connections[("http", "example.com", 80)])
-        self.assertIn(protocol, self.pool._timeouts)
+        self.assertIn(protocol, self.pool._idleSince)
 
         # Advance past 240 seconds, connection will be closed:
         self.fakeReactor.advance(1.1)
         self.assertEqual(protocol.transport.disconnecting, True)
-        self.assertNotIn(protocol,
-                         self.pool._connections[("http", "example.com", 80)])
-        self.assertNotIn(protocol, self.pool._timeouts)
+        self.assertNotIn(protocol, self.pool._connections.get(
+                ("http", "example.com", 80), []))
+        self.assertNotIn(protocol, self.pool._idleSince)
 
 
     def test_putExceedsMaxPersistent(self):
@@ -437,7 +437,6 @@ class HTTPConnectionPoolTests(TestCase, FakeReactorAndConnectMixin):
             pool._putConnection(("http", "example.com", 80), p)
         self.assertEqual(pool._connections[("http", "example.com", 80)],
                          origCached)
-        timeouts = pool._timeouts.copy()
 
         # Now we add another one:
         newProtocol = StubHTTPProtocol()
@@ -451,8 +450,9 @@ class HTTPConnectionPoolTests(TestCase, FakeReactorAndConnectMixin):
         self.assertEqual([p.transport.disconnecting for p in newCached],
                          [False, False])
         self.assertEqual(origCached[0].transport.disconnecting, True)
-        self.assertTrue(timeouts[origCached[0]].cancelled)
-        self.assertNotIn(origCached[0], pool._timeouts)
+        self.assertNotIn(origCached[0], pool._idleSince)
+        # A single timer takes care of timing out all cached connections:
+        self.assertEqual(len(self.fakeReactor.getDelayedCalls()), 1)
 
 
     def test_maxPersistentPerHost(self):
@@ -492,12 +492,12 @@ class HTTPConnectionPoolTests(TestCase, FakeReactorAndConnectMixin):
         def gotConnection(conn):
             # We got the cached connection:
             self.assertIdentical(protocol, conn)
-            self.assertNotIn(
-                conn, self.pool._connections[("http", "example.com", 80)])
-            # And the timeout was cancelled:
+            self.assertNotIn(conn, self.pool._connections.get(
+                    ("http", "example.com", 80), []))
+            # And it won't time out:
             self.fakeReactor.advance(241)
             self.assertEqual(conn.transport.disconnecting, False)
-            self.assertNotIn(conn, self.pool._timeouts)
+            self.assertNotIn(conn, self.pool._idleSince)
 
         return self.pool.getConnection(("http", "example.com", 80),
                                        BadEndpoint(),
@@ -552,8 +552,8 @@ class HTTPConnectionPoolTests(TestCase, FakeReactorAndConnectMixin):
 
         # And both the disconnected and removed connections should be out of
         # the cache:
-        self.assertEqual(pool._connections[key], [])
-        self.assertEqual(pool._timeouts, {})
+        self.assertEqual(pool._connections.get(key, []), [])
+        self.assertEqual(pool._idleSince, {})
 
 
     def test_putNotQuiescent(self):
@@ -637,7 +637,7 @@ class HTTPConnectionPoolTests(TestCase, FakeReactorAndConnectMixin):
         # All timeouts were cancelled and removed:
         for dc in self.fakeReactor.getDelayedCalls():
             self.assertEqual(dc.cancelled, True)
-        self.assertEqual(self.pool._timeouts, {})
+        self.assertEqual(self.pool._idleSince, {})
 
         # Returned Deferred fires when all connections have been closed:
         result = []
@@ -1128,6 +1128,41 @@ class AgentHTTPSTests(TestCase, FakeReactorAndConnectMixin):
         )
 
 
+    def test_sessionCache(self):
+        """
+        The session cache given to L{Agent} is used by the endpoints it
+        creates for I{HTTPS} connections.
+        """
+        cache = ssl.ClientSessionCache()
+        agent = client.Agent(self.Reactor(), sessionCache=cache)
+        endpoint = agent._getEndpoint(b'https', 'example.com', 443)
+        self.assertIdentical(endpoint._sessionCache, cache)
+
+
+    def test_sessionCacheKey(self):
+        """
+        The context factories of L{Agent}'s endpoints for the same host and
+        port are equal, so that the endpoints share cached sessions, while
+        those of another agent, with a context factory which may trust other
+        certificates, are not.
+        """
+        agent = client.Agent(self.Reactor())
+        first = agent._getEndpoint(b'https', 'example.com', 443)
+        second = agent._getEndpoint(b'https', 'example.com', 443)
+        self.assertEqual(first._sslContextFactory, second._sslContextFactory)
+        self.assertEqual(hash(first._sslContextFactory),
+                         hash(second._sslContextFactory))
+
+        other = agent._getEndpoint(b'https', 'example.com', 8443)
+        self.assertNotEqual(first._sslContextFactory,
+                            other._sslContextFactory)
+        other = client.Agent(
+            self.Reactor(), contextFactory=WebClientContextFactory(),
+            )._getEndpoint(b'https', 'example.com', 443)
+        self.assertNotEqual(first._sslContextFactory,
+                            other._sslContextFactory)
+
+
 
 class WebClientContextFactoryTests(TestCase):
     """
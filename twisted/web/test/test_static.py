@@ -4,15 +4,17 @@
 """
 Tests for L{twisted.web.static}.
 """
+import errno
 import inspect
 import mimetypes
 import os
 import re
 import StringIO
 
+from zope.interface import implementer
 from zope.interface.verify import verifyObject
 
-from twisted.internet import abstract, interfaces
+from twisted.internet import abstract, defer, error, interfaces
 from twisted.python.runtime import platform
 from twisted.python.filepath import FilePath
 from twisted.python import log
@@ -703,6 +705,114 @@ class NoRangeStaticProducerTests(TestCase):
 
 
 
+@implementer(interfaces.ISendFileTransport)
+class SendFileTransport(object):
+    """
+    A fake transport which records the files it is asked to send.
+
+    @ivar sent: A C{list} of the files passed to C{sendFile}.
+
+    @ivar deferred: The L{defer.Deferred} returned by the last call to
+        C{sendFile}.
+    """
+    def __init__(self):
+        self.sent = []
+        self.deferred = None
+
+
+    def sendFile(self, fileObject, offset=0, count=None):
+        self.sent.append((fileObject, offset, count))
+        self.deferred = defer.Deferred()
+        return self.deferred
+
+
+
+class SendFileRequest(DummyRequest):
+    """
+    A L{DummyRequest} with a transport which can send files itself.
+    """
+    chunked = 0
+    sentLength = 0
+
+    def __init__(self, *args, **kwargs):
+        DummyRequest.__init__(self, *args, **kwargs)
+        self.transport = SendFileTransport()
+        self.producers = []
+
+
+    def registerProducer(self, producer, streaming):
+        self.producers.append(producer)
+
+
+
+class NoRangeStaticProducerSendFileTests(TestCase):
+    """
+    Tests for L{NoRangeStaticProducer} with a transport which provides
+    L{interfaces.ISendFileTransport}.
+    """
+
+    def setUp(self):
+        self.request = SendFileRequest([])
+        self.fileObject = StringIO.StringIO('abcdef')
+        self.producer = static.NoRangeStaticProducer(
+            self.request, self.fileObject)
+
+
+    def test_sendFile(self):
+        """
+        L{NoRangeStaticProducer.start} hands the file to the transport instead
+        of registering itself as a producer, and finishes the request once it
+        has been sent.
+        """
+        self.producer.start()
+        self.assertEqual(self.request.producers, [])
+        self.assertEqual(
+            self.request.transport.sent, [(self.fileObject, 0, None)])
+        self.assertEqual(self.request.finished, 0)
+
+        self.request.transport.deferred.callback(6)
+        self.assertEqual(self.request.finished, 1)
+        self.assertEqual(self.request.sentLength, 6)
+        self.assertTrue(self.fileObject.closed)
+
+
+    def test_connectionLost(self):
+        """
+        If the connection is lost while the file is being sent, the file is
+        closed and the request is not finished.
+        """
+        self.producer.start()
+        self.request.transport.deferred.errback(error.ConnectionLost())
+        self.assertEqual(self.request.finished, 0)
+        self.assertTrue(self.fileObject.closed)
+
+
+    def test_sendFileError(self):
+        """
+        If sending the file fails for another reason, the file is closed, the
+        request is forgotten and the error is logged.
+        """
+        self.producer.start()
+        self.request.transport.deferred.errback(
+            OSError(errno.EPIPE, "Broken pipe"))
+        self.assertEqual(self.request.finished, 0)
+        self.assertTrue(self.fileObject.closed)
+        self.assertIdentical(self.producer.request, None)
+        self.assertEqual(len(self.flushLoggedErrors(OSError)), 1)
+
+
+    def test_chunked(self):
+        """
+        If the response has to be chunked, the producer writes the file to
+        the request itself.
+        """
+        self.request.chunked = 1
+        self.producer.start()
+        self.assertEqual(self.request.transport.sent, [])
+        self.assertEqual(self.request.producers, [self.producer])
+
+
+
 class SingleRangeStaticProducerTests(TestCase):
     """
     Tests for L{SingleRangeStaticProducer}.
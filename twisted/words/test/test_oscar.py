@@ -6,8 +6,9 @@ Tests for L{twisted.words.protocols.oscar}.
 """
 
 from twisted.trial.unittest import TestCase
+from twisted.test.proto_helpers import StringTransport
 
-from twisted.words.protocols.oscar import encryptPasswordMD5
+from twisted.words.protocols.oscar import encryptPasswordMD5, SNAC, SNACBased
 
 
 class PasswordTests(TestCase):
@@ -22,3 +23,28 @@ class PasswordTests(TestCase):
         self.assertEqual(
             encryptPasswordMD5('foo', 'bar').encode('hex'),
             'd73475c370a7b18c6c20386bcf1339f2')
+
+
+
+class SNACBasedTests(TestCase):
+    """
+    Tests for L{SNACBased}.
+    """
+    def test_sendSNAC(self):
+        """
+        L{SNACBased.sendSNAC} sends a SNAC with a new request ID and returns a
+        L{Deferred} which fires with the reply to that request.
+        """
+        connection = SNACBased("cookie")
+        connection.transport = StringTransport()
+        connection.seqnum = 0
+        replies = []
+        connection.sendSNAC(0x01, 0x02, "request").addCallback(
+            replies.append)
+        self.assertTrue(
+            connection.transport.value().endswith(
+                SNAC(0x01, 0x02, 0, "request")))
+
+        connection.oscar_Data((0x02, SNAC(0x01, 0x03, 0, "reply")))
+        self.assertEqual(replies, [[0x01, 0x03, 0, 0, 0, "reply"]])
+        self.assertEqual(connection.requestCallbacks, {})